@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Parallelle ObjectID-range paginering voor ArcGIS layers
+=======================================================
+
+Vervangt het seriële pagineren met resultOffset. Eerst worden met
+returnIdsOnly alle ObjectIDs van de layer opgehaald; die worden gesorteerd en
+opgeknipt in ranges van maximaal één pagina. Elke range wordt opgehaald met
+`where OBJECTID BETWEEN lo AND hi`, meerdere tegelijk, en de pagina's komen in
+de oorspronkelijke volgorde terug.
+
+Levert de server geen ObjectIDs (oude of afwijkende services), dan valt de
+pager terug op resultOffset paginering.
+
+Gebruik:
+    from arcgis_paging import LayerPager
+
+    pager = LayerPager(downloader.make_request, query_url)
+    for index, page in pager.pages():
+        features.extend(page['features'])
+
+`request` is een callable (url, params) -> dict of None, zoals make_request van
+de downloaders (inclusief retries en rate limiting). Die moet thread-safe zijn.
+
+De pagina's zijn Esri JSON (of decoded pbf) in WGS84 (outSR=OUT_SR);
+FeatureCollectionWriter zet ze bij het schrijven om naar GeoJSON.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000  # ArcGIS limiet (maxRecordCount)
+RANGE_WORKERS = 4  # Aantal ranges dat tegelijk wordt opgehaald
+OUT_SR = 4326  # Features komen in WGS84, zodat ze direct als GeoJSON (RFC 7946) geschreven kunnen worden
+
+Request = Callable[[str, Dict], Optional[Dict]]
+
+
+class PageError(RuntimeError):
+    """Een pagina kon niet opgehaald worden (na retries) of de server gaf een fout"""
+
+
+def split_id_ranges(object_ids: List[int], size: int = PAGE_SIZE) -> List[Tuple[int, int]]:
+    """
+    Knip gesorteerde ObjectIDs op in ranges met elk maximaal `size` IDs.
+
+    Gaten in de ID reeks maken een range niet groter: de grenzen zijn
+    bestaande IDs, dus BETWEEN lo AND hi levert precies die IDs op.
+    """
+    if size < 1:
+        raise ValueError("size moet >= 1 zijn")
+    ids = sorted(set(object_ids))
+    return [(ids[i], ids[min(i + size, len(ids)) - 1]) for i in range(0, len(ids), size)]
+
+
+def layer_schema_from_page(data: Dict) -> Dict:
+    """Veld- en geometrie metadata uit een query pagina (voor de generieke importer)"""
+    return {
+        'fields': data.get('fields', []),
+        'geometry_type': data.get('geometryType'),
+        'spatial_reference': data.get('spatialReference'),
+        'has_z': data.get('hasZ', False),
+        'has_m': data.get('hasM', False),
+        'object_id_field': data.get('objectIdFieldName'),
+        'global_id_field': data.get('globalIdFieldName')
+    }
+
+
+class LayerPager:
+    """Haalt alle features van één layer op, per ObjectID-range of per offset"""
+
+    def __init__(self, request: Request, query_url: str, page_size: int = PAGE_SIZE,
+                 workers: int = RANGE_WORKERS, where: str = '1=1', params: Optional[Dict] = None):
+        """
+        Initialiseer de pager.
+
+        Args:
+            request: Callable (url, params) -> dict of None
+            query_url: URL van het query endpoint (.../MapServer/<layer_id>/query)
+            page_size: Maximaal aantal features per request
+            workers: Aantal ranges dat tegelijk wordt opgehaald
+            where: Filter op de layer (wordt gecombineerd met de range)
+            params: Extra query parameters (bijv. outFields)
+        """
+        self.request = request
+        self.query_url = query_url
+        self.page_size = page_size
+        self.workers = max(1, workers)
+        self.where = where
+        self.params = {'outFields': '*', 'returnGeometry': 'true', 'outSR': OUT_SR, **(params or {})}
+        self.object_id_field: Optional[str] = None
+        self.object_ids: Optional[List[int]] = None
+        self.ranges: Optional[List[Tuple[int, int]]] = None
+        self.strategy: Optional[str] = None
+
+    def _query(self, params: Dict) -> Dict:
+        """Eén query request; PageError bij geen antwoord of een ArcGIS fout"""
+        data = self.request(self.query_url, {**self.params, **params})
+        if not data:
+            raise PageError(f"Geen antwoord van {self.query_url}")
+        if 'error' in data:
+            raise PageError(f"ArcGIS fout: {data['error']}")
+        return data
+
+    def plan(self) -> str:
+        """
+        Bepaal de strategie: 'ids' (ObjectID-ranges) of 'offset' (fallback).
+
+        Returns:
+            De gekozen strategie
+        """
+        if self.strategy:
+            return self.strategy
+
+        data = self.request(self.query_url, {'where': self.where, 'returnIdsOnly': 'true'})
+        ids = (data or {}).get('objectIds')
+        field = (data or {}).get('objectIdFieldName')
+        if data and 'error' not in data and field and ids is not None:
+            self.object_id_field = field
+            self.object_ids = sorted(ids)
+            self.ranges = split_id_ranges(self.object_ids, self.page_size)
+            self.strategy = 'ids'
+            logger.debug(f"    {len(self.object_ids)} ObjectIDs in {len(self.ranges)} ranges")
+        else:
+            self.strategy = 'offset'
+            logger.debug("    Geen ObjectIDs beschikbaar, terugval op resultOffset paginering")
+        return self.strategy
+
+    def plan_state(self) -> Dict:
+        """Het gekozen plan als dict (om een download later met dezelfde ranges te hervatten)"""
+        self.plan()
+        return {
+            'strategy': self.strategy,
+            'object_id_field': self.object_id_field,
+            'ranges': [list(r) for r in self.ranges] if self.ranges is not None else None,
+            'expected_count': self.expected_count
+        }
+
+    def restore_plan(self, state: Dict):
+        """Zet een eerder plan terug (zie plan_state), zonder returnIdsOnly opnieuw op te vragen"""
+        self.strategy = state['strategy']
+        self.object_id_field = state.get('object_id_field')
+        if state.get('ranges') is not None:
+            self.ranges = [tuple(r) for r in state['ranges']]
+        self.object_ids = None
+        self._expected = state.get('expected_count')
+
+    def fetch_count(self) -> int:
+        """Aantal features volgens de server (returnCountOnly)"""
+        data = self.request(self.query_url, {'where': self.where, 'returnCountOnly': 'true'})
+        if not data or 'error' in data or 'count' not in data:
+            raise PageError(f"Kon aantal features niet ophalen van {self.query_url}")
+        return int(data['count'])
+
+    @property
+    def expected_count(self) -> Optional[int]:
+        """Aantal features volgens returnIdsOnly (None bij offset paginering)"""
+        if self.object_ids is not None:
+            return len(self.object_ids)
+        return getattr(self, '_expected', None)
+
+    def range_where(self, lo: int, hi: int) -> str:
+        """WHERE clause voor één ObjectID-range"""
+        clause = f"{self.object_id_field} BETWEEN {int(lo)} AND {int(hi)}"
+        if self.where and self.where != '1=1':
+            clause = f"({self.where}) AND {clause}"
+        return clause
+
+    def fetch_range(self, lo: int, hi: int) -> Dict:
+        """
+        Haal één ObjectID-range op.
+
+        Is de maxRecordCount van de server kleiner dan de range
+        (exceededTransferLimit), dan wordt de rest van de range opgehaald
+        vanaf de hoogste ontvangen ObjectID.
+        """
+        data = self._query({'where': self.range_where(lo, hi)})
+        features = data.get('features', [])
+        while data.get('exceededTransferLimit') and features:
+            last = max(f.get('attributes', {}).get(self.object_id_field, lo) for f in features)
+            if last >= hi:
+                break
+            more = self._query({'where': self.range_where(last + 1, hi)})
+            if not more.get('features'):
+                break
+            features.extend(more['features'])
+            data = more
+        result = {k: v for k, v in data.items() if k not in ('features', 'exceededTransferLimit')}
+        result['features'] = features
+        return result
+
+    def _iter_range_pages(self, indices: List[int]) -> Iterator[Tuple[int, Dict]]:
+        """Haal ranges parallel op en lever ze in volgorde; hoogstens 2x workers onderweg"""
+        window = self.workers * 2
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            position = 0
+            for index in indices:
+                while len(futures) >= window:
+                    # Oudste range eerst afleveren (volgorde behouden, geheugen begrensd)
+                    done_index = indices[position]
+                    yield done_index, futures.pop(done_index).result()
+                    position += 1
+                futures[index] = executor.submit(self.fetch_range, *self.ranges[index])
+            for done_index in indices[position:]:
+                yield done_index, futures.pop(done_index).result()
+
+    def _iter_offset_pages(self, index: int = 0, offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """Seriële resultOffset paginering (fallback), eventueel vanaf een eerdere positie"""
+        while True:
+            data = self._query({
+                'where': self.where,
+                'resultOffset': offset,
+                'resultRecordCount': self.page_size
+            })
+            features = data.get('features', [])
+            yield index, data
+            if not features or (len(features) < self.page_size and not data.get('exceededTransferLimit')):
+                break
+            # Verschuif met het werkelijke aantal: maxRecordCount kan kleiner zijn dan page_size
+            offset += len(features)
+            index += 1
+
+    def pages(self, skip: Optional[set] = None, start_index: int = 0,
+              start_offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """
+        Lever (index, pagina) tuples in volgorde.
+
+        Args:
+            skip: Indices van ranges die al binnen zijn (alleen bij strategie 'ids')
+            start_index: Eerste pagina/range die opgehaald wordt (hervatten)
+            start_offset: Aantal features dat al binnen is (hervatten bij strategie 'offset')
+
+        Raises:
+            PageError: Als een pagina niet opgehaald kon worden
+        """
+        if self.plan() == 'ids':
+            indices = [i for i in range(start_index, len(self.ranges)) if not skip or i not in skip]
+            yield from self._iter_range_pages(indices)
+        else:
+            yield from self._iter_offset_pages(start_index, start_offset)
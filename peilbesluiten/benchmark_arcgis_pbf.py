@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ArcGIS query f=json versus f=pbf
+===========================================
+
+Haalt per layer dezelfde pagina features op als f=json en f=pbf en vergelijkt:
+- bytes over de lijn (na HTTP compressie, zoals de server ze stuurt)
+- parse tijd (json.loads versus arcgis_pbf.decode_feature_collection)
+- of beide formaten dezelfde features opleveren (attributen en aantal vertices)
+
+Gebruik:
+    python benchmark_arcgis_pbf.py                                    # dynamische datasets
+    python benchmark_arcgis_pbf.py --layer Peilgebied_praktijk_soort_gebied/MapServer/0
+    python benchmark_arcgis_pbf.py --count 2000 --repeat 10
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from arcgis_pbf import decode_feature_collection, supports_pbf
+from rate_limiter import limiter_for_url
+from update_dynamische_data import ARCGIS_BASE_URL, DYNAMISCHE_DATASETS, TIMEOUT
+
+
+def fetch(url: str, params: Dict) -> requests.Response:
+    limiter_for_url(url).acquire()
+    response = requests.get(url, params=params, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+def vertex_count(geometry: Optional[Dict]) -> int:
+    if not geometry:
+        return 0
+    if 'x' in geometry:
+        return 1
+    parts = geometry.get('rings') or geometry.get('paths') or [geometry.get('points') or []]
+    return sum(len(part) for part in parts)
+
+
+def parse_time(parser, payload, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parser(payload)
+    return (time.perf_counter() - start) / repeat
+
+
+def measure(layer_path: str, count: int, repeat: int) -> Optional[Dict]:
+    base = ARCGIS_BASE_URL.rstrip('/') + '/'
+    info = fetch(base + layer_path, {'f': 'json'}).json()
+    if not supports_pbf(info):
+        print(f"  {layer_path}: geen pbf ondersteuning (supportedQueryFormats: "
+              f"{info.get('supportedQueryFormats')})", file=sys.stderr)
+        return None
+
+    params = {'where': '1=1', 'outFields': '*', 'returnGeometry': 'true',
+              'resultOffset': 0, 'resultRecordCount': count}
+    json_response = fetch(base + layer_path + '/query', {**params, 'f': 'json'})
+    pbf_response = fetch(base + layer_path + '/query', {**params, 'f': 'pbf'})
+
+    json_data = json.loads(json_response.content)
+    pbf_data = decode_feature_collection(pbf_response.content)
+    json_features, pbf_features = json_data.get('features', []), pbf_data['features']
+    same = (len(json_features) == len(pbf_features)
+            and all(a['attributes'] == b['attributes']
+                    and vertex_count(a.get('geometry')) == vertex_count(b.get('geometry'))
+                    for a, b in zip(json_features, pbf_features)))
+
+    def wire_bytes(response):
+        # Content-Length is na compressie; anders de gedecomprimeerde grootte
+        return int(response.headers.get('Content-Length') or len(response.content))
+
+    return {
+        'layer': layer_path,
+        'features': len(pbf_features),
+        'json_bytes': wire_bytes(json_response),
+        'pbf_bytes': wire_bytes(pbf_response),
+        'json_raw': len(json_response.content),
+        'pbf_raw': len(pbf_response.content),
+        'json_parse': parse_time(json.loads, json_response.content, repeat),
+        'pbf_parse': parse_time(decode_feature_collection, pbf_response.content, repeat),
+        'same': same
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ArcGIS f=json versus f=pbf')
+    parser.add_argument('--layer', action='append',
+                        help='Layer pad onder de services URL, bijv. Gemaal/MapServer/0 (herhaalbaar)')
+    parser.add_argument('--count', type=int, default=1000, help='Features per pagina (default: 1000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Aantal parse herhalingen (default: 5)')
+    args = parser.parse_args()
+
+    layers: List[str] = args.layer or [f"{d['service']}/{d['layer_id']}" for d in DYNAMISCHE_DATASETS]
+
+    results = []
+    for layer in layers:
+        try:
+            result = measure(layer, args.count, args.repeat)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"  {layer}: {e}", file=sys.stderr)
+            continue
+        if result:
+            results.append(result)
+
+    if not results:
+        print("Geen layers gemeten", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"\n{'='*96}")
+    print(f"ARCGIS QUERY FORMAAT BENCHMARK - f=json versus f=pbf ({args.count} features per pagina)")
+    print(f"{'='*96}")
+    print(f"{'Layer':<40}{'Features':>9}{'JSON bytes':>12}{'PBF bytes':>11}{'Ratio':>8}"
+          f"{'JSON ms':>9}{'PBF ms':>8}{'Gelijk':>8}")
+    for r in results:
+        print(f"{r['layer'][:39]:<40}{r['features']:>9,}{r['json_bytes']:>12,}{r['pbf_bytes']:>11,}"
+              f"{r['json_bytes'] / max(r['pbf_bytes'], 1):>7.1f}x"
+              f"{r['json_parse'] * 1000:>9.1f}{r['pbf_parse'] * 1000:>8.1f}{'ja' if r['same'] else 'NEE':>8}")
+    json_raw = sum(r['json_raw'] for r in results)
+    pbf_raw = sum(r['pbf_raw'] for r in results)
+    print(f"{'='*96}")
+    print(f"Ongecomprimeerd: JSON {json_raw:,} bytes, PBF {pbf_raw:,} bytes "
+          f"({json_raw / max(pbf_raw, 1):.1f}x kleiner)")
+    print(f"{'='*96}\n")
+
+
+if __name__ == '__main__':
+    main()
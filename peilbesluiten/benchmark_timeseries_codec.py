@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tijdreeks codec versus JSON snapshots
+================================================
+
+Vergelijkt voor debiet reeksen:
+- JSON snapshot (huidig save_data formaat: indent=2, dict per punt)
+- NDJSON segment regels ("[timestamp_ms,value]")
+- Gorilla codec (timeseries_codec.py)
+
+Rapporteert bytes per punt en decode doorvoer (punten per seconde), en
+daarnaast het live pad: de punten worden in polls van --poll-points nieuwe
+punten via SegmentStore.append_points opgeslagen (ndjson en gorilla), zoals de
+fetcher dat doet. Dat meet de bytes op schijf en de tijd per append.
+
+Gebruik:
+    python benchmark_timeseries_codec.py                      # synthetische reeks (90 dagen)
+    python benchmark_timeseries_codec.py --days 365
+    python benchmark_timeseries_codec.py --days 14 --poll-points 1
+    python benchmark_timeseries_codec.py --segments realtime_gemaal_data/segments
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+from segment_store import SegmentStore
+from timeseries_codec import decode, encode
+
+HALF_HOUR_MS = 30 * 60 * 1000
+
+
+def synthetic_series(days: int, seed: int = 1) -> List[Tuple[int, float]]:
+    """Simuleer een gemaal: lange periodes uit (0.0) en pompperiodes met variërend debiet"""
+    rng = random.Random(seed)
+    start_ms = int(datetime(2025, 1, 1).timestamp() * 1000)
+    points = []
+    pump_on = False
+    for i in range(days * 48):
+        if rng.random() < 0.04:
+            pump_on = not pump_on
+        value = round(rng.uniform(0.1, 2.5), 3) if pump_on else 0.0
+        points.append((start_ms + i * HALF_HOUR_MS, value))
+    return points
+
+
+def as_json_snapshot(points: List[Tuple[int, float]]) -> bytes:
+    """Bouw een snapshot in het formaat van de oude save_data (indent=2)"""
+    data = [{
+        'timestamp': datetime.fromtimestamp(ts / 1000).isoformat(),
+        'timestamp_ms': ts,
+        'value': value,
+        'status': 'aan' if value > 0.001 else 'uit'
+    } for ts, value in points]
+    snapshot = {
+        'timestamp': datetime.now().isoformat(),
+        'feature_identifier': 'benchmark',
+        'chart_id': 'benchmark',
+        'data': {'series': [{'name': 'Debiet', 'type': 'line', 'color': '', 'data': data}]}
+    }
+    return json.dumps(snapshot, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def decode_json_snapshot(payload: bytes) -> List[Tuple[int, float]]:
+    snapshot = json.loads(payload)
+    return [(p['timestamp_ms'], p['value']) for p in snapshot['data']['series'][0]['data']]
+
+
+def as_ndjson(points: List[Tuple[int, float]]) -> bytes:
+    return ''.join(json.dumps([ts, value], separators=(',', ':')) + '\n'
+                   for ts, value in points).encode('utf-8')
+
+
+def decode_ndjson(payload: bytes) -> List[Tuple[int, float]]:
+    return [tuple(json.loads(line)) for line in payload.decode('utf-8').splitlines() if line]
+
+
+def measure(name: str, points, encoder, decoder, repeat: int) -> dict:
+    payload = encoder(points)
+    decoded = decoder(payload)
+    if [(int(ts), float(v)) for ts, v in decoded] != [(int(ts), float(v)) for ts, v in points]:
+        raise AssertionError(f"{name}: round-trip komt niet overeen")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decoder(payload)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    return {
+        'format': name,
+        'bytes': len(payload),
+        'bytes_per_point': len(payload) / len(points),
+        'decode_points_per_s': len(points) / elapsed if elapsed > 0 else float('inf')
+    }
+
+
+def measure_appends(points: List[Tuple[int, float]], poll_points: int) -> List[dict]:
+    """Sla de punten op in polls van poll_points nieuwe punten (met overlap, zoals een API response)"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for encoding in ('ndjson', 'gorilla'):
+            store = SegmentStore(Path(tmp) / encoding, encoding=encoding, latest_window_ms=None)
+            appends = 0
+            start = time.perf_counter()
+            for end in range(poll_points, len(points) + poll_points, poll_points):
+                store.append_points('benchmark', points[max(0, end - 6 * poll_points):end])
+                appends += 1
+            elapsed = time.perf_counter() - start
+            if list(store.read_points('benchmark')) != [(ts, float(v)) for ts, v in points]:
+                raise AssertionError(f"{encoding}: append round-trip komt niet overeen")
+            size = sum(p.stat().st_size for p in (Path(tmp) / encoding / 'benchmark').glob('*.*')
+                       if p.name != 'index.json')
+            results.append({'format': f"SegmentStore {encoding}", 'bytes': size,
+                            'bytes_per_point': size / len(points), 'ms_per_append': elapsed / appends * 1000})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tijdreeks codec versus JSON')
+    parser.add_argument('--days', type=int, default=90, help='Aantal dagen synthetische data (default: 90)')
+    parser.add_argument('--segments', type=str, help='Gebruik echte reeksen uit een segment store directory')
+    parser.add_argument('--repeat', type=int, default=5, help='Aantal decode herhalingen (default: 5)')
+    parser.add_argument('--poll-points', type=int, default=1,
+                        help='Nieuwe punten per append in het live pad (default: 1)')
+    parser.add_argument('--append-days', type=int, default=14,
+                        help='Dagen (laatste) voor het live pad; elke append herschrijft de dag (default: 14)')
+    args = parser.parse_args()
+
+    if args.segments:
+        store = SegmentStore(Path(args.segments))
+        points = []
+        for station in store.stations():
+            points.extend(store.read_points(station))
+        source = f"segment store {args.segments} ({len(store.stations())} reeksen)"
+    else:
+        points = synthetic_series(args.days)
+        source = f"synthetisch, {args.days} dagen"
+
+    if not points:
+        print("Geen punten gevonden", file=sys.stderr)
+        sys.exit(1)
+
+    results = [
+        measure('JSON snapshot (indent=2)', points, as_json_snapshot, decode_json_snapshot, args.repeat),
+        measure('NDJSON segment', points, as_ndjson, decode_ndjson, args.repeat),
+        measure('Gorilla codec', points, encode, decode, args.repeat),
+    ]
+
+    baseline = results[0]['bytes']
+    print(f"\n{'='*78}")
+    print(f"TIJDREEKS CODEC BENCHMARK - {len(points):,} punten ({source})")
+    print(f"{'='*78}")
+    print(f"{'Formaat':<28}{'Bytes':>12}{'Bytes/punt':>12}{'Ratio':>9}{'Decode punten/s':>17}")
+    for r in results:
+        print(f"{r['format']:<28}{r['bytes']:>12,}{r['bytes_per_point']:>12.2f}"
+              f"{baseline / r['bytes']:>8.1f}x{r['decode_points_per_s']:>17,.0f}")
+
+    live = points[-args.append_days * 48:]
+    print(f"\nLive pad: {len(live):,} punten, {args.poll_points} nieuw(e) punt(en) per append")
+    print(f"{'Formaat':<28}{'Bytes':>12}{'Bytes/punt':>12}{'ms/append':>12}")
+    for r in measure_appends(live, args.poll_points):
+        print(f"{r['format']:<28}{r['bytes']:>12,}{r['bytes_per_point']:>12.2f}{r['ms_per_append']:>12.2f}")
+    print(f"{'='*78}\n")
+
+
+if __name__ == '__main__':
+    main()
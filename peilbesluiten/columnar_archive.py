@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped kolom archief voor gemaal historie
+================================================
+
+Per station één bestand met twee vaste-breedte kolommen, gelezen via mmap als
+NumPy views. Een tijdsbereik opvragen is een binary search (np.searchsorted)
+plus een zero-copy slice: er worden geen Python objecten per punt aangemaakt.
+
+Bestandsformaat (<root>/<station>.col, little-endian):
+    header (64 bytes): magic b'HHVRCOL1', versie, aantal punten, eerste en laatste timestamp
+    timestamps: int64[count]  (milliseconden sinds epoch, oplopend, uniek)
+    values:     float64[count]
+
+Het archief wordt (her)opgebouwd uit de segment store (bijv. nachtelijks);
+schrijven gebeurt atomisch zodat lezers nooit een half bestand zien.
+
+Gebruik:
+    python columnar_archive.py build realtime_gemaal_data/segments gemaal_archief
+    python columnar_archive.py export gemaal_archief 176-036-00021 --start 2025-01-01 --csv out.csv
+
+Consumers: de export hierboven (CSV) en de sliding window skill
+(skills/process_sliding_windows_skill.py --data-source archive), die de
+kolommen via add_arrays direct aan de processors geeft.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from segment_store import SegmentStore, safe_key
+
+MAGIC = b'HHVRCOL1'
+VERSION = 1
+HEADER = struct.Struct('<8sIIqqq')
+HEADER_SIZE = 64
+TS_DTYPE = np.dtype('<i8')
+VALUE_DTYPE = np.dtype('<f8')
+
+
+class StationColumns:
+    """
+    Read-only, memory-mapped kolommen van één station.
+
+    De attributen `timestamps` en `values` zijn NumPy views op de mmap;
+    ze blijven geldig zolang het object open is.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE:
+            self._file.close()
+            raise ValueError(f"Geen geldig archief bestand: {self.path}")
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, first_ts, last_ts = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Onbekend archief formaat in {self.path}")
+
+        self.count = count
+        self.first_ts = first_ts if count else None
+        self.last_ts = last_ts if count else None
+        self.timestamps = np.frombuffer(self._mmap, dtype=TS_DTYPE, count=count, offset=HEADER_SIZE)
+        self.values = np.frombuffer(self._mmap, dtype=VALUE_DTYPE, count=count,
+                                    offset=HEADER_SIZE + count * TS_DTYPE.itemsize)
+
+    def range(self, start_ms: Optional[int] = None,
+              end_ms: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Geef de punten in [start_ms, end_ms] als zero-copy views.
+
+        Returns:
+            (timestamps, values) NumPy views
+        """
+        lo = 0 if start_ms is None else int(np.searchsorted(self.timestamps, start_ms, side='left'))
+        hi = self.count if end_ms is None else int(np.searchsorted(self.timestamps, end_ms, side='right'))
+        return self.timestamps[lo:hi], self.values[lo:hi]
+
+    def to_series_data(self, start_ms: Optional[int] = None,
+                       end_ms: Optional[int] = None) -> List[Dict]:
+        """
+        Zet een bereik om naar het series formaat van de Hydronet fetcher
+        (dicts met timestamp, timestamp_ms, value en status), voor bestaande consumers.
+        """
+        timestamps, values = self.range(start_ms, end_ms)
+        return [{
+            'timestamp': datetime.fromtimestamp(ts / 1000).isoformat(),
+            'timestamp_ms': ts,
+            'value': value,
+            'status': 'aan' if value > 0.001 else 'uit'
+        } for ts, value in zip(timestamps.tolist(), values.tolist())]
+
+    def close(self):
+        # Views moeten losgelaten zijn voordat de mmap dicht kan
+        self.timestamps = None
+        self.values = None
+        if getattr(self, '_mmap', None) is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Er leven nog slices bij de aanroeper; de mmap sluit bij garbage collection
+                pass
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarArchive:
+    """Directory met per station een kolom bestand"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, station: str) -> Path:
+        return self.root / f"{safe_key(station)}.col"
+
+    def stations(self) -> List[str]:
+        return sorted(p.stem for p in self.root.glob('*.col'))
+
+    def open(self, station: str) -> StationColumns:
+        """Open de kolommen van een station (gebruik als context manager)"""
+        return StationColumns(self.path_for(station))
+
+    def write(self, station: str, timestamps: Iterable[int], values: Iterable[float]) -> int:
+        """
+        Schrijf de volledige historie van een station (atomisch).
+
+        Timestamps worden gesorteerd en ontdubbeld (laatste waarde wint).
+
+        Returns:
+            Aantal geschreven punten
+        """
+        ts = np.asarray(list(timestamps) if not isinstance(timestamps, np.ndarray) else timestamps,
+                        dtype=TS_DTYPE)
+        vals = np.asarray(list(values) if not isinstance(values, np.ndarray) else values,
+                          dtype=VALUE_DTYPE)
+        if ts.shape != vals.shape:
+            raise ValueError("timestamps en values moeten even lang zijn")
+
+        order = np.argsort(ts, kind='stable')
+        ts, vals = ts[order], vals[order]
+        if len(ts):
+            # Bij dubbele timestamps de laatste waarde behouden
+            keep = np.append(ts[1:] != ts[:-1], True)
+            ts, vals = ts[keep], vals[keep]
+
+        count = len(ts)
+        header = HEADER.pack(MAGIC, VERSION, 0, count,
+                             int(ts[0]) if count else 0, int(ts[-1]) if count else 0)
+        header = header.ljust(HEADER_SIZE, b'\0')
+
+        path = self.path_for(station)
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix='.tmp_', suffix='.col')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                ts.tofile(f)
+                vals.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        return count
+
+    def append(self, station: str, points: Iterable[Tuple[int, float]]) -> int:
+        """
+        Voeg punten toe die nieuwer zijn dan het laatste punt in het archief.
+
+        Omdat de kolommen aaneengesloten zijn wordt het bestand herschreven;
+        gebruik dit voor periodieke compactie, niet per poll.
+
+        Returns:
+            Aantal toegevoegde punten
+        """
+        points = sorted(points)
+        path = self.path_for(station)
+        if not path.exists():
+            return self.write(station, (p[0] for p in points), (p[1] for p in points))
+
+        with self.open(station) as columns:
+            last_ts = columns.last_ts
+            new = [p for p in points if last_ts is None or p[0] > last_ts]
+            if not new:
+                return 0
+            ts = np.concatenate([columns.timestamps, np.array([p[0] for p in new], dtype=TS_DTYPE)])
+            vals = np.concatenate([columns.values, np.array([p[1] for p in new], dtype=VALUE_DTYPE)])
+        self.write(station, ts, vals)
+        return len(new)
+
+    def build_from_segment_store(self, store: SegmentStore,
+                                 stations: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Bouw het archief (opnieuw) op uit een segment store.
+
+        Returns:
+            Dict met per station het aantal punten
+        """
+        result = {}
+        for station in stations or store.stations():
+            timestamps = []
+            values = []
+            for ts, value in store.read_points(station):
+                timestamps.append(ts)
+                values.append(value)
+            if timestamps:
+                result[station] = self.write(station, timestamps, values)
+        return result
+
+
+def _parse_date_ms(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def main():
+    """CLI voor opbouwen en exporteren van het archief"""
+    parser = argparse.ArgumentParser(description='Memory-mapped kolom archief voor gemaal historie')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='Bouw het archief op uit een segment store')
+    build.add_argument('segments', help='Directory van de segment store')
+    build.add_argument('archive', help='Doel directory van het archief')
+
+    export = sub.add_parser('export', help='Exporteer een tijdsbereik van een station')
+    export.add_argument('archive', help='Directory van het archief')
+    export.add_argument('station', help='Gemaal code')
+    export.add_argument('--start', help='Begin (ISO datum/tijd)')
+    export.add_argument('--end', help='Eind (ISO datum/tijd)')
+    export.add_argument('--csv', help='Schrijf naar CSV bestand (default: stdout)')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        archive = ColumnarArchive(Path(args.archive))
+        result = archive.build_from_segment_store(SegmentStore(Path(args.segments)))
+        print(f"{len(result)} stations, {sum(result.values()):,} punten in {archive.root}", file=sys.stderr)
+        return
+
+    archive = ColumnarArchive(Path(args.archive))
+    with archive.open(args.station) as columns:
+        timestamps, values = columns.range(_parse_date_ms(args.start), _parse_date_ms(args.end))
+        out = open(args.csv, 'w', encoding='utf-8') if args.csv else sys.stdout
+        try:
+            out.write('timestamp_ms,value\n')
+            np.savetxt(out, np.column_stack([timestamps, values]), fmt=['%d', '%.6g'], delimiter=',')
+        finally:
+            if args.csv:
+                out.close()
+        print(f"{len(timestamps):,} punten geëxporteerd", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
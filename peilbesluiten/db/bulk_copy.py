@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Binary COPY bulk loader voor PostGIS tabellen
+=============================================
+
+Streamt rijen in het PostgreSQL binary COPY formaat (PGCOPY) naar een
+tijdelijke staging tabel (TEMP, ON COMMIT DROP) en voegt ze daarna met één
+set-based INSERT ... ON CONFLICT samen met de doeltabel. De staging tabel is
+privé per sessie: gelijktijdige imports van dezelfde tabel zitten elkaar niet
+in de weg en na een crash blijft er niets achter.
+
+Geometrie wordt client-side als EWKB (met SRID, geforceerd naar Multi*)
+gecodeerd, zodat de server geen GeoJSON hoeft te parsen.
+
+Gebruik (vanuit de import scripts):
+    from bulk_copy import bulk_merge
+
+    stats = bulk_merge(conn, 'peilbesluiten.peilbesluiten',
+                       columns=[('objectid', 'int4'), ..., ('geometry', 'geometry')],
+                       rows=rows, conflict_columns=['objectid'])
+"""
+
+import io
+import struct
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from psycopg2 import sql
+except ImportError:  # Alleen nodig voor copy_rows en bulk_merge; de encoders werken zonder psycopg2
+    sql = None
+
+PGCOPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+PGCOPY_HEADER = PGCOPY_SIGNATURE + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+
+POSTGRES_EPOCH = datetime(2000, 1, 1)
+POSTGRES_EPOCH_DATE = date(2000, 1, 1)
+
+# WKB geometrie types en EWKB vlaggen
+WKB_POINT = 1
+WKB_LINESTRING = 2
+WKB_POLYGON = 3
+WKB_MULTIPOINT = 4
+WKB_MULTILINESTRING = 5
+WKB_MULTIPOLYGON = 6
+WKB_GEOMETRYCOLLECTION = 7
+EWKB_Z_FLAG = 0x80000000
+EWKB_SRID_FLAG = 0x20000000
+
+GEOJSON_TYPES = {
+    'Point': WKB_POINT,
+    'LineString': WKB_LINESTRING,
+    'Polygon': WKB_POLYGON,
+    'MultiPoint': WKB_MULTIPOINT,
+    'MultiLineString': WKB_MULTILINESTRING,
+    'MultiPolygon': WKB_MULTIPOLYGON,
+    'GeometryCollection': WKB_GEOMETRYCOLLECTION,
+}
+MULTI_TYPES = {'Point': 'MultiPoint', 'LineString': 'MultiLineString', 'Polygon': 'MultiPolygon'}
+
+
+# ============================================================================
+# EWKB encoder
+# ============================================================================
+
+def _has_z(geometry: Dict) -> bool:
+    coords = geometry.get('coordinates')
+    while isinstance(coords, list) and coords and isinstance(coords[0], list):
+        coords = coords[0]
+    return isinstance(coords, list) and len(coords) > 2
+
+
+def _write_points(out: bytearray, points: Sequence[Sequence[float]], dims: int):
+    out += struct.pack('<I', len(points))
+    fmt = struct.Struct('<' + 'd' * dims)
+    for point in points:
+        out += fmt.pack(*(point[i] if i < len(point) else 0.0 for i in range(dims)))
+
+
+def _write_geometry(out: bytearray, geometry: Dict, dims: int, srid: Optional[int]):
+    geom_type = geometry['type']
+    wkb_type = GEOJSON_TYPES.get(geom_type)
+    if wkb_type is None:
+        raise ValueError(f"Onbekend geometrie type: {geom_type}")
+
+    type_flags = wkb_type | (EWKB_Z_FLAG if dims == 3 else 0)
+    if srid is not None:
+        type_flags |= EWKB_SRID_FLAG
+    out += b'\x01'  # Little-endian
+    out += struct.pack('<I', type_flags)
+    if srid is not None:
+        out += struct.pack('<I', srid)
+
+    coords = geometry.get('coordinates')
+    if wkb_type == WKB_POINT:
+        point = coords or []
+        out += struct.pack('<' + 'd' * dims, *(point[i] if i < len(point) else 0.0 for i in range(dims)))
+    elif wkb_type == WKB_LINESTRING:
+        _write_points(out, coords, dims)
+    elif wkb_type == WKB_POLYGON:
+        out += struct.pack('<I', len(coords))
+        for ring in coords:
+            _write_points(out, ring, dims)
+    elif wkb_type == WKB_GEOMETRYCOLLECTION:
+        parts = geometry.get('geometries', [])
+        out += struct.pack('<I', len(parts))
+        for part in parts:
+            _write_geometry(out, part, dims, None)
+    else:
+        # Multi*: elk onderdeel is een volledige WKB geometrie van het enkelvoudige type
+        single = geom_type[len('Multi'):]
+        out += struct.pack('<I', len(coords))
+        for part in coords:
+            _write_geometry(out, {'type': single, 'coordinates': part}, dims, None)
+
+
+def geojson_to_ewkb(geometry: Dict, srid: int = 4326, force_multi: bool = True) -> bytes:
+    """
+    Codeer een GeoJSON geometrie als EWKB (equivalent van
+    ST_Multi(ST_SetSRID(ST_GeomFromGeoJSON(...), srid))).
+
+    Args:
+        geometry: GeoJSON geometrie dict
+        srid: SRID om in de EWKB op te nemen
+        force_multi: Zet Point/LineString/Polygon om naar het Multi* type
+
+    Returns:
+        EWKB bytes (little-endian)
+    """
+    if force_multi and geometry['type'] in MULTI_TYPES:
+        geometry = {'type': MULTI_TYPES[geometry['type']], 'coordinates': [geometry['coordinates']]}
+    dims = 3 if _has_z(geometry) else 2
+    out = bytearray()
+    _write_geometry(out, geometry, dims, srid)
+    return bytes(out)
+
+
+# ============================================================================
+# PGCOPY binary encoder
+# ============================================================================
+
+def _encode_int4(value) -> bytes:
+    return struct.pack('>i', int(value))
+
+
+def _encode_int8(value) -> bytes:
+    return struct.pack('>q', int(value))
+
+
+def _encode_float8(value) -> bytes:
+    return struct.pack('>d', float(value))
+
+
+def _encode_bool(value) -> bytes:
+    return b'\x01' if value else b'\x00'
+
+
+def _encode_text(value) -> bytes:
+    return str(value).encode('utf-8')
+
+
+def _encode_timestamp(value) -> bytes:
+    # Microseconden sinds 2000-01-01; naive datetimes worden als lokale tijd opgeslagen (zoals TIMESTAMP)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - POSTGRES_EPOCH
+    return struct.pack('>q', (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+
+def _encode_date(value) -> bytes:
+    return struct.pack('>i', (value - POSTGRES_EPOCH_DATE).days)
+
+
+def _encode_uuid(value) -> bytes:
+    if not isinstance(value, uuid.UUID):
+        value = uuid.UUID(str(value))
+    return value.bytes
+
+
+def _encode_geometry(value) -> bytes:
+    # Dict = GeoJSON; bytes = al gecodeerde EWKB
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return geojson_to_ewkb(value)
+
+
+ENCODERS = {
+    'int4': _encode_int4,
+    'integer': _encode_int4,
+    'int8': _encode_int8,
+    'bigint': _encode_int8,
+    'float8': _encode_float8,
+    'double precision': _encode_float8,
+    'bool': _encode_bool,
+    'text': _encode_text,
+    'varchar': _encode_text,
+    'timestamp': _encode_timestamp,
+    'date': _encode_date,
+    'uuid': _encode_uuid,
+    'geometry': _encode_geometry,
+}
+
+
+def encode_row(row: Sequence, encoders: Sequence) -> bytes:
+    """Codeer één rij als PGCOPY tuple (None, en een lege string bij niet-tekst kolommen, wordt NULL)"""
+    parts = [struct.pack('>h', len(encoders))]
+    for value, encoder in zip(row, encoders):
+        if value is None or (value == '' and encoder is not _encode_text):
+            parts.append(struct.pack('>i', -1))
+        else:
+            data = encoder(value)
+            parts.append(struct.pack('>i', len(data)))
+            parts.append(data)
+    return b''.join(parts)
+
+
+def iter_pgcopy(rows: Iterable[Sequence], types: Sequence[str]) -> Iterator[bytes]:
+    """Lever het volledige PGCOPY binary bestand in stukken (header, rijen, trailer)"""
+    encoders = [ENCODERS[t] for t in types]
+    yield PGCOPY_HEADER
+    for row in rows:
+        yield encode_row(row, encoders)
+    yield PGCOPY_TRAILER
+
+
+class IteratorStream(io.RawIOBase):
+    """File-achtig object over een iterator van bytes, voor cursor.copy_expert"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = bytearray()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while len(self._buffer) < len(b):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        del self._buffer[:n]
+        return n
+
+
+# ============================================================================
+# Staging + merge
+# ============================================================================
+
+def _split_table(table: str) -> Tuple[str, str]:
+    schema, _, name = table.rpartition('.')
+    return schema or 'public', name
+
+
+def copy_rows(cursor, table, columns: List[Tuple[str, str]], rows: Iterable[Sequence]) -> int:
+    """
+    Stream rijen met binary COPY in een bestaande tabel.
+
+    Args:
+        cursor: psycopg2 cursor
+        table: sql.Identifier van de tabel
+        columns: Lijst van (kolomnaam, type) in de volgorde van de rijen
+        rows: Iterable van tuples in kolomvolgorde
+
+    Returns:
+        Aantal gekopieerde rijen
+    """
+    counter = {'rows': 0}
+
+    def counted(source):
+        for row in source:
+            counter['rows'] += 1
+            yield row
+
+    column_list = sql.SQL(', ').join(sql.Identifier(c) for c, _ in columns)
+    cursor.copy_expert(
+        sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT binary)").format(table, column_list).as_string(cursor),
+        io.BufferedReader(IteratorStream(iter_pgcopy(counted(rows), [t for _, t in columns])),
+                          buffer_size=1 << 20)
+    )
+    return counter['rows']
+
+
+def bulk_merge(conn, table: str, columns: List[Tuple[str, str]], rows: Iterable[Sequence],
+               conflict_columns: List[str], update_columns: Optional[List[str]] = None,
+               touch_updated_at: bool = True, commit: bool = True) -> Dict:
+    """
+    Laad rijen via binary COPY in een tijdelijke staging tabel en merge ze in de doeltabel.
+
+    Args:
+        conn: psycopg2 connectie
+        table: Doeltabel ('schema.tabel')
+        columns: Lijst van (kolomnaam, type) in de volgorde van de rijen; type is een sleutel uit ENCODERS
+        rows: Iterable van tuples in kolomvolgorde
+        conflict_columns: Kolommen van de unique constraint voor ON CONFLICT
+        update_columns: Kolommen die bij een conflict worden bijgewerkt (default: alle niet-conflict kolommen)
+        touch_updated_at: Zet updated_at = CURRENT_TIMESTAMP bij een update
+        commit: Commit na de merge (False om in dezelfde transactie verder te gaan)
+
+    Returns:
+        Dict met 'rows' (gekopieerd), 'merged' (ingevoegd/bijgewerkt) en 'seconds'
+    """
+    start = time.time()
+    schema, name = _split_table(table)
+    target = sql.Identifier(schema, name)
+    staging = sql.Identifier('pg_temp', f"{name}_staging")
+    names = [c for c, _ in columns]
+    column_list = sql.SQL(', ').join(sql.Identifier(c) for c in names)
+    conflict_list = sql.SQL(', ').join(sql.Identifier(c) for c in conflict_columns)
+    if update_columns is None:
+        update_columns = [c for c in names if c not in conflict_columns]
+
+    assignments = [sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in update_columns]
+    if touch_updated_at:
+        assignments.append(sql.SQL("updated_at = CURRENT_TIMESTAMP"))
+
+    with conn.cursor() as cursor:
+        # Tijdelijke staging tabel met de kolomtypes van de gekopieerde kolommen, zonder constraints
+        # of WAL. Alleen zichtbaar in deze sessie; ON COMMIT DROP ruimt hem ook op als de merge
+        # niet afloopt. De DROP vooraf is voor een eerdere aanroep in dezelfde transactie (commit=False).
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+        cursor.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+            sql.Identifier(f"{name}_staging"), column_list, target))
+
+        copied = copy_rows(cursor, staging, columns, rows)
+
+        cursor.execute(sql.SQL("""
+            INSERT INTO {target} ({columns})
+            SELECT DISTINCT ON ({conflict}) {columns} FROM {staging}
+            ORDER BY {conflict}
+            ON CONFLICT ({conflict}) DO UPDATE SET {assignments}
+        """).format(target=target, columns=column_list, conflict=conflict_list,
+                    staging=staging, assignments=sql.SQL(', ').join(assignments)))
+        merged = cursor.rowcount
+
+        cursor.execute(sql.SQL("DROP TABLE {}").format(staging))
+    if commit:
+        conn.commit()
+
+    return {'rows': copied, 'merged': merged, 'seconds': time.time() - start}
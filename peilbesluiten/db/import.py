@@ -1,14 +1,28 @@
 #!/usr/bin/env python3
 """
 Import peilbesluiten GeoJSON data into PostgreSQL database
+
+Modes:
+    values  execute_values met ST_GeomFromGeoJSON op de server (oorspronkelijke pad)
+    copy    binary COPY naar een staging tabel met client-side EWKB (zie bulk_copy.py)
 """
 
+import argparse
 import json
+import time
 import psycopg2
 from psycopg2.extras import execute_values
 from datetime import datetime
 import sys
 import os
+from pathlib import Path
+
+from bulk_copy import bulk_merge
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from geojson_stream import iter_feature_chunks, iter_features  # noqa: E402
+
+CHUNK_FEATURES = 1000  # Features per execute_values batch (begrensd geheugengebruik)
 
 # Database connection parameters
 DB_CONFIG = {
@@ -25,35 +39,47 @@ def convert_timestamp(timestamp_ms):
         return datetime.fromtimestamp(timestamp_ms / 1000)
     return None
 
-def import_geojson(geojson_file, conn):
-    """Import GeoJSON data into PostgreSQL"""
-
-    with open(geojson_file, 'r') as f:
-        data = json.load(f)
-
-    features = data.get('features', [])
-    print(f"Found {len(features)} features to import")
+COPY_COLUMNS = [
+    ('objectid', 'int4'),
+    ('ws_pbnaam', 'text'),
+    ('ws_gpnaam', 'text'),
+    ('ws_info', 'text'),
+    ('ws_dtm_goed', 'timestamp'),
+    ('globalid', 'uuid'),
+    ('geometry', 'geometry'),
+]
+
+def feature_to_row(feature):
+    """Zet een GeoJSON feature om naar een rij in kolomvolgorde (geometrie als dict)"""
+    props = feature['properties']
+    geom = feature['geometry']
+
+    return (
+        props.get('OBJECTID'),
+        props.get('WS_PBNAAM'),
+        props.get('WS_GPNAAM'),
+        props.get('WS_INFO'),
+        convert_timestamp(props.get('WS_DTM_GOED')),
+        props.get('GLOBALID'),
+        geom
+    )
+
+def import_geojson(geojson_file, conn, mode='values'):
+    """Import GeoJSON data into PostgreSQL (features worden gestreamd, niet volledig ingelezen)"""
 
     cursor = conn.cursor()
-
-    # Prepare data for batch insert
-    values = []
-    for feature in features:
-        props = feature['properties']
-        geom = feature['geometry']
-
-        # Convert geometry to WKT for PostGIS
-        geom_json = json.dumps(geom)
-
-        values.append((
-            props.get('OBJECTID'),
-            props.get('WS_PBNAAM'),
-            props.get('WS_GPNAAM'),
-            props.get('WS_INFO'),
-            convert_timestamp(props.get('WS_DTM_GOED')),
-            props.get('GLOBALID'),
-            geom_json
-        ))
+    start = time.time()
+
+    if mode == 'copy':
+        rows = (feature_to_row(feature) for feature in iter_features(geojson_file))
+        stats = bulk_merge(conn, 'peilbesluiten.peilbesluiten', COPY_COLUMNS, rows,
+                           conflict_columns=['objectid'])
+        report_rate(stats['rows'], time.time() - start, mode)
+        print(f"Successfully imported {stats['merged']} peilbesluiten")
+        cursor.execute("SELECT COUNT(*) FROM peilbesluiten.peilbesluiten")
+        print(f"Total peilbesluiten in database: {cursor.fetchone()[0]}")
+        cursor.close()
+        return
 
     # Batch insert with ON CONFLICT to handle duplicates
     insert_query = """
@@ -76,10 +102,22 @@ def import_geojson(geojson_file, conn):
         ST_Multi(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326))
     )"""
 
-    execute_values(cursor, insert_query, values, template=template, page_size=100)
+    # Verwerk de features per chunk; één transactie voor de hele import
+    imported = 0
+    for chunk in iter_feature_chunks(geojson_file, CHUNK_FEATURES):
+        values = []
+        for feature in chunk:
+            row = feature_to_row(feature)
+            # Convert geometry to GeoJSON text for ST_GeomFromGeoJSON
+            values.append(row[:-1] + (json.dumps(row[-1]),))
+        execute_values(cursor, insert_query, values, template=template, page_size=100)
+        imported += len(values)
+        print(f"  {imported} features verwerkt...", end="\r")
+    print("")  # Newline after progress
 
     conn.commit()
-    print(f"Successfully imported {len(values)} peilbesluiten")
+    report_rate(imported, time.time() - start, mode)
+    print(f"Successfully imported {imported} peilbesluiten")
 
     # Show statistics
     cursor.execute("SELECT COUNT(*) FROM peilbesluiten.peilbesluiten")
@@ -88,13 +126,21 @@ def import_geojson(geojson_file, conn):
 
     cursor.close()
 
+def report_rate(rows, seconds, mode):
+    """Print de import snelheid (voor vergelijking tussen de modes)"""
+    rate = rows / seconds if seconds > 0 else 0
+    print(f"Imported {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/sec, mode={mode})")
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python import.py <geojson_file>")
-        print("Example: python import.py data/peilbesluiten_hdsr.geojson")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description='Import peilbesluiten GeoJSON data into PostgreSQL',
+        epilog='Example: python import.py data/peilbesluiten_hdsr.geojson --mode copy')
+    parser.add_argument('geojson_file', help='GeoJSON bestand')
+    parser.add_argument('--mode', choices=['values', 'copy'], default='values',
+                        help='values: execute_values (default); copy: binary COPY + merge')
+    args = parser.parse_args()
 
-    geojson_file = sys.argv[1]
+    geojson_file = args.geojson_file
 
     if not os.path.exists(geojson_file):
         print(f"Error: File {geojson_file} not found")
@@ -106,7 +152,7 @@ def main():
         conn = psycopg2.connect(**DB_CONFIG)
         print("Connected successfully")
 
-        import_geojson(geojson_file, conn)
+        import_geojson(geojson_file, conn, mode=args.mode)
 
         conn.close()
         print("Import completed successfully")
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Import alle gedownloade Rijnland kaartlagen in PostgreSQL (schema kaartlagen)
+
+Per laag onder rijnland_kaartlagen/ wordt een tabel aangemaakt op basis van de
+ArcGIS veld metadata (meegeschreven door download_rijnland_layers.py; voor
+oudere downloads opgehaald van de server of afgeleid uit de attributen).
+
+Per laag:
+- Nieuwe tabel met kolommen uit de veld metadata en een getypeerde geometrie kolom
+- Binary COPY van de features (gestreamd, geometrie als EWKB, zie bulk_copy.py)
+- GiST index op de geometrie en ANALYZE
+- Atomische wissel met de vorige versie van de tabel
+
+Lagen worden parallel geladen door worker processen, elk met een eigen connection pool.
+
+Usage:
+    python db/import_kaartlagen.py                          # alle lagen
+    python db/import_kaartlagen.py rijnland_kaartlagen --workers 8
+    python db/import_kaartlagen.py --only Gemaal Meetlocatie
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import psycopg2
+import psycopg2.pool
+import requests
+from psycopg2 import sql
+
+from bulk_copy import copy_rows, geojson_to_ewkb
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from download_profiles import is_profile_file  # noqa: E402
+from geojson_stream import esri_to_geojson, feature_attributes, iter_features, read_member  # noqa: E402
+from rate_limiter import limiter_for_url  # noqa: E402
+
+# Database connection parameters
+DB_CONFIG = {
+    'dbname': os.getenv('POSTGRES_DB', 'peilbeheer'),
+    'user': os.getenv('POSTGRES_USER', 'postgres'),
+    'password': os.getenv('POSTGRES_PASSWORD', 'postgres'),
+    'host': os.getenv('POSTGRES_HOST', 'localhost'),
+    'port': os.getenv('POSTGRES_PORT', '5432')
+}
+
+KAARTLAGEN_DIR = Path(__file__).resolve().parent.parent / "rijnland_kaartlagen"
+SCHEMA_FILE = Path(__file__).resolve().parent / "schema_kaartlagen.sql"
+SCHEMA = 'kaartlagen'
+ARCGIS_BASE_URL = "https://rijnland.enl-mcs.nl/arcgis/rest/services"
+DEFAULT_SRID = 28992  # RD New, het coördinatenstelsel van de Rijnland services
+GEOJSON_SRID = 4326  # GeoJSON is altijd WGS84 (RFC 7946); de downloader vraagt outSR=4326
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+MAX_IDENTIFIER = 63  # PostgreSQL NAMEDATALEN - 1
+GEOMETRY_COLUMN = 'geom'
+
+# Esri veldtype -> (PostgreSQL type, bulk_copy encoder)
+FIELD_TYPES = {
+    'esriFieldTypeOID': ('INTEGER', 'int4'),
+    'esriFieldTypeSmallInteger': ('INTEGER', 'int4'),
+    'esriFieldTypeInteger': ('INTEGER', 'int4'),
+    'esriFieldTypeBigInteger': ('BIGINT', 'int8'),
+    'esriFieldTypeSingle': ('DOUBLE PRECISION', 'float8'),
+    'esriFieldTypeDouble': ('DOUBLE PRECISION', 'float8'),
+    'esriFieldTypeString': ('TEXT', 'text'),
+    'esriFieldTypeDate': ('TIMESTAMP', 'timestamp'),
+    'esriFieldTypeGUID': ('UUID', 'uuid'),
+    'esriFieldTypeGlobalID': ('UUID', 'uuid'),
+    'esriFieldTypeXML': ('TEXT', 'text'),
+}
+
+# Esri geometrie type -> PostGIS geometrie type
+GEOMETRY_TYPES = {
+    'esriGeometryPoint': 'Point',
+    'esriGeometryMultipoint': 'MultiPoint',
+    'esriGeometryPolyline': 'MultiLineString',
+    'esriGeometryPolygon': 'MultiPolygon',
+}
+
+
+# ============================================================================
+# Namen en schema
+# ============================================================================
+
+def sql_name(name: str, max_length: int = MAX_IDENTIFIER) -> str:
+    """Maak een veilige, lowercase PostgreSQL naam; te lange namen krijgen een hash suffix"""
+    name = re.sub(r'[^a-z0-9_]+', '_', name.lower()).strip('_') or 'x'
+    if name[0].isdigit():
+        name = f"f_{name}"
+    if len(name) > max_length:
+        digest = hashlib.md5(name.encode('utf-8')).hexdigest()[:8]
+        name = f"{name[:max_length - 9]}_{digest}"
+    return name
+
+
+def table_name_for(path: Path, root: Path) -> str:
+    """Tabelnaam voor een laagbestand: <service>_<laag>"""
+    relative = path.relative_to(root).with_suffix('')
+    return sql_name('_'.join(relative.parts))
+
+
+def _infer_field(values: List) -> str:
+    """Leid een Esri veldtype af uit voorbeeldwaarden"""
+    present = [v for v in values if v is not None and v != '']
+    if present and all(isinstance(v, bool) for v in present):
+        return 'esriFieldTypeString'
+    if present and all(isinstance(v, int) for v in present):
+        return 'esriFieldTypeBigInteger'
+    if present and all(isinstance(v, (int, float)) for v in present):
+        return 'esriFieldTypeDouble'
+    return 'esriFieldTypeString'
+
+
+def _geometry_type_of(geometry: Dict) -> Optional[str]:
+    if not geometry:
+        return None
+    if 'rings' in geometry:
+        return 'esriGeometryPolygon'
+    if 'paths' in geometry:
+        return 'esriGeometryPolyline'
+    if 'points' in geometry:
+        return 'esriGeometryMultipoint'
+    if 'x' in geometry:
+        return 'esriGeometryPoint'
+    return {
+        'Point': 'esriGeometryPoint', 'MultiPoint': 'esriGeometryMultipoint',
+        'LineString': 'esriGeometryPolyline', 'MultiLineString': 'esriGeometryPolyline',
+        'Polygon': 'esriGeometryPolygon', 'MultiPolygon': 'esriGeometryPolygon',
+    }.get(geometry.get('type'))
+
+
+def infer_layer_schema(path: Path) -> Dict:
+    """Leid velden en geometrie type af uit de features zelf (voor downloads zonder metadata)"""
+    samples: Dict[str, List] = {}
+    geometry_type = None
+    srid = DEFAULT_SRID
+    for feature in iter_features(path):
+        for key, value in feature_attributes(feature).items():
+            samples.setdefault(key, []).append(value)
+        if geometry_type is None:
+            geometry_type = _geometry_type_of(feature.get('geometry'))
+            if geometry_type and 'coordinates' in feature['geometry']:
+                srid = GEOJSON_SRID
+    return {
+        'fields': [{'name': name, 'type': _infer_field(values)} for name, values in samples.items()],
+        'geometry_type': geometry_type,
+        'spatial_reference': {'wkid': srid},
+    }
+
+
+def fetch_layer_schema(metadata: Dict) -> Optional[Dict]:
+    """Haal de veld metadata van de laag op bij de ArcGIS server"""
+    if not metadata.get('service') or metadata.get('layer_id') is None:
+        return None
+    base = (metadata.get('source') or ARCGIS_BASE_URL).rstrip('/')
+    url = f"{base}/{metadata['service'].lstrip('/')}/{metadata['layer_id']}"
+    try:
+        limiter_for_url(url).acquire()
+        response = requests.get(url, params={'f': 'json'}, timeout=60)
+        response.raise_for_status()
+        info = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"  Kon laag metadata niet ophalen ({url}): {e}")
+        return None
+    if not info.get('fields'):
+        return None
+    return {
+        'fields': info['fields'],
+        'geometry_type': info.get('geometryType'),
+        # Downloads zonder veld metadata zijn GeoJSON, dus WGS84 ongeacht het stelsel van de service
+        'spatial_reference': {'wkid': GEOJSON_SRID},
+        'has_z': info.get('hasZ', False),
+        'object_id_field': info.get('objectIdField'),
+    }
+
+
+def load_layer_schema(path: Path) -> Tuple[Dict, Dict]:
+    """
+    Bepaal het schema van een laag: uit de bestand metadata, anders van de server,
+    anders afgeleid uit de attributen.
+
+    Returns:
+        (schema, metadata)
+    """
+    metadata = read_member(path, 'metadata', {}) or {}
+    if metadata.get('fields'):
+        return metadata, metadata
+    return fetch_layer_schema(metadata) or infer_layer_schema(path), metadata
+
+
+def build_columns(layer_schema: Dict) -> List[Dict]:
+    """Zet Esri velden om naar kolommen: naam, PostgreSQL type, encoder en bronveld"""
+    columns = []
+    used = {GEOMETRY_COLUMN}
+    for field in layer_schema.get('fields', []):
+        mapping = FIELD_TYPES.get(field.get('type'))
+        if mapping is None:
+            continue  # Geometry, Blob en Raster velden worden niet als kolom opgenomen
+        pg_type, encoder = mapping
+        length = field.get('length')
+        if pg_type == 'TEXT' and field.get('type') == 'esriFieldTypeString' and length and 0 < length <= 10485760:
+            pg_type = f"VARCHAR({int(length)})"
+
+        name = sql_name(field['name'])
+        base, n = name, 1
+        while name in used:
+            n += 1
+            name = sql_name(f"{base}_{n}")
+        used.add(name)
+        columns.append({'name': name, 'pg_type': pg_type, 'encoder': encoder, 'field': field['name']})
+    return columns
+
+
+def layer_srid(layer_schema: Dict) -> int:
+    reference = layer_schema.get('spatial_reference') or {}
+    return int(reference.get('latestWkid') or reference.get('wkid') or DEFAULT_SRID)
+
+
+# ============================================================================
+# Rijen (Esri JSON -> GeoJSON -> EWKB, zie geojson_stream.esri_to_geojson)
+# ============================================================================
+
+def _convert_value(value, encoder: str):
+    if value is None:
+        return None
+    if encoder == 'timestamp' and isinstance(value, (int, float)):
+        # Esri datums zijn milliseconden sinds epoch (UTC)
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    return value
+
+
+def iter_layer_rows(path: Path, columns: List[Dict], srid: int, dims: int) -> Iterator[Tuple]:
+    """Lever de rijen van een laag in kolomvolgorde, met de geometrie als EWKB"""
+    for feature in iter_features(path):
+        attributes = feature_attributes(feature)
+        row = [_convert_value(attributes.get(c['field']), c['encoder']) for c in columns]
+        geometry = esri_to_geojson(feature.get('geometry'), dims)
+        row.append(geojson_to_ewkb(geometry, srid=srid, force_multi=geometry['type'] != 'Point')
+                   if geometry else None)
+        yield tuple(row)
+
+
+# ============================================================================
+# Import van één laag
+# ============================================================================
+
+def ensure_schema(conn):
+    """Maak het kaartlagen schema en het register aan (db/schema_kaartlagen.sql)"""
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_FILE.read_text(encoding='utf-8'))
+    conn.commit()
+
+
+def import_layer(path: Path, conn, root: Path = KAARTLAGEN_DIR) -> Dict:
+    """
+    Importeer één laagbestand in kaartlagen.<tabel>.
+
+    Returns:
+        Dict met tabel, aantal rijen en duur
+    """
+    start = time.time()
+    layer_schema, metadata = load_layer_schema(path)
+    geometry_type = GEOMETRY_TYPES.get(layer_schema.get('geometry_type'))
+    if geometry_type is None:
+        raise ValueError(f"Onbekend geometrie type: {layer_schema.get('geometry_type')}")
+
+    columns = build_columns(layer_schema)
+    srid = layer_srid(layer_schema)
+    dims = 3 if layer_schema.get('has_z') else 2
+    table = table_name_for(path, root)
+    loading = sql_name(f"{table}__laden")
+    geometry_sql = f"GEOMETRY({geometry_type}{'Z' if dims == 3 else ''}, {srid})"
+
+    column_defs = [sql.SQL("{} {}").format(sql.Identifier(c['name']), sql.SQL(c['pg_type'])) for c in columns]
+    column_defs.append(sql.SQL("{} {}").format(sql.Identifier(GEOMETRY_COLUMN), sql.SQL(geometry_sql)))
+    copy_columns = [(c['name'], c['encoder']) for c in columns] + [(GEOMETRY_COLUMN, 'geometry')]
+
+    target = sql.Identifier(SCHEMA, table)
+    loading_table = sql.Identifier(SCHEMA, loading)
+    oid_field = layer_schema.get('object_id_field')
+    oid_column = next((c['name'] for c in columns if c['field'] == oid_field), None)
+
+    with conn.cursor() as cursor:
+        # Laden in een nieuwe tabel; de bestaande tabel blijft bruikbaar tot de wissel
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(loading_table))
+        cursor.execute(sql.SQL("CREATE TABLE {} ({})").format(loading_table, sql.SQL(', ').join(column_defs)))
+        rows = copy_rows(cursor, loading_table, copy_columns, iter_layer_rows(path, columns, srid, dims))
+
+        # Indexen na het laden bouwen (sneller dan per rij bijwerken)
+        cursor.execute(sql.SQL("CREATE INDEX {} ON {} USING GIST ({})").format(
+            sql.Identifier(sql_name(f"{loading}_gix")), loading_table, sql.Identifier(GEOMETRY_COLUMN)))
+        if oid_column:
+            cursor.execute(sql.SQL("CREATE INDEX {} ON {} ({})").format(
+                sql.Identifier(sql_name(f"{loading}_oid")), loading_table, sql.Identifier(oid_column)))
+        cursor.execute(sql.SQL("ANALYZE {}").format(loading_table))
+
+        # Atomische wissel
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(target))
+        cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(loading_table, sql.Identifier(table)))
+        cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+            sql.Identifier(SCHEMA, sql_name(f"{loading}_gix")), sql.Identifier(sql_name(f"{table}_gix"))))
+        if oid_column:
+            cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(SCHEMA, sql_name(f"{loading}_oid")), sql.Identifier(sql_name(f"{table}_oid"))))
+
+        cursor.execute("""
+            INSERT INTO kaartlagen.lagen
+                (tabel, service, layer_id, layer_name, geometry_type, srid, feature_count, bronbestand, geimporteerd_op)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (tabel) DO UPDATE SET
+                service = EXCLUDED.service,
+                layer_id = EXCLUDED.layer_id,
+                layer_name = EXCLUDED.layer_name,
+                geometry_type = EXCLUDED.geometry_type,
+                srid = EXCLUDED.srid,
+                feature_count = EXCLUDED.feature_count,
+                bronbestand = EXCLUDED.bronbestand,
+                geimporteerd_op = CURRENT_TIMESTAMP
+        """, (table, metadata.get('service'), metadata.get('layer_id'), metadata.get('layer_name'),
+              geometry_type, srid, rows, str(path.relative_to(root))))
+    conn.commit()
+
+    return {'file': str(path), 'table': table, 'rows': rows, 'seconds': time.time() - start}
+
+
+# ============================================================================
+# Parallelle import
+# ============================================================================
+
+_pool = None
+_root = KAARTLAGEN_DIR
+
+
+def _init_worker(db_config: Dict, root: str):
+    """Initialiseer een worker proces met een eigen connection pool"""
+    global _pool, _root
+    _pool = psycopg2.pool.SimpleConnectionPool(1, 2, **db_config)
+    _root = Path(root)
+
+
+def _import_worker(path: str) -> Dict:
+    conn = _pool.getconn()
+    try:
+        return import_layer(Path(path), conn, _root)
+    except Exception as e:
+        conn.rollback()
+        return {'file': path, 'error': str(e)}
+    finally:
+        _pool.putconn(conn)
+
+
+def find_layer_files(root: Path, only: Optional[List[str]] = None) -> List[Path]:
+    """Alle laagbestanden, grootste eerst (betere verdeling over de workers)
+
+    Gegeneraliseerde profielkopieën (<laag>.<profiel>.geojson) zijn voor de kaart en
+    worden overgeslagen; de database krijgt de geometrie op volle precisie.
+    """
+    files = [p for p in root.rglob('*.geojson')
+             if not is_profile_file(p) and (not only or p.relative_to(root).parts[0] in only)]
+    return sorted(files, key=lambda p: p.stat().st_size, reverse=True)
+
+
+def import_all(root: Path, workers: int = DEFAULT_WORKERS, only: Optional[List[str]] = None) -> List[Dict]:
+    """Importeer alle lagen onder root parallel"""
+    files = find_layer_files(root, only)
+    print(f"Found {len(files)} layer files in {root}")
+    if not files:
+        return []
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    ensure_schema(conn)
+    conn.close()
+
+    results = []
+    with Pool(processes=workers, initializer=_init_worker, initargs=(DB_CONFIG, str(root))) as pool:
+        for i, result in enumerate(pool.imap_unordered(_import_worker, [str(p) for p in files]), 1):
+            if 'error' in result:
+                print(f"[{i}/{len(files)}] ✗ {result['file']}: {result['error']}")
+            else:
+                rate = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0
+                print(f"[{i}/{len(files)}] ✓ {SCHEMA}.{result['table']}: {result['rows']} rows "
+                      f"({result['seconds']:.1f}s, {rate:,.0f} rows/sec)")
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import alle Rijnland kaartlagen in PostgreSQL')
+    parser.add_argument('directory', nargs='?', default=str(KAARTLAGEN_DIR),
+                        help=f'Directory met gedownloade kaartlagen (default: {KAARTLAGEN_DIR})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Aantal parallelle worker processen (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--only', nargs='+', metavar='SERVICE',
+                        help='Importeer alleen deze services (mapnamen, bijv. Gemaal Meetlocatie)')
+    args = parser.parse_args()
+
+    root = Path(args.directory).resolve()
+    if not root.exists():
+        print(f"Error: Directory {root} not found")
+        sys.exit(1)
+
+    print(f"Connecting to PostgreSQL database: {DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
+    start = time.time()
+
+    try:
+        results = import_all(root, workers=args.workers, only=args.only)
+    except psycopg2.Error as e:
+        print(f"Database error: {e}")
+        sys.exit(1)
+
+    imported = [r for r in results if 'error' not in r]
+    failed = len(results) - len(imported)
+    total_rows = sum(r['rows'] for r in imported)
+    elapsed = time.time() - start
+    print(f"\nImported {len(imported)} layers ({total_rows:,} rows) in {elapsed:.1f}s, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,30 @@
 #!/usr/bin/env python3
 """
 Import Rijnland peilgebieden GeoJSON data into PostgreSQL database
+
+Modes:
+    values  execute_values met ST_GeomFromGeoJSON op de server (oorspronkelijke pad)
+    copy    binary COPY naar een staging tabel met client-side EWKB (zie bulk_copy.py)
+    diff    vergelijkt een content hash per peilgebied met de database en schrijft
+            alleen nieuwe, gewijzigde en verwijderde peilgebieden (dagelijkse re-import)
 """
 
+import argparse
+import hashlib
 import json
+import time
 import psycopg2
 from psycopg2.extras import execute_values
 import sys
 import os
+from pathlib import Path
+
+from bulk_copy import bulk_merge
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from geojson_stream import iter_feature_chunks, iter_features  # noqa: E402
+
+CHUNK_FEATURES = 1000  # Features per execute_values batch (begrensd geheugengebruik)
 
 # Database connection parameters
 DB_CONFIG = {
@@ -18,58 +35,164 @@ DB_CONFIG = {
     'port': os.getenv('POSTGRES_PORT', '5432')
 }
 
-def import_geojson(geojson_file, conn):
-    """Import GeoJSON data into PostgreSQL"""
+COPY_COLUMNS = [
+    ('oracle_objectid', 'text'),
+    ('code', 'text'),
+    ('naam', 'text'),
+    ('statusobject', 'text'),
+    ('soortpeilgebied', 'text'),
+    ('soortafwatering', 'text'),
+    ('peilbeherendeinstantie', 'text'),
+    ('peilindexering', 'text'),
+    ('jaartalhuidigpeil', 'text'),
+    ('jaartalvolgendewijziging', 'text'),
+    ('eindzomerpeil', 'float8'),
+    ('eindwinterpeil', 'float8'),
+    ('vorigzomerpeil', 'float8'),
+    ('vorigwinterpeil', 'float8'),
+    ('oppervlakte', 'float8'),
+    ('omtrek', 'float8'),
+    ('opmerking', 'text'),
+    ('hyperlink', 'text'),
+    ('soortpeilbeheer', 'text'),
+    ('vastpeil', 'float8'),
+    ('zomerpeil', 'float8'),
+    ('winterpeil', 'float8'),
+    ('flexzomerpeilondergrens', 'float8'),
+    ('flexzomerpeilbovengrens', 'float8'),
+    ('flexwinterpeilondergrens', 'float8'),
+    ('flexwinterpeilbovengrens', 'float8'),
+    ('zomerpeiltekst', 'text'),
+    ('winterpeiltekst', 'text'),
+    ('verlengdtot', 'text'),
+    ('geometry', 'geometry'),
+]
 
-    with open(geojson_file, 'r') as f:
-        data = json.load(f)
+# Kolommen die bij een bestaand peilgebied worden bijgewerkt (gelijk aan het values pad)
+UPDATE_COLUMNS = [
+    'naam', 'statusobject', 'soortpeilgebied', 'soortafwatering', 'zomerpeil',
+    'winterpeil', 'oppervlakte', 'hyperlink', 'geometry'
+]
 
-    features = data.get('features', [])
-    print(f"Found {len(features)} features to import")
+def feature_to_row(feature):
+    """Zet een GeoJSON feature om naar een rij in kolomvolgorde (geometrie als dict)"""
+    props = feature['properties']
+    geom = feature['geometry']
 
+    return (
+        props.get('ORACLE_OBJECTID'),
+        props.get('CODE'),
+        props.get('NAAM'),
+        props.get('STATUSOBJECT'),
+        props.get('SOORTPEILGEBIED'),
+        props.get('SOORTAFWATERING'),
+        props.get('PEILBEHERENDEINSTANTIE'),
+        props.get('PEILINDEXERING'),
+        props.get('JAARTALHUIDIGPEIL'),
+        props.get('JAARTALVOLGENDEWIJZIGING'),
+        props.get('EINDZOMERPEIL'),
+        props.get('EINDWINTERPEIL'),
+        props.get('VORIGZOMERPEIL'),
+        props.get('VORIGWINTERPEIL'),
+        props.get('OPPERVLAKTE'),
+        props.get('OMTREK'),
+        props.get('OPMERKING'),
+        props.get('HYPERLINK'),
+        props.get('SOORTPEILBEHEER'),
+        props.get('VASTPEIL'),
+        props.get('ZOMERPEIL'),
+        props.get('WINTERPEIL'),
+        props.get('FLEXZOMERPEILONDERGRENS'),
+        props.get('FLEXZOMERPEILBOVENGRENS'),
+        props.get('FLEXWINTERPEILONDERGRENS'),
+        props.get('FLEXWINTERPEILBOVENGRENS'),
+        props.get('ZOMERPEILTEKST'),
+        props.get('WINTERPEILTEKST'),
+        props.get('VERLENGDTOT'),
+        geom
+    )
+
+# Diff mode: alle kolommen plus de content hash (vóór de geometrie)
+DIFF_COLUMNS = COPY_COLUMNS[:-1] + [('content_hash', 'text'), ('geometry', 'geometry')]
+
+def feature_hash(row):
+    """MD5 van een rij (attributen + geometrie) in canonieke JSON vorm"""
+    canonical = json.dumps(row, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.md5(canonical.encode('utf-8')).hexdigest()
+
+def import_diff(geojson_file, conn):
+    """
+    Incrementele import: vergelijk per peilgebied de content hash met de database
+    en voeg alleen nieuwe, gewijzigde en verwijderde peilgebieden door.
+    """
+    start = time.time()
     cursor = conn.cursor()
+    cursor.execute("SELECT code, content_hash FROM peilbesluiten.peilgebieden_rijnland")
+    existing = dict(cursor.fetchall())
+
+    seen = set()
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+
+    def changed_rows():
+        for feature in iter_features(geojson_file):
+            row = feature_to_row(feature)
+            code = row[1]
+            if not code or code in seen:
+                counts['skipped'] += 1
+                continue
+            seen.add(code)
+
+            content_hash = feature_hash(row)
+            if existing.get(code) == content_hash:
+                counts['unchanged'] += 1
+                continue
+            counts['updated' if code in existing else 'inserted'] += 1
+            yield row[:-1] + (content_hash, row[-1])
 
-    # Prepare data for batch insert
-    values = []
-    for feature in features:
-        props = feature['properties']
-        geom = feature['geometry']
-
-        # Convert geometry to WKT for PostGIS
-        geom_json = json.dumps(geom)
-
-        values.append((
-            props.get('ORACLE_OBJECTID'),
-            props.get('CODE'),
-            props.get('NAAM'),
-            props.get('STATUSOBJECT'),
-            props.get('SOORTPEILGEBIED'),
-            props.get('SOORTAFWATERING'),
-            props.get('PEILBEHERENDEINSTANTIE'),
-            props.get('PEILINDEXERING'),
-            props.get('JAARTALHUIDIGPEIL'),
-            props.get('JAARTALVOLGENDEWIJZIGING'),
-            props.get('EINDZOMERPEIL'),
-            props.get('EINDWINTERPEIL'),
-            props.get('VORIGZOMERPEIL'),
-            props.get('VORIGWINTERPEIL'),
-            props.get('OPPERVLAKTE'),
-            props.get('OMTREK'),
-            props.get('OPMERKING'),
-            props.get('HYPERLINK'),
-            props.get('SOORTPEILBEHEER'),
-            props.get('VASTPEIL'),
-            props.get('ZOMERPEIL'),
-            props.get('WINTERPEIL'),
-            props.get('FLEXZOMERPEILONDERGRENS'),
-            props.get('FLEXZOMERPEILBOVENGRENS'),
-            props.get('FLEXWINTERPEILONDERGRENS'),
-            props.get('FLEXWINTERPEILBOVENGRENS'),
-            props.get('ZOMERPEILTEKST'),
-            props.get('WINTERPEILTEKST'),
-            props.get('VERLENGDTOT'),
-            geom_json
-        ))
+    # Alleen gewijzigde rijen gaan via COPY naar staging en worden volledig overschreven
+    stats = bulk_merge(conn, 'peilbesluiten.peilgebieden_rijnland', DIFF_COLUMNS, changed_rows(),
+                       conflict_columns=['code'], commit=False)
+
+    # Peilgebieden die niet meer in het bestand staan verwijderen (zelfde transactie)
+    deleted = [code for code in existing if code not in seen]
+    if deleted:
+        cursor.execute("DELETE FROM peilbesluiten.peilgebieden_rijnland WHERE code = ANY(%s)", (deleted,))
+    conn.commit()
+
+    total = counts['inserted'] + counts['updated'] + counts['unchanged']
+    report_rate(total, time.time() - start, 'diff')
+    print(f"Inserted: {counts['inserted']}, updated: {counts['updated']}, "
+          f"unchanged: {counts['unchanged']}, deleted: {len(deleted)}, skipped: {counts['skipped']}")
+    print(f"Rows written: {stats['merged'] + len(deleted)}")
+    cursor.close()
+    return stats['merged'] + len(deleted)
+
+def import_geojson(geojson_file, conn, mode='values'):
+    """
+    Import GeoJSON data into PostgreSQL (features worden gestreamd, niet volledig ingelezen)
+
+    Returns:
+        Aantal geschreven rijen
+    """
+
+    if mode == 'diff':
+        return import_diff(geojson_file, conn)
+
+    cursor = conn.cursor()
+    start = time.time()
+
+    if mode == 'copy':
+        # content_hash wordt geleegd: een gedeeltelijke update maakt de hash ongeldig
+        rows = (row[:-1] + (None, row[-1])
+                for row in map(feature_to_row, iter_features(geojson_file)))
+        stats = bulk_merge(conn, 'peilbesluiten.peilgebieden_rijnland', DIFF_COLUMNS, rows,
+                           conflict_columns=['code'], update_columns=UPDATE_COLUMNS + ['content_hash'])
+        report_rate(stats['rows'], time.time() - start, mode)
+        print(f"Successfully imported {stats['merged']} peilgebieden")
+        cursor.execute("SELECT COUNT(*) FROM peilbesluiten.peilgebieden_rijnland")
+        print(f"Total peilgebieden in database: {cursor.fetchone()[0]}")
+        cursor.close()
+        return stats['merged']
 
     # Batch insert with ON CONFLICT to handle duplicates
     insert_query = """
@@ -92,6 +215,7 @@ def import_geojson(geojson_file, conn):
             oppervlakte = EXCLUDED.oppervlakte,
             hyperlink = EXCLUDED.hyperlink,
             geometry = EXCLUDED.geometry,
+            content_hash = NULL,
             updated_at = CURRENT_TIMESTAMP
     """
 
@@ -102,10 +226,22 @@ def import_geojson(geojson_file, conn):
         ST_Multi(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326))
     )"""
 
-    execute_values(cursor, insert_query, values, template=template, page_size=100)
+    # Verwerk de features per chunk; één transactie voor de hele import
+    imported = 0
+    for chunk in iter_feature_chunks(geojson_file, CHUNK_FEATURES):
+        values = []
+        for feature in chunk:
+            row = feature_to_row(feature)
+            # Convert geometry to GeoJSON text for ST_GeomFromGeoJSON
+            values.append(row[:-1] + (json.dumps(row[-1]),))
+        execute_values(cursor, insert_query, values, template=template, page_size=100)
+        imported += len(values)
+        print(f"  {imported} features verwerkt...", end="\r")
+    print("")  # Newline after progress
 
     conn.commit()
-    print(f"Successfully imported {len(values)} peilgebieden")
+    report_rate(imported, time.time() - start, mode)
+    print(f"Successfully imported {imported} peilgebieden")
 
     # Show statistics
     cursor.execute("SELECT COUNT(*) FROM peilbesluiten.peilgebieden_rijnland")
@@ -113,14 +249,41 @@ def import_geojson(geojson_file, conn):
     print(f"Total peilgebieden in database: {total}")
 
     cursor.close()
+    return imported
+
+def refresh_display_view(conn):
+    """Ververs de materialized view voor kaartweergave zonder lezers te blokkeren"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_regclass('peilbesluiten.peilgebieden_rijnland_display')")
+    if cursor.fetchone()[0] is None:
+        print("Materialized view peilgebieden_rijnland_display bestaat niet; voer schema_rijnland.sql opnieuw uit")
+        cursor.close()
+        return
+
+    start = time.time()
+    cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY peilbesluiten.peilgebieden_rijnland_display")
+    conn.commit()
+    cursor.close()
+    print(f"Display view ververst in {time.time() - start:.2f}s")
+
+def report_rate(rows, seconds, mode):
+    """Print de import snelheid (voor vergelijking tussen de modes)"""
+    rate = rows / seconds if seconds > 0 else 0
+    print(f"Imported {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/sec, mode={mode})")
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python import_rijnland.py <geojson_file>")
-        print("Example: python import_rijnland.py data/peilgebieden_rijnland.geojson")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description='Import Rijnland peilgebieden GeoJSON data into PostgreSQL',
+        epilog='Example: python import_rijnland.py data/peilgebieden_rijnland.geojson --mode copy')
+    parser.add_argument('geojson_file', help='GeoJSON bestand')
+    parser.add_argument('--mode', choices=['values', 'copy', 'diff'], default='values',
+                        help='values: execute_values (default); copy: binary COPY + merge; '
+                             'diff: alleen gewijzigde peilgebieden (content hash)')
+    parser.add_argument('--no-refresh', action='store_true',
+                        help='Materialized view peilgebieden_rijnland_display niet verversen')
+    args = parser.parse_args()
 
-    geojson_file = sys.argv[1]
+    geojson_file = args.geojson_file
 
     if not os.path.exists(geojson_file):
         print(f"Error: File {geojson_file} not found")
@@ -132,7 +295,9 @@ def main():
         conn = psycopg2.connect(**DB_CONFIG)
         print("Connected successfully")
 
-        import_geojson(geojson_file, conn)
+        written = import_geojson(geojson_file, conn, mode=args.mode)
+        if written and not args.no_refresh:
+            refresh_display_view(conn)
 
         conn.close()
         print("Import completed successfully")
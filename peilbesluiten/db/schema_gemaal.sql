@@ -0,0 +1,54 @@
+-- Gemaal Metingen Schema
+-- Tijdreeksen (debiet) van de Rijnland gemalen uit de Hydronet Water Control Room API
+
+CREATE SCHEMA IF NOT EXISTS peilbesluiten;
+
+-- Metingen tabel, range-gepartitioneerd per maand op tijd
+-- De primary key (gemaal_code, ts) dedupliceert en maakt range queries per station snel
+CREATE TABLE IF NOT EXISTS peilbesluiten.gemaal_metingen (
+    gemaal_code VARCHAR(50) NOT NULL,
+    ts TIMESTAMPTZ NOT NULL,
+    debiet DOUBLE PRECISION,
+    PRIMARY KEY (gemaal_code, ts)
+) PARTITION BY RANGE (ts);
+
+-- BRIN index op tijd: klein en effectief omdat data in tijdsvolgorde binnenkomt
+CREATE INDEX IF NOT EXISTS idx_gemaal_metingen_ts_brin
+    ON peilbesluiten.gemaal_metingen USING BRIN (ts) WITH (pages_per_range = 32);
+
+-- Maak (indien nodig) de maandpartitie aan waarin het gegeven tijdstip valt
+CREATE OR REPLACE FUNCTION peilbesluiten.ensure_gemaal_metingen_partition(moment TIMESTAMPTZ)
+RETURNS TEXT AS $$
+DECLARE
+    month_start TIMESTAMPTZ := date_trunc('month', moment AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    month_end TIMESTAMPTZ := month_start + INTERVAL '1 month';
+    partition_name TEXT := format('gemaal_metingen_%s', to_char(month_start AT TIME ZONE 'UTC', 'YYYY_MM'));
+BEGIN
+    IF to_regclass(format('peilbesluiten.%I', partition_name)) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS peilbesluiten.%I PARTITION OF peilbesluiten.gemaal_metingen
+                 FOR VALUES FROM (%L) TO (%L)',
+            partition_name, month_start, month_end
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partities voor de huidige en volgende maand
+SELECT peilbesluiten.ensure_gemaal_metingen_partition(now());
+SELECT peilbesluiten.ensure_gemaal_metingen_partition(now() + INTERVAL '1 month');
+
+-- View met status zoals in de frontend (aan/uit op basis van debiet)
+CREATE OR REPLACE VIEW peilbesluiten.gemaal_metingen_view AS
+SELECT
+    gemaal_code,
+    ts,
+    debiet,
+    CASE WHEN debiet > 0.001 THEN 'aan' ELSE 'uit' END AS status
+FROM peilbesluiten.gemaal_metingen;
+
+COMMENT ON TABLE peilbesluiten.gemaal_metingen IS 'Debiet metingen van Rijnland gemalen (30-minuten interval), gepartitioneerd per maand';
+COMMENT ON COLUMN peilbesluiten.gemaal_metingen.gemaal_code IS 'Code van het gemaal (bijv. 176-036-00021)';
+COMMENT ON COLUMN peilbesluiten.gemaal_metingen.ts IS 'Tijdstip van de meting (UTC)';
+COMMENT ON COLUMN peilbesluiten.gemaal_metingen.debiet IS 'Debiet in m³/s';
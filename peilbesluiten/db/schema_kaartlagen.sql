@@ -0,0 +1,24 @@
+-- Kaartlagen Schema
+-- Generiek geïmporteerde Rijnland kaartlagen (zie db/import_kaartlagen.py)
+-- Per laag wordt een tabel kaartlagen.<service>_<laag> aangemaakt op basis van de ArcGIS veld metadata.
+
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+CREATE SCHEMA IF NOT EXISTS kaartlagen;
+
+-- Register van geïmporteerde lagen
+CREATE TABLE IF NOT EXISTS kaartlagen.lagen (
+    tabel VARCHAR(63) PRIMARY KEY,
+    service VARCHAR(255),
+    layer_id INTEGER,
+    layer_name VARCHAR(255),
+    geometry_type VARCHAR(50),
+    srid INTEGER,
+    feature_count INTEGER,
+    bronbestand TEXT,
+    geimporteerd_op TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE kaartlagen.lagen IS 'Register van kaartlagen die met import_kaartlagen.py zijn geïmporteerd';
+COMMENT ON COLUMN kaartlagen.lagen.tabel IS 'Tabelnaam in schema kaartlagen';
+COMMENT ON COLUMN kaartlagen.lagen.bronbestand IS 'Pad van het gedownloade bestand (relatief aan rijnland_kaartlagen/)';
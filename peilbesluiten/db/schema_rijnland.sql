@@ -34,10 +34,14 @@ CREATE TABLE IF NOT EXISTS peilbesluiten.peilgebieden_rijnland (
     winterpeiltekst VARCHAR(50),
     verlengdtot VARCHAR(50),
     geometry GEOMETRY(MultiPolygon, 4326) NOT NULL,
+    content_hash CHAR(32),  -- MD5 van attributen + geometrie, voor incrementele imports
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Bestaande databases: content hash kolom toevoegen
+ALTER TABLE peilbesluiten.peilgebieden_rijnland ADD COLUMN IF NOT EXISTS content_hash CHAR(32);
+
 -- Create spatial index for geometry
 CREATE INDEX IF NOT EXISTS idx_peilgebieden_rijnland_geometry
     ON peilbesluiten.peilgebieden_rijnland USING GIST (geometry);
@@ -46,6 +50,10 @@ CREATE INDEX IF NOT EXISTS idx_peilgebieden_rijnland_geometry
 CREATE INDEX IF NOT EXISTS idx_peilgebieden_rijnland_code
     ON peilbesluiten.peilgebieden_rijnland (code);
 
+-- Unique constraint op code, nodig voor ON CONFLICT (code) in de importer
+CREATE UNIQUE INDEX IF NOT EXISTS idx_peilgebieden_rijnland_code_unique
+    ON peilbesluiten.peilgebieden_rijnland (code);
+
 -- Create index on name
 CREATE INDEX IF NOT EXISTS idx_peilgebieden_rijnland_naam
     ON peilbesluiten.peilgebieden_rijnland (naam);
@@ -77,9 +85,82 @@ SELECT
     updated_at
 FROM peilbesluiten.peilgebieden_rijnland;
 
+-- Materialized view voor kaartweergave: oppervlakte en vereenvoudigde geometrieën
+-- worden één keer per import berekend in plaats van bij elke query.
+-- Toleranties in graden (EPSG:4326): 0.00001 ≈ 1 m, 0.0001 ≈ 10 m, 0.001 ≈ 100 m.
+CREATE MATERIALIZED VIEW IF NOT EXISTS peilbesluiten.peilgebieden_rijnland_display AS
+SELECT
+    id,
+    code,
+    naam,
+    statusobject,
+    soortpeilgebied,
+    soortafwatering,
+    peilbeherendeinstantie,
+    hyperlink as besluit_url,
+    soortpeilbeheer,
+    zomerpeil,
+    winterpeil,
+    oppervlakte,
+    ST_Area(geometry::geography) / 10000 as oppervlakte_ha,
+    geometry,
+    ST_AsGeoJSON(geometry, 7) as geojson,
+    ST_AsGeoJSON(ST_SimplifyPreserveTopology(geometry, 0.00001), 6) as geojson_hoog,
+    ST_AsGeoJSON(ST_SimplifyPreserveTopology(geometry, 0.0001), 5) as geojson_midden,
+    ST_AsGeoJSON(ST_SimplifyPreserveTopology(geometry, 0.001), 4) as geojson_laag,
+    updated_at
+FROM peilbesluiten.peilgebieden_rijnland;
+
+-- Unieke index is vereist voor REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_peilgebieden_rijnland_display_id
+    ON peilbesluiten.peilgebieden_rijnland_display (id);
+
+CREATE INDEX IF NOT EXISTS idx_peilgebieden_rijnland_display_geometry
+    ON peilbesluiten.peilgebieden_rijnland_display USING GIST (geometry);
+
+CREATE INDEX IF NOT EXISTS idx_peilgebieden_rijnland_display_code
+    ON peilbesluiten.peilgebieden_rijnland_display (code);
+
+-- Peilgebieden met een detailniveau passend bij het zoomniveau van de kaart,
+-- optioneel gefilterd op een bounding box (EPSG:4326)
+CREATE OR REPLACE FUNCTION peilbesluiten.peilgebieden_rijnland_for_zoom(
+    zoom INTEGER,
+    bbox GEOMETRY DEFAULT NULL
+)
+RETURNS TABLE (
+    code VARCHAR,
+    naam VARCHAR,
+    soortpeilbeheer VARCHAR,
+    zomerpeil DOUBLE PRECISION,
+    winterpeil DOUBLE PRECISION,
+    oppervlakte_ha DOUBLE PRECISION,
+    besluit_url TEXT,
+    geojson TEXT
+) AS $$
+    SELECT
+        d.code,
+        d.naam,
+        d.soortpeilbeheer,
+        d.zomerpeil,
+        d.winterpeil,
+        d.oppervlakte_ha,
+        d.besluit_url,
+        CASE
+            WHEN zoom <= 10 THEN d.geojson_laag
+            WHEN zoom <= 13 THEN d.geojson_midden
+            WHEN zoom <= 16 THEN d.geojson_hoog
+            ELSE d.geojson
+        END
+    FROM peilbesluiten.peilgebieden_rijnland_display d
+    WHERE bbox IS NULL OR d.geometry && ST_SetSRID(bbox, 4326);
+$$ LANGUAGE sql STABLE;
+
 COMMENT ON TABLE peilbesluiten.peilgebieden_rijnland IS 'Peilgebieden van Hoogheemraadschap van Rijnland';
 COMMENT ON COLUMN peilbesluiten.peilgebieden_rijnland.code IS 'Unieke code van het peilgebied';
 COMMENT ON COLUMN peilbesluiten.peilgebieden_rijnland.naam IS 'Naam van het peilgebied';
 COMMENT ON COLUMN peilbesluiten.peilgebieden_rijnland.zomerpeil IS 'Zomerpeil in meters NAP';
 COMMENT ON COLUMN peilbesluiten.peilgebieden_rijnland.winterpeil IS 'Winterpeil in meters NAP';
 COMMENT ON COLUMN peilbesluiten.peilgebieden_rijnland.hyperlink IS 'URL naar het peilbesluit op officielebekendmakingen.nl';
+COMMENT ON COLUMN peilbesluiten.peilgebieden_rijnland.content_hash IS 'MD5 van de feature (attributen + geometrie), bijgewerkt door import_rijnland.py --mode diff';
+COMMENT ON MATERIALIZED VIEW peilbesluiten.peilgebieden_rijnland_display IS 'Voorberekende oppervlakte en vereenvoudigde GeoJSON per zoomniveau; ververst door import_rijnland.py';
+COMMENT ON FUNCTION peilbesluiten.peilgebieden_rijnland_for_zoom(INTEGER, GEOMETRY) IS 'Peilgebieden met geometrie-detail passend bij het kaart zoomniveau';
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Download journal per layer: hervatten op pagina niveau
+======================================================
+
+Naast elk doelbestand staan tijdens een download twee verborgen bestanden:
+
+    .<bestand>.part          - de features tot nu toe (zie geojson_writer.py)
+    .<bestand>.journal.json  - het pagineerplan en hoeveel pagina's compleet zijn
+
+Na elke pagina wordt het .part bestand gefsynct en het journal atomisch
+bijgewerkt met het aantal afgeronde pagina's, het aantal features en de byte
+positie. Een herstarte download gebruikt hetzelfde plan (dezelfde
+ObjectID-ranges), kapt een half geschreven pagina af en gaat verder bij de
+eerstvolgende pagina.
+
+Zolang er een journal bestaat is de layer niet compleet, ook als er al een
+(oudere) versie van het doelbestand staat. Het journal wordt pas verwijderd
+nadat het aantal features is gecontroleerd tegen returnCountOnly en het
+bestand atomisch op zijn plek staat.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from response_cache import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = '.journal.json'
+PART_SUFFIX = '.part'
+
+
+def journal_path(output_file: Path) -> Path:
+    """Pad van het journal bij een doelbestand"""
+    output_file = Path(output_file)
+    return output_file.parent / f".{output_file.name}{JOURNAL_SUFFIX}"
+
+
+def part_path(output_file: Path) -> Path:
+    """Pad van het tijdelijke (hervatbare) bestand bij een doelbestand"""
+    output_file = Path(output_file)
+    return output_file.parent / f".{output_file.name}{PART_SUFFIX}"
+
+
+def has_journal(output_file: Path) -> bool:
+    """True als er een onafgeronde download voor dit bestand is"""
+    return journal_path(output_file).exists()
+
+
+class DownloadJournal:
+    """Voortgang van één layer download"""
+
+    def __init__(self, output_file: Path, query_url: str):
+        """
+        Initialiseer het journal.
+
+        Args:
+            output_file: Doelbestand van de layer
+            query_url: Query endpoint; een journal van een andere URL wordt genegeerd
+        """
+        self.output_file = Path(output_file)
+        self.query_url = query_url
+        self.path = journal_path(self.output_file)
+        self.part_path = part_path(self.output_file)
+        self.state: Dict = {}
+
+    def load(self) -> bool:
+        """
+        Laad een bestaand journal.
+
+        Returns:
+            True als er een bruikbaar journal en .part bestand is om te hervatten
+        """
+        if not self.path.exists():
+            return False
+        try:
+            state = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Journal {self.path.name} onleesbaar, opnieuw beginnen: {e}")
+            return False
+        if state.get('query_url') != self.query_url or not self.part_path.exists():
+            return False
+        if self.part_path.stat().st_size < state.get('bytes', 0):
+            logger.warning(f"{self.part_path.name} is korter dan het journal, opnieuw beginnen")
+            return False
+        self.state = state
+        return True
+
+    def start(self, plan: Dict, layer_schema: Optional[Dict] = None):
+        """Begin een nieuw journal met het pagineerplan (zie LayerPager.plan_state)"""
+        self.state = {
+            'query_url': self.query_url,
+            'plan': plan,
+            'layer_schema': layer_schema or {},
+            'pages_done': 0,
+            'features': 0,
+            'bytes': None,
+            'started': datetime.now().isoformat()
+        }
+        self._save()
+
+    @property
+    def plan(self) -> Dict:
+        return self.state['plan']
+
+    @property
+    def pages_done(self) -> int:
+        return self.state.get('pages_done', 0)
+
+    @property
+    def features(self) -> int:
+        return self.state.get('features', 0)
+
+    @property
+    def bytes(self) -> Optional[int]:
+        return self.state.get('bytes')
+
+    @property
+    def layer_schema(self) -> Dict:
+        return self.state.get('layer_schema', {})
+
+    def record_page(self, index: int, features: int, position: int, layer_schema: Optional[Dict] = None):
+        """
+        Markeer pagina `index` als compleet.
+
+        Args:
+            index: Index van de pagina of ObjectID-range (moet de volgende op volgorde zijn)
+            features: Totaal aantal features tot en met deze pagina
+            position: Byte positie in het .part bestand na deze pagina (writer.sync())
+            layer_schema: Veld metadata (alleen nodig bij de eerste pagina)
+        """
+        if index != self.pages_done:
+            raise ValueError(f"Pagina {index} buiten volgorde (verwacht {self.pages_done})")
+        self.state['pages_done'] = index + 1
+        self.state['features'] = features
+        self.state['bytes'] = position
+        if layer_schema and not self.state.get('layer_schema'):
+            self.state['layer_schema'] = layer_schema
+        self.state['updated'] = datetime.now().isoformat()
+        self._save()
+
+    def _save(self):
+        atomic_write_bytes(self.path, json.dumps(self.state, indent=2).encode('utf-8'))
+
+    def finish(self):
+        """Download compleet: journal verwijderen (het .part bestand is dan al hernoemd)"""
+        self.discard(keep_part=True)
+
+    def discard(self, keep_part: bool = False):
+        """Verwijder journal en (tenzij keep_part) het .part bestand"""
+        paths = [self.path] if keep_part else [self.path, self.part_path]
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self.state = {}
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Download profielen: gegeneraliseerde kopieën van layers voor de kaart
+=====================================================================
+
+Naast het bestand op volle precisie (voor analyses en de database import)
+worden lijn- en vlaklagen die in LAYER_PROFILES staan ook op lagere resolutie
+gedownload. De server generaliseert dan zelf (maxAllowableOffset) en rondt
+coördinaten af (geometryPrecision), zodat er veel minder vertices en bytes
+over de lijn gaan. Bij f=pbf wordt in plaats van afronden op het
+quantizationParameters raster van het profiel gekwantiseerd.
+
+Bestanden per layer:
+    Peilgebied_layer0.geojson          - volle precisie
+    Peilgebied_layer0.hoog.geojson     - profiel 'hoog'
+    Peilgebied_layer0.laag.geojson     - profiel 'laag'
+
+Profielkopieën worden niet als aparte laag geïmporteerd (zie is_profile_file).
+Afstanden in PROFILES zijn in meters. De server rekent in eenheden van outSR
+(WGS84, zie arcgis_paging.OUT_SR), dus profile_params zet ze om naar graden.
+"""
+
+import json
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from rd_new import GEOGRAPHIC_WKIDS, rd_to_wgs84
+
+PROFILES = {
+    'hoog': {'max_allowable_offset': 0.5, 'geometry_precision': 1},    # Straatniveau
+    'midden': {'max_allowable_offset': 2.5, 'geometry_precision': 0},  # Wijk / polder
+    'laag': {'max_allowable_offset': 10.0, 'geometry_precision': 0},   # Hele beheergebied
+}
+
+# Services (fnmatch op de servicenaam) waarvoor profielkopieën worden gedownload
+LAYER_PROFILES = {
+    'Peilgebied*': ('hoog', 'midden', 'laag'),
+    'Peilbesluit*': ('hoog', 'midden', 'laag'),
+    'Watergang*': ('hoog', 'midden', 'laag'),
+}
+
+# Punten hebben niets aan generalisatie
+GENERALIZABLE_TYPES = ('esriGeometryPolyline', 'esriGeometryPolygon')
+
+# Eén breedtegraad; een lengtegraad is op 52° N maar ~68,6 km, dus oost-west
+# valt de generalisatie iets fijner uit dan het profiel (nooit grover)
+METERS_PER_DEGREE = 111320.0
+DEGREE_DECIMALS = 5  # Extra decimalen in graden t.o.v. meters (1e-5° ≈ 1,1 m)
+
+
+def profiles_for(service_name: str, geometry_type: Optional[str]) -> List[str]:
+    """Profielen die voor een layer van deze service gedownload moeten worden"""
+    if geometry_type not in GENERALIZABLE_TYPES:
+        return []
+    for pattern, profiles in LAYER_PROFILES.items():
+        if fnmatch(service_name, pattern):
+            return [p for p in profiles if p in PROFILES]
+    return []
+
+
+def profile_path(output_file: Path, profile: str) -> Path:
+    """Pad van de profielkopie naast het bestand op volle precisie"""
+    output_file = Path(output_file)
+    return output_file.with_name(f"{output_file.stem}.{profile}{output_file.suffix}")
+
+
+def is_profile_file(path: Path) -> bool:
+    """True voor een profielkopie (<naam>.<profiel>.geojson)"""
+    suffixes = Path(path).suffixes
+    return len(suffixes) >= 2 and suffixes[-2].lstrip('.') in PROFILES
+
+
+def to_degrees(meters: float) -> float:
+    """Afstand in meters als (breedte)graden, voor parameters in eenheden van outSR"""
+    return round(meters / METERS_PER_DEGREE, 9)
+
+
+def wgs84_extent(extent: Dict) -> Dict:
+    """
+    Extent van de layer info (RD New) als WGS84 extent, voor quantizationParameters.
+
+    De hoekpunten worden omgerekend; de bbox daarvan omsluit de hele extent
+    (de RD-WGS84 vervorming is binnen het beheergebied verwaarloosbaar).
+    """
+    reference = extent.get('spatialReference') or {}
+    if (reference.get('latestWkid') or reference.get('wkid')) in GEOGRAPHIC_WKIDS:
+        return extent
+    corners = [rd_to_wgs84(x, y) for x in (extent['xmin'], extent['xmax'])
+               for y in (extent['ymin'], extent['ymax'])]
+    return {
+        'xmin': min(c[0] for c in corners), 'ymin': min(c[1] for c in corners),
+        'xmax': max(c[0] for c in corners), 'ymax': max(c[1] for c in corners),
+        'spatialReference': {'wkid': 4326}
+    }
+
+
+def profile_params(profile: str, query_format: str = 'json', extent: Optional[Dict] = None) -> Dict:
+    """
+    Query parameters voor een profiel, in graden (outSR=4326).
+
+    Met f=pbf en een bekende extent wordt het raster via quantizationParameters
+    gezet (de pbf geometrie is toch al gekwantiseerd). Met f=json blijft het bij
+    maxAllowableOffset en geometryPrecision, want gekwantiseerde f=json geometrie
+    zou een eigen decoder vragen.
+    """
+    settings = PROFILES[profile]
+    offset = to_degrees(settings['max_allowable_offset'])
+    params = {'maxAllowableOffset': offset}
+    if query_format == 'pbf' and extent:
+        params['quantizationParameters'] = json.dumps({
+            'mode': 'view',
+            'originPosition': 'upperLeft',
+            'tolerance': offset,
+            'extent': wgs84_extent(extent)
+        }, separators=(',', ':'))
+    else:
+        params['geometryPrecision'] = settings['geometry_precision'] + DEGREE_DECIMALS
+    return params
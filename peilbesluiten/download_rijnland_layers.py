@@ -10,27 +10,52 @@ Features:
 - Uitgebreide logging naar bestand
 - Progress tracking en statistieken
 - Error handling en retry mechanisme
+- Token-bucket rate limiting per host (gedeeld met andere processen)
+- Parallel downloaden van layers (thread pool, begrensd aantal requests per host)
+- Gegeneraliseerde kopieën van lijn- en vlaklagen voor de kaart (zie download_profiles.py)
+- Catalogus cache van services en layers met TTL en parallelle crawl (zie service_catalog.py)
+- Optioneel een FlatGeobuf kopie met ruimtelijke index per laag (zie flatgeobuf.py)
 """
 
+import argparse
 import json
 import requests
 import os
+import threading
 import time
 import logging
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import urljoin, urlparse
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 
+from arcgis_pbf import PbfDecodeError, parse_query_response, supports_pbf
+from arcgis_paging import LayerPager, PageError, layer_schema_from_page
+from download_journal import JOURNAL_SUFFIX, DownloadJournal, has_journal
+from download_profiles import profile_params, profile_path, profiles_for
+from flatgeobuf import convert_geojson
+from geojson_writer import FeatureCollectionWriter
+from rate_limiter import limiter_for_url
+from response_cache import atomic_write_bytes
+from service_catalog import CATALOG_FILE, ServiceCatalog
+
 # Configuratie
 ARCGIS_BASE_URL = "https://rijnland.enl-mcs.nl/arcgis/rest/services"
 OUTPUT_DIR = "rijnland_kaartlagen"
 LOG_DIR = "logs"
 MAX_FEATURES_PER_QUERY = 1000  # ArcGIS limiet
-REQUEST_DELAY = 0.5  # Seconden tussen requests
+RANGE_WORKERS = 4  # Aantal ObjectID-ranges per layer dat tegelijk wordt opgehaald
+USE_PBF = True  # Features als f=pbf ophalen als de service dat ondersteunt (zie arcgis_pbf.py)
 MAX_RETRIES = 3  # Aantal retries bij fouten
 TIMEOUT = 60  # Timeout voor requests in seconden
 RESUME = True  # Skip reeds gedownloade bestanden
+WORKERS = 4  # Aantal layers dat tegelijk gedownload wordt (1 = sequentieel)
+MAX_REQUESTS_PER_HOST = 4  # Maximaal aantal gelijktijdige requests per host
+PROGRESS_FILE = ".download_progress.json"  # Voortgangsrapport per layer (in OUTPUT_DIR), alleen geschreven
+CATALOG_WORKERS = 4  # Aantal folders / services dat tegelijk wordt opgevraagd bij het crawlen
+WRITE_FLATGEOBUF = False  # Naast de GeoJSON ook <naam>.fgb schrijven (bbox queries, HTTP range reads)
 
 # Setup logging
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -48,10 +73,15 @@ logger = logging.getLogger(__name__)
 class ArcGISDownloader:
     """Klasse voor het downloaden van ArcGIS kaartlagen"""
     
-    def __init__(self, base_url: str, output_dir: str, resume: bool = True):
+    def __init__(self, base_url: str, output_dir: str, resume: bool = True, refresh_catalog: bool = False,
+                 flatgeobuf: bool = WRITE_FLATGEOBUF):
         self.base_url = base_url
         self.output_dir = Path(output_dir)
         self.resume = resume
+        self.flatgeobuf = flatgeobuf
+        self.catalog = ServiceCatalog(self.output_dir / CATALOG_FILE, base_url)
+        if refresh_catalog:
+            self.catalog.invalidate()
         self.stats = {
             'services_found': 0,
             'services_processed': 0,
@@ -64,6 +94,12 @@ class ArcGISDownloader:
         }
         self.downloaded_files = set()
         
+        # Thread-safety voor parallel downloaden
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._progress: List[Dict] = []
+        
         # Laad lijst van reeds gedownloade bestanden als resume enabled is
         if self.resume:
             self._load_downloaded_files()
@@ -74,8 +110,37 @@ class ArcGISDownloader:
             return
         
         for geojson_file in self.output_dir.rglob("*.geojson"):
-            self.downloaded_files.add(str(geojson_file))
+            # Met een journal is de (her)download nog niet compleet
+            if not has_journal(geojson_file):
+                self.downloaded_files.add(str(geojson_file))
         logger.info(f"Resume modus: {len(self.downloaded_files)} bestanden gevonden")
+        
+        interrupted = sum(1 for _ in self.output_dir.rglob(f".*{JOURNAL_SUFFIX}"))
+        if interrupted:
+            logger.info(f"Resume modus: {interrupted} onderbroken downloads worden hervat")
+    
+    def _session(self) -> requests.Session:
+        """Eén requests.Session per thread (keep-alive verbindingen hergebruiken)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+    
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Semaphore die het aantal gelijktijdige requests naar een host begrenst"""
+        host = urlparse(url).hostname or 'default'
+        with self._stats_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+                self._host_slots[host] = slot
+            return slot
+    
+    def _record_error(self, error: Dict):
+        """Voeg een fout toe aan stats (thread-safe)"""
+        with self._stats_lock:
+            self.stats['errors'].append(error)
     
     def sanitize_filename(self, name: str) -> str:
         """Maak een veilige bestandsnaam"""
@@ -86,18 +151,29 @@ class ArcGISDownloader:
         name = name.strip(' .')
         return name
     
-    def make_request(self, url: str, params: Dict = None, retries: int = MAX_RETRIES) -> Optional[Dict]:
-        """Maak HTTP request met retry mechanisme"""
+    def make_request(self, url: str, params: Dict = None, retries: int = MAX_RETRIES,
+                     json_params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Maak HTTP request met retry mechanisme.
+        
+        Bij een onleesbare f=pbf response wordt de query herhaald met f=json, zonder
+        quantizationParameters en aangevuld met json_params (bijv. de f=json parameters
+        van een profiel, met geometryPrecision).
+        """
         if params is None:
             params = {}
         
-        params['f'] = 'json'
+        params.setdefault('f', 'json')
         
         for attempt in range(retries):
             try:
-                response = requests.get(url, params=params, timeout=TIMEOUT)
-                response.raise_for_status()
-                return response.json()
+                with self._host_slot(url):
+                    limiter_for_url(url).acquire()
+                    response = self._session().get(url, params=params, timeout=TIMEOUT)
+                    response.raise_for_status()
+                    if params['f'] == 'pbf':
+                        return parse_query_response(response)
+                    return response.json()
             except requests.exceptions.Timeout:
                 logger.warning(f"Timeout bij {url} (poging {attempt + 1}/{retries})")
                 if attempt < retries - 1:
@@ -109,11 +185,16 @@ class ArcGISDownloader:
             except json.JSONDecodeError as e:
                 logger.error(f"JSON decode fout bij {url}: {e}")
                 return None
+            except PbfDecodeError as e:
+                logger.warning(f"pbf decode fout bij {url}: {e}; terugval op f=json")
+                fallback = {k: v for k, v in params.items() if k != 'quantizationParameters'}
+                fallback.update(json_params or {}, f='json')
+                return self.make_request(url, fallback, retries)
         
         return None
     
-    def get_services(self, folder: Optional[str] = None) -> Tuple[List[Dict], List[str]]:
-        """Haal alle services op van de ArcGIS server"""
+    def get_services(self, folder: Optional[str] = None) -> Optional[Tuple[List[Dict], List[str]]]:
+        """Haal de services en subfolders van een folder op (None als het request mislukt)"""
         base = self.base_url.rstrip('/') + '/'
         if folder:
             path = folder.lstrip('/') + '/'
@@ -122,8 +203,8 @@ class ArcGISDownloader:
             url = base
         
         data = self.make_request(url)
-        if not data:
-            return [], []
+        if not data or 'error' in data:
+            return None
         
         services = []
         folders = []
@@ -138,7 +219,8 @@ class ArcGISDownloader:
                 if service.get('type') in ['MapServer', 'FeatureServer']:
                     service_name = service['name']
                     service_path = service_name
-                    if folder:
+                    # ArcGIS geeft services in een folder meestal al als "<folder>/<naam>"
+                    if folder and not service_name.startswith(f"{folder}/"):
                         service_path = f"{folder}/{service_name}"
                     services.append({
                         'name': service_name,
@@ -149,36 +231,73 @@ class ArcGISDownloader:
         return services, folders
     
     def get_all_services(self) -> List[Dict]:
-        """Haal recursief alle services op"""
+        """
+        Haal recursief alle services op.
+
+        Binnen de TTL van de catalogus (service_catalog.py) komt de lijst zonder requests uit
+        de cache. Anders worden de folders per niveau parallel gecrawld (CATALOG_WORKERS);
+        de volgorde is gelijk aan breadth-first. Mislukt een folder, dan is de lijst
+        onvolledig: die wordt voor deze run gebruikt maar niet in de catalogus opgeslagen
+        (anders zouden de ontbrekende services als verdwenen gelden).
+        """
+        if self.catalog.services_fresh():
+            all_services = self.catalog.services()
+            self.stats['services_found'] = len(all_services)
+            logger.info(f"{len(all_services)} services uit catalogus cache ({self.catalog.data['crawled']})")
+            return all_services
+        
         all_services = []
-        folders_to_process = [None]  # Start met root
+        failed = []
+        level = [None]  # Start met root
         
         logger.info("Services ophalen van ArcGIS server...")
         
-        while folders_to_process:
-            folder = folders_to_process.pop(0)
-            services, folders = self.get_services(folder)
-            all_services.extend(services)
-            
-            # Voeg nieuwe folders toe
-            for f in folders:
-                folder_path = f"{folder}/{f}" if folder else f
-                folders_to_process.append(folder_path)
-            
-            time.sleep(REQUEST_DELAY)
+        with ThreadPoolExecutor(max_workers=CATALOG_WORKERS) as executor:
+            while level:
+                next_level = []
+                # map behoudt de volgorde van de folders
+                for folder, result in zip(level, executor.map(self.get_services, level)):
+                    if result is None:
+                        failed.append(folder or '/')
+                        continue
+                    services, folders = result
+                    all_services.extend(services)
+                    
+                    # Voeg nieuwe folders toe
+                    for f in folders:
+                        next_level.append(f"{folder}/{f}" if folder else f)
+                level = next_level
+        
+        if failed:
+            logger.warning(f"{len(failed)} folder(s) niet opgehaald ({', '.join(failed)}); "
+                           f"onvolledige servicelijst niet in de catalogus opgeslagen")
+        elif all_services:
+            self.catalog.set_services(all_services)
+            self.catalog.save()
         
         self.stats['services_found'] = len(all_services)
         logger.info(f"{len(all_services)} services gevonden")
         return all_services
     
     def get_layers(self, service_path: str) -> List[Dict]:
-        """Haal alle layers op van een service"""
+        """
+        Haal alle layers op van een service (uit de catalogus cache als die vers genoeg is).
+
+        Eén request naar `<service>/layers` levert alle layers inclusief velden en extent;
+        servers zonder dat endpoint vallen terug op de service info.
+        """
+        cached = self.catalog.layers(service_path)
+        if cached is not None:
+            return cached
+        
         # Zorg dat base_url eindigt met / en service_path niet begint met /
         base = self.base_url.rstrip('/') + '/'
         path = service_path.lstrip('/')
         url = base + path
         
-        data = self.make_request(url)
+        data = self.make_request(f"{url}/layers")
+        if not data or 'layers' not in data:
+            data = self.make_request(url)
         if not data:
             return []
         
@@ -187,85 +306,136 @@ class ArcGISDownloader:
             for layer in data['layers']:
                 # Alleen layers met geometrie
                 if layer.get('geometryType'):
+                    pbf = USE_PBF and (supports_pbf(layer) or supports_pbf(data))
                     layers.append({
                         'id': layer['id'],
                         'name': layer.get('name', f"Layer_{layer['id']}"),
                         'geometryType': layer.get('geometryType'),
-                        'service_path': service_path
+                        'service_path': service_path,
+                        'query_format': 'pbf' if pbf else 'json',
+                        'extent': layer.get('extent') or data.get('fullExtent'),
+                        'fields': [{'name': f.get('name'), 'type': f.get('type'), 'alias': f.get('alias')}
+                                   for f in layer.get('fields') or []]
                     })
         
+        if 'error' not in data:
+            self.catalog.set_layers(service_path, layers)
         return layers
     
     def download_features(self, service_path: str, layer_id: int, layer_name: str, 
-                         output_file: Path) -> int:
-        """Download alle features van een layer met paginering"""
+                         output_file: Path, query_format: str = 'json',
+                         profile: Optional[str] = None, extent: Optional[Dict] = None) -> int:
+        """
+        Download alle features van een layer (parallel per ObjectID-range, zie arcgis_paging.py).
+
+        Pagina's worden direct naar een tijdelijk bestand gestreamd (geojson_writer.py) en per
+        pagina in een journal vastgelegd (download_journal.py). Een onderbroken download gaat bij
+        de volgende run verder bij de eerstvolgende pagina. Het bestand wordt pas na controle van
+        het aantal features (returnCountOnly) atomisch op zijn plek gezet.
+
+        Met query_format 'pbf' komen de features als protobuf binnen en worden ze lokaal
+        naar hetzelfde Esri JSON model gedecodeerd; bij een decode fout valt make_request
+        terug op f=json.
+
+        Met een profiel (download_profiles.py) generaliseert de server de geometrie en komt
+        de gegeneraliseerde kopie in output_file; extent is nodig voor quantizationParameters.
+        """
         base = self.base_url.rstrip('/') + '/'
         path = service_path.lstrip('/')
         query_url = f"{base}{path}/{layer_id}/query"
         
-        all_features = []
-        offset = 0
-        has_more = True
-        
-        logger.info(f"  Downloaden layer {layer_id}: {layer_name}...")
-        
-        while has_more:
-            params = {
-                'where': '1=1',
-                'outFields': '*',
-                'f': 'geojson',
-                'returnGeometry': 'true',
-                'resultOffset': offset,
-                'resultRecordCount': MAX_FEATURES_PER_QUERY
-            }
-            
-            data = self.make_request(query_url, params)
-            
-            if not data:
-                logger.error(f"    Kon geen data ophalen voor layer {layer_id}")
-                break
+        params = {'f': query_format}
+        request = self.make_request
+        if profile:
+            params.update(profile_params(profile, query_format, extent))
+            if query_format == 'pbf':
+                # Terugval op f=json met de json parameters van het profiel (geometryPrecision)
+                request = partial(self.make_request, json_params=profile_params(profile, 'json', extent))
+            logger.info(f"  Downloaden layer {layer_id}: {layer_name} (profiel {profile})...")
+        else:
+            logger.info(f"  Downloaden layer {layer_id}: {layer_name}...")
+        
+        pager = LayerPager(request, query_url, page_size=MAX_FEATURES_PER_QUERY,
+                           workers=RANGE_WORKERS, params=params)
+        journal = DownloadJournal(output_file, query_url)
+        
+        if self.resume and journal.load():
+            pager.restore_plan(journal.plan)
+            logger.info(f"    Hervatten vanaf pagina {journal.pages_done} ({journal.features} features)")
+            writer = FeatureCollectionWriter(output_file, part_path=journal.part_path,
+                                             resume_bytes=journal.bytes, resume_count=journal.features)
+        else:
+            journal.discard()
+            journal.start(pager.plan_state())
+            writer = FeatureCollectionWriter(output_file, part_path=journal.part_path)
+        layer_schema = journal.layer_schema
+        
+        with writer:
+            try:
+                for index, data in pager.pages(start_index=journal.pages_done, start_offset=journal.features):
+                    writer.write_features(data.get('features', []))
+                    
+                    # Veld- en geometrie metadata uit de eerste pagina (voor de generieke importer)
+                    if not layer_schema:
+                        layer_schema = layer_schema_from_page(data)
+                    
+                    journal.record_page(index, writer.count, writer.sync(), layer_schema)
+                    
+                    if writer.count >= MAX_FEATURES_PER_QUERY:
+                        logger.info(f"    {writer.count} features gedownload...")
+            except PageError as e:
+                # .part en journal blijven staan: de volgende run gaat hier verder
+                logger.error(f"    Kon geen data ophalen voor layer {layer_id} "
+                             f"(hervat vanaf pagina {journal.pages_done}): {e}")
+                writer.detach()
+                return 0
             
-            if 'features' in data:
-                features = data['features']
-                all_features.extend(features)
-                
-                # Check of er meer features zijn
-                if len(features) < MAX_FEATURES_PER_QUERY:
-                    has_more = False
-                else:
-                    offset += len(features)
-                    logger.info(f"    {len(all_features)} features gedownload...")
-                    time.sleep(REQUEST_DELAY)
-            elif 'error' in data:
-                logger.error(f"    ArcGIS fout: {data['error']}")
-                has_more = False
-            else:
-                has_more = False
-        
-        # Sla op als GeoJSON
-        if all_features:
-            geojson = {
-                'type': 'FeatureCollection',
-                'features': all_features,
-                'metadata': {
-                    'service': service_path,
-                    'layer_id': layer_id,
-                    'layer_name': layer_name,
-                    'feature_count': len(all_features),
-                    'download_date': datetime.now().isoformat(),
-                    'source': self.base_url
-                }
-            }
+            if not writer.count:
+                logger.warning(f"    ⚠ Geen features gevonden")
+                writer.abort()
+                journal.discard()
+                return 0
             
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(geojson, f, ensure_ascii=False, indent=2)
+            # Controleer het aantal features voordat de layer als compleet geldt
+            try:
+                expected = pager.fetch_count()
+            except PageError as e:
+                logger.warning(f"    {e}; controle tegen returnIdsOnly aantal")
+                expected = pager.expected_count
+            if expected is not None and expected != writer.count:
+                logger.error(f"    Aantal features klopt niet ({writer.count} gedownload, "
+                             f"{expected} op de server); layer wordt opnieuw gedownload")
+                writer.abort()
+                journal.discard()
+                return 0
             
-            logger.info(f"    ✓ {len(all_features)} features opgeslagen in {output_file.name}")
-            return len(all_features)
-        else:
-            logger.warning(f"    ⚠ Geen features gevonden")
-            return 0
+            # Metadata als trailer achter de features
+            writer.commit({
+                'service': service_path,
+                'layer_id': layer_id,
+                'layer_name': layer_name,
+                'feature_count': writer.count,
+                'download_date': datetime.now().isoformat(),
+                'source': self.base_url,
+                'query_format': query_format,
+                'profile': profile,
+                'profile_params': {k: v for k, v in params.items() if k != 'f'},
+                **layer_schema
+            })
+        journal.finish()
+        
+        logger.info(f"    ✓ {writer.count} features opgeslagen in {output_file.name}")
+        if self.flatgeobuf:
+            self._write_flatgeobuf(output_file)
+        return writer.count
+    
+    def _write_flatgeobuf(self, output_file: Path):
+        """FlatGeobuf kopie van een compleet laagbestand; een fout laat de GeoJSON intact"""
+        try:
+            fgb_file = convert_geojson(output_file)
+            logger.info(f"    ✓ FlatGeobuf geschreven: {fgb_file.name}")
+        except Exception as e:
+            logger.warning(f"    ⚠ FlatGeobuf schrijven mislukt voor {output_file.name}: {e}")
     
     def process_service(self, service: Dict) -> int:
         """Verwerk een service en download alle layers"""
@@ -285,51 +455,203 @@ class ArcGISDownloader:
             logger.warning(f"  Geen layers gevonden")
             return 0
         
+        self.catalog.save()
         self.stats['layers_found'] += len(layers)
         total_features = 0
         
         for layer in layers:
             layer_name = self.sanitize_filename(layer['name'])
-            output_file = self.output_dir / service_name / f"{layer_name}_layer{layer['id']}.geojson"
-            
-            # Check of bestand al bestaat (resume modus)
-            if self.resume and str(output_file) in self.downloaded_files:
-                logger.info(f"  ⏭ Skipping {layer_name} (reeds gedownload)")
-                self.stats['layers_skipped'] += 1
-                continue
+            base_file = self.output_dir / service_name / f"{layer_name}_layer{layer['id']}.geojson"
             
-            try:
-                features_count = self.download_features(
-                    service_url_path,
-                    layer['id'],
-                    layer['name'],
-                    output_file
-                )
-                
-                if features_count > 0:
+            for profile, output_file in self._layer_variants(service_name, layer, base_file):
+                # Check of bestand al bestaat (resume modus)
+                if self.resume and str(output_file) in self.downloaded_files:
+                    logger.info(f"  ⏭ Skipping {output_file.name} (reeds gedownload)")
+                    self.stats['layers_skipped'] += 1
+                    continue
+                features_count = self._download_variant(service_name, service_url_path, layer,
+                                                        output_file, profile)
+                # Profielkopieën bevatten dezelfde features; alleen volle precisie telt mee
+                if profile is None:
                     total_features += features_count
-                    self.stats['layers_downloaded'] += 1
-                    self.downloaded_files.add(str(output_file))
-                else:
-                    self.stats['layers_failed'] += 1
-                
-            except Exception as e:
-                logger.error(f"  Fout bij downloaden layer {layer_name}: {e}")
-                self.stats['layers_failed'] += 1
-                self.stats['errors'].append({
-                    'service': service_name,
-                    'layer': layer_name,
-                    'error': str(e)
-                })
-            
-            time.sleep(REQUEST_DELAY)
         
         if total_features > 0:
             self.stats['services_processed'] += 1
         
         return total_features
     
-    def run(self):
+    def _layer_variants(self, service_name: str, layer: Dict, output_file: Path) -> List[Tuple[Optional[str], Path]]:
+        """Bestand op volle precisie plus de profielkopieën van een layer, als (profiel, pad)"""
+        variants = [(None, output_file)]
+        for profile in profiles_for(service_name, layer.get('geometryType')):
+            variants.append((profile, profile_path(output_file, profile)))
+        return variants
+    
+    def _download_variant(self, service_name: str, service_url_path: str, layer: Dict,
+                          output_file: Path, profile: Optional[str]) -> int:
+        """Download één bestand van een layer (sequentiële modus) en werk stats bij"""
+        layer_name = self.sanitize_filename(layer['name'])
+        try:
+            features_count = self.download_features(
+                service_url_path,
+                layer['id'],
+                layer['name'],
+                output_file,
+                query_format=layer.get('query_format', 'json'),
+                profile=profile,
+                extent=layer.get('extent')
+            )
+        except Exception as e:
+            logger.error(f"  Fout bij downloaden layer {layer_name}: {e}")
+            self.stats['layers_failed'] += 1
+            self.stats['errors'].append({
+                'service': service_name,
+                'layer': layer_name,
+                'error': str(e)
+            })
+            return 0
+        
+        if features_count > 0:
+            self.stats['layers_downloaded'] += 1
+            self.downloaded_files.add(str(output_file))
+        else:
+            self.stats['layers_failed'] += 1
+        return features_count
+    
+    def _layer_jobs(self, services: List[Dict], workers: int) -> List[Dict]:
+        """Haal de layers van alle services (parallel) op als geordende lijst van download jobs"""
+        def list_layers(service):
+            service_url_path = f"{service['path']}/{service['type']}"
+            try:
+                return service, service_url_path, self.get_layers(service_url_path)
+            except Exception as e:
+                logger.error(f"Fout bij ophalen layers van {service['name']}: {e}")
+                self._record_error({'service': service['name'], 'error': str(e)})
+                return service, service_url_path, []
+
+        jobs = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map behoudt de volgorde van de services
+            for service, service_url_path, layers in executor.map(list_layers, services):
+                service_name = self.sanitize_filename(service['name'])
+                self.stats['layers_found'] += len(layers)
+                for layer in layers:
+                    layer_name = self.sanitize_filename(layer['name'])
+                    base_file = self.output_dir / service_name / f"{layer_name}_layer{layer['id']}.geojson"
+                    for profile, output_file in self._layer_variants(service_name, layer, base_file):
+                        jobs.append({
+                            'index': len(jobs),
+                            'service': service_name,
+                            'service_url_path': service_url_path,
+                            'layer_id': layer['id'],
+                            'layer_name': layer['name'],
+                            'query_format': layer.get('query_format', 'json'),
+                            'profile': profile,
+                            'extent': layer.get('extent'),
+                            'output_file': output_file
+                        })
+        self.catalog.save()
+        return jobs
+    
+    def _download_job(self, job: Dict) -> int:
+        """Download één layer (wordt in een worker thread uitgevoerd)"""
+        return self.download_features(
+            job['service_url_path'],
+            job['layer_id'],
+            job['layer_name'],
+            job['output_file'],
+            query_format=job.get('query_format', 'json'),
+            profile=job.get('profile'),
+            extent=job.get('extent')
+        )
+    
+    def _save_progress(self):
+        """
+        Schrijf de voortgang per layer (in job volgorde) naar het progress bestand.
+
+        Alleen een rapport voor monitoring; een herstart leest het niet terug maar
+        bepaalt met downloaded_files en de journals wat al klaar is.
+        """
+        with self._stats_lock:
+            payload = json.dumps({
+                'updated': datetime.now().isoformat(),
+                'stats': {k: v for k, v in self.stats.items() if k != 'errors'},
+                'layers': self._progress
+            }, ensure_ascii=False, indent=2).encode('utf-8')
+        atomic_write_bytes(self.output_dir / PROGRESS_FILE, payload)
+    
+    def _finish_job(self, job: Dict, status: str, features: int = 0, error: Optional[str] = None):
+        """Werk stats en de geordende voortgang bij voor een afgeronde job"""
+        with self._stats_lock:
+            entry = self._progress[job['index']]
+            entry.update({'status': status, 'features': features})
+            if error:
+                entry['error'] = error
+            if status == 'downloaded':
+                self.stats['layers_downloaded'] += 1
+                if not job.get('profile'):
+                    self.stats['total_features'] += features
+                self.downloaded_files.add(str(job['output_file']))
+            elif status == 'skipped':
+                self.stats['layers_skipped'] += 1
+            else:
+                self.stats['layers_failed'] += 1
+            # Aantal jobs dat op volgorde (zonder gaten) klaar is: tot hier kan een herstart overslaan
+            done = sum(1 for p in self._progress if p['status'] != 'pending')
+            contiguous = next((i for i, p in enumerate(self._progress) if p['status'] == 'pending'),
+                              len(self._progress))
+        self._save_progress()
+        logger.info(f"Voortgang: {done}/{len(self._progress)} layers "
+                    f"({contiguous} op volgorde afgerond)")
+    
+    def run_parallel(self, workers: int = WORKERS):
+        """Download alle layers parallel met een begrensde thread pool"""
+        all_services = self.get_all_services()
+        if not all_services:
+            logger.error("Geen services gevonden!")
+            return
+        
+        start_time = time.time()
+        jobs = self._layer_jobs(all_services, workers)
+        logger.info(f"\n{len(jobs)} layers in {len(all_services)} services, {workers} workers\n")
+        
+        self._progress = [{
+            'service': job['service'],
+            'layer_id': job['layer_id'],
+            'layer_name': job['layer_name'],
+            'profile': job.get('profile'),
+            'file': str(job['output_file'].relative_to(self.output_dir)),
+            'status': 'pending',
+            'features': 0
+        } for job in jobs]
+        
+        pending = []
+        for job in jobs:
+            if self.resume and str(job['output_file']) in self.downloaded_files:
+                logger.info(f"  ⏭ Skipping {job['output_file'].name} (reeds gedownload)")
+                self._finish_job(job, 'skipped')
+            else:
+                pending.append(job)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._download_job, job): job for job in pending}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    features_count = future.result()
+                except Exception as e:
+                    logger.error(f"  Fout bij downloaden layer {job['layer_name']}: {e}")
+                    self._record_error({'service': job['service'], 'layer': job['layer_name'], 'error': str(e)})
+                    self._finish_job(job, 'failed', error=str(e))
+                    continue
+                self._finish_job(job, 'downloaded' if features_count > 0 else 'failed', features_count)
+        
+        self.stats['services_processed'] = len({
+            p['service'] for p in self._progress if p['status'] == 'downloaded'
+        })
+        self.print_summary(time.time() - start_time)
+    
+    def run(self, workers: int = 1):
         """Hoofdfunctie - download alle kaartlagen"""
         logger.info("=" * 70)
         logger.info("Rijnland ArcGIS Server - Download alle kaartlagen")
@@ -342,6 +664,10 @@ class ArcGISDownloader:
         # Maak output directory
         self.output_dir.mkdir(exist_ok=True)
         
+        if workers > 1:
+            self.run_parallel(workers)
+            return
+        
         # Haal alle services op
         all_services = self.get_all_services()
         
@@ -398,14 +724,26 @@ class ArcGISDownloader:
 
 def main():
     """Hoofdfunctie"""
+    parser = argparse.ArgumentParser(description='Download alle Rijnland ArcGIS kaartlagen')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'Aantal layers tegelijk (default: {WORKERS}, 1 = sequentieel)')
+    parser.add_argument('--no-resume', action='store_true', help='Reeds gedownloade layers opnieuw downloaden')
+    parser.add_argument('--refresh-catalog', action='store_true',
+                        help='Services en layers opnieuw van de server ophalen (catalogus cache negeren)')
+    parser.add_argument('--flatgeobuf', action='store_true',
+                        help='Naast de GeoJSON ook een FlatGeobuf kopie (.fgb) met ruimtelijke index schrijven')
+    args = parser.parse_args()
+    
     downloader = ArcGISDownloader(
         base_url=ARCGIS_BASE_URL,
         output_dir=OUTPUT_DIR,
-        resume=RESUME
+        resume=RESUME and not args.no_resume,
+        refresh_catalog=args.refresh_catalog,
+        flatgeobuf=WRITE_FLATGEOBUF or args.flatgeobuf
     )
     
     try:
-        downloader.run()
+        downloader.run(workers=args.workers)
     except KeyboardInterrupt:
         logger.warning("\n\nDownload onderbroken door gebruiker")
         downloader.print_summary(0)
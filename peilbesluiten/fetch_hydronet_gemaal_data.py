@@ -13,10 +13,17 @@ from pathlib import Path
 from typing import Optional, Dict, List
 import time
 
+from geojson_stream import feature_attributes, iter_features
+from rate_limiter import limiter_for_url
+from response_cache import ResponseCache
+from segment_store import SegmentStore, series_key
+
 # Configuratie
 HYDRONET_BASE_URL = "https://watercontrolroom.hydronet.com/service/efsserviceprovider/api"
 CHART_ID = "e743fb87-2a02-4f3e-ac6c-03d03401aab8"  # Rijnland chart ID
 OUTPUT_DIR = Path("realtime_gemaal_data")
+CACHE_DIR = Path(__file__).parent / "gemaal_data_cache"  # Gedeeld door alle fetcher gebruikers
+SEGMENT_ENCODING = "gorilla"  # Zie timeseries_codec.py; "ndjson" voor leesbare segmenten
 LOG_DIR = "logs"
 
 # Setup logging
@@ -35,18 +42,25 @@ logger = logging.getLogger(__name__)
 class HydronetGemaalDataFetcher:
     """Klasse voor het ophalen van real-time gemaal data via Hydronet API"""
     
-    def __init__(self, chart_id: str, output_dir: Path):
+    def __init__(self, chart_id: str, output_dir: Path, cache: Optional[ResponseCache] = None):
         self.chart_id = chart_id
         self.output_dir = output_dir
         self.output_dir.mkdir(exist_ok=True)
         self.base_url = f"{HYDRONET_BASE_URL}/chart/{chart_id}"
+        # Standaard delen alle fetchers dezelfde cache, ongeacht hun output_dir
+        self.cache = cache if cache is not None else ResponseCache(CACHE_DIR)
+        self.store = SegmentStore(self.output_dir / "segments", encoding=SEGMENT_ENCODING)
     
-    def fetch_gemaal_data(self, feature_identifier: str) -> Optional[Dict]:
+    def fetch_gemaal_data(self, feature_identifier: str, use_cache: bool = True) -> Optional[Dict]:
         """
         Haal real-time data op voor een specifiek gemaal
         
+        Verse responses worden uit de gedeelde cache geserveerd; verlopen entries
+        worden conditioneel gerevalideerd (ETag / Last-Modified).
+        
         Args:
             feature_identifier: Gemaal code (bijv. '176-036-00021')
+            use_cache: Gebruik de gedeelde response cache (default: True)
         
         Returns:
             Dict met gemaal data of None bij fout
@@ -62,20 +76,43 @@ class HydronetGemaalDataFetcher:
             'Referer': 'https://rijnland.maps.arcgis.com/'
         }
         
+        cache_key = f"{self.chart_id}:{feature_identifier}"
+        if use_cache:
+            cached_body = self.cache.get(cache_key)
+            if cached_body is not None:
+                logger.info(f"✓ Cache hit voor gemaal {feature_identifier}")
+                return self.parse_response_body(cached_body, feature_identifier)
+            headers.update(self.cache.conditional_headers(self.cache.get_entry(cache_key)))
+        
         try:
             logger.info(f"Ophalen data voor gemaal {feature_identifier}...")
+            limiter_for_url(url).acquire()
             response = requests.get(url, params=params, headers=headers, timeout=30)
+            
+            if use_cache and response.status_code == 304:
+                body = self.cache.mark_revalidated(
+                    cache_key,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified')
+                )
+                if body is not None:
+                    logger.info(f"✓ Niet gewijzigd (304), cache gerevalideerd")
+                    return self.parse_response_body(body, feature_identifier)
+                # Entry is intussen ge-evict: onvoorwaardelijk opnieuw ophalen
+                return self.fetch_gemaal_data(feature_identifier, use_cache=False)
+            
             response.raise_for_status()
             
-            # Probeer JSON te parsen
-            try:
-                data = response.json()
-                logger.info(f"✓ JSON data ontvangen")
-                return data
-            except json.JSONDecodeError:
-                # Als het geen JSON is, parse Highcharts configuratie uit HTML
-                logger.info(f"Parsen Highcharts configuratie uit HTML...")
-                return self.parse_highcharts_config(response.text, feature_identifier)
+            if use_cache:
+                self.cache.put(
+                    cache_key,
+                    response.content,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                    url=response.url
+                )
+            
+            return self.parse_response_body(response.content, feature_identifier)
         
         except requests.exceptions.RequestException as e:
             logger.error(f"Request fout: {e}")
@@ -84,6 +121,20 @@ class HydronetGemaalDataFetcher:
             logger.error(f"Onverwachte fout: {e}")
             return None
     
+    def parse_response_body(self, body: bytes, feature_identifier: str) -> Optional[Dict]:
+        """Parse een (eventueel gecachte) response body naar gemaal data"""
+        text = body.decode('utf-8', errors='replace')
+        
+        # Probeer JSON te parsen
+        try:
+            data = json.loads(text)
+            logger.info(f"✓ JSON data ontvangen")
+            return data
+        except json.JSONDecodeError:
+            # Als het geen JSON is, parse Highcharts configuratie uit HTML
+            logger.info(f"Parsen Highcharts configuratie uit HTML...")
+            return self.parse_highcharts_config(text, feature_identifier)
+    
     def fetch_all_gemalen(self, gemaal_codes: List[str]) -> Dict[str, Dict]:
         """
         Haal data op voor meerdere gemalen
@@ -100,27 +151,33 @@ class HydronetGemaalDataFetcher:
             data = self.fetch_gemaal_data(code)
             if data:
                 results[code] = data
-            
-            # Korte pauze tussen requests
-            time.sleep(0.5)
         
         return results
     
     def save_data(self, data: Dict, feature_identifier: str, timestamp: datetime):
-        """Sla gemaal data op"""
-        filename = self.output_dir / f"gemaal_{feature_identifier}_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
-        
-        save_data = {
-            'timestamp': timestamp.isoformat(),
-            'feature_identifier': feature_identifier,
-            'chart_id': self.chart_id,
-            'data': data
-        }
+        """
+        Sla gemaal data op in de append-only segment store.
         
+        Alleen punten die nieuwer zijn dan het laatst opgeslagen punt worden
+        toegevoegd aan het dag segment van het station. Responses zonder
+        tijdreeks worden als record bewaard.
+        """
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Data opgeslagen: {filename.name}")
+            series_list = data.get('series') if isinstance(data, dict) else None
+            if series_list:
+                new_points = 0
+                for i, series in enumerate(series_list):
+                    new_points += self.store.append_series(
+                        series_key(feature_identifier, i),
+                        series.get('data', [])
+                    )
+                logger.info(f"Data opgeslagen: {new_points} nieuwe punten voor {feature_identifier}")
+            else:
+                self.store.append_record(f"{feature_identifier}__raw", timestamp, {
+                    'chart_id': self.chart_id,
+                    'data': data
+                })
+                logger.info(f"Data opgeslagen als record voor {feature_identifier}")
             return True
         except Exception as e:
             logger.error(f"Fout bij opslaan: {e}")
@@ -212,12 +269,9 @@ class HydronetGemaalDataFetcher:
     def load_gemaal_codes_from_geojson(self, geojson_file: str) -> List[str]:
         """Laad gemaal codes uit gedownloade GeoJSON"""
         try:
-            with open(geojson_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
             codes = []
-            for feature in data.get('features', []):
-                code = feature.get('attributes', {}).get('CODE')
+            for feature in iter_features(geojson_file):
+                code = feature_attributes(feature).get('CODE')
                 if code:
                     codes.append(code)
             
@@ -299,10 +353,6 @@ def main():
             else:
                 failed.append(code)
                 logger.warning(f"  ✗ Geen data beschikbaar")
-            
-            # Korte pauze tussen requests
-            if i < len(codes):
-                time.sleep(1)  # 1 seconde tussen requests om server niet te overbelasten
         
         elapsed_time = time.time() - start_time
         
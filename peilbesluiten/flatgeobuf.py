@@ -0,0 +1,912 @@
+#!/usr/bin/env python3
+"""
+FlatGeobuf schrijven en lezen (met packed Hilbert R-tree)
+=========================================================
+
+FlatGeobuf (https://flatgeobuf.org) is een binair formaat met een
+ruimtelijke index voorin het bestand. Een lezer haalt eerst de header en de
+index op en leest daarna alleen de features binnen een bbox, lokaal via mmap
+of over HTTP met range requests. De kaartviewer kan dezelfde bestanden met de
+flatgeobuf JavaScript library lezen.
+
+Deze module implementeert het formaat (versie 3) zonder de flatbuffers
+library: een kleine FlatBuffers builder/reader voor de Header en Feature
+tabellen, de packed Hilbert R-tree en de property codering.
+
+Bestandsopbouw:
+    magic (8 bytes) | header (size-prefixed) | index (40 bytes per node) | features (size-prefixed)
+
+Features worden op Hilbert waarde van het bbox midden gesorteerd, zodat
+features die dicht bij elkaar liggen ook in het bestand bij elkaar staan.
+
+Gebruik:
+    convert_geojson(Path('rijnland_kaartlagen/Gemaal/Gemaal_layer0.geojson'))   # -> .fgb ernaast
+
+    with FlatGeobufReader('rijnland_kaartlagen/Gemaal/Gemaal_layer0.fgb') as reader:
+        for feature in reader.features(bbox=(4.45, 52.12, 4.52, 52.16)):
+            ...
+
+    with FlatGeobufReader('https://example.org/kaartlagen/Gemaal_layer0.fgb') as reader:
+        features = list(reader.features(bbox=...))   # alleen de benodigde byte ranges
+
+Features komen terug in het Esri JSON model van de ArcGIS query pagina's
+('attributes' en Esri geometrie; feature_attributes en esri_to_geojson in
+geojson_stream.py werken op beide modellen); datums (esriFieldTypeDate) staan
+in FlatGeobuf als ISO 8601 DateTime en komen als string terug.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import requests
+
+from geojson_stream import feature_attributes, iter_features, read_member
+from rate_limiter import limiter_for_url
+
+MAGIC = b'fgb\x03fgb\x00'
+NODE_ITEM_SIZE = 40  # minX, minY, maxX, maxY (double) + offset (uint64)
+INDEX_NODE_SIZE = 16
+HILBERT_MAX = (1 << 16) - 1
+BLOCK_SIZE = 64 * 1024  # Bytes per HTTP range block
+MAX_CACHED_BLOCKS = 256
+TIMEOUT = 60
+
+# GeometryType
+UNKNOWN, POINT, LINESTRING, POLYGON, MULTIPOINT, MULTILINESTRING, MULTIPOLYGON = range(7)
+
+# ColumnType: (waarde, struct formaat of None voor lengte-prefixed)
+BYTE, UBYTE, BOOL, SHORT, USHORT, INT, UINT, LONG, ULONG, FLOAT, DOUBLE, STRING, JSON, DATETIME, BINARY = range(15)
+COLUMN_FORMATS = {BYTE: 'b', UBYTE: 'B', BOOL: '?', SHORT: 'h', USHORT: 'H', INT: 'i', UINT: 'I',
+                  LONG: 'q', ULONG: 'Q', FLOAT: 'f', DOUBLE: 'd'}
+INTEGER_TYPES = (BYTE, UBYTE, SHORT, USHORT, INT, UINT, LONG, ULONG)
+
+ESRI_GEOMETRY_TYPES = {
+    'esriGeometryPoint': POINT,
+    'esriGeometryMultipoint': MULTIPOINT,
+    'esriGeometryPolyline': MULTILINESTRING,
+    'esriGeometryPolygon': MULTIPOLYGON,
+}
+
+ESRI_COLUMN_TYPES = {
+    'esriFieldTypeSmallInteger': SHORT,
+    'esriFieldTypeInteger': INT,
+    'esriFieldTypeOID': LONG,
+    'esriFieldTypeSingle': FLOAT,
+    'esriFieldTypeDouble': DOUBLE,
+    'esriFieldTypeString': STRING,
+    'esriFieldTypeDate': DATETIME,
+    'esriFieldTypeGUID': STRING,
+    'esriFieldTypeGlobalID': STRING,
+    'esriFieldTypeXML': STRING,
+}
+SKIPPED_ESRI_TYPES = ('esriFieldTypeGeometry', 'esriFieldTypeBlob', 'esriFieldTypeRaster')
+
+
+class FlatGeobufError(ValueError):
+    """Geen geldig FlatGeobuf bestand"""
+
+
+def flatgeobuf_path(geojson_file: Path) -> Path:
+    """Pad van de FlatGeobuf kopie naast een GeoJSON bestand"""
+    return Path(geojson_file).with_suffix('.fgb')
+
+
+# --- FlatBuffers ------------------------------------------------------------
+#
+# Een tabel is een lijst velden (index = veld id in het schema), elk None of
+# (soort, waarde). Soorten: struct formaten voor scalars ('B', 'H', 'i', 'Q', 'd'),
+# 'str', 'vec:<formaat>', 'table' en 'vec:table'. De builder schrijft voorwaarts:
+# vtable, tabel en daarna de objecten waarnaar de tabel verwijst.
+
+class _Builder:
+    def __init__(self):
+        self.buf = bytearray(8)  # Size prefix + offset naar de root tabel
+
+    def _pad(self, align: int, phase: int = 0):
+        self.buf.extend(bytes((phase - len(self.buf)) % align))
+
+    def finish(self, fields: List) -> bytes:
+        root = self._table(fields)
+        struct.pack_into('<I', self.buf, 4, root - 4)
+        struct.pack_into('<I', self.buf, 0, len(self.buf) - 4)
+        return bytes(self.buf)
+
+    def _table(self, fields: List) -> int:
+        present = [(i, f[0], f[1]) for i, f in enumerate(fields) if f is not None]
+        items = sorted(((struct.calcsize(kind) if len(kind) == 1 else 4, i, kind, value)
+                        for i, kind, value in present), key=lambda item: -item[0])
+        offsets = [0] * len(fields)
+        layout = []
+        position = 4  # Na de soffset naar de vtable
+        for size, i, kind, value in items:
+            position += -position % size
+            offsets[i] = position
+            layout.append((position, kind, value))
+            position += size
+        table_size = position
+
+        self._pad(2)
+        vtable = len(self.buf)
+        self.buf += struct.pack(f'<HH{len(fields)}H', 4 + 2 * len(fields), table_size, *offsets)
+        self._pad(8)
+        table = len(self.buf)
+        self.buf += bytes(table_size)
+        struct.pack_into('<i', self.buf, table, table - vtable)
+
+        references = []
+        for position, kind, value in layout:
+            if len(kind) == 1:
+                struct.pack_into('<' + kind, self.buf, table + position, value)
+            else:
+                references.append((table + position, kind, value))
+        for field_position, kind, value in references:
+            target = self._reference(kind, value)
+            struct.pack_into('<I', self.buf, field_position, target - field_position)
+        return table
+
+    def _reference(self, kind: str, value) -> int:
+        if kind == 'table':
+            return self._table(value)
+        if kind == 'str':
+            data = value.encode('utf-8')
+            self._pad(4)
+            position = len(self.buf)
+            self.buf += struct.pack('<I', len(data)) + data + b'\x00'
+            return position
+        if kind == 'vec:table':
+            self._pad(4)
+            position = len(self.buf)
+            self.buf += struct.pack('<I', len(value)) + bytes(4 * len(value))
+            for k, child in enumerate(value):
+                target = self._table(child)
+                element = position + 4 + 4 * k
+                struct.pack_into('<I', self.buf, element, target - element)
+            return position
+        element = kind[4:]
+        size = struct.calcsize(element)
+        # Elementen (na de lengte) uitgelijnd op hun eigen grootte
+        self._pad(max(size, 4), phase=4 if size == 8 else 0)
+        position = len(self.buf)
+        if element == 'B':
+            self.buf += struct.pack('<I', len(value)) + bytes(value)
+        else:
+            self.buf += struct.pack(f'<I{len(value)}{element}', len(value), *value)
+        return position
+
+
+class _Table:
+    """Leest velden van een FlatBuffers tabel"""
+
+    __slots__ = ('buf', 'pos', 'vtable', 'vtable_size')
+
+    def __init__(self, buf, pos: int):
+        self.buf = buf
+        self.pos = pos
+        self.vtable = pos - struct.unpack_from('<i', buf, pos)[0]
+        self.vtable_size = struct.unpack_from('<H', buf, self.vtable)[0]
+
+    @classmethod
+    def root(cls, buf) -> '_Table':
+        return cls(buf, struct.unpack_from('<I', buf, 0)[0])
+
+    def _offset(self, field: int) -> int:
+        entry = 4 + 2 * field
+        if entry >= self.vtable_size:
+            return 0
+        return struct.unpack_from('<H', self.buf, self.vtable + entry)[0]
+
+    def scalar(self, field: int, fmt: str, default=0):
+        offset = self._offset(field)
+        return struct.unpack_from('<' + fmt, self.buf, self.pos + offset)[0] if offset else default
+
+    def _target(self, field: int) -> Optional[int]:
+        offset = self._offset(field)
+        if not offset:
+            return None
+        position = self.pos + offset
+        return position + struct.unpack_from('<I', self.buf, position)[0]
+
+    def string(self, field: int) -> Optional[str]:
+        position = self._target(field)
+        if position is None:
+            return None
+        length = struct.unpack_from('<I', self.buf, position)[0]
+        return bytes(self.buf[position + 4:position + 4 + length]).decode('utf-8')
+
+    def vector(self, field: int, fmt: str):
+        position = self._target(field)
+        if position is None:
+            return None
+        length = struct.unpack_from('<I', self.buf, position)[0]
+        if fmt == 'B':
+            return bytes(self.buf[position + 4:position + 4 + length])
+        return struct.unpack_from(f'<{length}{fmt}', self.buf, position + 4)
+
+    def table(self, field: int) -> Optional['_Table']:
+        position = self._target(field)
+        return _Table(self.buf, position) if position is not None else None
+
+    def tables(self, field: int) -> List['_Table']:
+        position = self._target(field)
+        if position is None:
+            return []
+        length = struct.unpack_from('<I', self.buf, position)[0]
+        elements = (position + 4 + 4 * k for k in range(length))
+        return [_Table(self.buf, e + struct.unpack_from('<I', self.buf, e)[0]) for e in elements]
+
+
+# --- Packed Hilbert R-tree --------------------------------------------------
+
+def hilbert(x: int, y: int) -> int:
+    """Hilbert index van (x, y) op een 16-bit raster (zelfde als de referentie implementatie)"""
+    a = x ^ y
+    b = 0xFFFF ^ a
+    c = 0xFFFF ^ (x | y)
+    d = x & (y ^ 0xFFFF)
+
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 2)) ^ (b & (b >> 2))
+    B = (a & (b >> 2)) ^ (b & ((a ^ b) >> 2))
+    C ^= (a & (c >> 2)) ^ (b & (d >> 2))
+    D ^= (b & (c >> 2)) ^ ((a ^ b) & (d >> 2))
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 4)) ^ (b & (b >> 4))
+    B = (a & (b >> 4)) ^ (b & ((a ^ b) >> 4))
+    C ^= (a & (c >> 4)) ^ (b & (d >> 4))
+    D ^= (b & (c >> 4)) ^ ((a ^ b) & (d >> 4))
+
+    a, b, c, d = A, B, C, D
+    C ^= (a & (c >> 8)) ^ (b & (d >> 8))
+    D ^= (b & (c >> 8)) ^ ((a ^ b) & (d >> 8))
+
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+
+    i0 = x ^ y
+    i1 = b | (0xFFFF ^ (i0 | a))
+
+    def spread(v):
+        v = (v | (v << 8)) & 0x00FF00FF
+        v = (v | (v << 4)) & 0x0F0F0F0F
+        v = (v | (v << 2)) & 0x33333333
+        return (v | (v << 1)) & 0x55555555
+
+    return ((spread(i1) << 1) | spread(i0)) & 0xFFFFFFFF
+
+
+def level_bounds(num_items: int, node_size: int) -> List[Tuple[int, int]]:
+    """(start, eind) node index per niveau, bladeren eerst; de root staat vooraan in het bestand"""
+    n = num_items
+    level_num_nodes = [n]
+    num_nodes = n
+    while True:
+        n = -(-n // node_size)
+        num_nodes += n
+        level_num_nodes.append(n)
+        if n == 1:
+            break
+    bounds = []
+    end = num_nodes
+    for size in level_num_nodes:
+        bounds.append((end - size, end))
+        end -= size
+    return bounds
+
+
+def index_size(num_items: int, node_size: int) -> int:
+    """Grootte van de index in bytes"""
+    if not node_size or not num_items:
+        return 0
+    node_size = min(max(node_size, 2), 65535)
+    return level_bounds(num_items, node_size)[0][1] * NODE_ITEM_SIZE
+
+
+def build_index(boxes: List[Tuple[float, float, float, float]], offsets: List[int], node_size: int) -> bytes:
+    """Packed R-tree over bboxen in bestandsvolgorde; bladeren verwijzen naar feature byte offsets"""
+    bounds = level_bounds(len(boxes), node_size)
+    nodes = [None] * bounds[0][1]
+    leaf_start = bounds[0][0]
+    for i, (box, offset) in enumerate(zip(boxes, offsets)):
+        nodes[leaf_start + i] = (*box, offset)
+    for level in range(len(bounds) - 1):
+        position, end = bounds[level]
+        parent = bounds[level + 1][0]
+        while position < end:
+            children = nodes[position:min(position + node_size, end)]
+            nodes[parent] = (min(n[0] for n in children), min(n[1] for n in children),
+                             max(n[2] for n in children), max(n[3] for n in children), position)
+            parent += 1
+            position += node_size
+    return b''.join(struct.pack('<4dQ', *node) for node in nodes)
+
+
+# --- Geometrie --------------------------------------------------------------
+
+def _is_clockwise(ring) -> bool:
+    area = 0.0
+    for (x1, y1, *_), (x2, y2, *_) in zip(ring, ring[1:] + ring[:1]):
+        area += x1 * y2 - x2 * y1
+    return area < 0
+
+
+def _flatten(parts, dims: int) -> Tuple[List[float], List[float], List[int]]:
+    """Parts naar (xy, z, ends in vertices)"""
+    xy, z, ends = [], [], []
+    for part in parts:
+        for vertex in part:
+            xy += (float(vertex[0]), float(vertex[1]))
+            if dims > 2:
+                z.append(float(vertex[2]) if len(vertex) > 2 and vertex[2] is not None else 0.0)
+        ends.append(len(xy) // 2)
+    return xy, z, ends
+
+
+def _geometry_table(geometry_type: int, parts, dims: int) -> List:
+    xy, z, ends = _flatten(parts, dims)
+    fields = [None] * 7
+    if len(ends) > 1:
+        fields[0] = ('vec:I', ends)
+    fields[1] = ('vec:d', xy)
+    if z:
+        fields[2] = ('vec:d', z)
+    fields[6] = ('B', geometry_type)
+    return fields
+
+
+def _normalize(geometry: Optional[Dict], has_z: bool) -> Optional[Tuple[int, list]]:
+    """Esri JSON of GeoJSON geometrie naar (FlatGeobuf type, parts)"""
+    if not geometry:
+        return None
+    if 'coordinates' in geometry:
+        kind, coords = geometry.get('type'), geometry['coordinates']
+        if kind == 'Point':
+            return POINT, [[coords]]
+        if kind == 'MultiPoint':
+            return MULTIPOINT, [coords]
+        if kind == 'LineString':
+            return MULTILINESTRING, [coords]
+        if kind == 'MultiLineString':
+            return MULTILINESTRING, coords
+        if kind == 'Polygon':
+            return MULTIPOLYGON, [coords]
+        if kind == 'MultiPolygon':
+            return MULTIPOLYGON, coords
+        return None
+    if 'x' in geometry:
+        if geometry['x'] is None or geometry.get('y') is None:
+            return None
+        return POINT, [[[geometry['x'], geometry['y'], geometry.get('z')]]]
+    if 'points' in geometry:
+        return MULTIPOINT, [geometry['points']]
+    if 'paths' in geometry:
+        return MULTILINESTRING, geometry['paths']
+    if 'rings' in geometry:
+        # Esri: buitenringen met de klok mee, gaten tegen de klok in na hun buitenring
+        polygons = []
+        for ring in geometry['rings']:
+            if not ring:
+                continue
+            if _is_clockwise(ring) or not polygons:
+                polygons.append([ring])
+            else:
+                polygons[-1].append(ring)
+        return MULTIPOLYGON, polygons
+    return None
+
+
+def encode_geometry(geometry: Optional[Dict], has_z: bool = False):
+    """
+    Geometrie naar een FlatGeobuf Geometry tabel.
+
+    Returns:
+        (type, tabel velden, bbox) of None zonder geometrie
+    """
+    normalized = _normalize(geometry, has_z)
+    if normalized is None:
+        return None
+    geometry_type, parts = normalized
+    dims = 3 if has_z else 2
+    if geometry_type == MULTIPOLYGON:
+        polygons = [p for p in parts if p and p[0]]
+        if not polygons:
+            return None
+        xs = [v[0] for polygon in polygons for v in polygon[0]]
+        ys = [v[1] for polygon in polygons for v in polygon[0]]
+        fields = [None] * 8
+        fields[6] = ('B', MULTIPOLYGON)
+        fields[7] = ('vec:table', [_geometry_table(POLYGON, polygon, dims) for polygon in polygons])
+    else:
+        parts = [p for p in parts if p]
+        if not parts:
+            return None
+        fields = _geometry_table(geometry_type, parts, dims)
+        xs = [v[0] for part in parts for v in part]
+        ys = [v[1] for part in parts for v in part]
+    return geometry_type, fields, (min(xs), min(ys), max(xs), max(ys))
+
+
+def _split(xy, z, ends) -> List[List[List[float]]]:
+    ends = list(ends) if ends else [len(xy) // 2]
+    parts, start = [], 0
+    for end in ends:
+        part = []
+        for i in range(start, end):
+            vertex = [xy[2 * i], xy[2 * i + 1]]
+            if z:
+                vertex.append(z[i])
+            part.append(vertex)
+        parts.append(part)
+        start = end
+    return parts
+
+
+def decode_geometry(table: Optional[_Table], header_type: int) -> Optional[Dict]:
+    """FlatGeobuf Geometry naar Esri JSON geometrie"""
+    if table is None:
+        return None
+    geometry_type = table.scalar(6, 'B', UNKNOWN) or header_type
+    if geometry_type in (MULTIPOLYGON, POLYGON) and table.tables(7):
+        rings = [ring for part in table.tables(7) for ring in decode_geometry(part, POLYGON)['rings']]
+        return {'rings': rings}
+    if geometry_type == MULTILINESTRING and table.tables(7):
+        return {'paths': [path for part in table.tables(7) for path in decode_geometry(part, LINESTRING)['paths']]}
+    xy = table.vector(1, 'd') or ()
+    z = table.vector(2, 'd')
+    parts = _split(xy, z, table.vector(0, 'I'))
+    if geometry_type == POINT:
+        if not xy:
+            return None
+        point = {'x': xy[0], 'y': xy[1]}
+        if z:
+            point['z'] = z[0]
+        return point
+    if geometry_type == MULTIPOINT:
+        return {'points': parts[0]}
+    if geometry_type in (LINESTRING, MULTILINESTRING):
+        return {'paths': parts}
+    if geometry_type in (POLYGON, MULTIPOLYGON):
+        return {'rings': parts}
+    raise FlatGeobufError(f"Geometrie type {geometry_type} niet ondersteund")
+
+
+# --- Properties -------------------------------------------------------------
+
+def columns_from_fields(fields: Optional[List[Dict]]) -> List[Dict]:
+    """Kolommen uit ArcGIS veld metadata (layer_schema['fields'])"""
+    columns = []
+    for field in fields or []:
+        field_type = field.get('type')
+        if field_type in SKIPPED_ESRI_TYPES or not field.get('name'):
+            continue
+        columns.append({'name': field['name'], 'type': ESRI_COLUMN_TYPES.get(field_type, STRING),
+                        'title': field.get('alias')})
+    return columns
+
+
+def _value_type(value) -> int:
+    if isinstance(value, bool):
+        return BOOL
+    if isinstance(value, int):
+        return LONG
+    if isinstance(value, float):
+        return DOUBLE
+    if isinstance(value, str):
+        return STRING
+    return JSON
+
+
+def infer_columns(features: Iterable[Dict]) -> List[Dict]:
+    """Kolommen afgeleid uit de attributen (voor bestanden zonder veld metadata)"""
+    types: Dict[str, int] = {}
+    for feature in features:
+        for name, value in feature_attributes(feature).items():
+            if value is None:
+                types.setdefault(name, None)
+                continue
+            current, new = types.get(name), _value_type(value)
+            if current is None or current == new:
+                types[name] = new
+            elif {current, new} == {LONG, DOUBLE}:
+                types[name] = DOUBLE
+            else:
+                types[name] = JSON
+    return [{'name': name, 'type': STRING if t is None else t} for name, t in types.items()]
+
+
+def _encode_value(column_type: int, value) -> Optional[bytes]:
+    fmt = COLUMN_FORMATS.get(column_type)
+    try:
+        if fmt:
+            if column_type in INTEGER_TYPES:
+                value = int(value)
+            elif column_type in (FLOAT, DOUBLE):
+                value = float(value)
+            return struct.pack('<' + fmt, value)
+    except (TypeError, ValueError, struct.error):
+        return None
+    if column_type == DATETIME and isinstance(value, (int, float)):
+        # Esri datums zijn milliseconden sinds 1970 (UTC)
+        value = datetime.fromtimestamp(value / 1000, tz=timezone.utc).isoformat().replace('+00:00', 'Z')
+    elif column_type == BINARY:
+        value = value if isinstance(value, bytes) else str(value).encode('utf-8')
+    elif column_type == JSON or not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    data = value if isinstance(value, bytes) else value.encode('utf-8')
+    return struct.pack('<I', len(data)) + data
+
+
+def encode_properties(attributes: Dict, columns: List[Dict]) -> bytes:
+    """Attributen als (uint16 kolom index, waarde) paren; null waarden worden weggelaten"""
+    out = bytearray()
+    for index, column in enumerate(columns):
+        value = attributes.get(column['name'])
+        if value is None:
+            continue
+        encoded = _encode_value(column['type'], value)
+        if encoded is not None:
+            out += struct.pack('<H', index) + encoded
+    return bytes(out)
+
+
+def decode_properties(data: bytes, columns: List[Dict]) -> Dict:
+    attributes = {column['name']: None for column in columns}
+    position = 0
+    while position < len(data):
+        index = struct.unpack_from('<H', data, position)[0]
+        position += 2
+        column = columns[index]
+        fmt = COLUMN_FORMATS.get(column['type'])
+        if fmt:
+            value = struct.unpack_from('<' + fmt, data, position)[0]
+            position += struct.calcsize(fmt)
+        else:
+            length = struct.unpack_from('<I', data, position)[0]
+            raw = bytes(data[position + 4:position + 4 + length])
+            position += 4 + length
+            if column['type'] == BINARY:
+                value = raw
+            elif column['type'] == JSON:
+                value = json.loads(raw)
+            else:
+                value = raw.decode('utf-8')
+        attributes[column['name']] = value
+    return attributes
+
+
+# --- Schrijven --------------------------------------------------------------
+
+def _header(name: str, envelope, geometry_type: int, has_z: bool, columns: List[Dict],
+            count: int, node_size: int, srid: Optional[int], metadata: Optional[Dict]) -> bytes:
+    fields = [None] * 14
+    fields[0] = ('str', name)
+    if envelope:
+        fields[1] = ('vec:d', list(envelope))
+    fields[2] = ('B', geometry_type)
+    if has_z:
+        fields[3] = ('B', 1)
+    column_tables = []
+    for column in columns:
+        table = [None] * 11
+        table[0] = ('str', column['name'])
+        table[1] = ('B', column['type'])
+        if column.get('title') and column['title'] != column['name']:
+            table[2] = ('str', column['title'])
+        column_tables.append(table)
+    if column_tables:
+        fields[7] = ('vec:table', column_tables)
+    fields[8] = ('Q', count)
+    fields[9] = ('H', node_size)
+    if srid:
+        crs = [None] * 6
+        crs[0] = ('str', 'EPSG')
+        crs[1] = ('i', srid)
+        fields[10] = ('table', crs)
+    if metadata:
+        fields[13] = ('str', json.dumps(metadata, ensure_ascii=False))
+    return _Builder().finish(fields)
+
+
+def write_flatgeobuf(output_file: Path, features: Iterable[Dict], columns: List[Dict],
+                     geometry_type: Optional[str] = None, srid: Optional[int] = None, has_z: bool = False,
+                     name: str = '', metadata: Optional[Dict] = None,
+                     node_size: int = INDEX_NODE_SIZE) -> int:
+    """
+    Schrijf features als FlatGeobuf met packed Hilbert R-tree (atomisch).
+
+    Features worden eerst gecodeerd naar een tijdelijk bestand; in het geheugen blijven
+    alleen de bboxen. Daarna volgen header, index en de features in Hilbert volgorde.
+
+    Args:
+        output_file: Doelbestand (.fgb)
+        features: Features met 'attributes' of 'properties' en Esri JSON of GeoJSON geometrie
+        columns: Kolommen (zie columns_from_fields / infer_columns)
+        geometry_type: Esri geometrie type van de laag (None: afgeleid uit de features)
+        srid: EPSG code van de coördinaten
+        has_z: Schrijf z waarden mee
+        name: Naam van de laag in de header
+        metadata: Extra metadata (JSON) in de header
+
+    Returns:
+        Aantal geschreven features
+    """
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    header_type = ESRI_GEOMETRY_TYPES.get(geometry_type)
+    seen_types = set()
+
+    items = []  # (bbox, positie in tijdelijk bestand, lengte)
+    with tempfile.TemporaryFile(dir=output_file.parent) as encoded:
+        for feature in features:
+            geometry = encode_geometry(feature.get('geometry'), has_z)
+            fields = [None] * 3
+            if geometry is not None:
+                seen_types.add(geometry[0])
+                fields[0] = ('table', geometry[1])
+                box = geometry[2]
+            else:
+                box = (math.inf, math.inf, -math.inf, -math.inf)  # Nooit in een bbox
+            properties = encode_properties(feature_attributes(feature), columns)
+            if properties:
+                fields[1] = ('vec:B', properties)
+            data = _Builder().finish(fields)
+            items.append((box, encoded.tell(), len(data)))
+            encoded.write(data)
+
+        boxes = [item[0] for item in items if math.isfinite(item[0][0])]
+        envelope = None
+        if boxes:
+            envelope = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                        max(b[2] for b in boxes), max(b[3] for b in boxes))
+            width, height = envelope[2] - envelope[0], envelope[3] - envelope[1]
+
+            def hilbert_key(item):
+                box = item[0]
+                if not math.isfinite(box[0]):
+                    return HILBERT_MAX * HILBERT_MAX
+                x = int(HILBERT_MAX * ((box[0] + box[2]) / 2 - envelope[0]) / width) if width else 0
+                y = int(HILBERT_MAX * ((box[1] + box[3]) / 2 - envelope[1]) / height) if height else 0
+                return hilbert(x, y)
+
+            items.sort(key=hilbert_key)
+
+        if header_type is None:
+            header_type = seen_types.pop() if len(seen_types) == 1 else UNKNOWN
+        if not items:
+            node_size = 0
+
+        offsets = []
+        position = 0
+        for _, _, length in items:
+            offsets.append(position)
+            position += length
+
+        fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(MAGIC)
+                f.write(_header(name, envelope, header_type, has_z, columns, len(items), node_size,
+                                srid, metadata))
+                if node_size:
+                    f.write(build_index([item[0] for item in items], offsets, node_size))
+                for _, start, length in items:
+                    encoded.seek(start)
+                    f.write(encoded.read(length))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, output_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+    return len(items)
+
+
+def convert_geojson(geojson_file: Path, output_file: Optional[Path] = None) -> Path:
+    """
+    Zet een laagbestand van de downloader om naar FlatGeobuf (standaard <naam>.fgb ernaast).
+
+    Kolommen en geometrie type komen uit de metadata trailer; zonder veld metadata
+    worden de kolommen uit de attributen afgeleid (extra leesronde).
+    """
+    geojson_file = Path(geojson_file)
+    output_file = Path(output_file) if output_file else flatgeobuf_path(geojson_file)
+    metadata = read_member(geojson_file, 'metadata', {}) or {}
+    columns = columns_from_fields(metadata.get('fields')) or infer_columns(iter_features(geojson_file))
+    reference = metadata.get('spatial_reference') or {}
+    srid = reference.get('latestWkid') or reference.get('wkid')
+    write_flatgeobuf(
+        output_file,
+        iter_features(geojson_file),
+        columns,
+        geometry_type=metadata.get('geometry_type'),
+        srid=srid,
+        has_z=bool(metadata.get('has_z')),
+        name=metadata.get('layer_name') or geojson_file.stem,
+        metadata={k: metadata[k] for k in ('service', 'layer_id', 'source', 'profile') if metadata.get(k) is not None}
+    )
+    return output_file
+
+
+# --- Lezen ------------------------------------------------------------------
+
+class _FileSource:
+    """Lokaal bestand via mmap"""
+
+    def __init__(self, path: Path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self, offset: int, length: int):
+        return memoryview(self._map)[offset:offset + length]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class _HttpSource:
+    """Bestand over HTTP met range requests en een block cache"""
+
+    def __init__(self, url: str, session: Optional[requests.Session] = None, block_size: int = BLOCK_SIZE):
+        self.url = url
+        self.session = session or requests.Session()
+        self.block_size = block_size
+        self.blocks: 'OrderedDict[int, bytes]' = OrderedDict()
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    def _fetch(self, first: int, last: int) -> Dict[int, bytes]:
+        """Haal blocks first..last op in één request; levert ze (ook als de cache ze al weer kwijt is)"""
+        start, end = first * self.block_size, (last + 1) * self.block_size - 1
+        limiter_for_url(self.url).acquire()
+        response = self.session.get(self.url, headers={'Range': f'bytes={start}-{end}'}, timeout=TIMEOUT)
+        response.raise_for_status()
+        self.requests += 1
+        data = response.content
+        self.bytes_fetched += len(data)
+        if response.status_code != 206:
+            # Server negeert Range: hele bestand ontvangen, alleen het gevraagde deel bewaren
+            data = data[start:end + 1]
+        fetched = {}
+        for block in range(first, first + -(-len(data) // self.block_size)):
+            begin = (block - first) * self.block_size
+            fetched[block] = data[begin:begin + self.block_size]
+        self.blocks.update(fetched)
+        while len(self.blocks) > MAX_CACHED_BLOCKS:
+            self.blocks.popitem(last=False)
+        return fetched
+
+    def read(self, offset: int, length: int) -> bytes:
+        first, last = offset // self.block_size, (offset + length - 1) // self.block_size
+        blocks = {b: self.blocks[b] for b in range(first, last + 1) if b in self.blocks}
+        missing = [b for b in range(first, last + 1) if b not in blocks]
+        # Aaneengesloten ontbrekende blocks in één request
+        while missing:
+            run_end = 0
+            while run_end + 1 < len(missing) and missing[run_end + 1] == missing[run_end] + 1:
+                run_end += 1
+            blocks.update(self._fetch(missing[0], missing[run_end]))
+            missing = [b for b in missing[run_end + 1:] if b not in blocks]
+        data = b''.join(blocks.get(b, b'') for b in range(first, last + 1))
+        begin = offset - first * self.block_size
+        result = data[begin:begin + length]
+        if len(result) < length:
+            raise FlatGeobufError(f"Bestand korter dan verwacht ({self.url})")
+        return result
+
+    def close(self):
+        pass
+
+
+class FlatGeobufReader:
+    """Leest een FlatGeobuf bestand (lokaal of via HTTP), optioneel gefilterd op bbox"""
+
+    def __init__(self, source: Union[str, Path], session: Optional[requests.Session] = None):
+        """
+        Open een bestand en lees de header.
+
+        Args:
+            source: Lokaal pad of http(s) URL
+            session: requests.Session voor HTTP (optioneel)
+        """
+        if str(source).startswith(('http://', 'https://')):
+            self._source = _HttpSource(str(source), session)
+        else:
+            self._source = _FileSource(Path(source))
+        magic = bytes(self._source.read(0, 8))
+        if magic[:3] != MAGIC[:3] or magic[4:7] != MAGIC[4:7]:
+            raise FlatGeobufError(f"Geen FlatGeobuf bestand: {source}")
+        header_size = struct.unpack('<I', bytes(self._source.read(8, 4)))[0]
+        header = _Table.root(bytes(self._source.read(12, header_size)))
+
+        crs = header.table(10)
+        self.name = header.string(0)
+        self.envelope = header.vector(1, 'd')
+        self.geometry_type = header.scalar(2, 'B', UNKNOWN)
+        self.has_z = bool(header.scalar(3, 'B', 0))
+        self.columns = [{'name': c.string(0), 'type': c.scalar(1, 'B', STRING), 'title': c.string(2)}
+                        for c in header.tables(7)]
+        self.features_count = header.scalar(8, 'Q', 0)
+        self.index_node_size = header.scalar(9, 'H', INDEX_NODE_SIZE)
+        self.srid = crs.scalar(1, 'i', 0) if crs is not None else None
+        metadata = header.string(13)
+        self.metadata = json.loads(metadata) if metadata else {}
+
+        self.index_offset = 12 + header_size
+        self.features_offset = self.index_offset + index_size(self.features_count, self.index_node_size)
+
+    def _read_feature(self, offset: int) -> Tuple[Dict, int]:
+        position = self.features_offset + offset
+        size = struct.unpack('<I', bytes(self._source.read(position, 4)))[0]
+        feature = _Table.root(bytes(self._source.read(position + 4, size)))
+        result = {'attributes': decode_properties(feature.vector(1, 'B') or b'', self.columns)}
+        geometry = decode_geometry(feature.table(0), self.geometry_type)
+        if geometry is not None:
+            result['geometry'] = geometry
+        return result, 4 + size
+
+    def search(self, bbox: Tuple[float, float, float, float]) -> List[int]:
+        """Byte offsets (binnen de features sectie) van features waarvan de bbox de zoek bbox raakt"""
+        min_x, min_y, max_x, max_y = bbox
+        node_size = self.index_node_size
+        bounds = level_bounds(self.features_count, node_size)
+        num_nodes = bounds[0][1]
+        leaf_start = num_nodes - self.features_count
+        hits = []
+        queue = [(0, len(bounds) - 1)]
+        while queue:
+            node_index, level = queue.pop(0)
+            end = min(node_index + node_size, bounds[level][1])
+            data = self._source.read(self.index_offset + node_index * NODE_ITEM_SIZE,
+                                     (end - node_index) * NODE_ITEM_SIZE)
+            for k in range(end - node_index):
+                n_min_x, n_min_y, n_max_x, n_max_y, offset = struct.unpack_from('<4dQ', data, k * NODE_ITEM_SIZE)
+                if n_max_x < min_x or n_max_y < min_y or n_min_x > max_x or n_min_y > max_y:
+                    continue
+                if node_index >= leaf_start:
+                    hits.append(offset)
+                else:
+                    queue.append((offset, level - 1))
+        return sorted(hits)
+
+    def features(self, bbox: Optional[Tuple[float, float, float, float]] = None) -> Iterator[Dict]:
+        """
+        Itereer over de features, optioneel alleen die (volgens hun bbox) in `bbox` vallen.
+
+        Met bbox worden alleen de index nodes en features gelezen die nodig zijn.
+        """
+        if bbox is not None and self.index_node_size and self.features_count:
+            for offset in self.search(bbox):
+                yield self._read_feature(offset)[0]
+            return
+        offset = 0
+        for _ in range(self.features_count):
+            feature, size = self._read_feature(offset)
+            offset += size
+            yield feature
+
+    def close(self):
+        self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Bulk ingest van gemaal tijdreeksen in PostgreSQL (peilbesluiten.gemaal_metingen)
+==============================================================================
+
+Laadt punten met COPY in een tijdelijke staging tabel en voegt ze daarna in één
+set-based INSERT ... ON CONFLICT samen met de gepartitioneerde metingen tabel.
+Dubbele (gemaal, tijdstip) combinaties worden zo gededupliceerd; alleen een
+gewijzigd debiet leidt tot een update.
+
+Schema: db/schema_gemaal.sql
+
+Gebruik:
+    # Backfill alle historie uit de segment store van de fetcher
+    python gemaal_metingen_db.py backfill realtime_gemaal_data/segments
+
+    # Alleen punten die nieuwer zijn dan wat al in de database staat
+    python gemaal_metingen_db.py sync realtime_gemaal_data/segments
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from segment_store import SegmentStore
+
+try:
+    import psycopg2
+except ImportError:  # Alleen nodig voor de CLI; GemaalMetingenWriter werkt met elke DB-API connectie
+    psycopg2 = None
+
+# Database connection parameters
+DB_CONFIG = {
+    'dbname': os.getenv('POSTGRES_DB', 'peilbeheer'),
+    'user': os.getenv('POSTGRES_USER', 'postgres'),
+    'password': os.getenv('POSTGRES_PASSWORD', 'postgres'),
+    'host': os.getenv('POSTGRES_HOST', 'localhost'),
+    'port': os.getenv('POSTGRES_PORT', '5432')
+}
+
+BATCH_ROWS = 500_000  # Rijen per COPY + merge transactie
+
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS gemaal_metingen_staging (
+        gemaal_code VARCHAR(50) NOT NULL,
+        ts_ms BIGINT NOT NULL,
+        debiet DOUBLE PRECISION
+    ) ON COMMIT DELETE ROWS
+"""
+
+MERGE_SQL = """
+    INSERT INTO peilbesluiten.gemaal_metingen (gemaal_code, ts, debiet)
+    SELECT DISTINCT ON (gemaal_code, ts_ms)
+        gemaal_code,
+        to_timestamp(ts_ms / 1000.0),
+        debiet
+    FROM gemaal_metingen_staging
+    ORDER BY gemaal_code, ts_ms
+    ON CONFLICT (gemaal_code, ts)
+    DO UPDATE SET debiet = EXCLUDED.debiet
+    WHERE gemaal_metingen.debiet IS DISTINCT FROM EXCLUDED.debiet
+"""
+
+
+class _CopyStream(io.RawIOBase):
+    """File-achtig object dat COPY tekst regels lazy uit een iterator levert"""
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = bytearray()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while len(self._buffer) < len(b):
+            chunk = ''.join(line for _, line in zip(range(1000), self._lines))
+            if not chunk:
+                break
+            self._buffer += chunk.encode('utf-8')
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        del self._buffer[:n]
+        return n
+
+
+def _copy_value(value: Optional[float]) -> str:
+    if value is None:
+        return '\\N'
+    return repr(float(value))
+
+
+class GemaalMetingenWriter:
+    """Schrijft gemaal metingen in batches met COPY naar PostgreSQL"""
+
+    def __init__(self, conn, batch_rows: int = BATCH_ROWS):
+        """
+        Args:
+            conn: psycopg2 connectie
+            batch_rows: Maximaal aantal rijen per COPY + merge transactie
+        """
+        self.conn = conn
+        self.batch_rows = batch_rows
+        self._known_partitions = set()
+        self.stats = {
+            'rows_copied': 0,
+            'rows_merged': 0,
+            'batches': 0,
+            'seconds': 0.0
+        }
+
+    def ensure_partitions(self, cursor, min_ts_ms: int, max_ts_ms: int):
+        """Maak de maandpartities aan die het bereik [min_ts_ms, max_ts_ms] dekken"""
+        month = datetime.fromtimestamp(min_ts_ms / 1000, tz=timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = datetime.fromtimestamp(max_ts_ms / 1000, tz=timezone.utc)
+        while month <= end:
+            key = (month.year, month.month)
+            if key not in self._known_partitions:
+                cursor.execute("SELECT peilbesluiten.ensure_gemaal_metingen_partition(%s)", (month,))
+                self._known_partitions.add(key)
+            month = (month.replace(year=month.year + 1, month=1) if month.month == 12
+                     else month.replace(month=month.month + 1))
+
+    def write_batch(self, rows: List[Tuple[str, int, Optional[float]]]) -> int:
+        start = time.time()
+        with self.conn.cursor() as cursor:
+            cursor.execute(STAGING_DDL)
+            self.ensure_partitions(cursor, min(r[1] for r in rows), max(r[1] for r in rows))
+
+            lines = (f"{code}\t{int(ts_ms)}\t{_copy_value(value)}\n" for code, ts_ms, value in rows)
+            cursor.copy_expert(
+                "COPY gemaal_metingen_staging (gemaal_code, ts_ms, debiet) FROM STDIN",
+                io.BufferedReader(_CopyStream(lines), buffer_size=1 << 20)
+            )
+            cursor.execute(MERGE_SQL)
+            merged = cursor.rowcount
+        self.conn.commit()
+
+        self.stats['rows_copied'] += len(rows)
+        self.stats['rows_merged'] += max(merged, 0)
+        self.stats['batches'] += 1
+        self.stats['seconds'] += time.time() - start
+        return merged
+
+    def write_rows(self, rows: Iterable[Tuple[str, int, Optional[float]]]) -> int:
+        """
+        Schrijf (gemaal_code, timestamp_ms, debiet) rijen in batches.
+
+        Returns:
+            Aantal ingevoegde of gewijzigde rijen
+        """
+        merged = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_rows:
+                merged += self.write_batch(batch)
+                batch = []
+        if batch:
+            merged += self.write_batch(batch)
+        return merged
+
+    def write_series(self, gemaal_code: str, series_data: List[Dict]) -> int:
+        """Schrijf een Hydronet series (dicts met 'timestamp_ms' en 'value')"""
+        return self.write_rows(
+            (gemaal_code, point['timestamp_ms'], point.get('value'))
+            for point in series_data
+            if point.get('timestamp_ms')
+        )
+
+    def latest_timestamps(self) -> Dict[str, int]:
+        """Laatste timestamp (ms) per gemaal in de database"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT gemaal_code, (extract(epoch FROM max(ts)) * 1000)::BIGINT
+                FROM peilbesluiten.gemaal_metingen
+                GROUP BY gemaal_code
+            """)
+            result = dict(cursor.fetchall())
+        self.conn.commit()
+        return result
+
+    def read_range(self, gemaal_code: str, start_ms: Optional[int] = None,
+                   end_ms: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Lees de metingen van één gemaal in een tijdsbereik"""
+        query = """
+            SELECT (extract(epoch FROM ts) * 1000)::BIGINT, debiet
+            FROM peilbesluiten.gemaal_metingen
+            WHERE gemaal_code = %s
+              AND ts >= COALESCE(to_timestamp(%s / 1000.0), '-infinity')
+              AND ts <= COALESCE(to_timestamp(%s / 1000.0), 'infinity')
+            ORDER BY ts
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, (gemaal_code, start_ms, end_ms))
+            rows = cursor.fetchall()
+        self.conn.commit()
+        return rows
+
+
+def iter_segment_rows(store: SegmentStore, since: Optional[Dict[str, int]] = None
+                      ) -> Iterator[Tuple[str, int, float]]:
+    """
+    Lever (gemaal_code, timestamp_ms, debiet) uit de segment store, optioneel na een tijdstip per gemaal.
+
+    Alleen tijdreeksen van stations; record streams (append_record) staan onder _records en doen niet mee.
+    """
+    for station in store.stations():
+        start_ms = None
+        if since and station in since:
+            start_ms = since[station] + 1
+        for ts, value in store.read_points(station, start_ms=start_ms):
+            yield station, ts, value
+
+
+def main():
+    """CLI voor backfill en sync vanuit de segment store"""
+    parser = argparse.ArgumentParser(description='Bulk ingest van gemaal metingen in PostgreSQL')
+    parser.add_argument('command', choices=['backfill', 'sync'],
+                        help='backfill: alle punten; sync: alleen nieuwer dan de database')
+    parser.add_argument('segments', help='Directory van de segment store (realtime_gemaal_data/segments)')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help=f'Rijen per transactie (default: {BATCH_ROWS})')
+    args = parser.parse_args()
+
+    if psycopg2 is None:
+        print("Error: psycopg2 is niet geïnstalleerd (pip install psycopg2-binary)")
+        sys.exit(1)
+
+    segments_dir = Path(args.segments)
+    if not segments_dir.exists():
+        print(f"Error: Directory {segments_dir} not found")
+        sys.exit(1)
+
+    print(f"Connecting to PostgreSQL database: {DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        writer = GemaalMetingenWriter(conn, batch_rows=args.batch_rows)
+        store = SegmentStore(segments_dir)
+
+        since = writer.latest_timestamps() if args.command == 'sync' else None
+        merged = writer.write_rows(iter_segment_rows(store, since))
+
+        stats = writer.stats
+        rate = stats['rows_copied'] / stats['seconds'] if stats['seconds'] else 0
+        print(f"Rows copied: {stats['rows_copied']:,} in {stats['batches']} batches "
+              f"({stats['seconds']:.1f}s, {rate:,.0f} rows/sec)")
+        print(f"Rows inserted/updated: {merged:,}")
+        conn.close()
+
+    except psycopg2.Error as e:
+        print(f"Database error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,7 +25,6 @@ Vaker pollen dan elke 15 minuten is niet zinvol omdat de brondata niet vaker upd
 
 import json
 import logging
-import time
 from datetime import datetime
 from pathlib import Path
 import sys
@@ -33,11 +32,13 @@ import sys
 # Import the fetcher class
 from fetch_hydronet_gemaal_data import HydronetGemaalDataFetcher, CHART_ID
 from sliding_window_processor import process_gemaal_series
+from history_store import open_history_store
 
 # Configuration
 OUTPUT_FILE = Path("../simulatie-peilbeheer/public/data/gemaal_status_latest.json")
 GEOJSON_FILE = Path("rijnland_kaartlagen/Gemaal/Gemaal_layer0.geojson")
 LOG_DIR = Path("logs")
+HISTORY_LOOKBACK_MS = 180 * 60 * 1000  # Grootste sliding window; historie van vóór de chart response
 
 # Setup logging
 LOG_DIR.mkdir(exist_ok=True)
@@ -89,6 +90,15 @@ def main():
     temp_dir.mkdir(exist_ok=True)
     fetcher = HydronetGemaalDataFetcher(CHART_ID, temp_dir)
     
+    # Historie backend (SQLite of PostgreSQL, zie history_store.py); zonder backend
+    # gaat de status generatie door op alleen de actuele response
+    try:
+        history = open_history_store()
+    except Exception as e:
+        logger.error(f"Historie backend niet beschikbaar, doorgaan zonder historie: {e}")
+        history = None
+    history_rows = []
+    
     # 1. Load all gemalen from GeoJSON
     if not GEOJSON_FILE.exists():
         logger.error(f"GeoJSON file not found: {GEOJSON_FILE}")
@@ -126,6 +136,15 @@ def main():
                     series_data = series['data']
                     last_point = series_data[-1]
                     
+                    # Opgeslagen historie van vóór de eerste punt in de response
+                    first_ts = series_data[0].get('timestamp_ms', 0)
+                    earlier_data = history.to_series_data(
+                        code, first_ts - HISTORY_LOOKBACK_MS, first_ts - 1) if history and first_ts else []
+                    history_rows.extend(
+                        (code, point['timestamp_ms'], point.get('value'))
+                        for point in series_data if point.get('timestamp_ms')
+                    )
+                    
                     debiet = last_point.get('value', 0)
                     status = last_point.get('status', 'uit')
                     
@@ -138,7 +157,7 @@ def main():
                     # Process with sliding windows (30 min, 1 hour, 3 hours)
                     windowed_data = process_gemaal_series(
                         code, 
-                        series_data, 
+                        earlier_data + series_data, 
                         windows_minutes=[30, 60, 180]
                     )
                     
@@ -176,12 +195,19 @@ def main():
         except Exception as e:
             logger.error(f"Error fetching {code}: {e}")
             summary_data["stations"][code] = {"status": "error", "error": str(e)}
-            
-        # Rate limiting
-        time.sleep(0.2)
         
     print("") # Newline after progress
     
+    # Historie van deze cyclus in één transactie wegschrijven
+    if history is not None:
+        try:
+            written = history.write_batch(history_rows)
+            logger.info(f"Historie bijgewerkt: {written} nieuwe/gewijzigde punten ({len(history_rows)} ontvangen)")
+        except Exception as e:
+            logger.error(f"Fout bij schrijven historie: {e}")
+        finally:
+            history.close()
+    
     # 3. Finalize summary
     summary_data["active_stations"] = active_count
     summary_data["total_debiet_m3s"] = round(total_debiet, 3)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Streaming GeoJSON / Esri JSON reader
+====================================
+
+Leest de features van een FeatureCollection één voor één van schijf, zonder
+het hele document in het geheugen te laden. Werkt voor zowel GeoJSON
+('properties'/'geometry') als de Esri JSON bestanden van de downloader
+('attributes'/'geometry'); alleen de top-level 'features' array wordt gestreamd.
+Andere top-level sleutels (bijv. 'metadata' achteraan) worden overgeslagen.
+
+Gebruik:
+    for feature in iter_features(path):
+        code = feature_attributes(feature).get('CODE')
+
+    for chunk in iter_feature_chunks(path, 1000):
+        import_chunk(chunk)   # begrensd geheugengebruik
+
+    esri_to_geojson({'rings': [...]})   # -> {'type': 'MultiPolygon', ...}
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+CHUNK_SIZE = 1 << 16  # Bytes (tekens) per leesactie
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+class _StreamReader:
+    """Buffer over een tekstbestand met incrementele JSON decodering"""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, minimum: int) -> bool:
+        """Lees minimaal `minimum` extra tekens; False bij einde van het bestand"""
+        if self.eof:
+            return False
+        if self.pos > len(self.buffer) // 2:
+            # Verwerkte tekst weggooien zodat de buffer niet onbeperkt groeit
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        data = self.f.read(max(self.chunk_size, minimum))
+        if not data:
+            self.eof = True
+            return False
+        self.buffer += data
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Volgende teken dat geen whitespace is (zonder het te consumeren)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(0):
+                return None
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Ongeldige JSON: '{char}' verwacht, '{found}' gevonden")
+        self.pos += 1
+
+    def decode_value(self):
+        """Decodeer één JSON waarde; leest bij en probeert opnieuw als de buffer te kort is"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Waarde loopt door na de buffer: verdubbel de leeshoeveelheid (logaritmisch aantal pogingen)
+                if not self._fill(len(self.buffer) - self.pos):
+                    raise
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # Een getal of literal kan over de grens van de buffer lopen
+                if self._fill(0):
+                    continue
+            self.pos = end
+            return value
+
+
+def _iter_members(source: Union[str, Path], chunk_size: int,
+                  stream_key: str) -> Iterator[Tuple[str, object]]:
+    """
+    Loop door de top-level sleutels van een JSON object.
+
+    Elementen van de array onder `stream_key` worden één voor één geleverd als
+    (stream_key, element); andere sleutels als (sleutel, volledige waarde).
+    """
+    with open(source, 'r', encoding='utf-8') as f:
+        reader = _StreamReader(f, chunk_size)
+        reader.expect('{')
+        while True:
+            char = reader.peek()
+            if char == '}' or char is None:
+                return
+            if char == ',':
+                reader.pos += 1
+                continue
+
+            key = reader.decode_value()
+            reader.expect(':')
+            if key != stream_key or reader.peek() != '[':
+                yield key, reader.decode_value()
+                continue
+
+            reader.expect('[')
+            while True:
+                char = reader.peek()
+                if char == ']':
+                    reader.pos += 1
+                    break
+                if char == ',':
+                    reader.pos += 1
+                    continue
+                if char is None:
+                    raise ValueError(f"Onverwacht einde van bestand in '{stream_key}'")
+                yield key, reader.decode_value()
+
+
+def iter_features(source: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Lever de features van een (Geo)JSON FeatureCollection één voor één.
+
+    Args:
+        source: Pad naar het bestand
+        chunk_size: Aantal tekens per leesactie
+
+    Raises:
+        ValueError: Als het bestand geen JSON object op het hoogste niveau bevat
+    """
+    for key, value in _iter_members(source, chunk_size, 'features'):
+        if key == 'features':
+            yield value
+
+
+def read_member(source: Union[str, Path], key: str, default=None, chunk_size: int = CHUNK_SIZE):
+    """
+    Lees één top-level waarde (bijv. 'metadata') zonder de features vast te houden.
+
+    De features worden wel geparsed om ze over te slaan, maar nooit allemaal tegelijk bewaard.
+    """
+    for member_key, value in _iter_members(source, chunk_size, 'features'):
+        if member_key == key:
+            return value
+    return default
+
+
+def iter_feature_chunks(source: Union[str, Path], size: int = 1000,
+                        chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict]]:
+    """Lever de features in lijsten van maximaal `size` stuks"""
+    chunk = []
+    for feature in iter_features(source, chunk_size):
+        chunk.append(feature)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def feature_attributes(feature: Dict) -> Dict:
+    """Attributen van een feature, voor Esri JSON ('attributes') en GeoJSON ('properties')"""
+    return feature.get('attributes') or feature.get('properties') or {}
+
+
+# ============================================================================
+# Geometrie conversie (Esri JSON -> GeoJSON)
+# ============================================================================
+
+def _ring_area(ring: List[List[float]]) -> float:
+    """Shoelace: positief voor tegen de klok in, negatief voor met de klok mee"""
+    area = 0.0
+    for (x1, y1, *_), (x2, y2, *_) in zip(ring, ring[1:]):
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def _point_in_ring(x: float, y: float, ring: List[List[float]]) -> bool:
+    inside = False
+    for (x1, y1, *_), (x2, y2, *_) in zip(ring, ring[1:]):
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+    return inside
+
+
+def _rings_to_polygons(rings: List[List[List[float]]]) -> List[List[List[List[float]]]]:
+    """Groepeer Esri rings: buitenringen met de klok mee, gaten tegen de klok in"""
+    outers = [r for r in rings if len(r) >= 4 and _ring_area(r) < 0]
+    holes = [r for r in rings if len(r) >= 4 and _ring_area(r) >= 0]
+    if not outers:
+        # Onjuist georiënteerde data: behandel elke ring als buitenring
+        return [[r] for r in holes]
+
+    polygons = [[outer] for outer in outers]
+    for hole in holes:
+        x, y = hole[0][0], hole[0][1]
+        target = next((p for p in polygons if _point_in_ring(x, y, p[0])), polygons[-1])
+        target.append(hole)
+    return polygons
+
+
+def esri_to_geojson(geometry: Optional[Dict], dims: int = 2) -> Optional[Dict]:
+    """
+    Zet een Esri JSON geometrie om naar GeoJSON (Polyline/Polygon als Multi*).
+    GeoJSON geometrieën worden ongewijzigd teruggegeven.
+    """
+    if not geometry:
+        return None
+    if 'type' in geometry:
+        return geometry
+
+    def trim(coords):
+        return [list(c[:dims]) for c in coords]
+
+    if 'x' in geometry:
+        if geometry.get('x') is None or geometry.get('x') == 'NaN':
+            return None
+        coords = [geometry['x'], geometry['y']]
+        if dims == 3:
+            coords.append(geometry.get('z', 0.0))
+        return {'type': 'Point', 'coordinates': coords}
+    if 'points' in geometry:
+        return {'type': 'MultiPoint', 'coordinates': trim(geometry['points'])} if geometry['points'] else None
+    if 'paths' in geometry:
+        paths = [trim(p) for p in geometry['paths'] if len(p) >= 2]
+        return {'type': 'MultiLineString', 'coordinates': paths} if paths else None
+    if 'rings' in geometry:
+        polygons = _rings_to_polygons([trim(r) for r in geometry['rings']])
+        return {'type': 'MultiPolygon', 'coordinates': polygons} if polygons else None
+    return None
+
+
+def esri_feature_to_geojson(feature: Dict) -> Dict:
+    """Esri JSON feature naar een GeoJSON Feature ('properties'); GeoJSON features blijven ongewijzigd"""
+    if feature.get('type') == 'Feature':
+        return feature
+    return {
+        'type': 'Feature',
+        'geometry': esri_to_geojson(feature.get('geometry')),
+        'properties': feature.get('attributes') or {}
+    }
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Streaming FeatureCollection writer
+==================================
+
+Schrijft features pagina voor pagina naar een tijdelijk bestand naast het
+doelbestand, in plaats van eerst de hele layer in geheugen te verzamelen.
+Esri JSON features (pagina's van de ArcGIS query, in WGS84 via outSR=4326)
+worden bij het schrijven omgezet naar GeoJSON ('properties', RFC 7946), zodat
+elk .geojson bestand direct bruikbaar is voor Leaflet en andere GeoJSON lezers.
+De metadata komt als trailer achter de features (`read_member` in
+geojson_stream.py leest die zonder de features vast te houden). Pas bij
+commit() wordt het bestand met os.replace op zijn plek gezet, zodat een
+afgebroken download nooit een half bestand achterlaat.
+
+Opbouw van het bestand (één feature per regel):
+    {"type": "FeatureCollection", "features": [
+    {...},
+    {...}
+    ], "metadata": {...}}
+
+Gebruik:
+    with FeatureCollectionWriter(output_file) as writer:
+        for page in pages:
+            writer.write_features(page['features'])
+        writer.commit({'feature_count': writer.count})
+
+Zonder commit() (of bij een exception) wordt het tijdelijke bestand verwijderd.
+
+Met een vaste `part_path` blijft het tijdelijke bestand bij een exception
+staan, zodat een download later vanaf de laatste sync() positie kan verder
+gaan (zie download_journal.py).
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from geojson_stream import esri_feature_to_geojson
+
+HEADER = b'{"type": "FeatureCollection", "features": [\n'
+
+
+class FeatureCollectionWriter:
+    """Schrijft een FeatureCollection incrementeel en atomisch"""
+
+    def __init__(self, path: Path, part_path: Optional[Path] = None,
+                 resume_bytes: Optional[int] = None, resume_count: int = 0):
+        """
+        Initialiseer de writer en open het tijdelijke bestand.
+
+        Args:
+            path: Doelbestand (wordt pas bij commit() aangemaakt of vervangen)
+            part_path: Vast tijdelijk bestand (blijft bij een exception bewaard)
+            resume_bytes: Ga verder in part_path vanaf deze positie (waarde van sync())
+            resume_count: Aantal features dat tot resume_bytes al geschreven is
+                (first_feature wordt dan uit part_path teruggelezen)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.persistent = part_path is not None
+        self.count = 0
+        self.first_feature: Optional[Dict] = None
+        self.closed = False
+
+        if part_path is None:
+            # Geen .geojson suffix: resume/rglob mag het tijdelijke bestand niet zien
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.",
+                                            suffix='.part')
+            self.tmp_path = Path(tmp_name)
+            self._file = os.fdopen(fd, 'wb')
+        else:
+            self.tmp_path = Path(part_path)
+            if resume_bytes is not None and self.tmp_path.exists():
+                # Alles na de laatste sync() positie is een half geschreven pagina
+                self._file = open(self.tmp_path, 'r+b')
+                self._file.truncate(resume_bytes)
+                self.count = resume_count
+                if resume_count:
+                    self.first_feature = self._read_first_feature()
+                self._file.seek(resume_bytes)
+                return
+            self._file = open(self.tmp_path, 'wb')
+        self._file.write(HEADER)
+
+    def _read_first_feature(self) -> Dict:
+        """Eerste feature uit een hervat tijdelijk bestand (de regel direct na HEADER)"""
+        self._file.seek(len(HEADER))
+        line = self._file.readline().rstrip(b'\r\n')
+        return json.loads(line[:-1] if line.endswith(b',') else line)
+
+    def write_features(self, features: Iterable[Dict]) -> int:
+        """
+        Voeg features toe (Esri JSON features worden als GeoJSON geschreven).
+
+        Returns:
+            Aantal geschreven features
+        """
+        if self.closed:
+            raise ValueError("Writer is al gesloten")
+        written = 0
+        for feature in features:
+            feature = esri_feature_to_geojson(feature)
+            if self.first_feature is None:
+                self.first_feature = feature
+            prefix = b',\n' if self.count else b''
+            self._file.write(prefix + json.dumps(feature, ensure_ascii=False,
+                                                 separators=(',', ':')).encode('utf-8'))
+            self.count += 1
+            written += 1
+        return written
+
+    def sync(self) -> int:
+        """
+        Schrijf gebufferde features naar schijf (fsync).
+
+        Returns:
+            Byte positie waarvandaan een hervatte writer verder kan gaan
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def detach(self):
+        """Sluit het tijdelijke bestand zonder het te verwijderen (om later te hervatten)"""
+        if self.closed:
+            return
+        self.closed = True
+        self._file.close()
+
+    def commit(self, metadata: Optional[Dict] = None) -> Path:
+        """Schrijf de metadata trailer, fsync en zet het bestand atomisch op zijn plek"""
+        if self.closed:
+            raise ValueError("Writer is al gesloten")
+        trailer = b'\n], "metadata": ' + json.dumps(metadata or {}, ensure_ascii=False,
+                                                     indent=2).encode('utf-8') + b'}\n'
+        try:
+            self._file.write(trailer)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.tmp_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        self.closed = True
+        return self.path
+
+    def abort(self):
+        """Gooi het tijdelijke bestand weg; het doelbestand blijft onaangeroerd"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._file.close()
+        finally:
+            try:
+                os.unlink(self.tmp_path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.persistent and exc_type is not None:
+            self.detach()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Historie opslag voor gemaal tijdreeksen (SQLite of PostgreSQL)
+==============================================================
+
+Eén API voor beide backends, zodat een deployment zonder PostGIS container
+dezelfde code kan draaien:
+
+    store = open_history_store()              # backend uit PEILBEHEER_HISTORY_BACKEND
+    store.write_batch(rows)                   # [(gemaal_code, timestamp_ms, debiet), ...]
+    timestamps, values = store.range(code, start_ms, end_ms)
+    series_data = store.to_series_data(code, start_ms, end_ms)
+
+`range()` levert twee kolommen voor `add_arrays()` van de sliding window
+processors; `to_series_data()` het series formaat van de Hydronet fetcher,
+net als het kolom archief (columnar_archive.py).
+
+SQLite backend:
+- WAL journal, zodat lezers doorlezen terwijl de writer een transactie open heeft
+- (station, ts) primary key in een WITHOUT ROWID tabel: de rijen liggen
+  geclusterd op station en tijd, een range query is één index scan
+- Eén transactie per batch (per poll cyclus) met executemany op een vaste,
+  door sqlite3 gecachte prepared statement
+
+Configuratie (environment variabelen):
+    PEILBEHEER_HISTORY_BACKEND  sqlite (default) of postgres
+    PEILBEHEER_HISTORY_DB       pad van het SQLite bestand
+    POSTGRES_*                  connectie voor de postgres backend (zie gemaal_metingen_db.py)
+"""
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_SQLITE_PATH = Path(__file__).parent / "gemaal_historie.sqlite"
+
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS gemaal_metingen (
+        gemaal_code TEXT NOT NULL,
+        ts INTEGER NOT NULL,
+        debiet REAL,
+        PRIMARY KEY (gemaal_code, ts)
+    ) WITHOUT ROWID
+"""
+
+SQLITE_UPSERT = """
+    INSERT INTO gemaal_metingen (gemaal_code, ts, debiet) VALUES (?, ?, ?)
+    ON CONFLICT (gemaal_code, ts) DO UPDATE SET debiet = excluded.debiet
+    WHERE debiet IS NOT excluded.debiet
+"""
+
+SQLITE_RANGE = """
+    SELECT ts, debiet FROM gemaal_metingen
+    WHERE gemaal_code = ? AND ts >= ? AND ts <= ?
+    ORDER BY ts
+"""
+
+# Grenzen voor een open bereik (SQLite INTEGER is 64-bit)
+MIN_TS = -(1 << 63)
+MAX_TS = (1 << 63) - 1
+
+
+def series_data_from_columns(timestamps: List[int], values: List[float]) -> List[Dict]:
+    """Zet kolommen om naar het series formaat van de Hydronet fetcher"""
+    return [{
+        'timestamp': datetime.fromtimestamp(ts / 1000).isoformat(),
+        'timestamp_ms': ts,
+        'value': value,
+        'status': 'aan' if value is not None and value > 0.001 else 'uit'
+    } for ts, value in zip(timestamps, values)]
+
+
+class HistoryStore(ABC):
+    """Gemeenschappelijke API van de historie backends"""
+
+    @abstractmethod
+    def write_batch(self, rows: Iterable[Tuple[str, int, Optional[float]]]) -> int:
+        """
+        Schrijf (gemaal_code, timestamp_ms, debiet) rijen in één transactie.
+
+        Returns:
+            Aantal ingevoegde of gewijzigde rijen
+        """
+
+    @abstractmethod
+    def range(self, station: str, start_ms: Optional[int] = None,
+              end_ms: Optional[int] = None) -> Tuple[List[int], List[float]]:
+        """Geef de punten in [start_ms, end_ms] als (timestamps, values) kolommen"""
+
+    @abstractmethod
+    def latest_timestamps(self) -> Dict[str, int]:
+        """Laatste timestamp (ms) per station"""
+
+    def stations(self) -> List[str]:
+        return sorted(self.latest_timestamps())
+
+    def write_series(self, station: str, series_data: List[Dict]) -> int:
+        """Schrijf een Hydronet series (dicts met 'timestamp_ms' en 'value')"""
+        return self.write_batch(
+            (station, point['timestamp_ms'], point.get('value'))
+            for point in series_data
+            if point.get('timestamp_ms')
+        )
+
+    def to_series_data(self, station: str, start_ms: Optional[int] = None,
+                       end_ms: Optional[int] = None) -> List[Dict]:
+        """Geef een bereik in het series formaat van de Hydronet fetcher"""
+        return series_data_from_columns(*self.range(station, start_ms, end_ms))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """Embedded historie in een SQLite bestand (WAL modus)"""
+
+    def __init__(self, path: Path = DEFAULT_SQLITE_PATH):
+        """
+        Args:
+            path: Pad van het SQLite bestand (wordt aangemaakt indien nodig)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []  # Alle reader connecties, voor close()
+        self._readers_lock = threading.Lock()
+
+        # isolation_level=None: transacties worden expliciet met BEGIN/COMMIT beheerd
+        self._writer = sqlite3.connect(str(self.path), isolation_level=None,
+                                       check_same_thread=False, timeout=30)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.execute(SQLITE_SCHEMA)
+        self.stats = {'rows_written': 0, 'batches': 0}
+
+    def _reader(self) -> sqlite3.Connection:
+        """Aparte read-only connectie per thread; leest de laatste commit, ook tijdens een schrijftransactie"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False: close() sluit de connecties van alle threads
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True,
+                                   isolation_level=None, check_same_thread=False, timeout=30)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def write_batch(self, rows: Iterable[Tuple[str, int, Optional[float]]]) -> int:
+        rows = [(code, int(ts_ms), None if value is None else float(value))
+                for code, ts_ms, value in rows]
+        if not rows:
+            return 0
+
+        with self._write_lock:
+            before = self._writer.total_changes
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                self._writer.executemany(SQLITE_UPSERT, rows)
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            changed = self._writer.total_changes - before
+
+        self.stats['rows_written'] += changed
+        self.stats['batches'] += 1
+        return changed
+
+    def range(self, station: str, start_ms: Optional[int] = None,
+              end_ms: Optional[int] = None) -> Tuple[List[int], List[float]]:
+        cursor = self._reader().execute(SQLITE_RANGE, (
+            station,
+            MIN_TS if start_ms is None else int(start_ms),
+            MAX_TS if end_ms is None else int(end_ms)
+        ))
+        rows = cursor.fetchall()
+        return [r[0] for r in rows], [r[1] for r in rows]
+
+    def latest_timestamps(self) -> Dict[str, int]:
+        cursor = self._reader().execute(
+            "SELECT gemaal_code, max(ts) FROM gemaal_metingen GROUP BY gemaal_code")
+        return dict(cursor.fetchall())
+
+    def close(self):
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        self._local = threading.local()
+        self._writer.close()
+
+
+class PostgresHistoryStore(HistoryStore):
+    """Historie in peilbesluiten.gemaal_metingen (zie db/schema_gemaal.sql)"""
+
+    def __init__(self, db_config: Optional[Dict] = None):
+        import psycopg2
+        from gemaal_metingen_db import DB_CONFIG, GemaalMetingenWriter
+
+        self.conn = psycopg2.connect(**(db_config or DB_CONFIG))
+        self.writer = GemaalMetingenWriter(self.conn)
+        self.stats = self.writer.stats
+
+    def write_batch(self, rows: Iterable[Tuple[str, int, Optional[float]]]) -> int:
+        rows = list(rows)
+        if not rows:
+            return 0
+        # Eén batch per cyclus: alles in één COPY + merge transactie
+        return self.writer.write_batch(rows)
+
+    def range(self, station: str, start_ms: Optional[int] = None,
+              end_ms: Optional[int] = None) -> Tuple[List[int], List[float]]:
+        rows = self.writer.read_range(station, start_ms, end_ms)
+        return [r[0] for r in rows], [r[1] for r in rows]
+
+    def latest_timestamps(self) -> Dict[str, int]:
+        return self.writer.latest_timestamps()
+
+    def close(self):
+        self.conn.close()
+
+
+def open_history_store(backend: Optional[str] = None) -> HistoryStore:
+    """
+    Open de geconfigureerde historie backend.
+
+    Args:
+        backend: 'sqlite' of 'postgres' (default: PEILBEHEER_HISTORY_BACKEND, anders sqlite)
+    """
+    backend = (backend or os.getenv('PEILBEHEER_HISTORY_BACKEND', 'sqlite')).lower()
+    if backend == 'sqlite':
+        return SQLiteHistoryStore(Path(os.getenv('PEILBEHEER_HISTORY_DB', DEFAULT_SQLITE_PATH)))
+    if backend in ('postgres', 'postgresql'):
+        return PostgresHistoryStore()
+    raise ValueError(f"Onbekende historie backend: {backend}")
@@ -1,14 +1,11 @@
-import json
 import random
 
+from geojson_stream import feature_attributes, iter_features
+
 geojson_path = '/Users/marc/Projecten/peilbeheer/peilbesluiten/rijnland_kaartlagen/Gemaal/Gemaal_layer0.geojson'
 
 try:
-    with open(geojson_path, 'r') as f:
-        data = json.load(f)
-    
-    features = data.get('features', [])
-    codes = [f['attributes']['CODE'] for f in features if 'attributes' in f and 'CODE' in f['attributes']]
+    codes = [feature_attributes(f)['CODE'] for f in iter_features(geojson_path) if 'CODE' in feature_attributes(f)]
     
     if codes:
         random_codes = random.sample(codes, 5)
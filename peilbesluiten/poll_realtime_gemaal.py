@@ -6,13 +6,15 @@ Dit script kan worden aangepast zodra er toegang is tot een real-time API
 
 import requests
 import time
-import json
 import logging
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict
 import os
 
+from rate_limiter import limiter_for_url
+from segment_store import SegmentStore
+
 # Configuratie
 OUTPUT_DIR = Path("realtime_gemaal_data")
 LOG_DIR = "logs"
@@ -45,6 +47,7 @@ class RealtimeGemaalPoller:
     def __init__(self, output_dir: Path, interval: int = 600):
         self.output_dir = output_dir
         self.output_dir.mkdir(exist_ok=True)
+        self.store = SegmentStore(self.output_dir / "segments")
         self.interval = interval
         self.stats = {
             'polls': 0,
@@ -67,6 +70,7 @@ class RealtimeGemaalPoller:
                 'radius': radius
             }
             
+            limiter_for_url(url).acquire()
             response = requests.get(url, params=params, timeout=30)
             response.raise_for_status()
             return response.json()
@@ -87,19 +91,10 @@ class RealtimeGemaalPoller:
         return None
     
     def save_data(self, data: Dict, source: str, timestamp: datetime):
-        """Sla real-time data op met timestamp"""
-        filename = self.output_dir / f"{source}_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
-        
-        save_data = {
-            'timestamp': timestamp.isoformat(),
-            'source': source,
-            'data': data
-        }
-        
+        """Sla real-time data op met timestamp (append aan het dag segment van de bron)"""
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Data opgeslagen: {filename.name}")
+            self.store.append_record(source, timestamp, data)
+            logger.info(f"Data opgeslagen in segment store: {source}")
             return True
         except Exception as e:
             logger.error(f"Fout bij opslaan data: {e}")
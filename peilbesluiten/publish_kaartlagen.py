@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Kaartlagen publiceren voor de frontend
+======================================
+
+Schrijft van elke laag onder `rijnland_kaartlagen/` een compacte kopie onder
+een bestandsnaam met de content hash, plus voorgecomprimeerde .gz en .br
+versies, en een manifest.json dat per laag naar de actuele versie wijst.
+
+Output (PUBLISH_DIR):
+    manifest.json
+    Gemaal/Gemaal_layer0.3f2a9c1b7d4e.geojson
+    Gemaal/Gemaal_layer0.3f2a9c1b7d4e.geojson.gz
+    Gemaal/Gemaal_layer0.3f2a9c1b7d4e.geojson.br    (alleen met de brotli package)
+
+manifest.json:
+    {
+      "version": 1,
+      "generated": "2026-10-19T06:05:00",
+      "layers": {
+        "Gemaal/Gemaal_layer0": {
+          "file": "Gemaal/Gemaal_layer0.3f2a9c1b7d4e.geojson",
+          "gzip": "....geojson.gz", "brotli": "....geojson.br",
+          "hash": "3f2a9c1b7d4e", "bytes": 81234, "gzip_bytes": 12034, "brotli_bytes": 9876,
+          "feature_count": 377, "published": "..."
+        }
+      }
+    }
+
+Bestanden met een hash in de naam veranderen nooit en mogen onbeperkt gecachet
+worden (Cache-Control: immutable); alleen manifest.json moet steeds opnieuw
+gevalideerd worden (no-cache). Een client haalt het manifest op en downloadt
+alleen lagen waarvan de hash veranderd is.
+
+Compact betekent: JSON zonder witruimte, coördinaten afgerond op
+PROJECTED_DECIMALS (RD New, meters) of GEOGRAPHIC_DECIMALS (graden) en zonder
+volatiele metadata (download datum), zodat een ongewijzigde laag na een nieuwe
+download dezelfde hash houdt.
+
+Ongewijzigde bronbestanden (grootte en mtime) worden niet opnieuw verwerkt. Het
+manifest wordt pas geschreven als alle bestanden klaar staan; bestanden van de
+vorige versie blijven één publicatie bewaard voor clients met een oud manifest.
+
+Gebruik:
+    python publish_kaartlagen.py
+    python publish_kaartlagen.py --source rijnland_kaartlagen --output ../simulatie-peilbeheer/public/kaartlagen
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from geojson_stream import iter_features, read_member
+from rd_new import GEOGRAPHIC_WKIDS
+from response_cache import atomic_write_bytes
+
+try:
+    import brotli
+except ImportError:  # Zonder brotli package alleen .gz kopieën
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIR = "rijnland_kaartlagen"
+PUBLISH_DIR = "../simulatie-peilbeheer/public/kaartlagen"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_LENGTH = 12  # Hex tekens van de SHA-256 in de bestandsnaam
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+PROJECTED_DECIMALS = 3  # Millimeters in RD New / Web Mercator
+GEOGRAPHIC_DECIMALS = 7  # ~1 cm in graden
+VOLATILE_METADATA = ('download_date', 'update_date', 'sync_mode')  # Veranderen zonder dat de data verandert
+WORKERS = 4  # Lagen die tegelijk verwerkt worden (gzip en brotli geven de GIL vrij)
+CHUNK_SIZE = 1 << 20
+
+HASHED_FILE = re.compile(r'\.[0-9a-f]{%d}\.geojson(\.gz|\.br)?$' % HASH_LENGTH)
+
+
+def coordinate_decimals(metadata: Dict) -> Optional[int]:
+    """Afronding voor de coördinaten van een laag (None: niet afronden, onbekend stelsel)"""
+    reference = metadata.get('spatial_reference') or {}
+    wkid = reference.get('latestWkid') or reference.get('wkid')
+    if wkid is None:
+        return None
+    return GEOGRAPHIC_DECIMALS if wkid in GEOGRAPHIC_WKIDS else PROJECTED_DECIMALS
+
+
+def round_geometry(value, decimals: int):
+    """Rond alle coördinaten van een geometrie af (Esri JSON en GeoJSON)"""
+    if isinstance(value, float):
+        value = round(value, decimals)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, list):
+        return [round_geometry(v, decimals) for v in value]
+    if isinstance(value, dict):
+        return {k: v if k == 'spatialReference' else round_geometry(v, decimals) for k, v in value.items()}
+    return value
+
+
+def minify_layer(source: Path, target) -> Dict:
+    """
+    Schrijf een compacte FeatureCollection naar een open (binair) bestand.
+
+    Returns:
+        Dict met 'sha256', 'bytes' en 'feature_count'
+    """
+    metadata = read_member(source, 'metadata', {}) or {}
+    decimals = coordinate_decimals(metadata)
+    digest = hashlib.sha256()
+    stats = {'bytes': 0, 'feature_count': 0}
+
+    def write(text: str):
+        data = text.encode('utf-8')
+        digest.update(data)
+        target.write(data)
+        stats['bytes'] += len(data)
+
+    write('{"type":"FeatureCollection","features":[')
+    for feature in iter_features(source):
+        if decimals is not None and feature.get('geometry'):
+            feature['geometry'] = round_geometry(feature['geometry'], decimals)
+        write((',' if stats['feature_count'] else '') + json.dumps(feature, ensure_ascii=False, separators=(',', ':')))
+        stats['feature_count'] += 1
+    metadata = {k: v for k, v in metadata.items() if k not in VOLATILE_METADATA}
+    write('],"metadata":' + json.dumps(metadata, ensure_ascii=False, separators=(',', ':')) + '}')
+    return {'sha256': digest.hexdigest(), **stats}
+
+
+def _compress(source: Path, target: Path, kind: str) -> int:
+    """Comprimeer een bestand atomisch naar target (gzip of brotli); levert de grootte"""
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix='.tmp_', suffix=target.suffix)
+    try:
+        with os.fdopen(fd, 'wb') as out, open(source, 'rb') as f:
+            if kind == 'gzip':
+                with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as compressed:
+                    while chunk := f.read(CHUNK_SIZE):
+                        compressed.write(chunk)
+            else:
+                compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+                while chunk := f.read(CHUNK_SIZE):
+                    out.write(compressor.process(chunk))
+                out.write(compressor.finish())
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_name, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return target.stat().st_size
+
+
+def _entry_files(entry: Dict) -> Set[str]:
+    return {entry[k] for k in ('file', 'gzip', 'brotli') if entry.get(k)}
+
+
+def _is_current(entry: Optional[Dict], source: Path, output_dir: Path) -> bool:
+    """True als de bron sinds de vorige publicatie niet veranderd is en alle bestanden er nog zijn"""
+    if not entry:
+        return False
+    stat = source.stat()
+    if entry.get('source_bytes') != stat.st_size or entry.get('source_mtime_ns') != stat.st_mtime_ns:
+        return False
+    if brotli is not None and not entry.get('brotli'):
+        return False
+    return all((output_dir / name).exists() for name in _entry_files(entry))
+
+
+def publish_layer(source: Path, name: str, output_dir: Path, previous: Optional[Dict] = None) -> Dict:
+    """
+    Publiceer één laag: compacte kopie onder de content hash plus .gz en .br.
+
+    Args:
+        source: Laagbestand van de downloader
+        name: Naam in het manifest (relatief pad zonder .geojson)
+        output_dir: Publicatie directory
+        previous: Manifest entry van de vorige publicatie
+
+    Returns:
+        Manifest entry
+    """
+    if _is_current(previous, source, output_dir):
+        return previous
+    stat = source.stat()
+    target_dir = (output_dir / name).parent
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_name = tempfile.mkstemp(dir=target_dir, prefix='.tmp_', suffix='.geojson')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            minified = minify_layer(source, f)
+        content_hash = minified['sha256'][:HASH_LENGTH]
+        path = target_dir / f"{Path(name).name}.{content_hash}.geojson"
+        if path.exists():
+            os.unlink(tmp_name)  # Zelfde inhoud al gepubliceerd
+        else:
+            os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    entry = {
+        'file': path.relative_to(output_dir).as_posix(),
+        'hash': content_hash,
+        'bytes': minified['bytes'],
+        'feature_count': minified['feature_count'],
+        'source_bytes': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'published': (previous['published'] if previous and previous.get('hash') == content_hash
+                      else datetime.now().isoformat())
+    }
+    variants = [('gzip', '.gz')] + ([('brotli', '.br')] if brotli is not None else [])
+    for kind, suffix in variants:
+        compressed = path.with_name(path.name + suffix)
+        size = compressed.stat().st_size if compressed.exists() else _compress(path, compressed, kind)
+        entry[kind] = compressed.relative_to(output_dir).as_posix()
+        entry[f"{kind}_bytes"] = size
+    return entry
+
+
+def load_manifest(output_dir: Path) -> Dict:
+    path = Path(output_dir) / MANIFEST_FILE
+    if path.exists():
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifest onleesbaar, alles opnieuw publiceren: {e}")
+    return {'version': MANIFEST_VERSION, 'layers': {}}
+
+
+def publish(source_dir: Path = Path(SOURCE_DIR), output_dir: Path = Path(PUBLISH_DIR),
+            workers: int = WORKERS) -> Dict:
+    """
+    Publiceer alle lagen en schrijf het manifest.
+
+    Returns:
+        Statistieken: layers, published, unchanged, failed, removed_files, seconds
+    """
+    start = time.time()
+    source_dir, output_dir = Path(source_dir), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(output_dir)
+    old_layers = previous.get('layers', {})
+
+    sources = {p.relative_to(source_dir).with_suffix('').as_posix(): p
+               for p in sorted(source_dir.rglob('*.geojson')) if not p.name.startswith('.')}
+
+    def run(name):
+        try:
+            return name, publish_layer(sources[name], name, output_dir, old_layers.get(name)), None
+        except Exception as e:
+            return name, None, e
+
+    layers, failed = {}, 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for name, entry, error in executor.map(run, sources):
+            if error is not None:
+                failed += 1
+                logger.error(f"Publiceren van {name} mislukt: {error}")
+                entry = old_layers.get(name)  # Vorige versie blijft staan
+            if entry:
+                layers[name] = entry
+
+    manifest = {'version': MANIFEST_VERSION, 'generated': datetime.now().isoformat(), 'layers': layers}
+    atomic_write_bytes(output_dir / MANIFEST_FILE,
+                       json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    # Alleen de huidige en de vorige publicatie bewaren
+    keep = set()
+    for entry in list(layers.values()) + list(old_layers.values()):
+        keep |= _entry_files(entry)
+    removed = 0
+    for path in output_dir.rglob('*'):
+        if path.is_file() and HASHED_FILE.search(path.name) and path.relative_to(output_dir).as_posix() not in keep:
+            path.unlink()
+            removed += 1
+
+    published = sum(1 for name, entry in layers.items() if entry['hash'] != old_layers.get(name, {}).get('hash'))
+    return {
+        'layers': len(layers),
+        'published': published,
+        'unchanged': len(layers) - published,
+        'failed': failed,
+        'removed_files': removed,
+        'seconds': time.time() - start
+    }
+
+
+def main():
+    """CLI voor het publiceren van de kaartlagen"""
+    parser = argparse.ArgumentParser(description='Publiceer kaartlagen met content hash en voorgecomprimeerde kopieën')
+    parser.add_argument('--source', default=SOURCE_DIR, help=f'Directory met de laagbestanden (default: {SOURCE_DIR})')
+    parser.add_argument('--output', default=PUBLISH_DIR, help=f'Publicatie directory (default: {PUBLISH_DIR})')
+    parser.add_argument('--workers', type=int, default=WORKERS, help=f'Lagen tegelijk (default: {WORKERS})')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if brotli is None:
+        logger.warning("brotli package niet geïnstalleerd: alleen .gz kopieën (pip install brotli)")
+    stats = publish(Path(args.source), Path(args.output), args.workers)
+    print(f"{stats['layers']} lagen: {stats['published']} nieuw gepubliceerd, {stats['unchanged']} ongewijzigd, "
+          f"{stats['failed']} mislukt, {stats['removed_files']} oude bestanden verwijderd "
+          f"({stats['seconds']:.1f}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Token-bucket rate limiter per upstream host, gedeeld tussen processen
+=====================================================================
+
+Vervangt de vaste time.sleep() pauzes tussen requests. Elke host krijgt een
+token bucket (rate = tokens per seconde, capacity = maximale burst). De toestand
+van de bucket staat in een klein bestand dat met een file lock wordt beschermd,
+zodat bijvoorbeeld de auto-refresh daemon en een skill die tegelijk draaien
+samen onder de limiet blijven.
+
+Gebruik:
+    from rate_limiter import limiter_for_url
+
+    limiter_for_url(url).acquire()
+    response = requests.get(url, ...)
+
+Er wordt alleen gewacht als de bucket leeg is: een request dat zelf al
+seconden duurde laat de bucket in de tussentijd weer vollopen.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows: alleen coördinatie binnen het proces
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Limieten per host: (tokens per seconde, maximale burst)
+HOST_LIMITS: Dict[str, Tuple[float, int]] = {
+    'watercontrolroom.hydronet.com': (5.0, 5),
+    'rijnland.enl-mcs.nl': (2.0, 4),
+}
+DEFAULT_LIMIT = (2.0, 2)
+
+STATE_DIR = Path(os.getenv('PEILBEHEER_RATELIMIT_DIR',
+                           Path(tempfile.gettempdir()) / 'peilbeheer_ratelimit'))
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket waarvan de toestand in een bestand met file lock staat.
+
+    Meerdere processen (en threads) die dezelfde naam en state directory gebruiken
+    delen één bucket.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: int, state_dir: Path = STATE_DIR):
+        """
+        Initialiseer de limiter.
+
+        Args:
+            name: Naam van de bucket (meestal de hostnaam)
+            rate: Aantal tokens dat per seconde wordt bijgevuld
+            capacity: Maximaal aantal tokens (burst grootte)
+            state_dir: Directory waarin de toestand wordt gedeeld
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate moet > 0 zijn en capacity >= 1")
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.state_file = self.state_dir / f"{name.replace(':', '_')}.bucket"
+        self._thread_lock = threading.Lock()
+        self.stats = {
+            'acquired': 0,
+            'waited': 0,
+            'wait_seconds': 0.0
+        }
+
+    def _try_take(self, tokens: float) -> float:
+        """
+        Probeer tokens te nemen onder de lock.
+
+        Returns:
+            0.0 als het gelukt is, anders het aantal seconden tot er genoeg tokens zijn
+        """
+        with self._thread_lock, open(self.state_file, 'a+', encoding='utf-8') as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                now = time.time()
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    state = {}
+
+                available = float(state.get('tokens', self.capacity))
+                updated = float(state.get('updated', now))
+                # Klok kan terugspringen; nooit negatieve bijvulling
+                available = min(self.capacity, available + max(0.0, now - updated) * self.rate)
+
+                if available >= tokens:
+                    available -= tokens
+                    wait = 0.0
+                else:
+                    wait = (tokens - available) / self.rate
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({'tokens': available, 'updated': now}))
+                f.flush()
+                return wait
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Blokkeer tot er `tokens` beschikbaar zijn en neem ze.
+
+        Returns:
+            Totale wachttijd in seconden
+        """
+        waited = 0.0
+        while True:
+            wait = self._try_take(tokens)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+
+        self.stats['acquired'] += 1
+        if waited > 0:
+            self.stats['waited'] += 1
+            self.stats['wait_seconds'] += waited
+        return waited
+
+
+_limiters: Dict[str, TokenBucketLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for_host(host: str, state_dir: Optional[Path] = None) -> TokenBucketLimiter:
+    """Haal de (gedeelde) limiter op voor een hostnaam"""
+    state_dir = Path(state_dir) if state_dir else STATE_DIR
+    cache_key = f"{state_dir}|{host}"
+    with _limiters_lock:
+        limiter = _limiters.get(cache_key)
+        if limiter is None:
+            rate, capacity = HOST_LIMITS.get(host, DEFAULT_LIMIT)
+            limiter = TokenBucketLimiter(host, rate, capacity, state_dir=state_dir)
+            _limiters[cache_key] = limiter
+        return limiter
+
+
+def limiter_for_url(url: str, state_dir: Optional[Path] = None) -> TokenBucketLimiter:
+    """Haal de limiter op voor de host van een URL"""
+    host = urlparse(url).hostname or 'default'
+    return limiter_for_host(host, state_dir=state_dir)
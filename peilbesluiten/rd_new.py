@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+RD New (EPSG:28992) <-> WGS84
+=============================
+
+Benaderingsformules (polynomen rond Amersfoort) voor het omrekenen tussen
+Rijksdriehoekscoördinaten en lengte/breedtegraad, dezelfde als in de
+kaartviewer. Binnen Nederland nauwkeurig tot op ongeveer een meter; genoeg
+voor kaarttegels, extents en afstanden tussen objecten, niet voor landmeten.
+
+De downloads zijn GeoJSON in WGS84 (outSR=4326); de metadata van de services
+(extents, tolerances) is in RD New.
+"""
+
+from typing import Tuple
+
+GEOGRAPHIC_WKIDS = (4326, 4258)
+
+
+def rd_to_wgs84(x: float, y: float) -> Tuple[float, float]:
+    """RD New (EPSG:28992) naar (lon, lat); dezelfde benadering als de kaartviewer"""
+    dx = (x - 155000) * 0.00001
+    dy = (y - 463000) * 0.00001
+    sum_n = (3235.65389 * dy - 32.58297 * dx ** 2 - 0.2475 * dy ** 2 - 0.84978 * dx ** 2 * dy
+             - 0.0655 * dy ** 3 - 0.01709 * dx ** 2 * dy ** 2 - 0.00738 * dx + 0.0053 * dx ** 3
+             - 0.00039 * dx ** 2 * dy ** 3 + 0.00033 * dx ** 4 - 0.00012 * dx * dy)
+    sum_e = (5260.52916 * dx + 105.94684 * dx * dy + 2.45656 * dx * dy ** 2 - 0.81885 * dx ** 3
+             + 0.05594 * dx * dy ** 3 - 0.05607 * dx ** 3 * dy + 0.01199 * dy - 0.00256 * dx ** 3 * dy ** 2
+             + 0.00128 * dx * dy ** 4 + 0.00022 * dy ** 2 - 0.00022 * dx ** 2 + 0.00026 * dx ** 5)
+    return 5.38720621 + sum_e / 3600, 52.15517440 + sum_n / 3600
+
+
+def wgs84_to_rd(lon: float, lat: float) -> Tuple[float, float]:
+    """(lon, lat) naar RD New (EPSG:28992); inverse van rd_to_wgs84"""
+    df = 0.36 * (lat - 52.15517440)
+    dl = 0.36 * (lon - 5.38720621)
+    x = (155000 + 190094.945 * dl - 11832.228 * df * dl - 114.221 * df ** 2 * dl - 32.391 * dl ** 3
+         - 0.705 * df - 2.340 * df ** 3 * dl - 0.608 * df * dl ** 3 - 0.008 * dl ** 2
+         + 0.148 * df ** 2 * dl ** 3)
+    y = (463000 + 309056.544 * df + 3638.893 * dl ** 2 + 73.077 * df ** 2 - 157.984 * df * dl ** 2
+         + 59.788 * df ** 3 + 0.433 * dl - 6.439 * df ** 2 * dl ** 2 - 0.032 * df * dl
+         + 0.092 * dl ** 4 - 0.054 * df * dl ** 4)
+    return x, y
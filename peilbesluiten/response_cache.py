@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Gedeelde on-disk HTTP response cache
+====================================
+
+Cache voor API responses die door alle gebruikers van de
+HydronetGemaalDataFetcher (generate_gemaal_status, skills, CLI) wordt gedeeld.
+
+Opbouw van de cache directory:
+    entries/<sleutel>.json   - metadata per sleutel (ETag, Last-Modified, tijden, body hash)
+    blobs/<sha256>           - response body, content-addressed (identieke bodies delen één blob)
+
+Eigenschappen:
+- Versheid volgt de publicatiecadans van Hydronet (nieuwe punten op :19 en :49),
+  met een maximale TTL van 30 minuten
+- Conditionele revalidatie met ETag / Last-Modified (304 Not Modified)
+- Atomische writes (tempfile + os.replace) zodat meerdere processen de cache delen
+- Eviction op totale grootte (oudste gebruik eerst). put() schrijft (of
+  touched) eerst de blob en dan de entry, zonder lock tussen processen; een
+  blob zonder entry is daarom pas wees na ORPHAN_GRACE_SECONDS, en een blob
+  die sinds het begin van een eviction ronde is aangeraakt blijft staan
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 30 * 60  # Hydronet publiceert elke 30 minuten
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+PUBLISH_MINUTES = (19, 49)  # Nieuwe datapunten verschijnen op :19 en :49
+PUBLISH_GRACE_SECONDS = 60  # Marge omdat de bron niet exact op de minuut publiceert
+ORPHAN_GRACE_SECONDS = 60  # Blobs zonder entry pas opruimen als ze minstens zo oud zijn
+
+
+def next_publish_time(moment: datetime, publish_minutes=PUBLISH_MINUTES,
+                      grace_seconds: int = PUBLISH_GRACE_SECONDS) -> datetime:
+    """
+    Bepaal het eerstvolgende publicatiemoment van de bron na `moment`.
+
+    Args:
+        moment: Referentietijdstip (bijv. moment van ophalen)
+        publish_minutes: Minuten binnen het uur waarop nieuwe data verschijnt
+        grace_seconds: Extra marge na het publicatiemoment
+
+    Returns:
+        Datetime van de eerstvolgende publicatie (inclusief marge)
+    """
+    hour_start = moment.replace(minute=0, second=0, microsecond=0)
+    for hour_offset in (0, 1):
+        for minute in sorted(publish_minutes):
+            candidate = hour_start + timedelta(hours=hour_offset, minutes=minute,
+                                               seconds=grace_seconds)
+            if candidate > moment:
+                return candidate
+    return moment + timedelta(hours=1)
+
+
+def atomic_write_bytes(path: Path, payload: bytes):
+    """Schrijf bytes atomisch: eerst naar een tijdelijk bestand, dan os.replace"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix='.tmp_', suffix=path.suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+class ResponseCache:
+    """
+    Content-addressed response cache met TTL, revalidatie en size-based eviction.
+
+    Sleutels zijn vrije strings (bijv. de gemaal code); de body wordt opgeslagen
+    onder de SHA-256 van de inhoud zodat identieke responses niet dubbel op schijf staan.
+    """
+
+    def __init__(self, cache_dir: Path, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, follow_publish_schedule: bool = True):
+        """
+        Initialiseer de response cache.
+
+        Args:
+            cache_dir: Directory van de cache (wordt aangemaakt indien nodig)
+            ttl_seconds: Maximale leeftijd van een entry voordat revalidatie nodig is
+            max_bytes: Maximale totale grootte van de blobs in bytes
+            follow_publish_schedule: Laat entries verlopen op het eerstvolgende
+                publicatiemoment van de bron (:19/:49) als dat eerder is dan de TTL
+        """
+        self.cache_dir = Path(cache_dir)
+        self.entries_dir = self.cache_dir / 'entries'
+        self.blobs_dir = self.cache_dir / 'blobs'
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.follow_publish_schedule = follow_publish_schedule
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'stores': 0,
+            'evicted': 0
+        }
+
+    def _entry_path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return self.entries_dir / f"{digest}.json"
+
+    def _blob_path(self, body_hash: str) -> Path:
+        return self.blobs_dir / body_hash
+
+    def _expires_at(self, fetched_at: float) -> float:
+        expires = fetched_at + self.ttl_seconds
+        if self.follow_publish_schedule:
+            publish = next_publish_time(datetime.fromtimestamp(fetched_at)).timestamp()
+            expires = min(expires, publish)
+        return expires
+
+    def get_entry(self, key: str) -> Optional[Dict]:
+        """
+        Haal de metadata van een entry op (ook als deze verlopen is).
+
+        Returns:
+            Dict met metadata en 'body' (bytes), of None als de entry ontbreekt
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(self._blob_path(entry['body_sha256']), 'rb') as f:
+                entry['body'] = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+        entry['fresh'] = time.time() < entry.get('expires_at', 0)
+        return entry
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Haal een verse body op uit de cache.
+
+        Returns:
+            Body als bytes, of None bij een miss of verlopen entry
+        """
+        entry = self.get_entry(key)
+        if entry and entry['fresh']:
+            self.stats['hits'] += 1
+            self._touch(key)
+            return entry['body']
+        self.stats['misses'] += 1
+        return None
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        """Bouw If-None-Match / If-Modified-Since headers voor een (verlopen) entry"""
+        headers = {}
+        if not entry:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, key: str, body: bytes, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, url: Optional[str] = None):
+        """
+        Sla een response op in de cache.
+
+        Args:
+            key: Cache sleutel (bijv. gemaal code)
+            body: Response body
+            etag: ETag header van de response
+            last_modified: Last-Modified header van de response
+            url: Optioneel, de opgevraagde URL (alleen informatief)
+        """
+        body_hash = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(body_hash)
+        try:
+            # Gedeelde blob: mtime bijwerken zodat een lopende evict() hem laat staan
+            os.utime(blob_path)
+        except OSError:
+            atomic_write_bytes(blob_path, body)
+
+        now = time.time()
+        entry = {
+            'key': key,
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'body_sha256': body_hash,
+            'size': len(body),
+            'fetched_at': now,
+            'expires_at': self._expires_at(now)
+        }
+        atomic_write_bytes(self._entry_path(key),
+                           json.dumps(entry, separators=(',', ':')).encode('utf-8'))
+        self.stats['stores'] += 1
+        self.evict()
+
+    def mark_revalidated(self, key: str, etag: Optional[str] = None,
+                         last_modified: Optional[str] = None) -> Optional[bytes]:
+        """
+        Verwerk een 304 Not Modified: verleng de entry en geef de bestaande body terug.
+
+        Returns:
+            De gecachte body, of None als de entry intussen verdwenen is
+        """
+        entry = self.get_entry(key)
+        if not entry:
+            return None
+
+        body = entry.pop('body')
+        entry.pop('fresh', None)
+        now = time.time()
+        entry['fetched_at'] = now
+        entry['expires_at'] = self._expires_at(now)
+        if etag:
+            entry['etag'] = etag
+        if last_modified:
+            entry['last_modified'] = last_modified
+        atomic_write_bytes(self._entry_path(key),
+                           json.dumps(entry, separators=(',', ':')).encode('utf-8'))
+        self.stats['revalidated'] += 1
+        return body
+
+    def _touch(self, key: str):
+        """Werk de access time bij zodat eviction recent gebruikte entries spaart"""
+        try:
+            os.utime(self._entry_path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Verwijder minst recent gebruikte entries tot de cache onder max_bytes zit"""
+        started = time.time()
+        blob_sizes = {}
+        blob_mtimes = {}
+        with os.scandir(self.blobs_dir) as it:
+            for blob in it:
+                if blob.name.startswith('.tmp_'):
+                    continue
+                try:
+                    stat = blob.stat()
+                except OSError:
+                    continue
+                blob_sizes[blob.name] = stat.st_size
+                blob_mtimes[blob.name] = stat.st_mtime
+
+        total = sum(blob_sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        entries = []
+        referenced = {}
+        for entry_path in self.entries_dir.glob('*.json'):
+            try:
+                with open(entry_path, 'r', encoding='utf-8') as f:
+                    body_hash = json.load(f)['body_sha256']
+                mtime = entry_path.stat().st_mtime
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            entries.append((mtime, entry_path, body_hash))
+            referenced[body_hash] = referenced.get(body_hash, 0) + 1
+
+        # Blobs zonder entry zijn wees (bijv. na een overschreven entry), tenzij een
+        # put() in een ander proces de blob net heeft geschreven en de entry nog volgt
+        for body_hash in list(blob_sizes):
+            if body_hash not in referenced and blob_mtimes[body_hash] < started - ORPHAN_GRACE_SECONDS:
+                self._unlink(self._blob_path(body_hash))
+                total -= blob_sizes.pop(body_hash)
+
+        for _, entry_path, body_hash in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._unlink(entry_path)
+            self.stats['evicted'] += 1
+            referenced[body_hash] -= 1
+            if (referenced[body_hash] == 0 and body_hash in blob_sizes
+                    and not self._touched_since(body_hash, started)):
+                self._unlink(self._blob_path(body_hash))
+                total -= blob_sizes.pop(body_hash)
+
+    def _touched_since(self, body_hash: str, moment: float) -> bool:
+        """True als een put() de blob na `moment` heeft geschreven of aangeraakt"""
+        try:
+            return self._blob_path(body_hash).stat().st_mtime >= moment
+        except OSError:
+            return False
+
+    @staticmethod
+    def _unlink(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Append-only segment store voor gemaal tijdreeksen
+=================================================
+
+Vervangt het wegschrijven van één JSON bestand per station per poll.
+Elk station krijgt per (UTC) dag één segment bestand waarin alleen nieuwe
+punten worden toegevoegd, plus een kleine index met de tijdsbereiken per segment.
+
+Opbouw:
+    <root>/<station>/<YYYY-MM-DD>.ndjson   - regels "[timestamp_ms,value]" (encoding 'ndjson')
+    <root>/<station>/<YYYY-MM-DD>.gts      - Gorilla gecomprimeerd blok (encoding 'gorilla',
+                                             zie timeseries_codec.py)
+    <root>/<station>/index.json            - tijdsbereik, aantal punten en bytes per segment
+    <root>/_records/<stream>/              - records (append_record) in dezelfde opbouw; buiten
+                                             de stations zodat stations() en read_points ze niet zien
+    <root>/_latest/<station>.json          - de punten van het laatste LATEST_WINDOW_MS per station,
+                                             na elke append bijgewerkt (gelezen door de frontend)
+
+NDJSON writes zijn sequentiële appends. Een Gorilla segment bevat één blok per
+dag: bij een append wordt de dag opnieuw gecodeerd en atomair vervangen, want
+een los frame per poll (eigen header, eerste waarde ongecomprimeerd) is bij één
+of enkele nieuwe punten groter dan NDJSON. De historie van een station lezen is
+één scan over de segmenten die het gevraagde bereik overlappen.
+"""
+
+import io
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from response_cache import atomic_write_bytes
+from timeseries_codec import encode, iter_decode_frames, iter_frames, write_frame
+
+try:
+    import fcntl
+except ImportError:  # Windows: alleen coördinatie binnen het proces
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+LOCK_FILE = '.lock'
+RECORDS_DIR = '_records'
+LATEST_DIR = '_latest'
+LATEST_WINDOW_MS = 3 * 60 * 60 * 1000  # De frontend toont de laatste 3 uur
+ENCODINGS = {
+    'ndjson': '.ndjson',
+    'gorilla': '.gts',
+}
+
+
+def segment_day(timestamp_ms: int) -> str:
+    """Bepaal de (UTC) dag partitie van een timestamp in milliseconden"""
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def safe_key(key: str) -> str:
+    """Maak een veilige directory naam van een station of bron"""
+    invalid_chars = '<>:"/\\|?* '
+    for char in invalid_chars:
+        key = key.replace(char, '_')
+    return key.strip(' .') or '_'
+
+
+def series_key(station: str, series_index: int = 0) -> str:
+    """Sleutel voor een series van een station; de eerste series gebruikt de stationscode"""
+    return station if series_index == 0 else f"{station}__series{series_index}"
+
+
+class SegmentStore:
+    """
+    Append-only, per dag gepartitioneerde opslag van tijdreekspunten per station.
+    """
+
+    def __init__(self, root: Path, encoding: str = 'ndjson',
+                 latest_window_ms: Optional[int] = LATEST_WINDOW_MS):
+        """
+        Initialiseer de segment store.
+
+        Args:
+            root: Directory waarin per station een subdirectory wordt aangemaakt
+            encoding: Encoding voor nieuwe tijdreekssegmenten ('ndjson' of 'gorilla').
+                Bestaande segmenten worden altijd gelezen, ongeacht hun encoding.
+            latest_window_ms: Venster van de _latest snapshot per station (None: geen snapshots)
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Onbekende encoding: {encoding}")
+        self.encoding = encoding
+        self.latest_window_ms = latest_window_ms
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._thread_lock = threading.Lock()
+
+    def _station_dir(self, station: str) -> Path:
+        return self.root / safe_key(station)
+
+    def _stream_dir(self, stream: str) -> Path:
+        return self.root / RECORDS_DIR / safe_key(stream)
+
+    def latest_path(self, station: str) -> Path:
+        """Pad van de snapshot met de laatste punten van een station"""
+        return self.root / LATEST_DIR / f"{safe_key(station)}.json"
+
+    @contextmanager
+    def _locked(self, station_dir: Path):
+        """Exclusieve lock per station (tussen threads én processen)"""
+        station_dir.mkdir(parents=True, exist_ok=True)
+        with self._thread_lock, open(station_dir / LOCK_FILE, 'a') as lock:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def load_index(self, station: str) -> Dict:
+        """
+        Laad de index van een station.
+
+        Returns:
+            Dict met 'segments' (bestandsnaam -> bereik) en 'last_ts'
+        """
+        return self._load_index(self._station_dir(station))
+
+    @staticmethod
+    def _load_index(directory: Path) -> Dict:
+        index_path = directory / INDEX_FILE
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {'segments': {}, 'last_ts': None}
+
+        # Oudere indexen gebruikten de dag als sleutel voor een .ndjson segment
+        index['segments'] = {
+            (name if '.' in name else f"{name}.ndjson"): segment
+            for name, segment in index.get('segments', {}).items()
+        }
+        return index
+
+    def _write_index(self, station_dir: Path, index: Dict):
+        atomic_write_bytes(station_dir / INDEX_FILE,
+                           json.dumps(index, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+
+    @staticmethod
+    def _append_lines(segment_path: Path, day_rows: List[Tuple[int, str]]) -> int:
+        """Append regels aan een NDJSON segment; geeft de nieuwe bestandsgrootte"""
+        with open(segment_path, 'ab') as f:
+            f.write(''.join(line + '\n' for _, line in day_rows).encode('utf-8'))
+            return f.tell()
+
+    @staticmethod
+    def _rewrite_gorilla(segment_path: Path, day_rows: List[Tuple[int, float]]) -> int:
+        """Codeer de bestaande en nieuwe punten van een dag als één blok; geeft de bestandsgrootte"""
+        points = []
+        if segment_path.exists():
+            with open(segment_path, 'rb') as f:
+                points = list(iter_decode_frames(f))
+        points.extend(day_rows)
+        points.sort(key=lambda p: p[0])
+        buffer = io.BytesIO()
+        write_frame(buffer, encode(points))
+        atomic_write_bytes(segment_path, buffer.getvalue())
+        return buffer.tell()
+
+    def _append_rows(self, station_dir: Path, rows: List[Tuple[int, object]], only_new: bool,
+                     extension: str, write_segment, on_append=None) -> int:
+        """
+        Voeg (timestamp_ms, item) paren toe aan de dag segmenten in een directory.
+
+        Args:
+            station_dir: Directory van het station of de record stream
+            rows: Lijst van (timestamp_ms, item); item is een regel of een waarde
+            only_new: Sla rijen over die niet nieuwer zijn dan het laatst opgeslagen punt
+            extension: Bestandsextensie van het segment (bepaalt de encoding)
+            write_segment: Functie (segment pad, rijen van één dag) -> nieuwe bestandsgrootte
+            on_append: Optionele functie die na het schrijven van de index (nog onder de lock)
+                wordt aangeroepen als er rijen zijn toegevoegd
+
+        Returns:
+            Aantal toegevoegde rijen
+        """
+        with self._locked(station_dir):
+            index = self._load_index(station_dir)
+            last_ts = index.get('last_ts')
+
+            rows = sorted(rows, key=lambda r: r[0])
+            if only_new and last_ts is not None:
+                rows = [r for r in rows if r[0] > last_ts]
+            if not rows:
+                return 0
+
+            by_day: Dict[str, List[Tuple[int, object]]] = {}
+            for ts, item in rows:
+                by_day.setdefault(segment_day(ts), []).append((ts, item))
+
+            for day, day_rows in by_day.items():
+                segment_name = f"{day}{extension}"
+                size = write_segment(station_dir / segment_name, day_rows)
+
+                segment = index['segments'].get(segment_name)
+                if segment is None:
+                    segment = {'start': day_rows[0][0], 'end': day_rows[-1][0], 'count': 0, 'bytes': 0}
+                    index['segments'][segment_name] = segment
+                segment['start'] = min(segment['start'], day_rows[0][0])
+                segment['end'] = max(segment['end'], day_rows[-1][0])
+                segment['count'] += len(day_rows)
+                segment['bytes'] = size
+
+            index['last_ts'] = max(rows[-1][0], last_ts or rows[-1][0])
+            self._write_index(station_dir, index)
+            if on_append:
+                on_append()
+            return len(rows)
+
+    def _write_latest(self, station: str):
+        """Schrijf de punten van het laatste latest_window_ms van een station naar _latest"""
+        last_ts = self.load_index(station).get('last_ts')
+        if last_ts is None:
+            return
+        snapshot = {
+            'station': station,
+            'updated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'last_ts': last_ts,
+            'window_ms': self.latest_window_ms,
+            'points': [[ts, value] for ts, value in self.read_points(station, last_ts - self.latest_window_ms)],
+        }
+        atomic_write_bytes(self.latest_path(station),
+                           json.dumps(snapshot, separators=(',', ':')).encode('utf-8'))
+
+    def read_latest(self, station: str) -> Optional[Dict]:
+        """Lees de _latest snapshot van een station (None als die er niet is)"""
+        try:
+            with open(self.latest_path(station), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def append_points(self, station: str, points: Iterable[Tuple[int, float]]) -> int:
+        """
+        Voeg tijdreekspunten toe; punten die niet nieuwer zijn dan het laatste
+        opgeslagen punt worden overgeslagen (overlappende API responses).
+
+        Args:
+            station: Gemaal code
+            points: Iterable van (timestamp_ms, value)
+
+        Returns:
+            Aantal nieuw opgeslagen punten
+        """
+        on_append = (lambda: self._write_latest(station)) if self.latest_window_ms else None
+        if self.encoding == 'gorilla':
+            rows = [(int(ts), float(value)) for ts, value in points]
+            return self._append_rows(self._station_dir(station), rows, True, ENCODINGS['gorilla'],
+                                     self._rewrite_gorilla, on_append)
+
+        rows = [(int(ts), json.dumps([int(ts), value], separators=(',', ':')))
+                for ts, value in points]
+        return self._append_rows(self._station_dir(station), rows, True, ENCODINGS['ndjson'],
+                                 self._append_lines, on_append)
+
+    def append_series(self, station: str, series_data: List[Dict]) -> int:
+        """
+        Voeg punten toe uit een Hydronet series (dicts met 'timestamp_ms' en 'value').
+
+        Returns:
+            Aantal nieuw opgeslagen punten
+        """
+        return self.append_points(station, (
+            (point['timestamp_ms'], point.get('value', 0))
+            for point in series_data
+            if point.get('timestamp_ms')
+        ))
+
+    def append_record(self, stream: str, timestamp: datetime, record: Dict) -> int:
+        """
+        Voeg een willekeurig JSON record toe (bijv. een poll response zonder tijdreeks).
+
+        Records staan onder <root>/_records/, los van de tijdreeksen van de stations.
+
+        Args:
+            stream: Naam van de bron (bijv. 'rijkswaterstaat')
+            timestamp: Tijdstip van het record
+            record: JSON-serialiseerbare data
+
+        Returns:
+            Aantal toegevoegde records (1)
+        """
+        ts = int(timestamp.timestamp() * 1000)
+        line = json.dumps({'ts': ts, 'data': record}, separators=(',', ':'), ensure_ascii=False)
+        return self._append_rows(self._stream_dir(stream), [(ts, line)], False, ENCODINGS['ndjson'],
+                                 self._append_lines)
+
+    def _segments_in_range(self, station_dir: Path, start_ms: Optional[int],
+                           end_ms: Optional[int]) -> List[Path]:
+        index = self._load_index(station_dir)
+        segments = []
+        for name, segment in sorted(index.get('segments', {}).items(),
+                                    key=lambda item: (item[1]['start'], item[0])):
+            if start_ms is not None and segment['end'] < start_ms:
+                continue
+            if end_ms is not None and segment['start'] > end_ms:
+                continue
+            segments.append(station_dir / name)
+        return segments
+
+    @staticmethod
+    def _iter_segment_points(segment_path: Path) -> Iterator[Tuple[int, float]]:
+        if segment_path.suffix == ENCODINGS['gorilla']:
+            with open(segment_path, 'rb') as f:
+                yield from iter_decode_frames(f)
+            return
+        with open(segment_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                ts, value = json.loads(line)
+                yield ts, value
+
+    def read_points(self, station: str, start_ms: Optional[int] = None,
+                    end_ms: Optional[int] = None) -> Iterator[Tuple[int, float]]:
+        """
+        Lees de punten van een station in tijdsvolgorde.
+
+        Args:
+            station: Gemaal code
+            start_ms: Optionele ondergrens (inclusief)
+            end_ms: Optionele bovengrens (inclusief)
+
+        Yields:
+            (timestamp_ms, value) tuples
+        """
+        for segment_path in self._segments_in_range(self._station_dir(station), start_ms, end_ms):
+            if not segment_path.exists():
+                continue
+            for ts, value in self._iter_segment_points(segment_path):
+                if start_ms is not None and ts < start_ms:
+                    continue
+                if end_ms is not None and ts > end_ms:
+                    continue
+                yield ts, value
+
+    def read_records(self, stream: str, start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None) -> Iterator[Dict]:
+        """Lees records die met append_record zijn opgeslagen"""
+        for segment_path in self._segments_in_range(self._stream_dir(stream), start_ms, end_ms):
+            with open(segment_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if start_ms is not None and record['ts'] < start_ms:
+                        continue
+                    if end_ms is not None and record['ts'] > end_ms:
+                        continue
+                    yield record
+
+    def compact(self, station: str) -> int:
+        """
+        Herschrijf Gorilla segmenten met meerdere frames (uit eerdere versies) als één blok.
+
+        Returns:
+            Aantal bespaarde bytes
+        """
+        station_dir = self._station_dir(station)
+        saved = 0
+        with self._locked(station_dir):
+            index = self._load_index(station_dir)
+            for name, segment in index['segments'].items():
+                path = station_dir / name
+                if path.suffix != ENCODINGS['gorilla'] or not path.exists():
+                    continue
+                with open(path, 'rb') as f:
+                    if sum(1 for _ in iter_frames(f)) <= 1:
+                        continue
+                before = path.stat().st_size
+                segment['bytes'] = self._rewrite_gorilla(path, [])
+                saved += before - segment['bytes']
+            if saved:
+                self._write_index(station_dir, index)
+        return saved
+
+    def stations(self) -> List[str]:
+        """Lijst van stations met een index (zonder record streams)"""
+        return sorted(p.parent.name for p in self.root.glob(f"*/{INDEX_FILE}"))
+
+    def streams(self) -> List[str]:
+        """Lijst van record streams"""
+        return sorted(p.parent.name for p in (self.root / RECORDS_DIR).glob(f"*/{INDEX_FILE}"))
+
+    def import_legacy_snapshots(self, directory: Path) -> int:
+        """
+        Importeer oude gemaal_<code>_<tijd>.json snapshot bestanden in de store.
+
+        Args:
+            directory: Directory met de oude snapshot bestanden
+
+        Returns:
+            Totaal aantal nieuw opgeslagen punten
+        """
+        total = 0
+        for snapshot in sorted(Path(directory).glob('gemaal_*.json')):
+            try:
+                with open(snapshot, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                station = saved['feature_identifier']
+                for i, series in enumerate(saved.get('data', {}).get('series', [])):
+                    total += self.append_series(series_key(station, i), series.get('data', []))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Kon snapshot {snapshot.name} niet importeren: {e}")
+        return total
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Catalogus cache van een ArcGIS server
+=====================================
+
+De lijst van services en per service de layers (naam, geometrie type, extent,
+velden en ondersteunde query formaten) verandert zelden. In plaats van bij
+elke run de hele server opnieuw af te lopen staat die informatie in
+`.catalog.json` in de output directory:
+
+    {
+      "base_url": "...",
+      "crawled": "2026-10-19T06:00:00",
+      "services": [{"name": ..., "type": ..., "path": ...}, ...],
+      "layers": {"Gemaal/MapServer": {"fetched": "...", "layers": [...]}, ...}
+    }
+
+Versheid:
+- Binnen SERVICES_TTL wordt de servicelijst zonder requests uit de cache gebruikt
+- Daarna wordt de folderstructuur opnieuw gecrawld (revalidatie, weinig requests);
+  layers van verdwenen services vervallen, nieuwe services worden opgehaald
+- Layer metadata van een bestaande service wordt pas na LAYERS_TTL opnieuw opgehaald
+
+Het bestand wordt atomisch geschreven (zie response_cache.atomic_write_bytes).
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from response_cache import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = '.catalog.json'
+SERVICES_TTL = timedelta(hours=24)  # Folderstructuur en servicelijst
+LAYERS_TTL = timedelta(days=7)  # Layer metadata per service
+
+
+class ServiceCatalog:
+    """Persistente cache van services en layers van één ArcGIS server"""
+
+    def __init__(self, path: Path, base_url: str, services_ttl: timedelta = SERVICES_TTL,
+                 layers_ttl: timedelta = LAYERS_TTL):
+        """
+        Initialiseer de catalogus en laad een bestaand bestand.
+
+        Args:
+            path: Pad van het catalogus bestand
+            base_url: Services URL; een catalogus van een andere server wordt genegeerd
+            services_ttl: Maximale leeftijd van de servicelijst
+            layers_ttl: Maximale leeftijd van de layer metadata van een service
+        """
+        self.path = Path(path)
+        self.base_url = base_url.rstrip('/')
+        self.services_ttl = services_ttl
+        self.layers_ttl = layers_ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        empty = {'base_url': self.base_url, 'crawled': None, 'services': [], 'layers': {}}
+        if not self.path.exists():
+            return empty
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Catalogus {self.path.name} onleesbaar, opnieuw opbouwen: {e}")
+            return empty
+        if data.get('base_url') != self.base_url:
+            return empty
+        data.setdefault('services', [])
+        data.setdefault('layers', {})
+        return data
+
+    @staticmethod
+    def _age(timestamp: Optional[str]) -> Optional[timedelta]:
+        if not timestamp:
+            return None
+        return datetime.now() - datetime.fromisoformat(timestamp)
+
+    def services_fresh(self) -> bool:
+        """True als de servicelijst jonger is dan services_ttl"""
+        age = self._age(self.data.get('crawled'))
+        return age is not None and age < self.services_ttl and bool(self.data['services'])
+
+    def services(self) -> List[Dict]:
+        return list(self.data['services'])
+
+    def set_services(self, services: List[Dict]):
+        """Nieuwe servicelijst na een crawl; layers van verdwenen services vervallen"""
+        with self._lock:
+            paths = {f"{s['path']}/{s['type']}" for s in services}
+            removed = [p for p in self.data['layers'] if p not in paths]
+            for path in removed:
+                del self.data['layers'][path]
+            if removed:
+                logger.info(f"Catalogus: {len(removed)} verdwenen services verwijderd")
+            self.data['services'] = services
+            self.data['crawled'] = datetime.now().isoformat()
+            self._dirty = True
+
+    def layers(self, service_path: str) -> Optional[List[Dict]]:
+        """Layers van een service uit de cache, of None als ze ontbreken of verlopen zijn"""
+        with self._lock:
+            entry = self.data['layers'].get(service_path)
+        if not entry:
+            return None
+        age = self._age(entry.get('fetched'))
+        if age is None or age >= self.layers_ttl:
+            return None
+        return entry['layers']
+
+    def set_layers(self, service_path: str, layers: List[Dict]):
+        with self._lock:
+            self.data['layers'][service_path] = {'fetched': datetime.now().isoformat(), 'layers': layers}
+            self._dirty = True
+
+    def invalidate(self):
+        """Vergeet alles (volledige herontdekking bij de volgende aanroep)"""
+        with self._lock:
+            self.data = {'base_url': self.base_url, 'crawled': None, 'services': [], 'layers': {}}
+            self._dirty = True
+
+    def save(self):
+        """Schrijf de catalogus als er iets gewijzigd is"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self.data, ensure_ascii=False, indent=2).encode('utf-8')
+            self._dirty = False
+        atomic_write_bytes(self.path, payload)
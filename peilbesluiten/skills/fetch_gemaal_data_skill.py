@@ -12,7 +12,7 @@ from pathlib import Path
 # Add parent directory to path to import modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from fetch_hydronet_gemaal_data import HydronetGemaalDataFetcher, CHART_ID
+from fetch_hydronet_gemaal_data import HydronetGemaalDataFetcher, CHART_ID, CACHE_DIR
 
 
 def main():
@@ -40,9 +40,8 @@ def main():
     args = parser.parse_args()
 
     try:
-        # Initialize fetcher with chart_id and output directory
-        output_dir = Path(__file__).parent.parent / 'gemaal_data_cache'
-        fetcher = HydronetGemaalDataFetcher(chart_id=CHART_ID, output_dir=output_dir)
+        # Initialize fetcher; responses komen uit de gedeelde cache als ze nog vers zijn
+        fetcher = HydronetGemaalDataFetcher(chart_id=CHART_ID, output_dir=CACHE_DIR)
 
         # Fetch data
         print(f"Ophalen van data voor gemaal: {args.gemaal_code}...", file=sys.stderr)
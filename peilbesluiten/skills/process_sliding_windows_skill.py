@@ -13,14 +13,17 @@ from datetime import datetime
 # Add parent directory to path to import modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from fetch_hydronet_gemaal_data import HydronetGemaalDataFetcher, CHART_ID
+from columnar_archive import ColumnarArchive
+from fetch_hydronet_gemaal_data import HydronetGemaalDataFetcher, CHART_ID, CACHE_DIR
 from sliding_window_processor import MultiWindowProcessor
 
+ARCHIVE_DIR = Path(__file__).parent.parent / 'gemaal_archief'
+
 
 def process_from_api(gemaal_code, window_sizes):
     """Process data directly from API."""
-    output_dir = Path(__file__).parent.parent / 'gemaal_data_cache'
-    fetcher = HydronetGemaalDataFetcher(chart_id=CHART_ID, output_dir=output_dir)
+    # Responses komen uit de gedeelde cache als ze nog vers zijn
+    fetcher = HydronetGemaalDataFetcher(chart_id=CHART_ID, output_dir=CACHE_DIR)
 
     print(f"Ophalen van data voor gemaal: {gemaal_code}...", file=sys.stderr)
     data = fetcher.fetch_gemaal_data(gemaal_code)
@@ -35,6 +38,22 @@ def process_from_api(gemaal_code, window_sizes):
     return series['data'], None
 
 
+def process_from_archive(gemaal_code, archive_dir, processor):
+    """Process data from the columnar archive (NumPy views, no dict per point)."""
+    archive_dir = Path(archive_dir)
+    if not archive_dir.is_dir():
+        return 0, f"Archief niet gevonden: {archive_dir}"
+
+    archive = ColumnarArchive(archive_dir)
+    if not archive.path_for(gemaal_code).exists():
+        return 0, f"Gemaal {gemaal_code} niet gevonden in archief"
+
+    with archive.open(gemaal_code) as columns:
+        # add_arrays verwerkt alleen de staart binnen het grootste venster
+        processor.add_arrays(columns.timestamps, columns.values)
+        return columns.count, None
+
+
 def process_from_json(gemaal_code, json_path):
     """Process data from existing JSON file."""
     try:
@@ -76,10 +95,16 @@ def main():
     )
     parser.add_argument(
         '--data-source',
-        choices=['api', 'json'],
+        choices=['api', 'json', 'archive'],
         default='api',
         help='Bron van data (default: api)'
     )
+    parser.add_argument(
+        '--archive-dir',
+        type=str,
+        default=str(ARCHIVE_DIR),
+        help='Directory van het kolom archief (voor data-source=archive, zie columnar_archive.py)'
+    )
     parser.add_argument(
         '--json-path',
         type=str,
@@ -111,20 +136,28 @@ def main():
         }))
         sys.exit(1)
 
-    # Validate gemaal_code for API source
-    if args.data_source == 'api' and not args.gemaal_code:
+    # Validate gemaal_code for API and archive source
+    if args.data_source in ('api', 'archive') and not args.gemaal_code:
         print(json.dumps({
             'success': False,
-            'error': 'gemaal-code is vereist bij data-source=api'
+            'error': f'gemaal-code is vereist bij data-source={args.data_source}'
         }))
         sys.exit(1)
 
     try:
+        # Initialize multi-window processor
+        processor = MultiWindowProcessor(window_sizes)
+
         # Fetch data based on source
+        data_points = None
         if args.data_source == 'api':
             data_points, error = process_from_api(args.gemaal_code, window_sizes)
+        elif args.data_source == 'archive':
+            processed_points, error = process_from_archive(args.gemaal_code, args.archive_dir, processor)
         else:
             data_points, error = process_from_json(args.gemaal_code, args.json_path)
+        if args.data_source != 'archive':
+            processed_points = len(data_points or [])
 
         if error:
             print(json.dumps({
@@ -133,21 +166,19 @@ def main():
             }))
             sys.exit(1)
 
-        if not data_points:
+        if not processed_points:
             print(json.dumps({
                 'success': False,
                 'error': 'Geen data punten om te verwerken'
             }))
             sys.exit(1)
 
-        # Initialize multi-window processor
-        processor = MultiWindowProcessor(window_sizes)
-
-        # Process all data points
-        print(f"Verwerken van {len(data_points)} datapunten...", file=sys.stderr)
-        for point in data_points:
-            timestamp = datetime.fromisoformat(point['timestamp'].replace('Z', '+00:00'))
-            processor.add_data_point(timestamp, point['value'])
+        # Process all data points (het archief is al verwerkt)
+        if data_points:
+            print(f"Verwerken van {len(data_points)} datapunten...", file=sys.stderr)
+            for point in data_points:
+                timestamp = datetime.fromisoformat(point['timestamp'].replace('Z', '+00:00'))
+                processor.add_data_point(timestamp, point['value'])
 
         # Get metrics
         all_metrics = processor.get_all_metrics()
@@ -157,7 +188,7 @@ def main():
             'success': True,
             'gemaal_code': args.gemaal_code if args.gemaal_code else 'N/A',
             'data_source': args.data_source,
-            'processed_points': len(data_points),
+            'processed_points': processed_points,
             'window_sizes': window_sizes,
             'metrics': all_metrics,
             'summary': summary
@@ -182,7 +213,7 @@ def main():
             print(f"{'='*70}\n")
 
             print(f"Data bron:        {args.data_source}")
-            print(f"Verwerkte punten: {len(data_points)}")
+            print(f"Verwerkte punten: {processed_points}")
             print(f"Window sizes:     {', '.join(map(str, window_sizes))} minuten\n")
 
             for window_minutes, metrics in all_metrics.items():
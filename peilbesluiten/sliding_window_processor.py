@@ -7,6 +7,7 @@ Berekent trends en aggregaties over verschillende tijdvensters voor gemaal times
 Gebaseerd op hoofdstuk 4 van Digital Twins boek - streaming data processing met sliding windows.
 """
 
+from bisect import bisect_left
 from collections import deque
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
@@ -66,6 +67,27 @@ class SlidingWindowProcessor:
                 timestamp = datetime.fromtimestamp(timestamp_ms / 1000)
                 self.add_data_point(timestamp, value)
     
+    def add_arrays(self, timestamps_ms, values):
+        """
+        Voeg een gesorteerde reeks toe als twee kolommen (lijsten of NumPy views,
+        bijv. uit het kolom archief). Alleen de staart die binnen het venster van
+        het laatste punt valt wordt verwerkt, dus maanden historie kosten geen
+        Python object per punt.
+        
+        Args:
+            timestamps_ms: Oplopende timestamps in milliseconden
+            values: Waarden bij de timestamps
+        """
+        if len(timestamps_ms) == 0:
+            return
+        
+        cutoff_ms = int(timestamps_ms[-1]) - int(self.window.total_seconds() * 1000)
+        start = bisect_left(timestamps_ms, cutoff_ms)
+        for timestamp_ms, value in zip(timestamps_ms[start:], values[start:]):
+            timestamp_ms = int(timestamp_ms)
+            if timestamp_ms > 0:
+                self.add_data_point(datetime.fromtimestamp(timestamp_ms / 1000), float(value))
+    
     def get_window_stats(self) -> Optional[Dict]:
         """
         Bereken statistieken over het huidige sliding window.
@@ -241,6 +263,17 @@ class MultiWindowProcessor:
         for processor in self.processors.values():
             processor.add_series_data(series_data)
     
+    def add_arrays(self, timestamps_ms, values):
+        """
+        Voeg kolom data (bijv. uit het kolom archief) toe aan alle windows.
+        
+        Args:
+            timestamps_ms: Oplopende timestamps in milliseconden
+            values: Waarden bij de timestamps
+        """
+        for processor in self.processors.values():
+            processor.add_arrays(timestamps_ms, values)
+    
     def get_all_metrics(self) -> Dict:
         """
         Haal metrics op voor alle windows.
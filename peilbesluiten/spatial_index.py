@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Ruimtelijke index voor peilgebieden, gemalen en meetlocaties
+============================================================
+
+Vragen als "in welk peilgebied ligt dit gemaal" of "welke meetlocaties liggen
+bij deze pomp" gingen tot nu toe via het inlezen van hele GeoJSON bestanden en
+een brute-force test per geometrie. Deze module bouwt per laaggroep (LAYERS)
+één keer een STR-tree en bewaart die op schijf, zodat een analyse alleen nog
+een .npz bestand hoeft te laden.
+
+De index (numpy arrays):
+- Bladniveau: bbox per feature in STR volgorde (gesorteerd op x, in
+  verticale stroken op y); hogere niveaus groeperen telkens NODE_CAPACITY
+  opeenvolgende nodes, zodat de kinderen van een node aaneengesloten liggen
+- Geometrie als lijnstukken per feature (ringen gesloten, punten als
+  lijnstuk met lengte 0) in RD New meters; laagbestanden in WGS84
+  (GeoJSON, outSR=4326) worden bij het bouwen omgerekend (rd_new.py)
+
+Queries werken op batches en lopen de boom niveau voor niveau af voor alle
+queries tegelijk:
+- query_bbox: (query, feature) paren waarvan de bboxen overlappen
+- point_in_polygon / locate: punt-in-vlak (even-odd, gaten en multipolygonen)
+- nearest: k dichtstbijzijnde features per punt (afstand tot de geometrie,
+  0 binnen een vlak), met een zoekstraal die per query verdubbelt
+
+De cache staat in <bron>/.spatial_index/<naam>.npz en wordt opnieuw gebouwd
+als een bronbestand (grootte of mtime) of FORMAT_VERSION verandert.
+
+Gebruik:
+    python spatial_index.py                             # gemalen -> peilgebied + dichtstbijzijnde meetlocaties
+    python spatial_index.py --nearest 3 --output gemaal_koppelingen.json
+    python spatial_index.py --rebuild
+
+    from spatial_index import load_index
+    peilgebieden = load_index('peilgebieden')
+    gemalen = load_index('gemalen')
+    gebied = peilgebieden.locate(gemalen.centroids())   # index per gemaal, -1 buiten alle peilgebieden
+"""
+
+import argparse
+import io
+import json
+import logging
+import math
+import sys
+import time
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from download_profiles import is_profile_file
+from geojson_stream import feature_attributes, iter_features, read_member
+from rd_new import GEOGRAPHIC_WKIDS, wgs84_to_rd
+from response_cache import atomic_write_bytes
+from vector_tiles import DROPPED_ATTRIBUTES, LINESTRING, POINT, POLYGON, geometry_parts
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIR = "rijnland_kaartlagen"
+CACHE_DIR = ".spatial_index"
+NODE_CAPACITY = 16  # Kinderen per node
+FORMAT_VERSION = 1  # Ophogen bij wijzigingen in de opbouw (maakt bestaande caches ongeldig)
+NEAREST = 3  # Standaard aantal meetlocaties per gemaal in de CLI
+
+# Laaggroepen: glob patronen relatief aan SOURCE_DIR (profielkopieën tellen niet mee)
+LAYERS = {
+    'peilgebieden': ('Peilgebied_praktijk_soort_gebied/*.geojson',),
+    'gemalen': ('Gemaal/Gemaal_layer0.geojson',),
+    'meetlocaties': ('Meetlocatie_*/*.geojson',),
+}
+
+
+def _identity(x: float, y: float) -> Tuple[float, float]:
+    return x, y
+
+
+def _rd_projection(srid: Optional[int], geometry: Dict):
+    """Functie (x, y) -> RD New; GeoJSON zonder spatial reference is WGS84 (RFC 7946)"""
+    if srid in GEOGRAPHIC_WKIDS or (srid is None and 'coordinates' in geometry):
+        return wgs84_to_rd
+    return _identity
+
+
+def _srid(metadata: Dict) -> Optional[int]:
+    reference = metadata.get('spatial_reference') or {}
+    return reference.get('latestWkid') or reference.get('wkid')
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Voor elk bereik [start, start + count): (bereik nummer, element index) als platte arrays"""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    first = np.cumsum(counts) - counts
+    return owner, np.repeat(starts, counts) + (np.arange(len(owner)) - first[owner])
+
+
+def _as_points(points) -> np.ndarray:
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def _as_boxes(boxes) -> np.ndarray:
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def _feature_edges(kind: int, parts) -> List[Tuple[float, float, float, float]]:
+    """Lijnstukken (x1, y1, x2, y2) van een feature; ringen worden gesloten"""
+    if kind == POINT:
+        return [(x, y, x, y) for x, y in parts]
+    if kind == LINESTRING:
+        paths = parts
+    else:
+        paths = [ring + ring[:1] for polygon in parts for ring in polygon]
+    return [(a[0], a[1], b[0], b[1]) for path in paths for a, b in zip(path, path[1:])]
+
+
+def _str_order(bounds: np.ndarray) -> np.ndarray:
+    """Sort-Tile-Recursive volgorde van de bladen: stroken op x, binnen een strook op y"""
+    centers_x = (bounds[:, 0] + bounds[:, 2]) / 2
+    centers_y = (bounds[:, 1] + bounds[:, 3]) / 2
+    order = np.argsort(centers_x, kind='stable')
+    leaves = math.ceil(len(bounds) / NODE_CAPACITY)
+    strip = math.ceil(math.sqrt(leaves)) * NODE_CAPACITY
+    for start in range(0, len(order), strip):
+        chunk = order[start:start + strip]
+        order[start:start + strip] = chunk[np.argsort(centers_y[chunk], kind='stable')]
+    return order
+
+
+def _pack_levels(leaves: np.ndarray) -> List[np.ndarray]:
+    """Bboxen per niveau, van de bladen tot één wortel"""
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        below = levels[-1]
+        starts = np.arange(0, len(below), NODE_CAPACITY)
+        levels.append(np.column_stack([
+            np.minimum.reduceat(below[:, 0], starts), np.minimum.reduceat(below[:, 1], starts),
+            np.maximum.reduceat(below[:, 2], starts), np.maximum.reduceat(below[:, 3], starts),
+        ]))
+    return levels
+
+
+class SpatialIndex:
+    """
+    STR-tree over de features van één laaggroep.
+
+    Features zijn genummerd in leesvolgorde (0..n-1); keys, attributes, kinds
+    en bounds zijn per feature. Queries geven feature nummers terug.
+    """
+
+    def __init__(self, name: str, keys: List, attributes: List[Dict], kinds: np.ndarray,
+                 bounds: np.ndarray, edges: np.ndarray, edge_offsets: np.ndarray,
+                 signature: Optional[List] = None):
+        self.name = name
+        self.keys = keys
+        self.attributes = attributes
+        self.kinds = kinds
+        self.bounds = bounds
+        self.edges = edges
+        self.edge_offsets = edge_offsets
+        self.signature = signature
+        self._order = _str_order(bounds) if len(bounds) else np.zeros(0, dtype=np.int64)
+        self._levels = _pack_levels(bounds[self._order]) if len(bounds) else []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # --- Opbouw -------------------------------------------------------------
+
+    @classmethod
+    def from_features(cls, name: str, features: Iterable[Dict], oid_field: str = 'OBJECTID',
+                      signature: Optional[List] = None, srid: Optional[int] = None) -> 'SpatialIndex':
+        """
+        Bouw een index uit Esri JSON of GeoJSON features (features zonder geometrie vallen weg).
+
+        srid is het coördinatenstelsel van de features (None: GeoJSON is WGS84,
+        Esri JSON is RD New); de index rekent altijd in RD New meters.
+        """
+        return cls._build(name, ((feature, srid) for feature in features), oid_field, signature)
+
+    @classmethod
+    def _build(cls, name: str, features: Iterable[Tuple[Dict, Optional[int]]], oid_field: str,
+               signature: Optional[List]) -> 'SpatialIndex':
+        keys, attributes, kinds, bounds, edges, counts = [], [], [], [], [], []
+        for feature, srid in features:
+            geometry = feature.get('geometry')
+            parts = geometry_parts(geometry, _rd_projection(srid, geometry)) if geometry else None
+            if parts is None or not parts[1]:
+                continue
+            kind, parts = parts
+            feature_edges = _feature_edges(kind, parts)
+            if not feature_edges:
+                continue
+            values = {k: v for k, v in feature_attributes(feature).items()
+                      if v is not None and not any(fnmatchcase(k.upper(), p) for p in DROPPED_ATTRIBUTES)}
+            keys.append(values.get(oid_field, len(keys)))
+            attributes.append(values)
+            kinds.append(kind)
+            xs = [e[0] for e in feature_edges] + [e[2] for e in feature_edges]
+            ys = [e[1] for e in feature_edges] + [e[3] for e in feature_edges]
+            bounds.append((min(xs), min(ys), max(xs), max(ys)))
+            edges.extend(feature_edges)
+            counts.append(len(feature_edges))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(name, keys, attributes, np.array(kinds, dtype=np.int8),
+                   np.array(bounds, dtype=np.float64).reshape(-1, 4),
+                   np.array(edges, dtype=np.float64).reshape(-1, 4), offsets, signature)
+
+    @classmethod
+    def from_layer_files(cls, name: str, paths: List[Path], signature: Optional[List] = None) -> 'SpatialIndex':
+        """Bouw een index uit één of meer laagbestanden van de downloader"""
+        metadata = {path: read_member(path, 'metadata', {}) or {} for path in paths}
+
+        def features():
+            for path in paths:
+                srid = _srid(metadata[path])
+                for feature in iter_features(path):
+                    yield feature, srid
+
+        oid_field = 'OBJECTID'
+        for path in paths:
+            oid_field = metadata[path].get('object_id_field') or oid_field
+        return cls._build(name, features(), oid_field, signature)
+
+    # --- Opslag -------------------------------------------------------------
+
+    def save(self, path: Path):
+        """Schrijf de index atomair als .npz (attributen en keys als JSON)"""
+        meta = json.dumps({'name': self.name, 'version': FORMAT_VERSION, 'signature': self.signature,
+                           'keys': self.keys, 'attributes': self.attributes},
+                          ensure_ascii=False, separators=(',', ':'), default=str)
+        buffer = io.BytesIO()
+        np.savez(buffer, kinds=self.kinds, bounds=self.bounds, edges=self.edges,
+                 edge_offsets=self.edge_offsets, meta=np.frombuffer(meta.encode('utf-8'), dtype=np.uint8))
+        atomic_write_bytes(Path(path), buffer.getvalue())
+
+    @classmethod
+    def load(cls, path: Path) -> 'SpatialIndex':
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            return cls(meta['name'], meta['keys'], meta['attributes'], data['kinds'], data['bounds'],
+                       data['edges'], data['edge_offsets'], meta['signature'])
+
+    # --- Queries ------------------------------------------------------------
+
+    def query_bbox(self, boxes) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Features waarvan de bbox een query bbox raakt.
+
+        Args:
+            boxes: (min_x, min_y, max_x, max_y) of een array daarvan
+
+        Returns:
+            (query, feature) index arrays van gelijke lengte
+        """
+        boxes = _as_boxes(boxes)
+        if not self._levels or not len(boxes):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        query = np.arange(len(boxes))
+        nodes = np.zeros(len(boxes), dtype=np.int64)
+        for depth in range(len(self._levels) - 1, -1, -1):
+            node_boxes, query_boxes = self._levels[depth][nodes], boxes[query]
+            hit = ((node_boxes[:, 0] <= query_boxes[:, 2]) & (node_boxes[:, 2] >= query_boxes[:, 0]) &
+                   (node_boxes[:, 1] <= query_boxes[:, 3]) & (node_boxes[:, 3] >= query_boxes[:, 1]))
+            query, nodes = query[hit], nodes[hit]
+            if depth:
+                starts = nodes * NODE_CAPACITY
+                counts = np.minimum(NODE_CAPACITY, len(self._levels[depth - 1]) - starts)
+                owner, nodes = _expand(starts, counts)
+                query = query[owner]
+        return query, self._order[nodes]
+
+    def _inside(self, points: np.ndarray, features: np.ndarray) -> np.ndarray:
+        """Per (punt, feature) paar: ligt het punt binnen het vlak (even-odd over alle ringen)"""
+        starts = self.edge_offsets[features]
+        owner, edge = _expand(starts, self.edge_offsets[features + 1] - starts)
+        x1, y1, x2, y2 = self.edges[edge].T
+        px, py = points[owner, 0], points[owner, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = ((y1 > py) != (y2 > py)) & (px < (x2 - x1) * (py - y1) / (y2 - y1) + x1)
+        return np.bincount(owner, weights=crossing, minlength=len(features)) % 2 == 1
+
+    def point_in_polygon(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Alle (punt, vlak) paren waarbij het punt in het vlak ligt.
+
+        Returns:
+            (punt, feature) index arrays, gesorteerd op punt
+        """
+        points = _as_points(points)
+        query, features = self.query_bbox(np.hstack([points, points]))
+        polygons = self.kinds[features] == POLYGON
+        query, features = query[polygons], features[polygons]
+        inside = self._inside(points[query], features)
+        query, features = query[inside], features[inside]
+        order = np.lexsort((features, query))
+        return query[order], features[order]
+
+    def locate(self, points) -> np.ndarray:
+        """Per punt het vlak waarin het ligt (laagste feature nummer bij overlap), -1 als er geen is"""
+        points = _as_points(points)
+        result = np.full(len(points), -1, dtype=np.int64)
+        query, features = self.point_in_polygon(points)
+        first = np.ones(len(query), dtype=bool)
+        first[1:] = query[1:] != query[:-1]
+        result[query[first]] = features[first]
+        return result
+
+    def distances(self, points, features) -> np.ndarray:
+        """Afstand van elk punt tot de geometrie van het bijbehorende feature (0 binnen een vlak)"""
+        points = _as_points(points)
+        features = np.asarray(features, dtype=np.int64)
+        if not len(features):
+            return np.zeros(0)
+        starts = self.edge_offsets[features]
+        counts = self.edge_offsets[features + 1] - starts
+        owner, edge = _expand(starts, counts)
+        x1, y1, x2, y2 = self.edges[edge].T
+        px, py = points[owner, 0], points[owner, 1]
+        dx, dy = x2 - x1, y2 - y1
+        length2 = dx * dx + dy * dy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(length2 > 0, ((px - x1) * dx + (py - y1) * dy) / length2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        distance = np.minimum.reduceat(np.hypot(px - x1 - t * dx, py - y1 - t * dy), np.cumsum(counts) - counts)
+        polygons = np.flatnonzero(self.kinds[features] == POLYGON)
+        if len(polygons):
+            distance[polygons[self._inside(points[polygons], features[polygons])]] = 0.0
+        return distance
+
+    def nearest(self, points, k: int = 1, max_distance: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        De k dichtstbijzijnde features per punt.
+
+        Elke query begint met een zoekstraal die bij een gelijkmatige spreiding
+        k features zou bevatten en verdubbelt tot er k binnen de straal liggen
+        (of de straal max_distance of de hele index beslaat).
+
+        Returns:
+            (features, afstanden) arrays van vorm (punten, k), aangevuld met -1 en inf
+        """
+        points = _as_points(points)
+        result = np.full((len(points), k), -1, dtype=np.int64)
+        result_distance = np.full((len(points), k), np.inf)
+        if not self._levels or not len(points) or k < 1:
+            return result, result_distance
+
+        min_x, min_y, max_x, max_y = self._levels[-1][0]
+        limit = (math.hypot(max_x - min_x, max_y - min_y) +
+                 np.hypot(np.maximum(0, np.maximum(min_x - points[:, 0], points[:, 0] - max_x)),
+                          np.maximum(0, np.maximum(min_y - points[:, 1], points[:, 1] - max_y))))
+        if max_distance is not None:
+            limit = np.minimum(limit, max_distance)
+        area = max(max_x - min_x, 1.0) * max(max_y - min_y, 1.0)
+        radius = np.minimum(math.sqrt(area * k / len(self)), limit)
+        wanted = min(k, len(self))
+
+        active = np.arange(len(points))
+        while len(active):
+            r = radius[active]
+            query, features = self.query_bbox(np.column_stack([points[active] - r[:, None], points[active] + r[:, None]]))
+            distance = self.distances(points[active][query], features)
+            keep = distance <= r[query]
+            query, features, distance = query[keep], features[keep], distance[keep]
+            order = np.lexsort((features, distance, query))
+            query, features, distance = query[order], features[order], distance[order]
+
+            found = np.bincount(query, minlength=len(active))
+            done = (found >= wanted) | (r >= limit[active])
+            rank = np.arange(len(query)) - (np.cumsum(found) - found)[query]
+            take = done[query] & (rank < k)
+            result[active[query[take]], rank[take]] = features[take]
+            result_distance[active[query[take]], rank[take]] = distance[take]
+
+            active = active[~done]
+            radius[active] = np.minimum(radius[active] * 2, limit[active])
+        return result, result_distance
+
+    # --- Hulpfuncties -------------------------------------------------------
+
+    def centroids(self) -> np.ndarray:
+        """Middelpunt van de bbox per feature (voor punten het punt zelf)"""
+        return np.column_stack([(self.bounds[:, 0] + self.bounds[:, 2]) / 2,
+                                (self.bounds[:, 1] + self.bounds[:, 3]) / 2])
+
+    def feature(self, index: int) -> Dict:
+        """Key, attributen en bbox van een feature nummer"""
+        return {'key': self.keys[index], 'attributes': self.attributes[index],
+                'bbox': [float(v) for v in self.bounds[index]]}
+
+
+# --- Laaggroepen en cache ---------------------------------------------------
+
+def layer_files(name: str, source_dir: Path = Path(SOURCE_DIR)) -> List[Path]:
+    """Laagbestanden van een laaggroep uit LAYERS"""
+    files = set()
+    for pattern in LAYERS[name]:
+        files.update(p for p in Path(source_dir).glob(pattern) if not is_profile_file(p))
+    return sorted(files)
+
+
+def _signature(files: List[Path], source_dir: Path) -> List:
+    signature = [FORMAT_VERSION, NODE_CAPACITY]
+    for path in files:
+        stat = path.stat()
+        signature.append([path.relative_to(source_dir).as_posix(), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def cache_path(name: str, source_dir: Path = Path(SOURCE_DIR)) -> Path:
+    return Path(source_dir) / CACHE_DIR / f"{name}.npz"
+
+
+def load_index(name: str, source_dir: Path = Path(SOURCE_DIR), rebuild: bool = False) -> SpatialIndex:
+    """
+    Index van een laaggroep, uit de cache of (als die ontbreekt of verouderd is) opnieuw gebouwd.
+
+    Raises:
+        FileNotFoundError: als er geen laagbestanden voor de groep zijn
+    """
+    source_dir = Path(source_dir)
+    files = layer_files(name, source_dir)
+    if not files:
+        raise FileNotFoundError(f"Geen laagbestanden voor '{name}' in {source_dir} ({', '.join(LAYERS[name])})")
+    signature = _signature(files, source_dir)
+    path = cache_path(name, source_dir)
+    if not rebuild and path.exists():
+        try:
+            index = SpatialIndex.load(path)
+            if index.signature == signature:
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Cache {path} onleesbaar, opnieuw bouwen: {e}")
+
+    start = time.monotonic()
+    index = SpatialIndex.from_layer_files(name, files, signature)
+    index.save(path)
+    logger.info(f"Index '{name}' gebouwd: {len(index):,} features uit {len(files)} bestand(en) "
+                f"in {time.monotonic() - start:.2f}s")
+    return index
+
+
+def link_gemalen(source_dir: Path = Path(SOURCE_DIR), nearest: int = NEAREST,
+                 rebuild: bool = False) -> Tuple[List[Dict], Dict]:
+    """
+    Koppel elk gemaal aan zijn peilgebied en de dichtstbijzijnde meetlocaties.
+
+    Returns:
+        (koppelingen per gemaal, stats met laad- en querytijden)
+    """
+    start = time.monotonic()
+    indexes = {name: load_index(name, source_dir, rebuild) for name in LAYERS}
+    loaded = time.monotonic()
+
+    gemalen, peilgebieden, meetlocaties = indexes['gemalen'], indexes['peilgebieden'], indexes['meetlocaties']
+    points = gemalen.centroids()
+    gebied = peilgebieden.locate(points)
+    located = time.monotonic()
+    near, distance = meetlocaties.nearest(points, nearest)
+    done = time.monotonic()
+
+    links = []
+    for i in range(len(gemalen)):
+        links.append({
+            'gemaal': gemalen.keys[i],
+            'naam': gemalen.attributes[i].get('NAAM'),
+            'peilgebied': peilgebieden.attributes[gebied[i]] if gebied[i] >= 0 else None,
+            'meetlocaties': [dict(meetlocaties.attributes[j], afstand_m=round(float(d), 1))
+                             for j, d in zip(near[i], distance[i]) if j >= 0],
+        })
+    stats = {name: len(index) for name, index in indexes.items()}
+    stats.update({'in_peilgebied': int((gebied >= 0).sum()), 'load_seconds': loaded - start,
+                  'locate_seconds': located - loaded, 'nearest_seconds': done - located})
+    return links, stats
+
+
+def main():
+    """CLI: koppel gemalen aan peilgebieden en meetlocaties"""
+    parser = argparse.ArgumentParser(description='Koppel gemalen aan peilgebied en nabije meetlocaties')
+    parser.add_argument('--source', default=SOURCE_DIR, help=f'Directory met de laagbestanden (default: {SOURCE_DIR})')
+    parser.add_argument('--nearest', type=int, default=NEAREST, help=f'Meetlocaties per gemaal (default: {NEAREST})')
+    parser.add_argument('--output', help='JSON bestand voor de koppelingen (default: stdout)')
+    parser.add_argument('--rebuild', action='store_true', help='Indexen opnieuw bouwen, ook als de cache actueel is')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    links, stats = link_gemalen(Path(args.source), args.nearest, args.rebuild)
+    text = json.dumps(links, ensure_ascii=False, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    else:
+        print(text)
+    print(f"{stats['gemalen']} gemalen, {stats['in_peilgebied']} in een van {stats['peilgebieden']:,} peilgebieden; "
+          f"indexen geladen in {stats['load_seconds'] * 1000:.0f} ms, punt-in-vlak "
+          f"{stats['locate_seconds'] * 1000:.1f} ms, {args.nearest} dichtstbijzijnde van "
+          f"{stats['meetlocaties']:,} meetlocaties {stats['nearest_seconds'] * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de ObjectID-range Paginering
+=============================================
+
+Test met een nagebootste ArcGIS query endpoint dat ranges compleet en in
+volgorde terugkomen, ook met gaten in de IDs, een kleine maxRecordCount en
+zonder returnIdsOnly ondersteuning (offset fallback).
+"""
+
+import time
+
+from arcgis_paging import OUT_SR, LayerPager, PageError, split_id_ranges
+from test_helpers import FakeLayer
+
+
+def collect(pager):
+    return [f['attributes']['OBJECTID'] for _, page in pager.pages() for f in page['features']]
+
+
+def test_split_id_ranges():
+    """Test het opknippen van ObjectIDs in ranges"""
+    print("=" * 70)
+    print("Test 1: split_id_ranges")
+    print("=" * 70)
+
+    assert split_id_ranges([5, 1, 3, 9, 7], size=2) == [(1, 3), (5, 7), (9, 9)]
+    assert split_id_ranges([], size=10) == []
+    assert split_id_ranges([4, 4, 4], size=10) == [(4, 4)]
+    print("✓ Ranges correct, ook met gaten en dubbele IDs")
+    print()
+
+
+def test_parallel_ranges_in_order():
+    """Test dat ranges parallel worden opgehaald en in volgorde terugkomen"""
+    print("=" * 70)
+    print("Test 2: Parallelle ranges in volgorde")
+    print("=" * 70)
+
+    ids = [i * 3 for i in range(1, 2501)]  # Gaten tussen de IDs
+    layer = FakeLayer(ids, delay=0.02)
+    pager = LayerPager(layer, 'http://test/MapServer/0/query', page_size=100, workers=4)
+
+    start = time.time()
+    result = collect(pager)
+    elapsed = time.time() - start
+
+    assert pager.strategy == 'ids'
+    assert pager.expected_count == len(ids)
+    assert result == ids, "Features moeten compleet en in ObjectID volgorde zijn"
+    assert layer.peak > 1, "Ranges moeten tegelijk opgehaald worden"
+    assert not any('resultOffset' in r for r in layer.requests)
+    assert all(r['outSR'] == OUT_SR for r in layer.requests if not r.get('returnIdsOnly'))
+    print(f"✓ {len(result)} features in {len(pager.ranges)} ranges, {elapsed:.2f}s, piek {layer.peak} requests")
+
+    # Overslaan van al opgehaalde ranges
+    skipped = {0, 2}
+    indices = [index for index, _ in pager.pages(skip=skipped)]
+    assert indices == [i for i in range(len(pager.ranges)) if i not in skipped]
+    print("✓ skip slaat opgegeven ranges over")
+    print()
+
+
+def test_small_max_record_count_and_fallback():
+    """Test exceededTransferLimit binnen een range en de offset fallback"""
+    print("=" * 70)
+    print("Test 3: Kleine maxRecordCount en offset fallback")
+    print("=" * 70)
+
+    ids = list(range(1, 1001))
+    layer = FakeLayer(ids, max_record_count=30)
+    assert collect(LayerPager(layer, 'q', page_size=100, workers=3)) == ids
+    print("✓ Ranges groter dan maxRecordCount worden aangevuld")
+
+    layer = FakeLayer(ids, max_record_count=30, supports_ids=False)
+    pager = LayerPager(layer, 'q', page_size=100)
+    assert collect(pager) == ids
+    assert pager.strategy == 'offset' and pager.expected_count is None
+    print("✓ Zonder returnIdsOnly terugval op resultOffset")
+
+    def failing(url, params):
+        if params.get('returnIdsOnly'):
+            return {'objectIdFieldName': 'OBJECTID', 'objectIds': ids}
+        return None
+
+    try:
+        collect(LayerPager(failing, 'q', page_size=100))
+        assert False, "Een mislukte pagina moet een PageError geven"
+    except PageError:
+        pass
+    print("✓ Mislukte pagina geeft PageError")
+    print()
+
+
+if __name__ == "__main__":
+    test_split_id_ranges()
+    test_parallel_ranges_in_order()
+    test_small_max_record_count_and_fallback()
+    print("Alle tests geslaagd!")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de f=pbf Decoder
+=================================
+
+Bouwt met een kleine protobuf encoder FeatureCollectionPBuffer responses na
+(punten, polygonen met meerdere rings, count en ids) en test dat de decoder
+hetzelfde Esri JSON model oplevert als f=json. Daarnaast de terugval op
+f=json bij een onleesbare pbf response.
+"""
+
+import struct
+import tempfile
+
+import update_dynamische_data
+from arcgis_pbf import PbfDecodeError, decode_feature_collection, parse_query_response, supports_pbf
+from test_helpers import FakeResponse
+from update_dynamische_data import DynamicDataUpdater
+
+
+# --- Minimale protobuf encoder ----------------------------------------------
+
+def varint(value: int) -> bytes:
+    value &= (1 << 64) - 1
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def field_varint(number: int, value: int) -> bytes:
+    return varint(number << 3) + varint(value)
+
+
+def field_bytes(number: int, value: bytes) -> bytes:
+    return varint(number << 3 | 2) + varint(len(value)) + value
+
+
+def field_double(number: int, value: float) -> bytes:
+    return varint(number << 3 | 1) + struct.pack('<d', value)
+
+
+def field_float(number: int, value: float) -> bytes:
+    return varint(number << 3 | 5) + struct.pack('<f', value)
+
+
+def packed(number: int, values) -> bytes:
+    return field_bytes(number, b''.join(varint(v) for v in values))
+
+
+def value(v) -> bytes:
+    if isinstance(v, str):
+        return field_bytes(1, v.encode('utf-8'))
+    if isinstance(v, float):
+        return field_double(3, v)
+    return field_varint(8, zigzag(v))  # sint64
+
+
+def geometry(parts, scale, translate):
+    """Kwantiseer en delta-codeer parts (upperLeft oorsprong)"""
+    lengths, coords = [], []
+    for part in parts:
+        lengths.append(len(part))
+        prev = (0, 0)
+        for x, y in part:
+            qx = round((x - translate[0]) / scale[0])
+            qy = round((translate[1] - y) / scale[1])
+            coords += [zigzag(qx - prev[0]), zigzag(qy - prev[1])]
+            prev = (qx, qy)
+    return packed(2, lengths) + packed(3, coords)
+
+
+def feature_collection(geometry_type, fields, features, scale, translate, exceeded=False):
+    # Zoals de server (proto3): standaardwaarden 0 (upperLeft, esriGeometryTypePoint) worden weggelaten
+    transform = (field_bytes(2, field_double(1, scale[0]) + field_double(2, scale[1]))
+                 + field_bytes(3, field_double(1, translate[0]) + field_double(2, translate[1])))
+    result = field_bytes(1, b'OBJECTID')
+    if geometry_type:
+        result += field_varint(7, geometry_type)
+    result += field_bytes(8, field_varint(1, 28992))
+    if exceeded:
+        result += field_varint(9, 1)
+    result += field_bytes(12, transform)
+    for name, field_type in fields:
+        result += field_bytes(13, field_bytes(1, name.encode('utf-8')) + field_varint(2, field_type))
+    for attributes, parts in features:
+        feature = b''.join(field_bytes(1, value(v)) for v in attributes)
+        if parts is not None:
+            feature += field_bytes(2, geometry(parts, scale, translate))
+        result += field_bytes(15, feature)
+    return field_bytes(2, field_bytes(1, result))
+
+
+def test_decode_features():
+    """Test punten en polygonen met meerdere rings"""
+    print("=" * 70)
+    print("Test 1: Features decoderen")
+    print("=" * 70)
+
+    scale, translate = (0.001, 0.001), (80000.0, 470000.0)
+    fields = [('OBJECTID', 6), ('NAAM', 4), ('PEIL', 3), ('MUTATIE', 5)]
+    points = [((1, 'Gemaal "De Blauwe" é', -0.6, 1700000000000), [[(92000.5, 461000.25)]]),
+              ((2, 'Stuw', -1.25, 1600000000000), [[(91999.0, 465000.0)]]),
+              ((3, 'Zonder geometrie', 0.0, -5), None)]
+    data = decode_feature_collection(feature_collection(0, fields, points, scale, translate, exceeded=True))
+
+    assert data['geometryType'] == 'esriGeometryPoint'
+    assert data['objectIdFieldName'] == 'OBJECTID'
+    assert data['spatialReference'] == {'wkid': 28992}
+    assert data['exceededTransferLimit'] is True
+    assert [f['name'] for f in data['fields']] == ['OBJECTID', 'NAAM', 'PEIL', 'MUTATIE']
+    assert data['fields'][0]['type'] == 'esriFieldTypeOID'
+    assert data['features'][0]['attributes'] == {
+        'OBJECTID': 1, 'NAAM': 'Gemaal "De Blauwe" é', 'PEIL': -0.6, 'MUTATIE': 1700000000000}
+    assert data['features'][2]['attributes']['MUTATIE'] == -5
+    assert 'geometry' not in data['features'][2]
+    for (_, parts), feature in zip(points[:2], data['features']):
+        x, y = parts[0][0]
+        assert abs(feature['geometry']['x'] - x) < 1e-6 and abs(feature['geometry']['y'] - y) < 1e-6
+    print("✓ Punten, attributen (string, double, sint64) en ontbrekende geometrie correct")
+
+    # Punten hebben geen veld 7 (proto3 standaardwaarde); een tabel zonder geometrie stuurt 127
+    table = decode_feature_collection(feature_collection(127, [('OBJECTID', 6)], [((5,), None)], scale, translate))
+    assert table['geometryType'] is None and table['features'] == [{'attributes': {'OBJECTID': 5}}]
+    print("✓ Ontbrekend geometrie type is een puntlaag, 127 een tabel")
+
+    outer = [(90000.0, 460000.0), (91000.0, 460000.0), (91000.0, 461000.0), (90000.0, 460000.0)]
+    hole = [(90200.0, 460100.0), (90300.0, 460100.0), (90300.0, 460200.0), (90200.0, 460100.0)]
+    data = decode_feature_collection(feature_collection(
+        3, [('OBJECTID', 6)], [((7,), [outer, hole])], (0.5, 0.5), translate))
+    rings = data['features'][0]['geometry']['rings']
+    assert data['geometryType'] == 'esriGeometryPolygon'
+    assert rings == [[list(v) for v in outer], [list(v) for v in hole]], "Deltas beginnen per ring opnieuw"
+    print("✓ Polygoon met gat: deltas per ring, upperLeft y-as")
+
+    # float32 waarden komen terug als kortste representatie
+    single = field_bytes(2, field_bytes(1, field_bytes(13, field_bytes(1, b'V') + field_varint(2, 2))
+                                        + field_bytes(15, field_bytes(1, field_float(2, 0.1)))))
+    assert decode_feature_collection(single)['features'][0]['attributes'] == {'V': 0.1}
+    print("✓ float32 attribuut")
+    print()
+
+
+def test_count_ids_and_errors():
+    """Test count/ids resultaten, JSON foutmeldingen en ongeldige payloads"""
+    print("=" * 70)
+    print("Test 2: Count, ids en foutafhandeling")
+    print("=" * 70)
+
+    assert decode_feature_collection(field_bytes(2, field_bytes(2, field_varint(1, 4321)))) == {'count': 4321}
+    ids = field_bytes(2, field_bytes(3, field_bytes(1, b'OBJECTID') + packed(3, [5, 300, 70000])))
+    assert decode_feature_collection(ids) == {'objectIdFieldName': 'OBJECTID', 'objectIds': [5, 300, 70000]}
+    print("✓ countResult en idsResult")
+
+    error = FakeResponse(b'{"error": {"code": 400}}', 'text/plain')
+    assert parse_query_response(error) == {'error': {'code': 400}}
+    print("✓ JSON foutmelding bij f=pbf wordt als JSON gelezen")
+
+    for payload in (b'\x12\x05\x0a\x03', b'\x0f', b''):
+        try:
+            decode_feature_collection(payload)
+            assert False, f"{payload!r} moet PbfDecodeError geven"
+        except PbfDecodeError:
+            pass
+    print("✓ Ongeldige payloads geven PbfDecodeError")
+
+    assert supports_pbf({'supportedQueryFormats': 'JSON, geoJSON, PBF'})
+    assert not supports_pbf({'supportedQueryFormats': 'JSON, AMF'})
+    assert not supports_pbf(None)
+    print("✓ supportedQueryFormats detectie")
+    print()
+
+
+def test_fallback_to_json():
+    """Test dat make_request bij een onleesbare pbf response f=json opvraagt"""
+    print("=" * 70)
+    print("Test 3: Terugval op f=json")
+    print("=" * 70)
+
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params['f'])
+        if params['f'] == 'pbf':
+            return FakeResponse(b'\x12\xff\xff')
+        return FakeResponse(b'{"features": []}', 'application/json')
+
+    original = update_dynamische_data.requests.get
+    update_dynamische_data.requests.get = fake_get
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            updater = DynamicDataUpdater('http://pbf-test/arcgis/rest/services', tmp)
+            data = updater.make_request('http://pbf-test/arcgis/rest/services/X/MapServer/0/query',
+                                        {'where': '1=1', 'f': 'pbf'})
+    finally:
+        update_dynamische_data.requests.get = original
+
+    assert data == {'features': []}
+    assert calls == ['pbf', 'json']
+    print("✓ Decode fout: dezelfde query opnieuw met f=json")
+    print()
+
+
+if __name__ == "__main__":
+    test_decode_features()
+    test_count_ids_and_errors()
+    test_fallback_to_json()
+    print("Alle tests geslaagd!")
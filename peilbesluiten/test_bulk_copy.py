@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Binary COPY Encoders
+========================================
+
+Test de EWKB en PGCOPY encoders uit db/bulk_copy.py op byte niveau, zonder
+database: EWKB van een punt en een multipolygon (met SRID en Z) tegen de
+hex die PostGIS voor dezelfde geometrie geeft (ST_AsEWKB), en de opbouw van
+een PGCOPY bestand (signature, header, rijen met NULLs, trailer).
+"""
+
+import struct
+import sys
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'db'))
+from bulk_copy import (PGCOPY_SIGNATURE, ENCODERS, encode_row, geojson_to_ewkb,  # noqa: E402
+                       iter_pgcopy)
+
+
+def test_ewkb():
+    """Test EWKB tegen bekende PostGIS output"""
+    print("=" * 70)
+    print("Test 1: EWKB")
+    print("=" * 70)
+
+    # SELECT ST_AsEWKB('SRID=28992;POINT Z (1 2 3)')
+    point = geojson_to_ewkb({'type': 'Point', 'coordinates': [1, 2, 3]}, srid=28992, force_multi=False)
+    assert point.hex() == ('01' '010000a0' '40710000'
+                           '000000000000f03f' '0000000000000040' '0000000000000840')
+    print("✓ POINT Z met SRID 28992")
+
+    # SELECT ST_AsEWKB('SRID=4326;MULTIPOLYGON(((0 0,1 0,1 1,0 0)))')
+    polygon = {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 0], [1, 1], [0, 0]]]}
+    assert geojson_to_ewkb(polygon).hex() == (
+        '01' '06000020' 'e6100000' '01000000'           # MultiPolygon, SRID 4326, 1 polygoon
+        '01' '03000000' '01000000' '04000000'           # Polygon zonder SRID, 1 ring, 4 punten
+        '0000000000000000' '0000000000000000'
+        '000000000000f03f' '0000000000000000'
+        '000000000000f03f' '000000000000f03f'
+        '0000000000000000' '0000000000000000')
+    print("✓ Polygon wordt MULTIPOLYGON met SRID 4326")
+
+    # SELECT ST_AsEWKB('SRID=28992;MULTIPOLYGON Z (((0 0 5,1 0 5,1 1 5,0 0 5)),((2 2 0,3 2 0,3 3 0,2 2 0)))')
+    multipolygon = {'type': 'MultiPolygon', 'coordinates': [
+        [[[0, 0, 5], [1, 0, 5], [1, 1, 5], [0, 0, 5]]],
+        [[[2, 2, 0], [3, 2, 0], [3, 3, 0], [2, 2, 0]]],
+    ]}
+    ewkb = geojson_to_ewkb(multipolygon, srid=28992)
+    assert ewkb[:13].hex() == '01' '060000a0' '40710000' '02000000'
+    assert ewkb[13:26].hex() == '01' '03000080' '01000000' '04000000'  # Z vlag, geen SRID op onderdelen
+    first_ring = struct.unpack('<12d', ewkb[26:26 + 96])
+    assert first_ring == (0, 0, 5, 1, 0, 5, 1, 1, 5, 0, 0, 5)
+    assert len(ewkb) == 13 + 2 * (13 + 4 * 3 * 8)
+    print(f"✓ MULTIPOLYGON Z met twee delen ({len(ewkb)} bytes)")
+    print()
+
+
+def test_pgcopy_layout():
+    """Test signature, header, rijen met NULLs en de trailer"""
+    print("=" * 70)
+    print("Test 2: PGCOPY opbouw")
+    print("=" * 70)
+
+    types = ['int4', 'text', 'float8', 'timestamp', 'date', 'uuid', 'bool', 'geometry']
+    globalid = uuid.UUID('12345678-1234-5678-1234-567812345678')
+    rows = [
+        (7, 'Gemaal', 1.5, datetime(2000, 1, 1, 0, 0, 1), date(2000, 1, 2), str(globalid), True,
+         {'type': 'Point', 'coordinates': [1, 2]}),
+        (None, '', '', None, None, None, None, None),
+    ]
+    data = b''.join(iter_pgcopy(rows, types))
+
+    assert PGCOPY_SIGNATURE == b'PGCOPY\n\xff\r\n\x00'
+    assert data[:11] == PGCOPY_SIGNATURE and data[11:19] == b'\x00' * 8  # flags en extensie lengte
+    assert data[-2:] == b'\xff\xff'
+    print("✓ Signature, lege header extensie en trailer -1")
+
+    offset = 19
+    fields = []
+    for _ in rows:
+        count, = struct.unpack_from('>h', data, offset)
+        assert count == len(types)
+        offset += 2
+        row = []
+        for _ in range(count):
+            length, = struct.unpack_from('>i', data, offset)
+            offset += 4
+            row.append(None if length == -1 else data[offset:offset + length])
+            offset += max(length, 0)
+        fields.append(row)
+    assert offset == len(data) - 2
+
+    first, second = fields
+    assert first[0] == b'\x00\x00\x00\x07' and first[1] == b'Gemaal'
+    assert first[2] == struct.pack('>d', 1.5)
+    assert first[3] == struct.pack('>q', 1_000_000)  # Microseconden sinds 2000-01-01
+    assert first[4] == struct.pack('>i', 1)  # Dagen sinds 2000-01-01
+    assert first[5] == globalid.bytes and first[6] == b'\x01'
+    assert first[7] == geojson_to_ewkb({'type': 'Point', 'coordinates': [1, 2]})
+    # None is NULL; een lege string is NULL behalve in een tekstkolom
+    assert second == [None, b'', None, None, None, None, None, None]
+    print("✓ Rijen met veldlengtes, NULL (-1) en een lege tekst")
+
+    aware = datetime(2000, 1, 1, 1, 0, tzinfo=timezone(timedelta(hours=1)))
+    assert ENCODERS['timestamp'](aware) == struct.pack('>q', 0)
+    assert encode_row((None,), [ENCODERS['int8']]) == struct.pack('>hi', 1, -1)
+    print("✓ Tijdzone-bewuste timestamps worden naar UTC omgezet")
+    print()
+
+
+if __name__ == "__main__":
+    test_ewkb()
+    test_pgcopy_layout()
+    print("Alle tests geslaagd!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test Script voor het Memory-mapped Kolom Archief
+================================================
+
+Test schrijven, zero-copy range queries en het voeden van de sliding
+window processor (en de sliding window skill) vanuit het archief.
+"""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from columnar_archive import ColumnarArchive
+from segment_store import SegmentStore
+from skills.process_sliding_windows_skill import process_from_archive
+from sliding_window_processor import MultiWindowProcessor
+
+HALF_HOUR_MS = 30 * 60 * 1000
+START_MS = 1735689600000  # 2025-01-01 00:00 UTC
+
+
+def test_range_query_is_zero_copy():
+    """Test range query met binary search en views op de mmap"""
+    print("=" * 70)
+    print("Test 1: Range query")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = ColumnarArchive(Path(tmp))
+        timestamps = [START_MS + i * HALF_HOUR_MS for i in range(48 * 90)]
+        values = [float(i % 7) for i in range(len(timestamps))]
+        assert archive.write('176-036-00021', timestamps, values) == len(timestamps)
+
+        with archive.open('176-036-00021') as columns:
+            ts, vals = columns.range(START_MS + 10 * HALF_HOUR_MS, START_MS + 19 * HALF_HOUR_MS)
+            assert len(ts) == 10 and ts[0] == START_MS + 10 * HALF_HOUR_MS
+            assert list(vals[:3]) == [3.0, 4.0, 5.0]
+            # Views delen het geheugen van de mmap (geen kopie)
+            assert not ts.flags['OWNDATA'] and not ts.flags['WRITEABLE']
+            assert columns.range(0, START_MS - 1)[0].size == 0
+            print(f"✓ {columns.count} punten, bereik van {len(ts)} punten als view")
+            del ts, vals
+    print()
+
+
+def test_append_and_build_from_segments():
+    """Test opbouw vanuit de segment store en appenden van nieuwe punten"""
+    print("=" * 70)
+    print("Test 2: Opbouw uit segment store")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SegmentStore(Path(tmp) / 'segments', encoding='gorilla')
+        store.append_points('gemaal', [(START_MS + i * HALF_HOUR_MS, 1.0) for i in range(100)])
+
+        archive = ColumnarArchive(Path(tmp) / 'archief')
+        assert archive.build_from_segment_store(store) == {'gemaal': 100}
+        # Overlap wordt genegeerd, alleen nieuwe punten worden toegevoegd
+        added = archive.append('gemaal', [(START_MS + i * HALF_HOUR_MS, 2.0) for i in range(95, 110)])
+        assert added == 10
+
+        with archive.open('gemaal') as columns:
+            assert columns.count == 110
+            assert np.all(np.diff(columns.timestamps) > 0)
+
+            processor = MultiWindowProcessor([60, 180])
+            processor.add_arrays(*columns.range())
+            metrics = processor.get_all_metrics()
+            # 180 minuten venster bevat 7 punten van 30 minuten
+            assert metrics['180_min']['data_points_count'] == 7
+            assert metrics['60_min']['max_debiet'] == 2.0
+    print()
+
+
+def test_sliding_window_skill_reads_archive():
+    """Test de sliding window skill met het archief als databron"""
+    print("=" * 70)
+    print("Test 3: Sliding window skill op het archief")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = ColumnarArchive(Path(tmp))
+        timestamps = [START_MS + i * HALF_HOUR_MS for i in range(48)]
+        archive.write('gemaal', timestamps, [i * 5.0 for i in range(48)])
+
+        processor = MultiWindowProcessor([60, 180])
+        assert process_from_archive('gemaal', tmp, processor) == (48, None)
+        metrics = processor.get_all_metrics()
+        assert metrics['180_min']['trend']['direction'] == 'increasing'
+        assert metrics['60_min']['max_debiet'] == 235.0
+
+        count, error = process_from_archive('onbekend', tmp, MultiWindowProcessor([60]))
+        assert count == 0 and 'niet gevonden' in error
+        print(f"✓ Trend 180 min uit het archief: {metrics['180_min']['trend']['direction']}")
+    print()
+
+
+if __name__ == "__main__":
+    test_range_query_is_zero_copy()
+    test_append_and_build_from_segments()
+    test_sliding_window_skill_reads_archive()
+
+    print("=" * 70)
+    print("Alle tests voltooid!")
+    print("=" * 70)
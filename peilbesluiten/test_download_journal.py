@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test Script voor het Download Journal
+=====================================
+
+Test dat een layer download die halverwege afbreekt bij de volgende run
+verder gaat bij de eerstvolgende pagina, dat het resultaat identiek is aan
+een download in één keer en dat een afwijkend aantal features niet als
+compleet wordt opgeslagen.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from download_journal import has_journal, journal_path, part_path
+from geojson_stream import iter_features, read_member
+from test_helpers import FakeLayer, make_downloader
+
+
+class FlakyLayer(FakeLayer):
+    """FakeLayer waarvan de range die bij `fail_at` begint niet beantwoord wordt"""
+
+    def __init__(self, object_ids, fail_at=None):
+        super().__init__(object_ids)
+        self.fail_at = fail_at
+        self.range_requests = []
+
+    def _respond(self, params):
+        where = params.get('where', '')
+        if 'BETWEEN' in where:
+            if self.fail_at is not None and where.startswith(f"OBJECTID BETWEEN {self.fail_at} "):
+                return None
+            with self.lock:
+                self.range_requests.append(where)
+        return super()._respond(params)
+
+
+def test_resume_after_interrupt():
+    """Test hervatten vanaf de eerstvolgende pagina"""
+    print("=" * 70)
+    print("Test 1: Hervatten na onderbreking")
+    print("=" * 70)
+
+    ids = list(range(1, 5001))
+    with tempfile.TemporaryDirectory() as tmp:
+        output_file = Path(tmp) / 'Gemaal' / 'Gemaal_layer0.geojson'
+
+        layer = FlakyLayer(ids, fail_at=2001)
+        assert make_downloader(tmp, layer).download_features('Gemaal/MapServer', 0, 'Gemaal', output_file) == 0
+        assert not output_file.exists()
+        assert has_journal(output_file) and part_path(output_file).exists()
+        journal = json.loads(journal_path(output_file).read_text(encoding='utf-8'))
+        done_first = [f"OBJECTID BETWEEN {lo} AND {hi}"
+                      for lo, hi in journal['plan']['ranges'][:journal['pages_done']]]
+        assert len(done_first) == 2 and journal['features'] == 2000
+        print(f"✓ Onderbroken na {len(done_first)} ranges op volgorde, journal en .part bewaard")
+
+        # Nieuwe run: resume mag het bestand niet als compleet zien
+        downloader = make_downloader(tmp, FlakyLayer(ids))
+        assert str(output_file) not in downloader.downloaded_files
+        layer = FlakyLayer(ids)
+        downloader.make_request = lambda url, params=None, **_: layer(url, params or {})
+        assert downloader.download_features('Gemaal/MapServer', 0, 'Gemaal', output_file) == len(ids)
+
+        assert not any(where in layer.range_requests for where in done_first), \
+            "Afgeronde ranges mogen niet opnieuw opgehaald worden"
+        assert not any(r.get('returnIdsOnly') for r in layer.requests), "Plan komt uit het journal"
+        assert [f['properties']['OBJECTID'] for f in iter_features(output_file)] == ids
+        assert read_member(output_file, 'metadata')['feature_count'] == len(ids)
+        assert not journal_path(output_file).exists() and not part_path(output_file).exists()
+        print(f"✓ Hervat met {len(layer.range_requests)} ranges, resultaat compleet en in volgorde")
+    print()
+
+
+def test_count_mismatch_not_marked_complete():
+    """Test dat een afwijkend aantal features (returnCountOnly) niet als compleet geldt"""
+    print("=" * 70)
+    print("Test 2: Controle met returnCountOnly")
+    print("=" * 70)
+
+    ids = list(range(1, 1501))
+    with tempfile.TemporaryDirectory() as tmp:
+        output_file = Path(tmp) / 'Stuw' / 'Stuw_layer0.geojson'
+        layer = FakeLayer(ids)
+        original = layer._respond
+        layer._respond = lambda params: {'count': len(ids) + 7} if params.get('returnCountOnly') else original(params)
+
+        assert make_downloader(tmp, layer).download_features('Stuw/MapServer', 0, 'Stuw', output_file) == 0
+        assert not output_file.exists()
+        assert not has_journal(output_file) and not part_path(output_file).exists()
+        print("✓ Afwijkend aantal: geen bestand, journal opgeruimd voor een volledige nieuwe download")
+    print()
+
+
+if __name__ == "__main__":
+    test_resume_after_interrupt()
+    test_count_mismatch_not_marked_complete()
+    print("Alle tests geslaagd!")
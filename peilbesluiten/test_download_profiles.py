@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Download Profielen
+======================================
+
+Test dat vlaklagen van services in LAYER_PROFILES naast het bestand op volle
+precisie ook als gegeneraliseerde kopieën worden gedownload, met de juiste
+query parameters per profiel, en dat puntlagen en andere services alleen
+op volle precisie komen.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from download_profiles import (is_profile_file, profile_params, profile_path, profiles_for, to_degrees,
+                               wgs84_extent)
+from download_rijnland_layers import ArcGISDownloader
+from geojson_stream import read_member
+from test_helpers import FakeLayer, FakeResponse, make_downloader
+
+EXTENT = {'xmin': 80000, 'ymin': 440000, 'xmax': 120000, 'ymax': 480000, 'spatialReference': {'wkid': 28992}}
+
+
+class FakeMapServer(FakeLayer):
+    """FakeLayer met service info (één layer van het opgegeven geometrie type)"""
+
+    def __init__(self, object_ids, geometry_type, formats='JSON'):
+        super().__init__(object_ids)
+        self.geometry_type = geometry_type
+        self.formats = formats
+
+    def __call__(self, url, params):
+        if not url.endswith('/query'):
+            return {'layers': [{'id': 0, 'name': 'Peilgebied', 'geometryType': self.geometry_type}],
+                    'fullExtent': EXTENT, 'supportedQueryFormats': self.formats}
+        return super().__call__(url, params)
+
+
+def test_profile_helpers():
+    """Test profielselectie, bestandsnamen en query parameters"""
+    print("=" * 70)
+    print("Test 1: Profielen, paden en parameters")
+    print("=" * 70)
+
+    assert profiles_for('Peilgebied_vigerend_besluit', 'esriGeometryPolygon') == ['hoog', 'midden', 'laag']
+    assert profiles_for('Watergang_as', 'esriGeometryPolyline') == ['hoog', 'midden', 'laag']
+    assert profiles_for('Peilgebied_vigerend_besluit', 'esriGeometryPoint') == []
+    assert profiles_for('Gemaal', 'esriGeometryPolygon') == []
+    print("✓ Alleen lijn- en vlaklagen van geconfigureerde services")
+
+    path = Path('rijnland_kaartlagen/Peilgebied/Peilgebied_layer0.geojson')
+    assert profile_path(path, 'laag') == path.with_name('Peilgebied_layer0.laag.geojson')
+    assert is_profile_file(profile_path(path, 'laag'))
+    assert not is_profile_file(path)
+    assert not is_profile_file(Path('Peil.v2_layer0.geojson'))
+    print("✓ Profielkopie naast het bestand, herkenbaar voor de importer")
+
+    # Server rekent in graden (outSR=4326): 10 m ≈ 9e-5°, 1 m precisie = 5 decimalen
+    assert profile_params('laag') == {'maxAllowableOffset': to_degrees(10.0), 'geometryPrecision': 5}
+    assert abs(to_degrees(10.0) - 8.98e-5) < 1e-7
+    assert profile_params('hoog')['geometryPrecision'] == 6
+    params = profile_params('hoog', 'pbf', EXTENT)
+    quantization = json.loads(params['quantizationParameters'])
+    assert params['maxAllowableOffset'] == to_degrees(0.5) and 'geometryPrecision' not in params
+    assert quantization['tolerance'] == to_degrees(0.5)
+    assert 'quantizationParameters' not in profile_params('hoog', 'pbf', None)
+    print("✓ geometryPrecision bij f=json, quantizationParameters bij f=pbf")
+
+    # Quantization extent in WGS84 rond het RD New beheergebied
+    extent = quantization['extent']
+    assert extent['spatialReference'] == {'wkid': 4326}
+    assert 4.1 < extent['xmin'] < 4.5 < 4.7 < extent['xmax'] < 4.9
+    assert 51.9 < extent['ymin'] < 52.0 < 52.3 < extent['ymax'] < 52.4
+    assert wgs84_extent(extent) is extent
+    print("✓ Quantization extent omgerekend naar WGS84")
+    print()
+
+
+def test_download_with_profiles():
+    """Test dat een service alle profielkopieën downloadt en resume ze overslaat"""
+    print("=" * 70)
+    print("Test 2: Download met profielen")
+    print("=" * 70)
+
+    service = {'name': 'Peilgebied_vigerend_besluit', 'type': 'MapServer', 'path': 'Peilgebied_vigerend_besluit'}
+    ids = list(range(1, 1501))
+    with tempfile.TemporaryDirectory() as tmp:
+        layer = FakeMapServer(ids, 'esriGeometryPolygon', formats='JSON, PBF')
+        downloader = make_downloader(tmp, layer)
+        assert downloader.process_service(service) == len(ids), "Alleen volle precisie telt mee"
+
+        folder = Path(tmp) / 'Peilgebied_vigerend_besluit'
+        assert sorted(p.name for p in folder.iterdir()) == [
+            'Peilgebied_layer0.geojson', 'Peilgebied_layer0.hoog.geojson',
+            'Peilgebied_layer0.laag.geojson', 'Peilgebied_layer0.midden.geojson']
+        assert downloader.stats['layers_downloaded'] == 4
+
+        full = read_member(folder / 'Peilgebied_layer0.geojson', 'metadata')
+        laag = read_member(folder / 'Peilgebied_layer0.laag.geojson', 'metadata')
+        assert full['profile'] is None and full['profile_params'] == {}
+        assert laag['profile'] == 'laag' and laag['feature_count'] == len(ids)
+        assert laag['profile_params']['maxAllowableOffset'] == to_degrees(10.0)
+
+        pages = [r for r in layer.requests if 'OBJECTID BETWEEN' in r.get('where', '')]
+        assert {r.get('maxAllowableOffset') for r in pages} == {None, *map(to_degrees, (0.5, 2.5, 10.0))}
+        assert all(r['outSR'] == 4326 for r in pages)
+        assert all(r['f'] == 'pbf' for r in pages)
+        assert all('quantizationParameters' in r for r in pages if r.get('maxAllowableOffset'))
+        print("✓ Volle precisie en drie profielen gedownload met eigen parameters")
+
+        # Tweede run: alles al aanwezig
+        downloader = make_downloader(tmp, layer)
+        assert downloader.process_service(service) == 0
+        assert downloader.stats['layers_skipped'] == 4
+        print("✓ Resume slaat ook profielkopieën over")
+
+        # Puntlaag: geen profielen
+        points = FakeMapServer(ids, 'esriGeometryPoint')
+        make_downloader(tmp, points).process_service({**service, 'name': 'Peilgebied_punten', 'path': 'Peilgebied_punten'})
+        assert [p.name for p in (Path(tmp) / 'Peilgebied_punten').iterdir()] == ['Peilgebied_layer0.geojson']
+        print("✓ Puntlaag alleen op volle precisie")
+    print()
+
+
+class FakeSession:
+    """requests.Session met een onleesbare f=pbf response en f=json van de FakeLayer"""
+
+    def __init__(self, layer):
+        self.layer = layer
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(dict(params))
+        if params['f'] == 'pbf':
+            return FakeResponse(b'\x12\xff\xff')
+        return FakeResponse(json.dumps(self.layer(url, params)).encode('utf-8'), 'application/json')
+
+
+def test_pbf_fallback_uses_json_profile():
+    """Test dat de f=json terugval de json parameters van het profiel gebruikt"""
+    print("=" * 70)
+    print("Test 3: Terugval op f=json met profiel")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session = FakeSession(FakeLayer(range(1, 11)))
+        downloader = ArcGISDownloader('http://pbf-test/arcgis/rest/services', tmp, resume=False)
+        downloader._session = lambda: session
+        output_file = Path(tmp) / 'Peilgebied_layer0.laag.geojson'
+        assert downloader.download_features('Peilgebied/MapServer', 0, 'Peilgebied', output_file,
+                                            query_format='pbf', profile='laag', extent=EXTENT) == 10
+
+        pages = [c for c in session.calls if 'BETWEEN' in c.get('where', '')]
+        assert [c['f'] for c in pages] == ['pbf', 'json']
+        fallback = pages[1]
+        assert 'quantizationParameters' not in fallback
+        assert fallback['geometryPrecision'] == profile_params('laag')['geometryPrecision']
+        assert fallback['maxAllowableOffset'] == to_degrees(10.0) and fallback['outSR'] == 4326
+        print("✓ Terugval zonder quantizationParameters, met geometryPrecision van het profiel")
+    print()
+
+
+if __name__ == "__main__":
+    test_profile_helpers()
+    test_download_with_profiles()
+    test_pbf_fallback_uses_json_profile()
+    print("Alle tests geslaagd!")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Test Script voor FlatGeobuf
+===========================
+
+Test het schrijven en teruglezen van punten en polygonen (met gaten en
+meerdere buitenringen) met attributen, dat een bbox query via de packed
+Hilbert R-tree dezelfde features geeft als een brute-force filter, en dat
+een lezer over HTTP alleen de benodigde byte ranges ophaalt (ook met een
+block cache kleiner dan het bestand en servers die Range negeren).
+"""
+
+import random
+import tempfile
+from pathlib import Path
+
+import flatgeobuf
+from flatgeobuf import (DATETIME, DOUBLE, INDEX_NODE_SIZE, LONG, MAGIC, NODE_ITEM_SIZE, STRING,
+                        FlatGeobufReader, columns_from_fields, convert_geojson, flatgeobuf_path,
+                        index_size, write_flatgeobuf)
+from test_helpers import FakeLayer, make_downloader, square, write_layer
+
+FIELDS = [
+    {'name': 'OBJECTID', 'type': 'esriFieldTypeOID', 'alias': 'OBJECTID'},
+    {'name': 'NAAM', 'type': 'esriFieldTypeString', 'alias': 'Naam'},
+    {'name': 'PEIL', 'type': 'esriFieldTypeDouble', 'alias': 'Peil (m NAP)'},
+    {'name': 'DATUM', 'type': 'esriFieldTypeDate', 'alias': 'Datum'},
+    {'name': 'Shape', 'type': 'esriFieldTypeGeometry'},
+]
+
+
+def point_features(count, seed=1):
+    rng = random.Random(seed)
+    return [{
+        'attributes': {'OBJECTID': i, 'NAAM': f"Gemaal {i}", 'PEIL': round(rng.uniform(-6, 1), 2),
+                       'DATUM': 1700000000000 + i * 1000 if i % 3 else None},
+        'geometry': {'x': rng.uniform(80000, 120000), 'y': rng.uniform(440000, 480000)}
+    } for i in range(1, count + 1)]
+
+
+def brute_force(features, bbox):
+    min_x, min_y, max_x, max_y = bbox
+    return {f['attributes']['OBJECTID'] for f in features
+            if min_x <= f['geometry']['x'] <= max_x and min_y <= f['geometry']['y'] <= max_y}
+
+
+def test_roundtrip():
+    """Test punten en polygonen met attributen heen en terug"""
+    print("=" * 70)
+    print("Test 1: Schrijven en teruglezen")
+    print("=" * 70)
+
+    columns = columns_from_fields(FIELDS)
+    assert [c['name'] for c in columns] == ['OBJECTID', 'NAAM', 'PEIL', 'DATUM']
+    assert [c['type'] for c in columns] == [LONG, STRING, DOUBLE, DATETIME]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'punten.fgb'
+        features = point_features(50)
+        assert write_flatgeobuf(path, features, columns, 'esriGeometryPoint', srid=28992, name='Gemaal') == 50
+        data = path.read_bytes()
+        assert data[:8] == MAGIC
+
+        with FlatGeobufReader(path) as reader:
+            assert reader.name == 'Gemaal' and reader.srid == 28992 and reader.features_count == 50
+            assert reader.index_node_size == INDEX_NODE_SIZE
+            assert reader.features_offset - reader.index_offset == index_size(50, INDEX_NODE_SIZE)
+            assert index_size(50, INDEX_NODE_SIZE) == (50 + 4 + 1) * NODE_ITEM_SIZE
+            read = {f['attributes']['OBJECTID']: f for f in reader.features()}
+        assert sorted(read) == list(range(1, 51))
+        original = features[6]
+        copy = read[7]
+        assert copy['geometry'] == original['geometry']
+        assert copy['attributes']['NAAM'] == 'Gemaal 7' and copy['attributes']['PEIL'] == original['attributes']['PEIL']
+        assert copy['attributes']['DATUM'] == '2023-11-14T22:13:27Z'
+        assert read[3]['attributes']['DATUM'] is None
+        print(f"✓ 50 punten met attributen en datums ({len(data):,} bytes)")
+
+        polygons = [
+            {'attributes': {'OBJECTID': 1, 'NAAM': 'Met gat'},
+             'geometry': {'rings': [square(0, 0, 10), square(2, 2, 2, clockwise=False)]}},
+            {'attributes': {'OBJECTID': 2, 'NAAM': 'Twee delen'},
+             'geometry': {'rings': [square(20, 0, 5), square(30, 0, 5), square(31, 1, 1, clockwise=False)]}},
+            {'attributes': {'OBJECTID': 3, 'NAAM': None}},
+        ]
+        path = Path(tmp) / 'vlakken.fgb'
+        write_flatgeobuf(path, polygons, columns[:2], 'esriGeometryPolygon')
+        with FlatGeobufReader(path) as reader:
+            read = {f['attributes']['OBJECTID']: f for f in reader.features()}
+            assert reader.envelope == (0.0, 0.0, 35.0, 10.0)
+            assert [f['attributes']['OBJECTID'] for f in reader.features(bbox=(19, -1, 40, 1))] == [2]
+        for polygon in polygons[:2]:
+            assert read[polygon['attributes']['OBJECTID']]['geometry'] == polygon['geometry']
+        assert 'geometry' not in read[3] and read[3]['attributes']['NAAM'] is None
+        print("✓ Polygonen met gaten, meerdere delen en een feature zonder geometrie")
+    print()
+
+
+def test_bbox_query():
+    """Test dat de bbox query via de index gelijk is aan brute force"""
+    print("=" * 70)
+    print("Test 2: Bbox query via de R-tree")
+    print("=" * 70)
+
+    features = point_features(2000, seed=7)
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'punten.fgb'
+        write_flatgeobuf(path, features, columns_from_fields(FIELDS), 'esriGeometryPoint')
+        with FlatGeobufReader(path) as reader:
+            for _ in range(20):
+                x, y = rng.uniform(80000, 115000), rng.uniform(440000, 475000)
+                bbox = (x, y, x + rng.uniform(100, 5000), y + rng.uniform(100, 5000))
+                found = [f['attributes']['OBJECTID'] for f in reader.features(bbox=bbox)]
+                assert len(found) == len(set(found))
+                assert set(found) == brute_force(features, bbox)
+            assert list(reader.features(bbox=(0, 0, 1, 1))) == []
+        print("✓ 20 willekeurige bboxen gelijk aan brute force")
+    print()
+
+
+class RangeSession:
+    """requests.Session die een bestand met Range responses (206) serveert"""
+
+    class Response:
+        def __init__(self, content):
+            self.content = content
+            self.status_code = 206
+
+        def raise_for_status(self):
+            pass
+
+    def __init__(self, data, supports_ranges=True):
+        self.data = data
+        self.supports_ranges = supports_ranges
+        self.ranges = []
+
+    def get(self, url, headers=None, timeout=None):
+        start, end = (int(v) for v in headers['Range'][len('bytes='):].split('-'))
+        self.ranges.append((start, end))
+        if not self.supports_ranges:
+            response = self.Response(self.data)
+            response.status_code = 200
+            return response
+        return self.Response(self.data[start:end + 1])
+
+
+def test_http_range_reads():
+    """Test een bbox query over HTTP met alleen range requests"""
+    print("=" * 70)
+    print("Test 3: Lezen over HTTP met range requests")
+    print("=" * 70)
+
+    features = point_features(5000, seed=11)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'punten.fgb'
+        write_flatgeobuf(path, features, columns_from_fields(FIELDS), 'esriGeometryPoint')
+        data = path.read_bytes()
+
+    session = RangeSession(data)
+    bbox = (95000, 455000, 96000, 456000)
+    with FlatGeobufReader('http://fgb-test/kaartlagen/punten.fgb', session=session) as reader:
+        found = {f['attributes']['OBJECTID'] for f in reader.features(bbox=bbox)}
+        fetched = reader._source.bytes_fetched
+    assert found == brute_force(features, bbox) and found
+    assert fetched < len(data) / 2, f"{fetched} van {len(data)} bytes opgehaald"
+    assert len(session.ranges) <= 4
+    print(f"✓ {len(found)} features met {len(session.ranges)} range requests, "
+          f"{fetched:,} van {len(data):,} bytes")
+    print()
+
+
+def test_http_small_block_cache():
+    """Test lezen met een kleine block cache, met en zonder Range ondersteuning"""
+    print("=" * 70)
+    print("Test 4: Block cache kleiner dan het bestand")
+    print("=" * 70)
+
+    features = point_features(2000, seed=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'punten.fgb'
+        write_flatgeobuf(path, features, columns_from_fields(FIELDS), 'esriGeometryPoint')
+        data = path.read_bytes()
+
+    bbox = (95000, 455000, 96000, 456000)
+    max_cached = flatgeobuf.MAX_CACHED_BLOCKS
+    flatgeobuf.MAX_CACHED_BLOCKS = 1  # Het bestand beslaat meerdere blocks
+    try:
+        for supports_ranges in (True, False):
+            session = RangeSession(data, supports_ranges)
+            with FlatGeobufReader('http://fgb-test/kaartlagen/punten.fgb', session=session) as reader:
+                reader._source.block_size = 4096
+                reader._source.blocks.clear()
+                found = {f['attributes']['OBJECTID'] for f in reader.features(bbox=bbox)}
+                assert len(reader._source.blocks) <= 1
+            assert found == brute_force(features, bbox) and found
+            print(f"✓ Range {'ondersteund' if supports_ranges else 'genegeerd (200)'}: "
+                  f"{len(found)} features met {len(session.ranges)} requests")
+    finally:
+        flatgeobuf.MAX_CACHED_BLOCKS = max_cached
+    print()
+
+
+def test_convert_download():
+    """Test de FlatGeobuf kopie naast een gedownload laagbestand"""
+    print("=" * 70)
+    print("Test 4: FlatGeobuf bij downloaden en converteren")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = make_downloader(tmp, FakeLayer(list(range(1, 1201))))
+        downloader.flatgeobuf = True
+        output_file = Path(tmp) / 'Gemaal' / 'Gemaal_layer0.geojson'
+        assert downloader.download_features('Gemaal/MapServer', 0, 'Gemaal', output_file) == 1200
+        with FlatGeobufReader(flatgeobuf_path(output_file)) as reader:
+            assert reader.features_count == 1200 and reader.metadata['layer_id'] == 0
+            ids = sorted(f['attributes']['OBJECTID'] for f in reader.features(bbox=(100, -1, 199, 1)))
+        assert ids == list(range(100, 200))
+        print("✓ Download schrijft een .fgb met kolommen afgeleid uit de attributen")
+
+        geojson = Path(tmp) / 'los.geojson'
+        write_layer(geojson, point_features(10), {'wkid': 102100, 'latestWkid': 3857},
+                    fields=FIELDS, geometry_type='esriGeometryPoint')
+        with FlatGeobufReader(convert_geojson(geojson)) as reader:
+            assert reader.srid == 3857 and [c['title'] for c in reader.columns][2] == 'Peil (m NAP)'
+        print("✓ convert_geojson gebruikt veld metadata en spatial reference uit de trailer")
+    print()
+
+
+if __name__ == "__main__":
+    test_roundtrip()
+    test_bbox_query()
+    test_http_range_reads()
+    test_http_small_block_cache()
+    test_convert_download()
+    print("Alle tests geslaagd!")
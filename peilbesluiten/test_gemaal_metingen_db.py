@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Bulk Ingest van Gemaal Metingen
+===================================================
+
+Test dat iter_segment_rows alleen tijdreekspunten uit de segment store levert
+(geen records) en dat GemaalMetingenWriter in batches naar staging kopieert,
+de maandpartities één keer aanmaakt en via de merge dedupliceert. De database
+is een connectie die COPY, de staging tabel en de merge in het geheugen nabootst.
+"""
+
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from gemaal_metingen_db import MERGE_SQL, STAGING_DDL, GemaalMetingenWriter, iter_segment_rows
+from segment_store import SegmentStore
+
+HALF_HOUR_MS = 30 * 60 * 1000
+START_MS = 1738360800000  # 2025-01-31 22:00 UTC
+
+
+class FakeCursor:
+    """Cursor die staging, partities en de merge van gemaal_metingen nabootst"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(sql)
+        if sql == STAGING_DDL:
+            self.conn.staging_created += 1
+        elif 'ensure_gemaal_metingen_partition' in sql:
+            self.conn.partitions.append(params[0])
+        elif sql == MERGE_SQL:
+            staged = {}
+            for code, ts_ms, debiet in self.conn.staging:
+                staged.setdefault((code, ts_ms), debiet)  # DISTINCT ON: eerste per (gemaal, ts)
+            self.rowcount = 0
+            for key, debiet in staged.items():
+                if key not in self.conn.table or self.conn.table[key] != debiet:
+                    self.conn.table[key] = debiet
+                    self.rowcount += 1
+        else:
+            raise AssertionError(f"Onverwachte SQL: {sql}")
+
+    def copy_expert(self, sql, file):
+        assert sql.startswith("COPY gemaal_metingen_staging (gemaal_code, ts_ms, debiet) FROM STDIN")
+        payload = file.read().decode('utf-8')
+        self.conn.copies.append(payload)
+        for line in payload.splitlines():
+            code, ts_ms, debiet = line.split('\t')
+            self.conn.staging.append((code, int(ts_ms), None if debiet == '\\N' else float(debiet)))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements, self.copies, self.partitions = [], [], []
+        self.staging, self.table = [], {}
+        self.staging_created = 0
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.staging = []  # ON COMMIT DELETE ROWS
+
+
+def test_iter_segment_rows():
+    """Test dat alleen punten van stations worden geleverd, ook na een tijdstip"""
+    print("=" * 70)
+    print("Test 1: Rijen uit de segment store")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SegmentStore(Path(tmp), encoding='gorilla')
+        store.append_points('G1', [(START_MS + i * HALF_HOUR_MS, float(i)) for i in range(4)])
+        store.append_points('G2', [(START_MS, 0.5)])
+        store.append_record('G2__raw', datetime(2025, 1, 31, tzinfo=timezone.utc), {'html': '...'})
+        store.append_record('rijkswaterstaat', datetime(2025, 1, 31, tzinfo=timezone.utc), {'waterstand': 1.2})
+
+        rows = list(iter_segment_rows(store))
+        assert rows == [('G1', START_MS + i * HALF_HOUR_MS, float(i)) for i in range(4)] + [('G2', START_MS, 0.5)]
+        print(f"✓ {len(rows)} rijen, records niet meegenomen")
+
+        rows = list(iter_segment_rows(store, since={'G1': START_MS + HALF_HOUR_MS}))
+        assert rows == [('G1', START_MS + 2 * HALF_HOUR_MS, 2.0), ('G1', START_MS + 3 * HALF_HOUR_MS, 3.0),
+                        ('G2', START_MS, 0.5)]
+        print("✓ Sync levert alleen punten na de laatste timestamp in de database")
+    print()
+
+
+def test_batches_and_merge():
+    """Test COPY in batches, partities per maand en deduplicatie via de merge"""
+    print("=" * 70)
+    print("Test 2: Batches, partities en merge")
+    print("=" * 70)
+
+    conn = FakeConnection()
+    writer = GemaalMetingenWriter(conn, batch_rows=3)
+    # 31 januari 22:00 t/m 1 februari 01:00: twee maandpartities
+    rows = [('G1', START_MS + i * HALF_HOUR_MS, float(i)) for i in range(7)] + [('G1', START_MS, 9.0)]
+    rows.append(('G2', START_MS, None))
+    assert writer.write_rows(rows) == 9  # 8 nieuw, 1 bijgewerkt
+    assert writer.stats['batches'] == 3 and writer.stats['rows_copied'] == 9
+    assert conn.commits == 3 and conn.staging_created == 3
+    assert [p.strftime('%Y-%m') for p in conn.partitions] == ['2025-01', '2025-02']
+    assert conn.copies[0] == f"G1\t{START_MS}\t0.0\nG1\t{START_MS + HALF_HOUR_MS}\t1.0\nG1\t{START_MS + 2 * HALF_HOUR_MS}\t2.0\n"
+    assert conn.copies[-1].endswith(f"G2\t{START_MS}\t\\N\n")
+    # (G1, START_MS) stond in een eerdere batch: de latere waarde 9.0 overschrijft
+    assert conn.table[('G1', START_MS)] == 9.0 and conn.table[('G2', START_MS)] is None
+    print(f"✓ {writer.stats['rows_copied']} rijen in {writer.stats['batches']} batches, partities 2025-01 en 2025-02")
+
+    assert writer.write_rows(rows[1:7]) == 0
+    assert writer.write_series('G1', [{'timestamp_ms': START_MS + HALF_HOUR_MS, 'value': 1.5},
+                                      {'timestamp_ms': None, 'value': 3.0}]) == 1
+    assert len(conn.partitions) == 2, "Bekende partities worden niet opnieuw aangemaakt"
+    print("✓ Ongewijzigde rijen worden niet bijgewerkt, een gewijzigd debiet wel")
+    print()
+
+
+if __name__ == "__main__":
+    test_iter_segment_rows()
+    test_batches_and_merge()
+    print("Alle tests geslaagd!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Streaming GeoJSON Reader
+============================================
+
+Test dat features incrementeel en correct gelezen worden, ook bij kleine
+leesbuffers, extra top-level sleutels en grote features.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from geojson_stream import (_rings_to_polygons, esri_feature_to_geojson, esri_to_geojson,
+                            feature_attributes, iter_feature_chunks, iter_features, read_member)
+
+
+def make_collection(count: int) -> dict:
+    return {
+        'type': 'FeatureCollection',
+        'note': 'tekst met "quotes", [haken] en {accolades}',
+        'features': [{
+            'attributes': {'OBJECTID': i, 'CODE': f"176-036-{i:05d}", 'WAARDE': i * 1.25},
+            'geometry': {'x': 4.5 + i / 1000, 'y': 52.1, 'ring': [[j, j * 2] for j in range(i % 50)]}
+        } for i in range(count)],
+        'metadata': {'feature_count': count, 'layer': 'Gemaal'}
+    }
+
+
+def test_streaming_matches_json_load():
+    """Test dat de stream hetzelfde oplevert als json.load, bij elke buffergrootte"""
+    print("=" * 70)
+    print("Test 1: Streaming versus json.load")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'Gemaal_layer0.geojson'
+        collection = make_collection(300)
+        path.write_text(json.dumps(collection, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        for chunk_size in (1, 7, 64, 4096, 1 << 16):
+            features = list(iter_features(path, chunk_size=chunk_size))
+            assert features == collection['features'], f"Verschil bij chunk_size={chunk_size}"
+        print(f"✓ {len(collection['features'])} features identiek bij alle buffergroottes")
+
+        chunks = list(iter_feature_chunks(path, size=128))
+        assert [len(c) for c in chunks] == [128, 128, 44]
+        assert feature_attributes(chunks[2][-1])['CODE'] == '176-036-00299'
+        print(f"✓ Chunks: {[len(c) for c in chunks]}")
+
+        # Metadata achter de features
+        assert read_member(path, 'metadata', chunk_size=64) == collection['metadata']
+        assert read_member(path, 'ontbreekt', default={}) == {}
+        print("✓ Metadata gelezen zonder de features vast te houden")
+    print()
+
+
+def test_edge_cases():
+    """Test lege collecties, ontbrekende features en GeoJSON properties"""
+    print("=" * 70)
+    print("Test 2: Randgevallen")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'test.geojson'
+
+        path.write_text('{"features": [], "metadata": {"count": 0}}', encoding='utf-8')
+        assert list(iter_features(path)) == []
+
+        path.write_text('{"metadata": {"count": 0}, "exceededTransferLimit": false}', encoding='utf-8')
+        assert list(iter_features(path)) == []
+
+        # Getal aan het einde van de buffer mag niet halverwege afgekapt worden
+        path.write_text('{"count": 1234567890, "features": [{"properties": {"CODE": "A"}}]}', encoding='utf-8')
+        assert list(iter_features(path, chunk_size=12)) == [{'properties': {'CODE': 'A'}}]
+        assert feature_attributes({'properties': {'CODE': 'A'}}) == {'CODE': 'A'}
+
+        path.write_text('[1, 2, 3]', encoding='utf-8')
+        try:
+            list(iter_features(path))
+            assert False, "Een array op het hoogste niveau moet een ValueError geven"
+        except ValueError:
+            pass
+        print("✓ Randgevallen correct afgehandeld")
+    print()
+
+
+def test_esri_to_geojson():
+    """Test de omzetting van Esri JSON geometrieën naar GeoJSON"""
+    print("=" * 70)
+    print("Test 3: Esri JSON naar GeoJSON")
+    print("=" * 70)
+
+    # Esri: buitenringen met de klok mee, gaten tegen de klok in
+    outer = [[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]]
+    hole = [[2, 2], [4, 2], [4, 4], [2, 4], [2, 2]]
+    second = [[20, 0], [20, 5], [25, 5], [25, 0], [20, 0]]
+
+    geometry = esri_to_geojson({'rings': [outer, hole]})
+    assert geometry == {'type': 'MultiPolygon', 'coordinates': [[outer, hole]]}
+    print("✓ Polygoon met gat: gat bij de buitenring")
+
+    # Gat na de tweede buitenring in de lijst hoort toch bij de eerste (point-in-ring)
+    geometry = esri_to_geojson({'rings': [outer, second, hole]})
+    assert geometry == {'type': 'MultiPolygon', 'coordinates': [[outer, hole], [second]]}
+    assert _rings_to_polygons([second, outer]) == [[second], [outer]]
+    print("✓ Multipolygoon met twee delen")
+
+    # Alleen tegen de klok in (verkeerd georiënteerd): elke ring wordt een buitenring
+    assert _rings_to_polygons([hole]) == [[hole]]
+    # Gedegenereerde ringen (< 4 punten) vallen weg
+    assert esri_to_geojson({'rings': [[[0, 0], [1, 1], [0, 0]]]}) is None
+
+    geometry = esri_to_geojson({'paths': [[[0, 0, 1.5], [5, 5, 2.5]], [[9, 9]]]})
+    assert geometry == {'type': 'MultiLineString', 'coordinates': [[[0, 0], [5, 5]]]}
+    geometry = esri_to_geojson({'paths': [[[0, 0, 1.5], [5, 5, 2.5]]]}, dims=3)
+    assert geometry['coordinates'] == [[[0, 0, 1.5], [5, 5, 2.5]]]
+    print("✓ Paths als MultiLineString (paden met één punt vallen weg)")
+
+    point = {'x': 94000.5, 'y': 463000.25, 'z': -1.75}
+    assert esri_to_geojson(point) == {'type': 'Point', 'coordinates': [94000.5, 463000.25]}
+    assert esri_to_geojson(point, dims=3) == {'type': 'Point', 'coordinates': [94000.5, 463000.25, -1.75]}
+    assert esri_to_geojson({'x': 1, 'y': 2}, dims=3)['coordinates'] == [1, 2, 0.0]
+    assert esri_to_geojson({'x': 'NaN', 'y': 'NaN'}) is None
+    geometry = esri_to_geojson({'points': [[1, 2, 3], [4, 5, 6]]}, dims=3)
+    assert geometry == {'type': 'MultiPoint', 'coordinates': [[1, 2, 3], [4, 5, 6]]}
+    print("✓ Punten en multipunten met Z")
+
+    geojson = {'type': 'Point', 'coordinates': [4.5, 52.1]}
+    assert esri_to_geojson(geojson) is geojson
+    assert esri_to_geojson(None) is None and esri_to_geojson({}) is None
+    print("✓ GeoJSON ongewijzigd, lege geometrie wordt None")
+
+    feature = esri_feature_to_geojson({'attributes': {'CODE': 'G1'}, 'geometry': {'x': 4.5, 'y': 52.1}})
+    assert feature == {'type': 'Feature', 'geometry': geojson, 'properties': {'CODE': 'G1'}}
+    assert esri_feature_to_geojson(feature) is feature
+    assert esri_feature_to_geojson({'attributes': None, 'geometry': None})['properties'] == {}
+    print("✓ Esri features als GeoJSON Feature met properties")
+    print()
+
+
+if __name__ == "__main__":
+    test_streaming_matches_json_load()
+    test_edge_cases()
+    test_esri_to_geojson()
+    print("Alle tests geslaagd!")
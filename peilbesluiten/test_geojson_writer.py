@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Streaming FeatureCollection Writer
+======================================================
+
+Test dat features per pagina geschreven en met de streaming reader
+teruggelezen worden, en dat een afgebroken download het bestaande bestand
+onaangeroerd laat.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from geojson_stream import iter_features, read_member
+from geojson_writer import FeatureCollectionWriter
+
+
+def make_page(start: int, count: int) -> list:
+    return [{
+        'attributes': {'OBJECTID': i, 'NAAM': f"Gemaal \"{i}\" é"},
+        'geometry': {'x': 4.5 + i / 1000, 'y': 52.1}
+    } for i in range(start, start + count)]
+
+
+def test_write_and_read_back():
+    """Test schrijven per pagina en teruglezen met de streaming reader"""
+    print("=" * 70)
+    print("Test 1: Schrijven per pagina en teruglezen")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'Gemaal' / 'Gemaal_layer0.geojson'
+        pages = [make_page(i * 100, 100) for i in range(5)]
+
+        with FeatureCollectionWriter(path) as writer:
+            for page in pages:
+                writer.write_features(page)
+            assert not path.exists(), "Doelbestand mag pas na commit bestaan"
+            writer.commit({'feature_count': writer.count, 'layer_name': 'Gemaal'})
+
+        # Esri JSON pagina's worden als GeoJSON geschreven
+        expected = [{'type': 'Feature', 'properties': f['attributes'],
+                     'geometry': {'type': 'Point', 'coordinates': [f['geometry']['x'], f['geometry']['y']]}}
+                    for page in pages for f in page]
+        assert list(iter_features(path)) == expected
+        assert read_member(path, 'metadata') == {'feature_count': 500, 'layer_name': 'Gemaal'}
+        assert json.loads(path.read_text(encoding='utf-8'))['type'] == 'FeatureCollection'
+        assert sorted(p.name for p in path.parent.iterdir()) == ['Gemaal_layer0.geojson']
+        print(f"✓ {len(expected)} features en metadata trailer correct teruggelezen")
+
+        # Lege collectie is ook geldige JSON
+        empty = Path(tmp) / 'leeg.geojson'
+        with FeatureCollectionWriter(empty) as writer:
+            writer.commit()
+        assert json.loads(empty.read_text(encoding='utf-8')) == {
+            'type': 'FeatureCollection', 'features': [], 'metadata': {}}
+        print("✓ Lege FeatureCollection is geldige JSON")
+    print()
+
+
+def test_abort_keeps_existing_file():
+    """Test dat een afgebroken download geen half bestand achterlaat"""
+    print("=" * 70)
+    print("Test 2: Afbreken laat bestaand bestand intact")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'Gemaal_layer0.geojson'
+        with FeatureCollectionWriter(path) as writer:
+            writer.write_features(make_page(0, 10))
+            writer.commit({'feature_count': 10})
+        original = path.read_bytes()
+
+        try:
+            with FeatureCollectionWriter(path) as writer:
+                writer.write_features(make_page(0, 50))
+                raise RuntimeError("Verbinding verbroken op pagina 40")
+        except RuntimeError:
+            pass
+        assert path.read_bytes() == original
+        assert [p.name for p in Path(tmp).iterdir()] == ['Gemaal_layer0.geojson']
+        print("✓ Exception: bestaand bestand onaangeroerd, tijdelijk bestand opgeruimd")
+
+        # Zonder commit (bijv. geen wijzigingen) wordt ook niets vervangen
+        with FeatureCollectionWriter(path) as writer:
+            writer.write_features(make_page(0, 3))
+        assert path.read_bytes() == original
+        print("✓ Zonder commit wordt niets vervangen")
+    print()
+
+
+def test_esri_pages_as_geojson():
+    """Test dat Esri JSON pagina's als GeoJSON (properties, Multi* geometrie) in het bestand komen"""
+    print("=" * 70)
+    print("Test 3: Esri JSON pagina's als GeoJSON")
+    print("=" * 70)
+
+    outer = [[4.40, 52.10], [4.40, 52.20], [4.50, 52.20], [4.50, 52.10], [4.40, 52.10]]
+    hole = [[4.42, 52.12], [4.44, 52.12], [4.44, 52.14], [4.42, 52.14], [4.42, 52.12]]
+    geojson = {'type': 'Feature', 'properties': {'OBJECTID': 3},
+               'geometry': {'type': 'Point', 'coordinates': [4.5, 52.1]}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'Peilgebied_layer0.geojson'
+        with FeatureCollectionWriter(path) as writer:
+            writer.write_features([
+                {'attributes': {'OBJECTID': 1, 'CODE': 'PG1'}, 'geometry': {'rings': [outer, hole]}},
+                {'attributes': {'OBJECTID': 2}, 'geometry': {'paths': [outer[:2]]}},
+                geojson,
+            ])
+            assert writer.first_feature['properties'] == {'OBJECTID': 1, 'CODE': 'PG1'}
+            writer.commit({'spatial_reference': {'wkid': 4326}})
+
+        features = list(iter_features(path))
+        assert features[0] == {'type': 'Feature', 'properties': {'OBJECTID': 1, 'CODE': 'PG1'},
+                               'geometry': {'type': 'MultiPolygon', 'coordinates': [[outer, hole]]}}
+        assert features[1]['geometry'] == {'type': 'MultiLineString', 'coordinates': [outer[:2]]}
+        assert features[2] == geojson
+        assert all('attributes' not in f for f in features)
+        print("✓ Attributen als properties, rings/paths als MultiPolygon/MultiLineString, GeoJSON ongewijzigd")
+    print()
+
+
+def test_resume_restores_first_feature():
+    """Test dat een hervatte writer de eerste feature uit het tijdelijke bestand terugleest"""
+    print("=" * 70)
+    print("Test 4: Hervatten met eerste feature")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'Gemaal_layer0.geojson'
+        part = Path(tmp) / '.Gemaal_layer0.geojson.part'
+        for first_page in (1, 100):
+            writer = FeatureCollectionWriter(path, part_path=part)
+            writer.write_features(make_page(0, first_page))
+            position, count, first = writer.sync(), writer.count, writer.first_feature
+            writer.write_features(make_page(first_page, 7))  # Half geschreven pagina, niet gesynct
+            writer.detach()
+
+            # Zoals de downloader na een onderbreking (download_journal.py)
+            writer = FeatureCollectionWriter(path, part_path=part, resume_bytes=position, resume_count=count)
+            assert writer.first_feature == first and writer.first_feature['properties']['OBJECTID'] == 0
+            writer.write_features(make_page(first_page, 5))
+            writer.commit({'feature_count': writer.count})
+            ids = [f['properties']['OBJECTID'] for f in iter_features(path)]
+            assert ids == list(range(first_page + 5))
+        print("✓ first_feature na hervatten gelijk aan het origineel (ook met één feature)")
+    print()
+
+
+if __name__ == "__main__":
+    test_write_and_read_back()
+    test_abort_keeps_existing_file()
+    test_esri_pages_as_geojson()
+    test_resume_restores_first_feature()
+    print("Alle tests geslaagd!")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Gedeelde Testdata
+=================
+
+Nagebootste ArcGIS endpoints, een downloader daarop, vierkante ringen in Esri
+oriëntatie en laagbestanden zoals de downloader ze schrijft (FeatureCollectionWriter
+met metadata trailer). Gedeeld door de downloader- en kaartlaag tests; bevat
+zelf geen tests.
+"""
+
+import json
+import re
+import threading
+import time
+
+from download_rijnland_layers import ArcGISDownloader
+from geojson_writer import FeatureCollectionWriter
+from rd_new import rd_to_wgs84
+
+RD_NEW = {'wkid': 28992, 'latestWkid': 28992}
+WGS84 = {'wkid': 4326, 'latestWkid': 4326}
+
+
+class FakeLayer:
+    """Minimale ArcGIS query endpoint voor één layer"""
+
+    def __init__(self, object_ids, max_record_count=1000, supports_ids=True, delay=0.0):
+        self.object_ids = sorted(object_ids)
+        self.max_record_count = max_record_count
+        self.supports_ids = supports_ids
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url, params):
+        with self.lock:
+            self.requests.append(dict(params))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            return self._respond(params)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def _respond(self, params):
+        if params.get('returnCountOnly'):
+            return {'count': len(self.object_ids)}
+        if params.get('returnIdsOnly'):
+            if not self.supports_ids:
+                return {'error': {'code': 400, 'message': 'Not supported'}}
+            return {'objectIdFieldName': 'OBJECTID', 'objectIds': list(reversed(self.object_ids))}
+
+        ids = self.object_ids
+        match = re.search(r'OBJECTID BETWEEN (\d+) AND (\d+)', params.get('where', ''))
+        if match:
+            lo, hi = int(match.group(1)), int(match.group(2))
+            ids = [i for i in ids if lo <= i <= hi]
+        offset = int(params.get('resultOffset', 0))
+        count = min(int(params.get('resultRecordCount', self.max_record_count)), self.max_record_count)
+        page = ids[offset:offset + count]
+        return {
+            'objectIdFieldName': 'OBJECTID',
+            'spatialReference': {'wkid': params.get('outSR', 28992)},
+            'fields': [{'name': 'OBJECTID', 'type': 'esriFieldTypeOID'}],
+            'features': [{'attributes': {'OBJECTID': i}, 'geometry': {'x': i, 'y': 0}} for i in page],
+            'exceededTransferLimit': len(ids) > offset + len(page)
+        }
+
+
+class FakeResponse:
+    """requests.Response met vaste inhoud (standaard een f=pbf response)"""
+
+    def __init__(self, content: bytes, content_type: str = 'application/x-protobuf'):
+        self.content = content
+        self.headers = {'Content-Type': content_type}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def make_downloader(tmp, layer):
+    """ArcGISDownloader (resume aan) die zijn requests naar een FakeLayer stuurt"""
+    downloader = ArcGISDownloader('http://test/arcgis/rest/services', tmp, resume=True)
+    downloader.make_request = lambda url, params=None, **_: layer(url, params or {})
+    return downloader
+
+
+def square(x, y, size, clockwise=True):
+    """Gesloten vierkante ring; met de klok mee is een Esri buitenring, tegen de klok in een gat"""
+    ring = [[x, y], [x, y + size], [x + size, y + size], [x + size, y], [x, y]]
+    return ring if clockwise else ring[::-1]
+
+
+def to_wgs84(features):
+    """Esri features in RD New als WGS84, zoals de downloader ze ophaalt (outSR=4326)"""
+    def project(geometry):
+        if 'x' in geometry:
+            lon, lat = rd_to_wgs84(geometry['x'], geometry['y'])
+            return {'x': lon, 'y': lat}
+        key = 'rings' if 'rings' in geometry else 'paths'
+        return {key: [[list(rd_to_wgs84(x, y)) for x, y, *_ in part] for part in geometry[key]]}
+    return [{'attributes': f['attributes'], 'geometry': project(f['geometry'])} for f in features]
+
+
+def write_layer(path, features, spatial_reference=RD_NEW, **metadata):
+    """Schrijf een laagbestand met feature_count, object_id_field en spatial_reference in de trailer"""
+    with FeatureCollectionWriter(path) as writer:
+        writer.write_features(features)
+        writer.commit({'feature_count': writer.count, 'object_id_field': 'OBJECTID',
+                       'spatial_reference': spatial_reference, **metadata})
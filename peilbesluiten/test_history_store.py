@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de SQLite Historie Backend
+===========================================
+
+Test batch schrijven met deduplicatie, range queries, lezen tijdens een
+open schrijftransactie, het voeden van de sliding window processor en het
+sluiten van de reader connecties van alle threads.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+from history_store import HistoryStore, SQLiteHistoryStore, open_history_store
+from sliding_window_processor import MultiWindowProcessor
+
+HALF_HOUR_MS = 30 * 60 * 1000
+START_MS = 1735689600000  # 2025-01-01 00:00 UTC
+
+
+def test_batch_write_and_range():
+    """Test batch schrijven, upsert en range queries"""
+    print("=" * 70)
+    print("Test 1: Batch schrijven en range queries")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with SQLiteHistoryStore(Path(tmp) / 'historie.sqlite') as store:
+            rows = [('176-036-00021', START_MS + i * HALF_HOUR_MS, float(i)) for i in range(48)]
+            rows += [('053-036-00021', START_MS + i * HALF_HOUR_MS, 0.0) for i in range(10)]
+            assert store.write_batch(rows) == 58
+
+            # Dezelfde cyclus nogmaals: niets gewijzigd; één gecorrigeerde waarde wordt bijgewerkt
+            assert store.write_batch(rows) == 0
+            assert store.write_batch([('176-036-00021', START_MS, 9.5)]) == 1
+
+            timestamps, values = store.range('176-036-00021', START_MS, START_MS + 3 * HALF_HOUR_MS)
+            assert timestamps == [START_MS + i * HALF_HOUR_MS for i in range(4)]
+            assert values == [9.5, 1.0, 2.0, 3.0]
+            assert len(store.range('176-036-00021')[0]) == 48
+            assert store.stations() == ['053-036-00021', '176-036-00021']
+            assert store.latest_timestamps()['053-036-00021'] == START_MS + 9 * HALF_HOUR_MS
+
+            series = store.to_series_data('176-036-00021', end_ms=START_MS + HALF_HOUR_MS)
+            assert [p['status'] for p in series] == ['aan', 'aan']
+            print(f"✓ {store.stats['rows_written']} rijen in {store.stats['batches']} batches")
+    print()
+
+
+def test_read_during_write_transaction():
+    """Test dat lezers in WAL modus niet blokkeren op een open schrijftransactie"""
+    print("=" * 70)
+    print("Test 2: Lezen tijdens schrijven (WAL)")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'historie.sqlite'
+        with SQLiteHistoryStore(path) as store:
+            store.write_batch([('gemaal', START_MS, 1.0)])
+
+            # Een tweede proces houdt een schrijftransactie open
+            other = sqlite3.connect(str(path), isolation_level=None)
+            other.execute("BEGIN IMMEDIATE")
+            other.execute("INSERT INTO gemaal_metingen VALUES ('gemaal', ?, 2.0)", (START_MS + HALF_HOUR_MS,))
+
+            timestamps, _ = store.range('gemaal')
+            assert timestamps == [START_MS], "Lezer moet de laatste commit zien"
+
+            other.execute("COMMIT")
+            other.close()
+            assert len(store.range('gemaal')[0]) == 2
+            mode = store._writer.execute("PRAGMA journal_mode").fetchone()[0]
+            assert mode == 'wal'
+            print(f"✓ journal_mode={mode}, lezer zag alleen gecommitte data")
+    print()
+
+
+def test_factory_and_window_processor():
+    """Test backend keuze via environment en add_arrays op de range kolommen"""
+    print("=" * 70)
+    print("Test 3: Factory en sliding window")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['PEILBEHEER_HISTORY_DB'] = str(Path(tmp) / 'env.sqlite')
+        try:
+            store = open_history_store('sqlite')
+        finally:
+            del os.environ['PEILBEHEER_HISTORY_DB']
+
+        with store:
+            assert isinstance(store, SQLiteHistoryStore)
+            store.write_batch(('gemaal', START_MS + i * HALF_HOUR_MS, i * 5.0) for i in range(20))
+
+            processor = MultiWindowProcessor(windows_minutes=[60, 180])
+            processor.add_arrays(*store.range('gemaal'))
+            metrics = processor.get_all_metrics()
+            assert metrics['180_min']['trend']['direction'] == 'increasing'
+            print(f"✓ Trend 180 min: {metrics['180_min']['trend']['direction']}")
+
+        try:
+            open_history_store('onbekend')
+            assert False, "Onbekende backend moet een ValueError geven"
+        except ValueError:
+            pass
+    print()
+
+
+def test_close_all_readers():
+    """Test dat close() de reader connecties van alle threads sluit"""
+    print("=" * 70)
+    print("Test 4: Reader connecties sluiten")
+    print("=" * 70)
+
+    try:
+        HistoryStore()
+        assert False, "HistoryStore is abstract"
+    except TypeError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(Path(tmp) / 'historie.sqlite')
+        store.write_batch([('gemaal', START_MS, 1.0)])
+        threads = [threading.Thread(target=store.range, args=('gemaal',)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.range('gemaal')
+        readers = list(store._readers)
+        assert len(readers) == 4, "Eén reader per thread"
+
+        store.close()
+        for conn in readers:
+            try:
+                conn.execute("SELECT 1")
+                assert False, "Reader connectie moet gesloten zijn"
+            except sqlite3.ProgrammingError:
+                pass
+        print(f"✓ {len(readers)} reader connecties gesloten")
+    print()
+
+
+if __name__ == "__main__":
+    test_batch_write_and_range()
+    test_read_during_write_transaction()
+    test_factory_and_window_processor()
+    test_close_all_readers()
+    print("Alle tests geslaagd!")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test Script voor het Publiceren van Kaartlagen
+==============================================
+
+Test dat elke laag compact onder een content hash met .gz (en .br) kopie
+wordt gepubliceerd, dat het manifest naar de actuele versies wijst, dat een
+nieuwe download met dezelfde data dezelfde hash houdt en dat alleen de
+vorige publicatie bewaard blijft.
+"""
+
+import gzip
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+
+import publish_kaartlagen
+from publish_kaartlagen import MANIFEST_FILE, publish
+from test_helpers import WGS84, write_layer
+
+
+def write_gemalen(path, peil=-0.6, download_date='2026-10-18T06:00:00'):
+    write_layer(path, [
+        {'attributes': {'OBJECTID': 1, 'NAAM': 'Gemaal Leiden', 'STREEFPEIL': peil},
+         'geometry': {'x': 4.491234567891, 'y': 52.15123456789}},
+        {'attributes': {'OBJECTID': 2, 'NAAM': 'Gemaal Oost', 'STREEFPEIL': -1.2},
+         'geometry': {'x': 4.63, 'y': 52.08}},
+    ], WGS84, download_date=download_date)
+
+
+def test_publish_and_manifest():
+    """Test hashed bestanden, compressie en het manifest"""
+    print("=" * 70)
+    print("Test 1: Publiceren met manifest")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, output = Path(tmp) / 'rijnland_kaartlagen', Path(tmp) / 'public'
+        write_gemalen(source / 'Gemaal' / 'Gemaal_layer0.geojson')
+        write_gemalen(source / 'Stuw' / 'Stuw_layer0.geojson', peil=-2.0)
+        stats = publish(source, output, workers=2)
+        assert stats['layers'] == 2 and stats['published'] == 2 and stats['failed'] == 0
+
+        manifest = json.loads((output / MANIFEST_FILE).read_text(encoding='utf-8'))
+        entry = manifest['layers']['Gemaal/Gemaal_layer0']
+        assert entry['file'] == f"Gemaal/Gemaal_layer0.{entry['hash']}.geojson"
+        data = (output / entry['file']).read_bytes()
+        assert hashlib.sha256(data).hexdigest().startswith(entry['hash']) and len(data) == entry['bytes']
+        assert gzip.decompress((output / entry['gzip']).read_bytes()) == data
+        assert entry['gzip_bytes'] == (output / entry['gzip']).stat().st_size
+        assert entry['feature_count'] == 2
+        print(f"✓ Compacte kopie {entry['bytes']} bytes, gzip {entry['gzip_bytes']} bytes")
+
+        if publish_kaartlagen.brotli is not None:
+            assert publish_kaartlagen.brotli.decompress((output / entry['brotli']).read_bytes()) == data
+            print("✓ Brotli kopie")
+        else:
+            assert 'brotli' not in entry
+            print("✓ Zonder brotli package alleen gzip")
+
+        published = json.loads(data)
+        assert b'\n' not in data and b': ' not in data
+        assert published['features'][0]['geometry'] == {'type': 'Point', 'coordinates': [4.4912346, 52.1512346]}
+        assert published['features'][0]['properties']['NAAM'] == 'Gemaal Leiden'
+        assert 'download_date' not in published['metadata']
+        print("✓ Zonder witruimte, coördinaten op ~1 cm (7 decimalen), zonder download datum")
+    print()
+
+
+def test_versions():
+    """Test ongewijzigde lagen, een nieuwe download en het opruimen van oude versies"""
+    print("=" * 70)
+    print("Test 2: Versies en opruimen")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, output = Path(tmp) / 'rijnland_kaartlagen', Path(tmp) / 'public'
+        layer = source / 'Gemaal' / 'Gemaal_layer0.geojson'
+        write_gemalen(layer)
+        first = publish(source, output)
+        hash_1 = json.loads((output / MANIFEST_FILE).read_text())['layers']['Gemaal/Gemaal_layer0']['hash']
+
+        assert publish(source, output)['published'] == 0
+        write_gemalen(layer, download_date='2026-10-19T06:00:00')
+        assert publish(source, output)['published'] == 0
+        manifest = json.loads((output / MANIFEST_FILE).read_text())
+        assert manifest['layers']['Gemaal/Gemaal_layer0']['hash'] == hash_1
+        print("✓ Nieuwe download met dezelfde data houdt dezelfde hash")
+
+        write_gemalen(layer, peil=-0.7)
+        assert publish(source, output)['published'] == 1
+        hash_2 = json.loads((output / MANIFEST_FILE).read_text())['layers']['Gemaal/Gemaal_layer0']['hash']
+        assert hash_2 != hash_1
+        assert (output / 'Gemaal' / f"Gemaal_layer0.{hash_1}.geojson").exists(), "Vorige versie blijft bewaard"
+
+        write_gemalen(layer, peil=-0.8)
+        stats = publish(source, output)
+        assert stats['published'] == 1 and stats['removed_files'] >= 2
+        names = sorted(p.name for p in (output / 'Gemaal').iterdir())
+        assert not any(hash_1 in name for name in names)
+        assert any(hash_2 in name for name in names)
+        assert first['layers'] == 1
+        print("✓ Alleen de huidige en de vorige publicatie blijven staan")
+
+        layer.unlink()
+        publish(source, output)
+        assert json.loads((output / MANIFEST_FILE).read_text())['layers'] == {}
+        print("✓ Verwijderde laag verdwijnt uit het manifest")
+    print()
+
+
+if __name__ == "__main__":
+    test_publish_and_manifest()
+    test_versions()
+    print("Alle tests geslaagd!")
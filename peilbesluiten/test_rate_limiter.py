@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Token-Bucket Rate Limiter
+=============================================
+
+Test burst, bijvulling en coördinatie tussen processen via de gedeelde state.
+"""
+
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from rate_limiter import TokenBucketLimiter
+
+
+def _worker(state_dir, count):
+    limiter = TokenBucketLimiter('test-host', rate=20.0, capacity=1, state_dir=Path(state_dir))
+    for _ in range(count):
+        limiter.acquire()
+
+
+def test_burst_and_refill():
+    """Test dat een burst direct gaat en daarna op de rate wordt gewacht"""
+    print("=" * 70)
+    print("Test 1: Burst en bijvulling")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        limiter = TokenBucketLimiter('test-host', rate=20.0, capacity=2, state_dir=Path(tmp))
+
+        start = time.time()
+        limiter.acquire()
+        limiter.acquire()
+        burst_time = time.time() - start
+        assert burst_time < 0.05
+
+        for _ in range(4):
+            limiter.acquire()
+        elapsed = time.time() - start
+        # 4 extra tokens bij 20/s kosten minimaal 0.2 seconde
+        assert elapsed >= 0.19
+        print(f"Burst: {burst_time:.3f}s, totaal 6 requests: {elapsed:.3f}s, stats: {limiter.stats}")
+    print()
+
+
+def test_shared_between_processes():
+    """Test dat twee processen samen onder de limiet blijven"""
+    print("=" * 70)
+    print("Test 2: Gedeelde bucket tussen processen")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.time()
+        processes = [multiprocessing.Process(target=_worker, args=(tmp, 5)) for _ in range(2)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        elapsed = time.time() - start
+
+        # 10 tokens met burst 1 bij 20/s: minimaal 9 / 20 = 0.45 seconde
+        assert elapsed >= 0.4
+        print(f"2 processen x 5 requests: {elapsed:.3f}s")
+    print()
+
+
+if __name__ == "__main__":
+    test_burst_and_refill()
+    test_shared_between_processes()
+
+    print("=" * 70)
+    print("Alle tests voltooid!")
+    print("=" * 70)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de gedeelde Response Cache
+===========================================
+
+Test versheid, revalidatie, content-addressing en eviction zonder netwerk,
+ook met een put() die in een ander proces tegelijk loopt.
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from response_cache import ORPHAN_GRACE_SECONDS, ResponseCache, next_publish_time
+
+
+def test_publish_schedule():
+    """Test berekening van het volgende publicatiemoment (:19 en :49)"""
+    print("=" * 70)
+    print("Test 1: Publicatiemomenten")
+    print("=" * 70)
+
+    assert next_publish_time(datetime(2025, 1, 1, 10, 5), grace_seconds=0) == datetime(2025, 1, 1, 10, 19)
+    assert next_publish_time(datetime(2025, 1, 1, 10, 30), grace_seconds=0) == datetime(2025, 1, 1, 10, 49)
+    assert next_publish_time(datetime(2025, 1, 1, 23, 55), grace_seconds=0) == datetime(2025, 1, 2, 0, 19)
+    print("✓ Publicatiemomenten correct")
+    print()
+
+
+def test_hit_and_revalidation():
+    """Test cache hit, verlopen entry en 304 revalidatie"""
+    print("=" * 70)
+    print("Test 2: Hit en revalidatie")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(Path(tmp), ttl_seconds=3600, follow_publish_schedule=False)
+        cache.put('176-036-00021', b'{"series": []}', etag='"abc"', last_modified='Mon, 01 Jan 2025 10:00:00 GMT')
+
+        assert cache.get('176-036-00021') == b'{"series": []}'
+        assert cache.get('onbekend') is None
+
+        # Laat de entry verlopen en controleer conditionele headers
+        cache.ttl_seconds = -1
+        cache.put('176-036-00021', b'{"series": []}', etag='"abc"', last_modified='Mon, 01 Jan 2025 10:00:00 GMT')
+        entry = cache.get_entry('176-036-00021')
+        assert entry is not None and not entry['fresh']
+        headers = cache.conditional_headers(entry)
+        assert headers['If-None-Match'] == '"abc"'
+        assert 'If-Modified-Since' in headers
+
+        cache.ttl_seconds = 3600
+        body = cache.mark_revalidated('176-036-00021')
+        assert body == b'{"series": []}'
+        assert cache.get('176-036-00021') == body
+        print(f"Statistieken: {cache.stats}")
+    print()
+
+
+def test_content_addressing_and_eviction():
+    """Test dat identieke bodies één blob delen en eviction op grootte"""
+    print("=" * 70)
+    print("Test 3: Content-addressing en eviction")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(Path(tmp), max_bytes=2500, follow_publish_schedule=False)
+        cache.put('a', b'x' * 1000)
+        cache.put('b', b'x' * 1000)
+        assert len(list(cache.blobs_dir.iterdir())) == 1
+
+        time.sleep(0.01)
+        cache.put('c', b'y' * 1000)
+        time.sleep(0.01)
+        cache.get('a')  # 'a' recent gebruikt
+        cache.put('d', b'z' * 1000)
+
+        blob_bytes = sum(p.stat().st_size for p in cache.blobs_dir.iterdir())
+        assert blob_bytes <= 2500
+        assert cache.get('d') is not None
+        print(f"Blob bytes na eviction: {blob_bytes}, ge-evict: {cache.stats['evicted']}")
+    print()
+
+
+def test_eviction_with_concurrent_put():
+    """Test dat eviction een net geschreven blob zonder entry en kapotte entries overleeft"""
+    print("=" * 70)
+    print("Test 4: Eviction naast een put() in een ander proces")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(Path(tmp), max_bytes=1500, follow_publish_schedule=False)
+        (cache.entries_dir / 'kapot.json').write_text('{"key": "zonder body hash"}')
+
+        # Een ander proces heeft de blob net geschreven, de entry volgt nog
+        fresh = cache.blobs_dir / ('a' * 64)
+        fresh.write_bytes(b'n' * 1000)
+        stale = cache.blobs_dir / ('b' * 64)
+        stale.write_bytes(b'o' * 1000)
+        old = time.time() - ORPHAN_GRACE_SECONDS - 1
+        os.utime(stale, (old, old))
+
+        cache.put('a', b'x' * 100)
+        assert fresh.exists(), "Blob binnen de grace periode is nog geen wees"
+        assert not stale.exists(), "Oude blob zonder entry wordt opgeruimd"
+        assert cache.get('a') == b'x' * 100
+        print("✓ Verse blob zonder entry blijft staan, oude wees verdwijnt, kapotte entry overgeslagen")
+    print()
+
+
+if __name__ == "__main__":
+    test_publish_schedule()
+    test_hit_and_revalidation()
+    test_content_addressing_and_eviction()
+    test_eviction_with_concurrent_put()
+
+    print("=" * 70)
+    print("Alle tests voltooid!")
+    print("=" * 70)
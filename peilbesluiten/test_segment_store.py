@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Append-only Segment Store
+=============================================
+
+Test dat overlappende responses alleen nieuwe punten toevoegen, dat segmenten
+per dag worden gepartitioneerd en dat range reads de index gebruiken.
+"""
+
+import json
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from segment_store import SegmentStore
+from timeseries_codec import encode, iter_frames, write_frame
+
+HALF_HOUR_MS = 30 * 60 * 1000
+
+
+def _series(start_ms, count):
+    return [
+        {'timestamp_ms': start_ms + i * HALF_HOUR_MS, 'value': float(i % 3), 'status': 'aan'}
+        for i in range(count)
+    ]
+
+
+def test_append_only_new_points():
+    """Test dat overlappende polls alleen nieuwe punten opslaan"""
+    print("=" * 70)
+    print("Test 1: Alleen nieuwe punten")
+    print("=" * 70)
+
+    start_ms = int(datetime(2025, 1, 1, 20, 0, tzinfo=timezone.utc).timestamp() * 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SegmentStore(Path(tmp))
+        assert store.append_series('176-036-00021', _series(start_ms, 10)) == 10
+        # Tweede poll overlapt 8 punten en voegt er 2 toe
+        assert store.append_series('176-036-00021', _series(start_ms + 2 * HALF_HOUR_MS, 10)) == 2
+
+        index = store.load_index('176-036-00021')
+        print(f"Segmenten: {sorted(index['segments'])}")
+        # 20:00 t/m 01:30 UTC loopt over twee dagen
+        assert sorted(index['segments']) == ['2025-01-01.ndjson', '2025-01-02.ndjson']
+        assert sum(s['count'] for s in index['segments'].values()) == 12
+
+        points = list(store.read_points('176-036-00021'))
+        assert len(points) == 12
+        assert [p[0] for p in points] == sorted(p[0] for p in points)
+    print()
+
+
+def test_range_read_and_records():
+    """Test range reads en opslag van records zonder tijdreeks"""
+    print("=" * 70)
+    print("Test 2: Range reads en records")
+    print("=" * 70)
+
+    start_ms = int(datetime(2025, 1, 1, 0, 0, tzinfo=timezone.utc).timestamp() * 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SegmentStore(Path(tmp))
+        store.append_series('gemaal', _series(start_ms, 96))  # twee dagen
+
+        window = list(store.read_points('gemaal', start_ms + 10 * HALF_HOUR_MS, start_ms + 14 * HALF_HOUR_MS))
+        assert len(window) == 5
+
+        store.append_record('rijkswaterstaat', datetime.now(), {'waterstand': 1.2})
+        store.append_record('rijkswaterstaat', datetime.now(), {'waterstand': 1.3})
+        records = list(store.read_records('rijkswaterstaat'))
+        assert [r['data']['waterstand'] for r in records] == [1.2, 1.3]
+        assert store.stations() == ['gemaal'] and store.streams() == ['rijkswaterstaat']
+        assert (Path(tmp) / '_records' / 'rijkswaterstaat' / 'index.json').exists()
+        print(f"Window punten: {len(window)}, records: {len(records)}")
+    print()
+
+
+def test_gorilla_segments():
+    """Test dat gecomprimeerde segmenten dezelfde punten teruggeven"""
+    print("=" * 70)
+    print("Test 3: Gorilla segmenten")
+    print("=" * 70)
+
+    start_ms = int(datetime(2025, 1, 1, 0, 0, tzinfo=timezone.utc).timestamp() * 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = SegmentStore(Path(tmp) / 'plain')
+        packed = SegmentStore(Path(tmp) / 'packed', encoding='gorilla')
+        for offset in range(0, 96, 4):  # 24 polls met overlap
+            series = _series(start_ms + offset * HALF_HOUR_MS, 8)
+            plain.append_series('gemaal', series)
+            packed.append_series('gemaal', series)
+
+        assert list(packed.read_points('gemaal')) == list(plain.read_points('gemaal'))
+        plain_bytes = sum(s['bytes'] for s in plain.load_index('gemaal')['segments'].values())
+        packed_bytes = sum(s['bytes'] for s in packed.load_index('gemaal')['segments'].values())
+        print(f"ndjson: {plain_bytes} bytes, gorilla: {packed_bytes} bytes")
+
+        # Live poll patroon: één nieuw punt (wisselend debiet) per append
+        for i in range(96, 96 + 96):
+            point = [(start_ms + i * HALF_HOUR_MS, round(1.0 + (i % 7) * 0.137, 3))]
+            plain.append_points('live', point)
+            packed.append_points('live', point)
+        assert list(packed.read_points('live')) == list(plain.read_points('live'))
+        segments = packed.load_index('live')['segments']
+        for name, segment in segments.items():
+            path = Path(tmp) / 'packed' / 'live' / name
+            with open(path, 'rb') as f:
+                assert len(list(iter_frames(f))) == 1, "Eén blok per dag"
+            assert segment['bytes'] == path.stat().st_size
+        plain_bytes = sum(s['bytes'] for s in plain.load_index('live')['segments'].values())
+        packed_bytes = sum(s['bytes'] for s in segments.values())
+        assert packed_bytes < plain_bytes / 2
+        print(f"✓ Per punt appenden: ndjson {plain_bytes} bytes, gorilla {packed_bytes} bytes")
+
+        # Segment met een frame per append (eerdere versie) wordt gecompacteerd
+        points = list(packed.read_points('live'))
+        legacy = Path(tmp) / 'packed' / 'live' / '2025-01-03.gts'
+        with open(legacy, 'wb') as f:
+            for point in points[:48]:
+                write_frame(f, encode([point]))
+        index = packed.load_index('live')
+        index['segments']['2025-01-03.gts']['bytes'] = legacy.stat().st_size
+        (Path(tmp) / 'packed' / 'live' / 'index.json').write_text(json.dumps(index))
+        assert list(packed.read_points('live')) == points
+        assert packed.compact('live') > 0 and packed.compact('live') == 0
+        assert list(packed.read_points('live')) == points
+        print("✓ Oude segmenten met losse frames worden één blok")
+    print()
+
+
+def test_latest_snapshot():
+    """Test de _latest snapshot met de laatste punten voor de frontend"""
+    print("=" * 70)
+    print("Test 4: Laatste punten")
+    print("=" * 70)
+
+    start_ms = int(datetime(2025, 1, 1, 0, 0, tzinfo=timezone.utc).timestamp() * 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SegmentStore(Path(tmp))
+        store.append_series('176-036-00021', _series(start_ms, 20))
+        latest = store.read_latest('176-036-00021')
+        assert latest['last_ts'] == start_ms + 19 * HALF_HOUR_MS
+        assert [p[0] for p in latest['points']] == [start_ms + i * HALF_HOUR_MS for i in range(13, 20)]
+        assert store.latest_path('176-036-00021') == Path(tmp) / '_latest' / '176-036-00021.json'
+        assert store.stations() == ['176-036-00021']
+        print(f"✓ Snapshot met {len(latest['points'])} punten van de laatste 3 uur")
+
+        assert store.append_series('176-036-00021', _series(start_ms, 20)) == 0
+        assert store.read_latest('176-036-00021') == latest, "Zonder nieuwe punten blijft de snapshot staan"
+        assert SegmentStore(Path(tmp) / 'zonder', latest_window_ms=None).append_series(
+            'G2', _series(start_ms, 2)) == 2
+        assert not (Path(tmp) / 'zonder' / '_latest').exists()
+        print("✓ Geen snapshot zonder nieuwe punten of zonder venster")
+    print()
+
+
+if __name__ == "__main__":
+    test_append_only_new_points()
+    test_range_read_and_records()
+    test_gorilla_segments()
+    test_latest_snapshot()
+
+    print("=" * 70)
+    print("Alle tests voltooid!")
+    print("=" * 70)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Catalogus Cache
+===================================
+
+Test met een nagebootste ArcGIS server (folders, services en het
+`<service>/layers` endpoint) dat de crawl parallel en in breadth-first
+volgorde verloopt, dat een tweede run zonder requests uit de catalogus
+start, dat revalidatie na de TTL alleen nieuwe services opnieuw opvraagt en
+dat een mislukte folder de catalogus niet overschrijft.
+"""
+
+import json
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from download_rijnland_layers import ArcGISDownloader
+from service_catalog import CATALOG_FILE, ServiceCatalog
+
+BASE = 'http://test/arcgis/rest/services'
+
+
+class FakeServer:
+    """ArcGIS catalogus: {folder: [services]}, subfolders afgeleid uit de namen"""
+
+    def __init__(self, folders, delay=0.02):
+        self.folders = folders
+        self.delay = delay
+        self.failing = set()  # Folders waarvan het request mislukt (make_request geeft None)
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url, params=None):
+        with self.lock:
+            self.requests.append(url)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            return self._respond(url[len(BASE):].strip('/'))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def _respond(self, path):
+        if path.endswith('/layers'):
+            name = path.split('/')[-3]
+            return {'layers': [{
+                'id': 0, 'name': name, 'geometryType': 'esriGeometryPolygon',
+                'supportedQueryFormats': 'JSON, PBF', 'extent': {'xmin': 0, 'ymin': 0, 'xmax': 1, 'ymax': 1},
+                'fields': [{'name': 'OBJECTID', 'type': 'esriFieldTypeOID', 'alias': 'OBJECTID', 'length': 4}]
+            }]}
+        folder = path or None
+        if folder in self.failing:
+            return None
+        if folder not in self.folders:
+            return {'error': {'code': 404}}
+        prefix = f"{folder}/" if folder else ''
+        subfolders = sorted({f[len(prefix):].split('/')[0] for f in self.folders
+                             if f and f != folder and f.startswith(prefix)})
+        return {
+            'folders': subfolders,
+            'services': [{'name': f"{prefix}{name}", 'type': 'MapServer'} for name in self.folders[folder]]
+        }
+
+
+def make_downloader(tmp, server, **kwargs):
+    downloader = ArcGISDownloader(BASE, tmp, **kwargs)
+    downloader.make_request = server
+    return downloader
+
+
+def test_parallel_crawl_and_cache():
+    """Test parallelle crawl en een tweede run zonder requests"""
+    print("=" * 70)
+    print("Test 1: Parallelle crawl en catalogus cache")
+    print("=" * 70)
+
+    folders = {None: ['Gemaal', 'Peilgebied'], 'A': ['Stuw'], 'B': ['Watergang'], 'C': ['Duiker'],
+               'A/Sub': ['Kering'], 'B/Sub': ['Brug']}
+    server = FakeServer(folders)
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = make_downloader(tmp, server)
+        services = downloader.get_all_services()
+        assert [s['path'] for s in services] == ['Gemaal', 'Peilgebied', 'A/Stuw', 'B/Watergang',
+                                                 'C/Duiker', 'A/Sub/Kering', 'B/Sub/Brug']
+        assert server.peak > 1, "Folders van hetzelfde niveau moeten tegelijk opgevraagd worden"
+        print(f"✓ {len(services)} services in breadth-first volgorde, piek {server.peak} requests")
+
+        jobs = downloader._layer_jobs(services, workers=4)
+        assert len(jobs) == len(services) + 3, "Peilgebied krijgt drie profielkopieën"
+        layers = downloader.get_layers('Gemaal/MapServer')
+        assert layers[0]['query_format'] == 'pbf' and layers[0]['fields'][0]['name'] == 'OBJECTID'
+        assert 'length' not in layers[0]['fields'][0]
+        assert all(url.endswith('/layers') for url in server.requests[-len(services):])
+        print("✓ Layers, velden en query formaat via één /layers request per service")
+
+        server.requests.clear()
+        start = time.perf_counter()
+        downloader = make_downloader(tmp, server)
+        services_again = downloader.get_all_services()
+        jobs_again = downloader._layer_jobs(services_again, workers=4)
+        elapsed = time.perf_counter() - start
+        assert server.requests == [], "Tweede run mag geen catalogus requests doen"
+        assert [j['output_file'] for j in jobs_again] == [j['output_file'] for j in jobs]
+        assert elapsed < 1.0
+        print(f"✓ Tweede run zonder requests ({elapsed * 1000:.0f} ms tot de eerste download job)")
+
+        downloader = make_downloader(tmp, server, refresh_catalog=True)
+        downloader.get_all_services()
+        assert server.requests, "--refresh-catalog moet opnieuw crawlen"
+        print("✓ refresh_catalog negeert de cache")
+    print()
+
+
+def test_revalidation_after_ttl():
+    """Test revalidatie: nieuwe services ophalen, verdwenen services vergeten"""
+    print("=" * 70)
+    print("Test 2: Revalidatie na de TTL")
+    print("=" * 70)
+
+    server = FakeServer({None: ['Gemaal', 'Stuw']}, delay=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = make_downloader(tmp, server)
+        downloader._layer_jobs(downloader.get_all_services(), workers=2)
+
+        # Servicelijst verlopen (layers nog vers); op de server is Stuw vervangen door Sluis
+        path = Path(tmp) / CATALOG_FILE
+        data = json.loads(path.read_text(encoding='utf-8'))
+        data['crawled'] = (datetime.now() - timedelta(days=2)).isoformat()
+        path.write_text(json.dumps(data), encoding='utf-8')
+        server.folders = {None: ['Gemaal', 'Sluis']}
+        server.requests.clear()
+
+        downloader = make_downloader(tmp, server)
+        downloader._layer_jobs(downloader.get_all_services(), workers=2)
+        assert server.requests == [BASE + '/', f"{BASE}/Sluis/MapServer/layers"], server.requests
+        catalog = ServiceCatalog(path, BASE)
+        assert sorted(catalog.data['layers']) == ['Gemaal/MapServer', 'Sluis/MapServer']
+        assert catalog.services_fresh()
+        print("✓ Alleen de servicelijst en de nieuwe service opnieuw opgevraagd, Stuw vergeten")
+
+        # Catalogus van een andere server wordt genegeerd
+        assert ServiceCatalog(path, 'http://andere/server').services() == []
+        print("✓ Catalogus van een andere base URL wordt genegeerd")
+    print()
+
+
+def test_failed_folder_keeps_catalog():
+    """Test dat een mislukte folder de catalogus niet overschrijft"""
+    print("=" * 70)
+    print("Test 3: Mislukte folder tijdens de crawl")
+    print("=" * 70)
+
+    server = FakeServer({None: ['Gemaal'], 'A': ['Stuw']}, delay=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = make_downloader(tmp, server)
+        downloader._layer_jobs(downloader.get_all_services(), workers=2)
+
+        path = Path(tmp) / CATALOG_FILE
+        data = json.loads(path.read_text(encoding='utf-8'))
+        data['crawled'] = (datetime.now() - timedelta(days=2)).isoformat()
+        path.write_text(json.dumps(data), encoding='utf-8')
+        server.failing = {'A'}
+
+        services = make_downloader(tmp, server).get_all_services()
+        assert [s['path'] for s in services] == ['Gemaal'], "Deze run werkt met wat wel opgehaald is"
+        catalog = ServiceCatalog(path, BASE)
+        assert [s['path'] for s in catalog.services()] == ['Gemaal', 'A/Stuw']
+        assert sorted(catalog.data['layers']) == ['A/Stuw/MapServer', 'Gemaal/MapServer']
+        assert not catalog.services_fresh(), "De volgende run moet opnieuw crawlen"
+        print("✓ Onvolledige crawl niet opgeslagen, metadata van A/Stuw behouden")
+    print()
+
+
+if __name__ == "__main__":
+    test_parallel_crawl_and_cache()
+    test_revalidation_after_ttl()
+    test_failed_folder_keeps_catalog()
+    print("Alle tests geslaagd!")
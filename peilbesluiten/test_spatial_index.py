@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Ruimtelijke Index
+=====================================
+
+Test punt-in-vlak (met gaten en meerdere delen), bbox en k-nearest queries
+tegen een brute-force berekening, de cache op schijf en dat 377 gemalen
+tegen een paar duizend peilgebieden binnen milliseconden gekoppeld worden.
+"""
+
+import math
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from spatial_index import SpatialIndex, cache_path, link_gemalen, load_index
+from test_helpers import WGS84, square, to_wgs84, write_layer
+
+
+def peilgebieden(columns=50, rows=50, size=500.0, origin=(80000.0, 440000.0)):
+    """Raster van vierkante peilgebieden; elk 7e gebied heeft een gat, gebied 1 heeft twee delen"""
+    features = []
+    for i in range(columns * rows):
+        x, y = origin[0] + (i % columns) * size, origin[1] + (i // columns) * size
+        rings = [square(x, y, size)]
+        if i % 7 == 0:
+            rings.append(square(x + size / 4, y + size / 4, size / 2, clockwise=False))
+        features.append({'attributes': {'OBJECTID': i + 1, 'CODE': f"PG{i + 1:04d}"},
+                         'geometry': {'rings': rings}})
+    features[1]['geometry']['rings'].append(square(origin[0] - 2000, origin[1] - 2000, 100))
+    return features
+
+
+def punten(count, seed, prefix, bounds=(79000.0, 439000.0, 106000.0, 466000.0)):
+    rng = random.Random(seed)
+    return [{'attributes': {'OBJECTID': i + 1, 'NAAM': f"{prefix} {i + 1}"},
+             'geometry': {'x': rng.uniform(bounds[0], bounds[2]), 'y': rng.uniform(bounds[1], bounds[3])}}
+            for i in range(count)]
+
+
+def inside(point, rings):
+    x, y = point
+    result = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+            if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+                result = not result
+    return result
+
+
+def test_queries():
+    """Test punt-in-vlak, bbox en k-nearest tegen brute force"""
+    print("=" * 70)
+    print("Test 1: Queries tegen brute force")
+    print("=" * 70)
+
+    gebieden = peilgebieden(20, 20)
+    index = SpatialIndex.from_features('peilgebieden', gebieden)
+    stations = punten(300, seed=5, prefix='Gemaal', bounds=(77000.0, 437000.0, 91000.0, 451000.0))
+    points = [(f['geometry']['x'], f['geometry']['y']) for f in stations]
+    points += [(80000.0 + 250, 440000.0 + 250), (80000.0 - 1950, 440000.0 - 1950)]  # In een gat, tweede deel
+
+    query, features = index.point_in_polygon(points)
+    found = set(zip(query.tolist(), features.tolist()))
+    expected = {(p, g) for p, point in enumerate(points) for g, f in enumerate(gebieden)
+                if inside(point, f['geometry']['rings'])}
+    assert found == expected
+    located = index.locate(points)
+    assert located[-2] == -1 and index.keys[located[-1]] == 2
+    print(f"✓ Punt-in-vlak gelijk aan brute force ({len(found)} treffers, gaten en multipolygonen)")
+
+    box = (84000, 443000, 85200, 444100)
+    query, features = index.query_bbox(box)
+    assert set(query.tolist()) == {0}
+    assert sorted(index.keys[f] for f in features) == sorted(
+        f['attributes']['OBJECTID'] for f in gebieden
+        if min(p[0] for p in f['geometry']['rings'][0]) <= box[2] and max(p[0] for p in f['geometry']['rings'][0]) >= box[0]
+        and min(p[1] for p in f['geometry']['rings'][0]) <= box[3] and max(p[1] for p in f['geometry']['rings'][0]) >= box[1])
+    print("✓ Bbox query")
+
+    meetlocaties = punten(500, seed=9, prefix='Meetlocatie')
+    index = SpatialIndex.from_features('meetlocaties', meetlocaties)
+    coords = np.array([(f['geometry']['x'], f['geometry']['y']) for f in meetlocaties])
+    near, distance = index.nearest(points, k=4)
+    for p, point in enumerate(points):
+        brute = np.hypot(coords[:, 0] - point[0], coords[:, 1] - point[1])
+        assert np.allclose(distance[p], np.sort(brute)[:4])
+        assert np.allclose(brute[near[p]], distance[p])
+    near, distance = index.nearest(points[:5], k=3, max_distance=300)
+    assert ((near == -1) == np.isinf(distance)).all() and (distance[near >= 0] <= 300).all()
+    print("✓ K-nearest gelijk aan brute force, ook met max_distance")
+
+    vlakken = SpatialIndex.from_features('vlakken', gebieden[:4])
+    assert vlakken.distances([(80000.0 + 10, 440000.0 + 10)], [0])[0] == 0
+    assert math.isclose(vlakken.distances([(80000.0 + 250, 440000.0 + 250)], [0])[0], 125)
+    print("✓ Afstand tot een vlak is 0 binnen het vlak en de randafstand in een gat")
+    print()
+
+
+def test_cache_and_speed():
+    """Test de cache op schijf en de snelheid van 377 gemalen"""
+    print("=" * 70)
+    print("Test 2: Cache en snelheid")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp)
+        write_layer(source / 'Peilgebied_praktijk_soort_gebied' / 'Peilgebied_layer0.geojson',
+                    to_wgs84(peilgebieden()), WGS84)
+        write_layer(source / 'Gemaal' / 'Gemaal_layer0.geojson',
+                    to_wgs84(punten(377, seed=1, prefix='Gemaal')), WGS84)
+        write_layer(source / 'Meetlocatie_waterkwantiteit' / 'Meetlocatie_layer0.geojson',
+                    to_wgs84(punten(800, seed=2, prefix='Meetlocatie')), WGS84)
+
+        gemalen = load_index('gemalen', source)
+        cached = cache_path('gemalen', source)
+        assert cached.exists() and len(gemalen) == 377
+        # GeoJSON in WGS84 wordt bij het bouwen terug naar RD New meters gerekend
+        original = [(f['geometry']['x'], f['geometry']['y']) for f in punten(377, seed=1, prefix='Gemaal')]
+        assert np.abs(gemalen.centroids() - np.array(original)).max() < 1.0
+        print("✓ WGS84 laagbestand geïndexeerd in RD New (afwijking < 1 m)")
+        mtime = cached.stat().st_mtime_ns
+        again = load_index('gemalen', source)
+        assert cached.stat().st_mtime_ns == mtime and again.keys == gemalen.keys
+        assert np.array_equal(again.nearest([(90000, 450000)], 5)[0], gemalen.nearest([(90000, 450000)], 5)[0])
+        print("✓ Tweede keer uit de cache")
+
+        layer = source / 'Gemaal' / 'Gemaal_layer0.geojson'
+        write_layer(layer, to_wgs84(punten(10, seed=1, prefix='Gemaal')), WGS84)
+        os.utime(layer, ns=(mtime + 10**9, mtime + 10**9))
+        assert len(load_index('gemalen', source)) == 10
+        write_layer(layer, to_wgs84(punten(377, seed=1, prefix='Gemaal')), WGS84)
+        print("✓ Gewijzigde bron geeft een nieuwe index")
+
+        links, stats = link_gemalen(source, nearest=3)
+        assert stats['gemalen'] == 377 and stats['peilgebieden'] == 2500
+        assert len(links) == 377 and all(len(link['meetlocaties']) == 3 for link in links)
+        assert stats['in_peilgebied'] == sum(1 for link in links if link['peilgebied'])
+
+        index = load_index('peilgebieden', source)
+        points = load_index('gemalen', source).centroids()
+        start = time.perf_counter()
+        index.locate(points)
+        seconds = time.perf_counter() - start
+        assert seconds < 0.5, f"{seconds:.3f}s"
+        print(f"✓ 377 gemalen tegen 2500 peilgebieden in {seconds * 1000:.1f} ms")
+    print()
+
+
+if __name__ == "__main__":
+    test_queries()
+    test_cache_and_speed()
+    print("Alle tests geslaagd!")
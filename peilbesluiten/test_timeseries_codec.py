@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Tijdreeks Codec
+===================================
+
+Test round-trip van de Gorilla-stijl codec, run-length encoding van
+nul-reeksen en het lezen van frames.
+"""
+
+import io
+import math
+import random
+
+from timeseries_codec import TimeSeriesEncoder, decode, encode, iter_decode_frames, write_frame
+
+HALF_HOUR_MS = 30 * 60 * 1000
+START_MS = 1735689600000  # 2025-01-01 00:00 UTC
+
+
+def _debiet_series(count, seed=42):
+    """Simuleer een debiet reeks: lange runs van 0.0 afgewisseld met pompperiodes"""
+    rng = random.Random(seed)
+    points = []
+    pump_on = False
+    for i in range(count):
+        if rng.random() < 0.05:
+            pump_on = not pump_on
+        value = round(rng.uniform(0.2, 1.5), 3) if pump_on else 0.0
+        points.append((START_MS + i * HALF_HOUR_MS, value))
+    return points
+
+
+def test_round_trip():
+    """Test dat decode(encode(x)) exact x oplevert, ook bij onregelmatige timestamps"""
+    print("=" * 70)
+    print("Test 1: Round-trip")
+    print("=" * 70)
+
+    points = _debiet_series(2000)
+    # Onregelmatigheden: gat in de data, jitter en speciale waarden
+    points[100] = (points[100][0] + 1234, points[100][1])
+    points = points[:500] + points[800:]
+    points.append((points[-1][0] + HALF_HOUR_MS, float('inf')))
+    points.append((points[-1][0] + HALF_HOUR_MS, -0.0))
+
+    decoded = decode(encode(points))
+    assert len(decoded) == len(points)
+    for (ts_a, v_a), (ts_b, v_b) in zip(points, decoded):
+        assert ts_a == ts_b
+        assert v_a == v_b and math.copysign(1, v_a) == math.copysign(1, v_b)
+
+    assert decode(encode([])) == []
+    assert decode(encode([(START_MS, 1.5)])) == [(START_MS, 1.5)]
+    print(f"✓ {len(points)} punten exact terug gelezen")
+    print()
+
+
+def test_zero_runs_compress():
+    """Test dat een dag zonder pompactiviteit vrijwel niets kost"""
+    print("=" * 70)
+    print("Test 2: Run-length encoding van 0.0")
+    print("=" * 70)
+
+    points = [(START_MS + i * HALF_HOUR_MS, 0.0) for i in range(48)]
+    block = encode(points)
+    print(f"48 punten 0.0: {len(block)} bytes ({len(block) / 48:.2f} bytes/punt)")
+    # Header (8) + eerste punt (16) + eerste delta (40 bits) + één run (17 bits)
+    assert len(block) <= 32
+    assert decode(block) == points
+    print()
+
+
+def test_streaming_frames():
+    """Test streaming encode in blokken en decode van frames"""
+    print("=" * 70)
+    print("Test 3: Frames")
+    print("=" * 70)
+
+    points = _debiet_series(300, seed=7)
+    buffer = io.BytesIO()
+    for start in range(0, len(points), 48):
+        encoder = TimeSeriesEncoder()
+        for ts, value in points[start:start + 48]:
+            encoder.add(ts, value)
+        write_frame(buffer, encoder.finish())
+
+    # Een afgebroken laatste frame mag de eerdere frames niet onleesbaar maken
+    truncated = buffer.getvalue()[:-3]
+    decoded = list(iter_decode_frames(io.BytesIO(truncated)))
+    assert decoded == points[:len(decoded)]
+    assert len(decoded) >= len(points) - 48
+    assert list(iter_decode_frames(io.BytesIO(buffer.getvalue()))) == points
+    print(f"✓ {len(points)} punten in {math.ceil(len(points) / 48)} frames")
+    print()
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_zero_runs_compress()
+    test_streaming_frames()
+
+    print("=" * 70)
+    print("Alle tests voltooid!")
+    print("=" * 70)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Dynamische Data Updater
+===========================================
+
+Test met een nagebootste ArcGIS layer dat een ongewijzigde layer via het
+manifest wordt overgeslagen zonder download, en dat edits, nieuwe en
+verwijderde features incrementeel in de lokale kopie worden verwerkt. Een
+volledige download moet een wijziging in elke feature zien, niet alleen in
+de eerste.
+"""
+
+import re
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from geojson_stream import iter_features, read_member
+from test_helpers import FakeLayer
+from update_dynamische_data import DynamicDataUpdater, manifest_path
+
+DATASET = {'name': 'Peilafwijking_praktijk', 'service': 'Peilafwijking_praktijk/MapServer', 'layer_id': 0}
+
+
+class FakeService(FakeLayer):
+    """FakeLayer met layer info (editingInfo) en LAST_EDITED_DATE per feature"""
+
+    def __init__(self, object_ids):
+        super().__init__(object_ids)
+        self.last_edit = 1700000000000
+        self.edits = {oid: self.last_edit - oid * 1000 for oid in self.object_ids}
+        self.values = {oid: 0 for oid in self.object_ids}
+
+    def edit(self, oid, value):
+        """Bewerk (of voeg toe) een feature; 5 seconden na de vorige edit"""
+        self.last_edit += 5000
+        self.edits[oid] = self.last_edit
+        self.values[oid] = value
+        self.object_ids = sorted(self.edits)
+
+    def delete(self, oid):
+        self.last_edit += 5000
+        del self.edits[oid], self.values[oid]
+        self.object_ids = sorted(self.edits)
+
+    def _respond(self, params):
+        where = params.get('where', '1=1')
+        ids = self.object_ids
+        match = re.search(r"LAST_EDITED_DATE > TIMESTAMP '([^']+)'", where)
+        if match:
+            since = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+            ids = [oid for oid in ids if self.edits[oid] > since.timestamp() * 1000]
+        match = re.search(r'OBJECTID BETWEEN (\d+) AND (\d+)', where)
+        if match:
+            ids = [oid for oid in ids if int(match.group(1)) <= oid <= int(match.group(2))]
+
+        if params.get('returnCountOnly'):
+            return {'count': len(ids)}
+        if params.get('returnIdsOnly'):
+            return {'objectIdFieldName': 'OBJECTID', 'objectIds': ids}
+        return {
+            'objectIdFieldName': 'OBJECTID',
+            'fields': [{'name': 'OBJECTID'}, {'name': 'LAST_EDITED_DATE'}, {'name': 'WAARDE'}],
+            'features': [{'attributes': {'OBJECTID': oid, 'LAST_EDITED_DATE': self.edits[oid],
+                                         'WAARDE': self.values[oid]},
+                          'geometry': {'x': oid, 'y': 0}} for oid in ids[:self.max_record_count]]
+        }
+
+    def __call__(self, url, params=None):
+        params = params or {}
+        if not url.endswith('/query'):
+            with self.lock:
+                self.requests.append({'layer_info': url})
+            return {'name': 'Peilafwijking', 'editingInfo': {'lastEditDate': self.last_edit},
+                    'fields': [{'name': 'OBJECTID'}, {'name': 'LAST_EDITED_DATE'}]}
+        return super().__call__(url, params)
+
+
+def make_updater(tmp, service):
+    updater = DynamicDataUpdater('http://test/arcgis/rest/services', tmp)
+    updater.make_request = service
+    return updater
+
+
+def test_manifest_skips_unchanged_layer():
+    """Test dat een ongewijzigde layer één of twee kleine requests kost"""
+    print("=" * 70)
+    print("Test 1: Wijzigingsdetectie via het manifest")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = FakeService(range(1, 2501))
+        updater = make_updater(tmp, service)
+        assert updater.update_dataset(DATASET) is True
+        output_file = Path(tmp) / 'Peilafwijking_praktijk' / 'Peilafwijking_layer0.geojson'
+        assert output_file.exists() and manifest_path(output_file).exists()
+        print(f"✓ Eerste run: gedownload in {len(service.requests)} requests")
+
+        service.requests.clear()
+        assert updater.update_dataset(DATASET) is False
+        assert len(service.requests) == 2, service.requests
+        assert updater.stats['downloads_skipped'] == 1
+        print("✓ Ongewijzigd: 2 requests (layer info + returnCountOnly), geen download")
+
+        service.requests.clear()
+        service.last_edit += 60000
+        updater.update_dataset(DATASET)
+        assert any('TIMESTAMP' in r.get('where', '') for r in service.requests)
+        print("✓ Nieuwe lastEditDate: layer opnieuw gecontroleerd")
+    print()
+
+
+def test_incremental_sync():
+    """Test incrementele sync: alleen bewerkte features, merge op OBJECTID, verwijderingen"""
+    print("=" * 70)
+    print("Test 2: Incrementele sync")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = FakeService(range(1, 3001))
+        updater = make_updater(tmp, service)
+        assert updater.update_dataset(DATASET) is True
+        output_file = Path(tmp) / 'Peilafwijking_praktijk' / 'Peilafwijking_layer0.geojson'
+
+        service.edit(10, 42)
+        service.edit(3500, 7)  # Nieuwe feature
+        service.requests.clear()
+        assert updater.update_dataset(DATASET) is True
+        feature_requests = [r for r in service.requests if 'BETWEEN' in r.get('where', '')]
+        assert len(feature_requests) == 1, "Alleen de bewerkte features mogen opgehaald worden"
+        values = {f['properties']['OBJECTID']: f['properties']['WAARDE'] for f in iter_features(output_file)}
+        assert len(values) == 3001 and values[10] == 42 and values[3500] == 7
+        assert read_member(output_file, 'metadata')['sync_mode'] == 'incremental'
+        assert updater.stats['datasets_incremental'] == 1
+        print(f"✓ 2 features gesynct in {len(service.requests)} requests")
+
+        # Verwijdering: aantal klopt niet meer, dus reconcile met returnIdsOnly
+        service.delete(20)
+        service.edit(30, 1)
+        service.edit(4000, 2)
+        assert updater.update_dataset(DATASET) is True
+        values = {f['properties']['OBJECTID']: f['properties']['WAARDE'] for f in iter_features(output_file)}
+        assert 20 not in values and values[30] == 1 and values[4000] == 2 and len(values) == 3001
+        print("✓ Verwijderde feature opgespoord via returnIdsOnly")
+
+        # Volledige download geeft hetzelfde resultaat
+        full_dir = Path(tmp) / 'volledig'
+        full = DynamicDataUpdater('http://test/arcgis/rest/services', str(full_dir), incremental=False)
+        full.make_request = service
+        full.update_dataset(DATASET)
+        full_values = {f['properties']['OBJECTID']: f['properties']['WAARDE']
+                       for f in iter_features(full_dir / 'Peilafwijking_praktijk' / 'Peilafwijking_layer0.geojson')}
+        assert full_values == values
+        full_file = full_dir / 'Peilafwijking_praktijk' / 'Peilafwijking_layer0.geojson'
+        assert read_member(full_file, 'metadata')['data_hash'] == read_member(output_file, 'metadata')['data_hash']
+        print("✓ Incrementele kopie gelijk aan een volledige download (ook de data hash)")
+    print()
+
+
+def test_full_download_detects_any_edit():
+    """Test dat een volledige download een wijziging in een willekeurige feature oppikt"""
+    print("=" * 70)
+    print("Test 3: Wijziging buiten de eerste feature")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = FakeService(range(1, 1501))
+        updater = DynamicDataUpdater('http://test/arcgis/rest/services', tmp, incremental=False)
+        updater.make_request = service
+        assert updater.update_dataset(DATASET) is True
+        output_file = Path(tmp) / 'Peilafwijking_praktijk' / 'Peilafwijking_layer0.geojson'
+
+        # Server toestand wijkt af van het manifest: de download wordt altijd opgeslagen
+        service.edit(1200, 42)
+        assert updater.update_dataset(DATASET) is True
+        values = {f['properties']['OBJECTID']: f['properties']['WAARDE'] for f in iter_features(output_file)}
+        assert values[1200] == 42
+        print("✓ Nieuwe server toestand: download opgeslagen")
+
+        # Zonder manifest beslist de hash over alle features
+        manifest_path(output_file).unlink()
+        assert updater.update_dataset(DATASET) is False
+        service.values[800] = 7  # Zelfde edit datum, andere waarde
+        manifest_path(output_file).unlink()
+        assert updater.update_dataset(DATASET) is True
+        values = {f['properties']['OBJECTID']: f['properties']['WAARDE'] for f in iter_features(output_file)}
+        assert values[800] == 7
+        print("✓ Zonder manifest: data hash over alle features ziet de wijziging")
+    print()
+
+
+if __name__ == "__main__":
+    test_manifest_skips_unchanged_layer()
+    test_incremental_sync()
+    test_full_download_detects_any_edit()
+    print("Alle tests geslaagd!")
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Test Script voor de Vector Tiles
+================================
+
+Test dat de tegelpiramide geldige MVT tegels bevat (lagen, attributen per
+zoomniveau, polygoon oriëntatie), dat knippen en projecteren kloppen, dat
+een tweede build alleen tegels van gewijzigde features opnieuw rendert en
+dat een MBTiles build met een process pool dezelfde tegels geeft.
+"""
+
+import struct
+import tempfile
+from pathlib import Path
+
+from arcgis_pbf import _fields, _packed_varints, _zigzag
+from test_helpers import square, write_layer
+from vector_tiles import (DETAIL_ZOOM, TILE_BUFFER, TILE_EXTENT, MBTilesStore, build_tiles, clip_line,
+                          clip_ring, lonlat_to_world, rd_to_wgs84, tile_range)
+
+def gemalen(peil=-0.6, x=94200):
+    return [
+        {'attributes': {'OBJECTID': 1, 'NAAM': 'Gemaal Leiden', 'CAPACITEIT': 12.5, 'ACTIEF': True,
+                        'GlobalID': '{ABC}', 'last_edited_date': 1700000000000, 'STREEFPEIL': peil},
+         'geometry': {'x': x, 'y': 464200}},
+        {'attributes': {'OBJECTID': 2, 'NAAM': 'Gemaal Oost', 'CAPACITEIT': 3, 'ACTIEF': False, 'STREEFPEIL': -1.2},
+         'geometry': {'x': 104000, 'y': 455000}},
+    ]
+
+
+def make_source(root):
+    write_layer(root / 'Gemaal' / 'Gemaal_layer0.geojson', gemalen())
+    write_layer(root / 'Peilgebied' / 'Peilgebied_layer0.geojson', [
+        {'attributes': {'OBJECTID': 10, 'CODE': 'PG-10', 'OPMERKING': 'lang verhaal'},
+         'geometry': {'rings': [square(94000, 464000, 500), square(94200, 464100, 100, clockwise=False)]}},
+    ])
+    write_layer(root / 'Watergang' / 'Watergang_layer0.geojson', [
+        {'attributes': {'OBJECTID': 5, 'NAAM': 'Vliet'},
+         'geometry': {'paths': [[[93000 + i * 10, 464000 + (i % 7)] for i in range(400)]]}},
+    ])
+
+
+def decode_value(buf):
+    for number, wire, value in _fields(buf):
+        if number == 1:
+            return value.decode('utf-8')
+        if number == 3:
+            return struct.unpack('<d', value)[0]
+        if number == 5:
+            return value
+        if number == 6:
+            return _zigzag(value)
+        if number == 7:
+            return bool(value)
+
+
+def decode_commands(commands):
+    parts, x, y, i = [], 0, 0, 0
+    while i < len(commands):
+        command, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if command == 7:
+            continue
+        if command == 1:
+            parts.append([])
+        for _ in range(count):
+            x += _zigzag(commands[i])
+            y += _zigzag(commands[i + 1])
+            i += 2
+            parts[-1].append((x, y))
+    return parts
+
+
+def decode_tile(data):
+    """MVT tegel naar {laag: {'extent', 'features'}}"""
+    layers = {}
+    for number, _, layer in _fields(data):
+        assert number == 3
+        name, extent, keys, values, raw = None, None, [], [], []
+        for n, wire, value in _fields(layer):
+            if n == 1:
+                name = value.decode('utf-8')
+            elif n == 2:
+                raw.append(value)
+            elif n == 3:
+                keys.append(value.decode('utf-8'))
+            elif n == 4:
+                values.append(decode_value(value))
+            elif n == 5:
+                extent = value
+        features = []
+        for buf in raw:
+            feature = {'id': None, 'properties': {}}
+            for n, wire, value in _fields(buf):
+                if n == 1:
+                    feature['id'] = value
+                elif n == 2:
+                    tags = _packed_varints(wire, value)
+                    feature['properties'] = {keys[tags[k]]: values[tags[k + 1]] for k in range(0, len(tags), 2)}
+                elif n == 3:
+                    feature['type'] = value
+                elif n == 4:
+                    feature['parts'] = decode_commands(_packed_varints(wire, value))
+            features.append(feature)
+        layers[name] = {'extent': extent, 'features': features}
+    return layers
+
+
+def features_at(root, zoom):
+    """Alle features van een zoomniveau per laag (uit een tegel directory)"""
+    result = {}
+    for path in sorted((root / str(zoom)).rglob('*.pbf')):
+        for name, layer in decode_tile(path.read_bytes()).items():
+            assert layer['extent'] == TILE_EXTENT
+            result.setdefault(name, []).extend(layer['features'])
+    return result
+
+
+def area(ring):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1])) / 2
+
+
+def test_geometry_helpers():
+    """Test projectie, tegelbereik en knippen"""
+    print("=" * 70)
+    print("Test 1: Projectie en knippen")
+    print("=" * 70)
+
+    lon, lat = rd_to_wgs84(155000, 463000)
+    assert abs(lon - 5.38720621) < 1e-9 and abs(lat - 52.15517440) < 1e-9
+    x, y = lonlat_to_world(0, 0)
+    assert abs(x - 0.5) < 1e-12 and abs(y - 0.5) < 1e-12
+    world = lonlat_to_world(*rd_to_wgs84(155000, 463000))
+    assert tile_range((*world, *world), 8)[:2] == (131, 84)
+    print("✓ Amersfoort valt in tegel 8/131/84")
+
+    lo, hi = -TILE_BUFFER, TILE_EXTENT + TILE_BUFFER
+    big = [(-1000.0, -1000.0), (-1000.0, 9000.0), (9000.0, 9000.0), (9000.0, -1000.0)]
+    clipped = clip_ring(big, lo, hi)
+    assert sorted(clipped) == sorted([(lo, lo), (lo, hi), (hi, hi), (hi, lo)])
+    pieces = clip_line([(-500.0, 100.0), (5000.0, 100.0), (5000.0, 200.0), (-500.0, 200.0)], lo, hi)
+    assert pieces == [[(lo, 100.0), (hi, 100.0)], [(hi, 200.0), (lo, 200.0)]]
+    print("✓ Vlak rond de tegel wordt de tegel plus buffer, lijn wordt in twee stukken geknipt")
+    print()
+
+
+def test_build_directory():
+    """Test de piramide: lagen, attributen per zoom en oriëntatie"""
+    print("=" * 70)
+    print("Test 2: Tegelpiramide als directory")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, tiles = Path(tmp) / 'kaartlagen', Path(tmp) / 'tiles'
+        make_source(source)
+        stats = build_tiles(source, tiles, min_zoom=8, max_zoom=DETAIL_ZOOM, workers=1)
+        assert stats['layers'] == 3 and stats['features'] == 4 and stats['tiles_written'] > 0
+        assert (tiles / 'metadata.json').exists()
+
+        low = features_at(tiles, 8)
+        assert sorted(low) == ['Gemaal', 'Peilgebied', 'Watergang']
+        gemaal = next(f for f in low['Gemaal'] if f['id'] == 1)
+        assert gemaal['properties'] == {'OBJECTID': 1, 'NAAM': 'Gemaal Leiden', 'STREEFPEIL': -0.6}
+        assert low['Peilgebied'][0]['properties'] == {'OBJECTID': 10, 'CODE': 'PG-10'}
+        print("✓ Onder DETAIL_ZOOM alleen samenvattende attributen")
+
+        detail = features_at(tiles, DETAIL_ZOOM)
+        gemaal = next(f for f in detail['Gemaal'] if f['id'] == 1)
+        assert gemaal['properties']['CAPACITEIT'] == 12.5 and gemaal['properties']['ACTIEF'] is True
+        assert 'GlobalID' not in gemaal['properties'] and 'last_edited_date' not in gemaal['properties']
+        polygon = detail['Peilgebied'][0]
+        assert polygon['type'] == 3 and len(polygon['parts']) == 2
+        assert area(polygon['parts'][0]) > 0 > area(polygon['parts'][1]), "Buitenring positief, gat negatief"
+        print("✓ Op DETAIL_ZOOM alle attributen behalve Shape/GlobalID/edit velden; gat behouden")
+
+        line_low = low['Watergang'][0]['parts'][0]
+        line_high = detail['Watergang'][0]['parts'][0]
+        assert len(line_low) < len(line_high) <= 400
+        print(f"✓ Lijn vereenvoudigd per zoom ({len(line_low)} punten op z8, {len(line_high)} op z{DETAIL_ZOOM})")
+    print()
+
+
+def test_incremental_build():
+    """Test dat alleen tegels van gewijzigde features opnieuw worden gerenderd"""
+    print("=" * 70)
+    print("Test 3: Incrementele build")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, tiles = Path(tmp) / 'kaartlagen', Path(tmp) / 'tiles'
+        make_source(source)
+        first = build_tiles(source, tiles, min_zoom=8, max_zoom=12, workers=1)
+
+        again = build_tiles(source, tiles, min_zoom=8, max_zoom=12, workers=1)
+        assert again['changed_features'] == 0 and again['tiles_written'] == 0
+        print("✓ Ongewijzigde bron: geen tegels gerenderd")
+
+        write_layer(source / 'Gemaal' / 'Gemaal_layer0.geojson', gemalen(peil=-0.7))
+        changed = build_tiles(source, tiles, min_zoom=8, max_zoom=12, workers=1)
+        assert changed['changed_features'] == 1
+        assert 0 < changed['tiles_written'] < first['tiles_written']
+        gemaal = next(f for f in features_at(tiles, 12)['Gemaal'] if f['id'] == 1)
+        assert gemaal['properties']['STREEFPEIL'] == -0.7
+        print(f"✓ Eén gewijzigde feature: {changed['tiles_written']} van {first['tiles_written']} tegels gerenderd")
+
+        # Gemaal 1 verplaatst ver weg: oude tegels verliezen het punt
+        write_layer(source / 'Gemaal' / 'Gemaal_layer0.geojson', gemalen(peil=-0.7, x=130000))
+        build_tiles(source, tiles, min_zoom=8, max_zoom=12, workers=1)
+        world = lonlat_to_world(*rd_to_wgs84(130000, 464200))
+        min_x, min_y, max_x, max_y = tile_range((*world, *world), 12)
+        for path in (tiles / '12').rglob('*.pbf'):
+            x, y = int(path.parent.name), int(path.stem)
+            layer = decode_tile(path.read_bytes()).get('Gemaal', {'features': []})
+            if 1 in {f['id'] for f in layer['features']}:
+                assert min_x <= x <= max_x and min_y <= y <= max_y, f"Gemaal 1 nog in oude tegel 12/{x}/{y}"
+
+        (source / 'Watergang' / 'Watergang_layer0.geojson').unlink()
+        removed = build_tiles(source, tiles, min_zoom=8, max_zoom=12, workers=1)
+        assert removed['changed_features'] == 1
+        assert 'Watergang' not in features_at(tiles, 12)
+        print("✓ Verplaatste en verwijderde features verdwijnen uit de oude tegels")
+    print()
+
+
+def test_mbtiles_with_pool():
+    """Test een MBTiles build met meerdere processen tegen de directory build"""
+    print("=" * 70)
+    print("Test 4: MBTiles met process pool")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, tiles = Path(tmp) / 'kaartlagen', Path(tmp) / 'tiles'
+        make_source(source)
+        build_tiles(source, tiles, min_zoom=8, max_zoom=13, workers=1)
+        stats = build_tiles(source, Path(tmp) / 'kaartlagen.mbtiles', min_zoom=8, max_zoom=13, workers=2)
+
+        store = MBTilesStore(Path(tmp) / 'kaartlagen.mbtiles')
+        try:
+            count = store.conn.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+            metadata = dict(store.conn.execute("SELECT name, value FROM metadata"))
+            paths = list(tiles.rglob('*.pbf'))
+            assert count == stats['tiles_written'] == len(paths)
+            for path in paths:
+                z, x, y = int(path.parts[-3]), int(path.parts[-2]), int(path.stem)
+                assert store.get(z, x, y) == path.read_bytes()
+        finally:
+            store.close()
+        assert metadata['format'] == 'pbf' and metadata['minzoom'] == '8' and metadata['maxzoom'] == '13'
+        print(f"✓ {count} tegels, identiek aan de directory build")
+    print()
+
+
+if __name__ == "__main__":
+    test_geometry_helpers()
+    test_build_directory()
+    test_incremental_build()
+    test_mbtiles_with_pool()
+    print("Alle tests geslaagd!")
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Tijdreeks codec voor debiet series (Gorilla-stijl)
+==================================================
+
+Compressie van (timestamp_ms, value) reeksen, gebaseerd op de Gorilla paper
+(Facebook, VLDB 2015):
+
+- Timestamps: delta-of-delta. Bij het vaste 30-minuten interval is de
+  delta-of-delta 0 en kost een timestamp 1 bit.
+- Waarden: XOR met de vorige waarde; alleen de betekenisvolle bits worden opgeslagen.
+  Een herhaalde waarde kost 1 bit.
+- Run-length encoding: runs van punten met regelmatige timestamp én dezelfde
+  waarde (bijv. 0.0 terwijl de pomp uit staat) worden als één run opgeslagen.
+
+Formaat van een blok:
+    b'GTS1' | uint32 aantal punten | bitstream
+
+Meerdere blokken kunnen achter elkaar in een bestand staan als frames
+(uint32 lengte + blok), zodat een segment append-only kan groeien.
+
+Gebruik:
+    encoder = TimeSeriesEncoder()
+    for ts, value in points:
+        encoder.add(ts, value)
+    block = encoder.finish()
+
+    for ts, value in iter_decode(block):
+        ...
+"""
+
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+MAGIC = b'GTS1'
+HEADER = struct.Struct('>4sI')
+FRAME_HEADER = struct.Struct('>I')
+
+RUN_COUNT_BITS = 16
+MAX_RUN = (1 << RUN_COUNT_BITS) - 1
+# Een los herhaald punt kost 3 bits (vlag + dod + waarde); een run 1 + 16 bits
+MIN_RUN = (1 + RUN_COUNT_BITS) // 3 + 1
+
+# Delta-of-delta buckets: (prefix bits, prefix lengte, payload bits)
+DOD_BUCKETS = [
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+    (0b11110, 5, 32),
+]
+DOD_FALLBACK = (0b11111, 5, 64)
+
+_MASK64 = (1 << 64) - 1
+
+
+def float_to_bits(value: float) -> int:
+    """IEEE-754 double als unsigned 64-bit integer"""
+    return struct.unpack('>Q', struct.pack('>d', value))[0]
+
+
+def bits_to_float(bits: int) -> float:
+    """Unsigned 64-bit integer terug naar IEEE-754 double"""
+    return struct.unpack('>d', struct.pack('>Q', bits))[0]
+
+
+def _fits_signed(value: int, bits: int) -> bool:
+    return -(1 << (bits - 1)) <= value < (1 << (bits - 1))
+
+
+class BitWriter:
+    """Schrijft bits MSB-first naar een bytearray"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._acc = 0
+        self._nbits = 0
+
+    def write(self, value: int, nbits: int):
+        if nbits == 0:
+            return
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._nbits += nbits
+        while self._nbits >= 8:
+            self._nbits -= 8
+            self.buffer.append((self._acc >> self._nbits) & 0xFF)
+        self._acc &= (1 << self._nbits) - 1
+
+    def getvalue(self) -> bytes:
+        data = bytes(self.buffer)
+        if self._nbits:
+            data += bytes([(self._acc << (8 - self._nbits)) & 0xFF])
+        return data
+
+
+class BitReader:
+    """Leest bits MSB-first uit bytes"""
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.pos = offset * 8
+
+    def read(self, nbits: int) -> int:
+        value = 0
+        pos = self.pos
+        data = self.data
+        remaining = nbits
+        while remaining:
+            byte = data[pos >> 3]
+            bit_offset = pos & 7
+            take = min(8 - bit_offset, remaining)
+            chunk = (byte >> (8 - bit_offset - take)) & ((1 << take) - 1)
+            value = (value << take) | chunk
+            pos += take
+            remaining -= take
+        self.pos = pos
+        return value
+
+    def read_bit(self) -> int:
+        pos = self.pos
+        self.pos = pos + 1
+        return (self.data[pos >> 3] >> (7 - (pos & 7))) & 1
+
+    def read_signed(self, nbits: int) -> int:
+        value = self.read(nbits)
+        if value >> (nbits - 1):
+            value -= 1 << nbits
+        return value
+
+
+class TimeSeriesEncoder:
+    """
+    Streaming encoder: voeg punten één voor één toe en haal met finish() het blok op.
+    """
+
+    def __init__(self):
+        self._writer = BitWriter()
+        self.count = 0
+        self._prev_ts = 0
+        self._prev_delta = 0
+        self._prev_bits = 0
+        self._prev_leading = 65  # Nog geen venster
+        self._prev_trailing = 0
+        self._pending_run = 0
+
+    def add(self, timestamp_ms: int, value: float):
+        """Voeg een punt toe (timestamps moeten oplopend zijn)"""
+        timestamp_ms = int(timestamp_ms)
+        bits = float_to_bits(float(value))
+        w = self._writer
+
+        if self.count == 0:
+            w.write(timestamp_ms & _MASK64, 64)
+            w.write(bits, 64)
+            self._prev_ts = timestamp_ms
+            self._prev_bits = bits
+            self.count = 1
+            return
+
+        delta = timestamp_ms - self._prev_ts
+        dod = delta - self._prev_delta
+        if dod == 0 and bits == self._prev_bits:
+            self._pending_run += 1
+            if self._pending_run == MAX_RUN:
+                self._flush_run()
+        else:
+            self._flush_run()
+            w.write(0, 1)  # Enkel punt
+            self._write_dod(dod)
+            self._write_value(bits)
+
+        self._prev_ts = timestamp_ms
+        self._prev_delta = delta
+        self._prev_bits = bits
+        self.count += 1
+
+    def add_many(self, points: Iterable[Tuple[int, float]]):
+        for timestamp_ms, value in points:
+            self.add(timestamp_ms, value)
+
+    def _flush_run(self):
+        run = self._pending_run
+        if not run:
+            return
+        w = self._writer
+        if run >= MIN_RUN:
+            w.write(1, 1)
+            w.write(run, RUN_COUNT_BITS)
+        else:
+            for _ in range(run):
+                w.write(0, 3)  # vlag 0, dod 0, waarde gelijk
+        self._pending_run = 0
+
+    def _write_dod(self, dod: int):
+        w = self._writer
+        if dod == 0:
+            w.write(0, 1)
+            return
+        for prefix, prefix_len, payload in DOD_BUCKETS:
+            if _fits_signed(dod, payload):
+                w.write(prefix, prefix_len)
+                w.write(dod, payload)
+                return
+        prefix, prefix_len, payload = DOD_FALLBACK
+        w.write(prefix, prefix_len)
+        w.write(dod & _MASK64, payload)
+
+    def _write_value(self, bits: int):
+        w = self._writer
+        xor = bits ^ self._prev_bits
+        if xor == 0:
+            w.write(0, 1)
+            return
+
+        leading = 64 - xor.bit_length()
+        trailing = (xor & -xor).bit_length() - 1
+        leading = min(leading, 31)
+
+        if leading >= self._prev_leading and trailing >= self._prev_trailing:
+            # Past in het vorige venster van betekenisvolle bits
+            w.write(0b10, 2)
+            meaningful = 64 - self._prev_leading - self._prev_trailing
+            w.write(xor >> self._prev_trailing, meaningful)
+        else:
+            meaningful = 64 - leading - trailing
+            w.write(0b11, 2)
+            w.write(leading, 5)
+            w.write(meaningful - 1, 6)
+            w.write(xor >> trailing, meaningful)
+            self._prev_leading = leading
+            self._prev_trailing = trailing
+
+    def finish(self) -> bytes:
+        """Sluit het blok af en geef de bytes terug (header + bitstream)"""
+        self._flush_run()
+        return HEADER.pack(MAGIC, self.count) + self._writer.getvalue()
+
+
+def iter_decode(block: bytes) -> Iterator[Tuple[int, float]]:
+    """
+    Decodeer een blok lazy tot (timestamp_ms, value) tuples.
+
+    Raises:
+        ValueError: Als het blok geen geldige header heeft
+    """
+    if len(block) < HEADER.size:
+        raise ValueError("Blok te kort voor header")
+    magic, count = HEADER.unpack_from(block)
+    if magic != MAGIC:
+        raise ValueError(f"Onbekend blok formaat: {magic!r}")
+    if count == 0:
+        return
+
+    r = BitReader(block, HEADER.size)
+    ts = r.read_signed(64)
+    bits = r.read(64)
+    yield ts, bits_to_float(bits)
+
+    delta = 0
+    leading = 0
+    trailing = 0
+    emitted = 1
+    while emitted < count:
+        if r.read_bit():
+            # Run van regelmatige, herhaalde punten
+            run = r.read(RUN_COUNT_BITS)
+            value = bits_to_float(bits)
+            for _ in range(run):
+                ts += delta
+                yield ts, value
+            emitted += run
+            continue
+
+        # Delta-of-delta
+        if r.read_bit() == 0:
+            dod = 0
+        else:
+            prefix_len = 1
+            while prefix_len < 5 and r.read_bit():
+                prefix_len += 1
+            if prefix_len == 5:
+                dod = r.read_signed(DOD_FALLBACK[2])
+            else:
+                dod = r.read_signed(DOD_BUCKETS[prefix_len - 1][2])
+        delta += dod
+        ts += delta
+
+        # XOR waarde
+        if r.read_bit():
+            if r.read_bit() == 0:
+                meaningful = 64 - leading - trailing
+                bits ^= r.read(meaningful) << trailing
+            else:
+                leading = r.read(5)
+                meaningful = r.read(6) + 1
+                trailing = 64 - leading - meaningful
+                bits ^= r.read(meaningful) << trailing
+
+        yield ts, bits_to_float(bits)
+        emitted += 1
+
+
+def encode(points: Iterable[Tuple[int, float]]) -> bytes:
+    """Encodeer een reeks (timestamp_ms, value) tot één blok"""
+    encoder = TimeSeriesEncoder()
+    encoder.add_many(points)
+    return encoder.finish()
+
+
+def decode(block: bytes) -> List[Tuple[int, float]]:
+    """Decodeer een blok tot een lijst van (timestamp_ms, value)"""
+    return list(iter_decode(block))
+
+
+def write_frame(f: BinaryIO, block: bytes) -> int:
+    """
+    Schrijf een blok als frame (lengte prefix) naar een bestand.
+
+    Returns:
+        Aantal geschreven bytes
+    """
+    f.write(FRAME_HEADER.pack(len(block)))
+    f.write(block)
+    return FRAME_HEADER.size + len(block)
+
+
+def iter_frames(f: BinaryIO) -> Iterator[bytes]:
+    """Lees blokken uit een bestand met frames; een afgebroken laatste frame wordt genegeerd"""
+    while True:
+        header = f.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return
+        (length,) = FRAME_HEADER.unpack(header)
+        block = f.read(length)
+        if len(block) < length:
+            return
+        yield block
+
+
+def iter_decode_frames(f: BinaryIO) -> Iterator[Tuple[int, float]]:
+    """Decodeer alle punten uit een bestand met frames, in volgorde"""
+    for block in iter_frames(f):
+        yield from iter_decode(block)
@@ -2,6 +2,21 @@
 """
 Update dynamische waterdata van Rijnland
 Download en update alleen datasets die regelmatig worden bijgewerkt (peilen, meetlocaties, etc.)
+
+Incrementele sync: layers met een edit datum veld (editFieldsInfo of
+LAST_EDITED_DATE) worden na de eerste volledige download bijgewerkt met
+`where LAST_EDITED_DATE > <laatste sync>`; de gewijzigde features worden op
+OBJECTID in de lokale kopie gemerged. Verwijderde features worden opgespoord
+met returnIdsOnly, periodiek (RECONCILE_DAYS) of als het aantal niet klopt.
+
+Wijzigingsdetectie: per layer staat naast het bestand een klein manifest
+(.<bestand>.manifest.json) met de laatste edit datum (editingInfo.lastEditDate
+of max(LAST_EDITED_DATE)) en het aantal features (returnCountOnly). Zolang die
+op de server gelijk zijn wordt de layer niet gedownload en niet gelezen.
+
+Met --flatgeobuf wordt na elke bijgewerkte layer ook <bestand>.fgb geschreven
+(FlatGeobuf met ruimtelijke index, zie flatgeobuf.py). Met --publish worden de
+lagen na een update opnieuw gepubliceerd voor de frontend (zie publish_kaartlagen.py).
 """
 
 import json
@@ -11,16 +26,33 @@ import time
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Iterable, Optional, List
 import hashlib
+from datetime import timedelta, timezone
+
+from arcgis_pbf import PbfDecodeError, parse_query_response, supports_pbf
+from arcgis_paging import LayerPager, PageError, layer_schema_from_page
+from flatgeobuf import convert_geojson
+from geojson_stream import esri_feature_to_geojson, feature_attributes, iter_features, read_member
+from geojson_writer import FeatureCollectionWriter
+from publish_kaartlagen import PUBLISH_DIR, publish
+from response_cache import atomic_write_bytes
+from rate_limiter import limiter_for_url
 
 # Configuratie
 ARCGIS_BASE_URL = "https://rijnland.enl-mcs.nl/arcgis/rest/services"
 OUTPUT_DIR = "rijnland_kaartlagen"
 LOG_DIR = "logs"
-REQUEST_DELAY = 0.5
 MAX_RETRIES = 3
 TIMEOUT = 60
+MAX_FEATURES_PER_QUERY = 1000
+RANGE_WORKERS = 4  # Aantal ObjectID-ranges dat tegelijk wordt opgehaald
+USE_PBF = True  # Features als f=pbf ophalen als de layer dat ondersteunt (zie arcgis_pbf.py)
+MANIFEST_SUFFIX = '.manifest.json'
+EDIT_DATE_FIELDS = ('LAST_EDITED_DATE', 'DATUMINWINNING')  # Kandidaten voor de edit datum
+INCREMENTAL_FIELDS = ('LAST_EDITED_DATE',)  # Edit tracking velden bruikbaar voor incrementele sync
+RECONCILE_DAYS = 7  # Elke N dagen met returnIdsOnly controleren op verwijderde features
+WRITE_FLATGEOBUF = False  # Naast de GeoJSON ook <naam>.fgb schrijven
 
 # Dynamische datasets (worden regelmatig bijgewerkt)
 DYNAMISCHE_DATASETS = [
@@ -81,19 +113,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def max_attribute(features: List[Dict], field: str, current: Optional[int] = None) -> Optional[int]:
+    """Hoogste (niet-lege) waarde van een attribuut, beginnend bij current"""
+    for feature in features:
+        value = feature_attributes(feature).get(field)
+        if value is not None and (current is None or value > current):
+            current = value
+    return current
+
+
+class FeatureHash:
+    """
+    Hash over de inhoud van alle features, bijgewerkt tijdens het streamen.
+    
+    Per feature een sha256 van de GeoJSON vorm (zoals de writer hem schrijft);
+    de digests worden opgeteld, zodat de volgorde niet uitmaakt (parallelle
+    ranges en een incrementele merge leveren dezelfde hash als een volledige
+    download van dezelfde data).
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+    
+    def update(self, features: Iterable[Dict]):
+        for feature in features:
+            encoded = json.dumps(esri_feature_to_geojson(feature), sort_keys=True, ensure_ascii=False,
+                                 separators=(',', ':')).encode('utf-8')
+            self.total = (self.total + int.from_bytes(hashlib.sha256(encoded).digest(), 'big')) % 2 ** 256
+            self.count += 1
+    
+    def hexdigest(self) -> str:
+        if not self.count:
+            return ""
+        return hashlib.sha256(f"{self.count}:{self.total:064x}".encode()).hexdigest()
+
+
+def manifest_path(output_file: Path) -> Path:
+    """Pad van het manifest bij een layer bestand"""
+    return output_file.parent / f".{output_file.name}{MANIFEST_SUFFIX}"
+
+
+def load_manifest(output_file: Path) -> Optional[Dict]:
+    """Lees het manifest van een layer (None als het ontbreekt of het bestand weg is)"""
+    path = manifest_path(output_file)
+    if not output_file.exists() or not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Manifest {path.name} onleesbaar: {e}")
+        return None
+
+
+def save_manifest(output_file: Path, manifest: Dict):
+    """Schrijf het manifest van een layer atomisch"""
+    atomic_write_bytes(manifest_path(output_file),
+                       json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
 class DynamicDataUpdater:
     """Klasse voor het updaten van dynamische waterdata"""
     
-    def __init__(self, base_url: str, output_dir: str):
+    def __init__(self, base_url: str, output_dir: str, incremental: bool = True,
+                 flatgeobuf: bool = WRITE_FLATGEOBUF):
         self.base_url = base_url.rstrip('/') + '/'
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.incremental = incremental
+        self.flatgeobuf = flatgeobuf
         self.stats = {
             'datasets_checked': 0,
             'datasets_updated': 0,
             'datasets_unchanged': 0,
             'datasets_failed': 0,
-            'total_features_downloaded': 0
+            'total_features_downloaded': 0,
+            'downloads_skipped': 0,
+            'datasets_incremental': 0
         }
     
     def sanitize_filename(self, name: str) -> str:
@@ -108,12 +204,15 @@ class DynamicDataUpdater:
         if params is None:
             params = {}
         
-        params['f'] = 'json'
+        params.setdefault('f', 'json')
         
         for attempt in range(retries):
             try:
+                limiter_for_url(url).acquire()
                 response = requests.get(url, params=params, timeout=TIMEOUT)
                 response.raise_for_status()
+                if params['f'] == 'pbf':
+                    return parse_query_response(response)
                 return response.json()
             except requests.exceptions.RequestException as e:
                 logger.warning(f"Request fout bij {url}: {e} (poging {attempt + 1}/{retries})")
@@ -122,29 +221,17 @@ class DynamicDataUpdater:
             except json.JSONDecodeError as e:
                 logger.error(f"JSON decode fout bij {url}: {e}")
                 return None
+            except PbfDecodeError as e:
+                logger.warning(f"pbf decode fout bij {url}: {e}; terugval op f=json")
+                return self.make_request(url, {**params, 'f': 'json'}, retries)
         
         return None
     
     def get_data_hash(self, data: Dict) -> str:
         """Genereer hash van data om te checken of er wijzigingen zijn"""
-        # Gebruik LAST_EDITED_DATE en feature count voor snelle vergelijking
-        features = data.get('features', [])
-        if not features:
-            return ""
-        
-        # Haal laatste edit datum op uit eerste feature
-        last_edit = None
-        if features:
-            attrs = features[0].get('attributes', {})
-            last_edit = attrs.get('LAST_EDITED_DATE') or attrs.get('DATUMINWINNING')
-        
-        hash_data = {
-            'count': len(features),
-            'last_edit': last_edit,
-            'sample_id': features[0].get('attributes', {}).get('OBJECTID') if features else None
-        }
-        
-        return hashlib.md5(json.dumps(hash_data, sort_keys=True).encode()).hexdigest()
+        digest = FeatureHash()
+        digest.update(data.get('features', []))
+        return digest.hexdigest()
     
     def get_existing_hash(self, file_path: Path) -> Optional[str]:
         """Haal hash op van bestaand bestand"""
@@ -152,79 +239,253 @@ class DynamicDataUpdater:
             return None
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            features = data.get('features', [])
-            if not features:
-                return ""
-            
-            # Haal laatste edit datum op
-            last_edit = None
-            if features:
-                attrs = features[0].get('attributes', {})
-                last_edit = attrs.get('LAST_EDITED_DATE') or attrs.get('DATUMINWINNING')
-            
-            hash_data = {
-                'count': len(features),
-                'last_edit': last_edit,
-                'sample_id': features[0].get('attributes', {}).get('OBJECTID') if features else None
-            }
-            
-            return hashlib.md5(json.dumps(hash_data, sort_keys=True).encode()).hexdigest()
+            # Stream de features: de hash houdt niets vast
+            digest = FeatureHash()
+            digest.update(iter_features(file_path))
+            return digest.hexdigest()
         except Exception as e:
             logger.warning(f"Kon hash niet lezen van {file_path}: {e}")
             return None
     
-    def download_features(self, service_path: str, layer_id: int, max_features: int = None) -> Optional[Dict]:
-        """Download alle features van een layer"""
+    def edit_date_field(self, layer_info: Dict) -> Optional[str]:
+        """Bepaal het veld met de laatste edit datum van een layer"""
+        edit_fields = layer_info.get('editFieldsInfo') or {}
+        if edit_fields.get('editDateField'):
+            return edit_fields['editDateField']
+        names = {f.get('name') for f in layer_info.get('fields') or []}
+        return next((name for name in EDIT_DATE_FIELDS if name in names), None)
+    
+    def incremental_field(self, layer_info: Dict) -> Optional[str]:
+        """Edit tracking veld waarmee incrementeel gesynct kan worden (geen meetdatum)"""
+        edit_fields = layer_info.get('editFieldsInfo') or {}
+        if edit_fields.get('editDateField'):
+            return edit_fields['editDateField']
+        names = {f.get('name') for f in layer_info.get('fields') or []}
+        return next((name for name in INCREMENTAL_FIELDS if name in names), None)
+    
+    def get_layer_state(self, service_path: str, layer_id: int, layer_info: Dict) -> Optional[Dict]:
+        """
+        Vraag goedkoop de toestand van een layer op bij de server.
+        
+        Gebruikt editingInfo.lastEditDate uit de layer info (al opgehaald), het aantal
+        features (returnCountOnly) en, als editingInfo ontbreekt, max(<edit datum veld>).
+        
+        Returns:
+            Dict met 'last_edit_date', 'max_edit_date' en 'count', of None als het aantal
+            niet opgevraagd kon worden
+        """
         query_url = f"{self.base_url}{service_path}/{layer_id}/query"
         
-        all_features = []
-        offset = 0
-        has_more = True
-        MAX_FEATURES_PER_QUERY = 1000
+        count_data = self.make_request(query_url, {'where': '1=1', 'returnCountOnly': 'true'})
+        if not count_data or 'count' not in count_data:
+            return None
+        
+        state = {
+            'last_edit_date': (layer_info.get('editingInfo') or {}).get('lastEditDate'),
+            'max_edit_date': None,
+            'count': count_data['count']
+        }
         
-        while has_more:
-            params = {
+        edit_field = self.edit_date_field(layer_info)
+        if state['last_edit_date'] is None and edit_field:
+            stats = self.make_request(query_url, {
                 'where': '1=1',
-                'outFields': '*',
-                'f': 'geojson',
-                'returnGeometry': 'true',
-                'resultOffset': offset,
-                'resultRecordCount': MAX_FEATURES_PER_QUERY
-            }
-            
-            data = self.make_request(query_url, params)
-            
-            if not data:
-                return None
-            
-            if 'features' in data:
-                features = data['features']
-                all_features.extend(features)
-                
+                'returnGeometry': 'false',
+                'outStatistics': json.dumps([{
+                    'statisticType': 'max',
+                    'onStatisticField': edit_field,
+                    'outStatisticFieldName': 'max_edit'
+                }])
+            })
+            features = (stats or {}).get('features') or []
+            if features:
+                attrs = features[0].get('attributes', {})
+                # Veldnaam van de statistiek is niet bij elke server even hoofdlettergevoelig
+                state['max_edit_date'] = next(iter(attrs.values()), None)
+        
+        return state
+    
+    def state_unchanged(self, state: Optional[Dict], manifest: Optional[Dict]) -> bool:
+        """
+        True als de server toestand gelijk is aan het manifest.
+        
+        Alleen het aantal features is niet genoeg: er moet een edit datum zijn.
+        """
+        if not state or not manifest or manifest.get('state') is None:
+            return False
+        if state['last_edit_date'] is None and state['max_edit_date'] is None:
+            return False
+        return state == manifest['state']
+    
+    def download_features(self, service_path: str, layer_id: int, writer: FeatureCollectionWriter,
+                          max_features: int = None, edit_field: Optional[str] = None,
+                          query_format: str = 'json') -> Optional[Dict]:
+        """
+        Download alle features van een layer naar een streaming writer
+        (parallel per ObjectID-range, zie arcgis_paging.py).
+        
+        Returns:
+            Dict met 'layer_schema' (veld- en geometrie metadata), 'max_edit'
+            (hoogste waarde van edit_field) en 'data_hash' (FeatureHash van alle
+            features), of None bij een fout
+        """
+        query_url = f"{self.base_url}{service_path}/{layer_id}/query"
+        
+        layer_schema = {}
+        max_edit = None
+        digest = FeatureHash()
+        
+        pager = LayerPager(self.make_request, query_url, page_size=MAX_FEATURES_PER_QUERY,
+                           workers=RANGE_WORKERS, params={'f': query_format})
+        try:
+            for _, data in pager.pages():
+                features = data.get('features', [])
                 # Stop als we max_features hebben bereikt (voor testen)
-                if max_features and len(all_features) >= max_features:
-                    all_features = all_features[:max_features]
-                    has_more = False
-                elif len(features) < MAX_FEATURES_PER_QUERY:
-                    has_more = False
-                else:
-                    offset += len(features)
-                    logger.debug(f"    {len(all_features)} features gedownload...")
-                    time.sleep(REQUEST_DELAY)
-            elif 'error' in data:
-                logger.error(f"    ArcGIS fout: {data['error']}")
+                if max_features:
+                    features = features[:max_features - writer.count]
+                writer.write_features(features)
+                digest.update(features)
+                if edit_field:
+                    max_edit = max_attribute(features, edit_field, max_edit)
+                
+                # Veld- en geometrie metadata uit de eerste pagina (voor de generieke importer)
+                if not layer_schema:
+                    layer_schema = layer_schema_from_page(data)
+                
+                if max_features and writer.count >= max_features:
+                    break
+                logger.debug(f"    {writer.count} features gedownload...")
+        except PageError as e:
+            logger.error(f"    {e}")
+            return None
+        
+        return {'layer_schema': layer_schema, 'max_edit': max_edit, 'data_hash': digest.hexdigest()}
+    
+    def fetch_object_ids(self, query_url: str) -> Optional[set]:
+        """Alle ObjectIDs van een layer (returnIdsOnly), of None bij een fout"""
+        data = self.make_request(query_url, {'where': '1=1', 'returnIdsOnly': 'true'})
+        if not data or data.get('objectIds') is None:
+            return None
+        return set(data['objectIds'])
+    
+    def sync_incremental(self, service_path: str, layer_id: int, output_file: Path,
+                         manifest: Dict, state: Dict, query_format: str = 'json') -> Optional[Dict]:
+        """
+        Haal alleen features op die sinds de vorige sync zijn bewerkt en merge ze
+        op ObjectID in de lokale kopie.
+        
+        Returns:
+            Dict met 'count', 'changed', 'deleted', 'max_edit', 'reconciled' en 'data_hash',
+            of None als een volledige download nodig is
+        """
+        sync = manifest['sync']
+        edit_field = sync['edit_field']
+        query_url = f"{self.base_url}{service_path}/{layer_id}/query"
+        
+        metadata = read_member(output_file, 'metadata', {}) or {}
+        oid_field = metadata.get('object_id_field') or 'OBJECTID'
+        
+        since = datetime.fromtimestamp(sync['last_edit'] / 1000, tz=timezone.utc)
+        # Afgerond op seconden naar beneden: features uit dezelfde seconde komen
+        # opnieuw mee, maar de merge op ObjectID maakt dat onschadelijk
+        where = f"{edit_field} > TIMESTAMP '{since.strftime('%Y-%m-%d %H:%M:%S')}'"
+        
+        changed = {}
+        max_edit = sync['last_edit']
+        pager = LayerPager(self.make_request, query_url, page_size=MAX_FEATURES_PER_QUERY,
+                           workers=RANGE_WORKERS, where=where, params={'f': query_format})
+        try:
+            for _, data in pager.pages():
+                for feature in data.get('features', []):
+                    oid = feature_attributes(feature).get(oid_field)
+                    if oid is None:
+                        return None
+                    changed[oid] = feature
+                max_edit = max_attribute(data.get('features', []), edit_field, max_edit)
+        except PageError as e:
+            logger.warning(f"  Incrementele query mislukt ({e}); volledige download")
+            return None
+        
+        last_reconcile = datetime.fromisoformat(sync.get('last_reconcile') or '1970-01-01T00:00:00')
+        server_ids = None
+        if datetime.now() - last_reconcile >= timedelta(days=RECONCILE_DAYS):
+            server_ids = self.fetch_object_ids(query_url)
+        
+        def merge(server_ids):
+            """Schrijf de lokale kopie met de wijzigingen; levert de writer (nog niet gecommit)"""
+            pending = dict(changed)
+            deleted = 0
+            writer = FeatureCollectionWriter(output_file)
+            digest = FeatureHash()
+            try:
+                for feature in iter_features(output_file):
+                    oid = feature_attributes(feature).get(oid_field)
+                    if server_ids is not None and oid not in server_ids:
+                        deleted += 1
+                        continue
+                    kept = [pending.pop(oid, feature)]
+                    writer.write_features(kept)
+                    digest.update(kept)
+                # Nieuwe features (niet in de lokale kopie)
+                writer.write_features(pending.values())
+                digest.update(pending.values())
+            except BaseException:
+                writer.abort()
+                raise
+            return writer, deleted, digest
+        
+        writer, deleted, digest = merge(server_ids)
+        if writer.count != state['count'] and server_ids is None:
+            # Aantal klopt niet: er zijn features verwijderd, reconcile nu
+            writer.abort()
+            server_ids = self.fetch_object_ids(query_url)
+            if server_ids is None:
                 return None
-            else:
-                has_more = False
+            writer, deleted, digest = merge(server_ids)
+        
+        with writer:
+            if writer.count != state['count']:
+                logger.warning(f"  Incrementele merge geeft {writer.count} features, server {state['count']}; "
+                               f"volledige download")
+                return None
+            
+            data_hash = digest.hexdigest()
+            metadata.update({
+                'feature_count': writer.count,
+                'update_date': datetime.now().isoformat(),
+                'data_hash': data_hash,
+                'sync_mode': 'incremental'
+            })
+            writer.commit(metadata)
         
         return {
-            'type': 'FeatureCollection',
-            'features': all_features
+            'count': writer.count,
+            'changed': len(changed),
+            'deleted': deleted,
+            'max_edit': max_edit,
+            'reconciled': server_ids is not None,
+            'data_hash': data_hash
         }
     
+    def write_flatgeobuf(self, output_file: Path):
+        """FlatGeobuf kopie van het bijgewerkte bestand; een fout laat de GeoJSON intact"""
+        if not self.flatgeobuf:
+            return
+        try:
+            fgb_file = convert_geojson(output_file)
+            logger.info(f"  ✓ FlatGeobuf geschreven: {fgb_file.name}")
+        except Exception as e:
+            logger.warning(f"  ⚠ FlatGeobuf schrijven mislukt voor {output_file.name}: {e}")
+    
+    def full_manifest(self, state: Optional[Dict], data_hash: str, edit_field: Optional[str],
+                      max_edit: Optional[int]) -> Dict:
+        """Manifest na een volledige download (basis voor de volgende incrementele sync)"""
+        now = datetime.now().isoformat()
+        manifest = {'state': state, 'data_hash': data_hash, 'checked': now}
+        if edit_field and max_edit is not None:
+            manifest['sync'] = {'edit_field': edit_field, 'last_edit': max_edit, 'last_reconcile': now}
+        return manifest
+    
     def update_dataset(self, dataset: Dict) -> bool:
         """Update een dynamische dataset"""
         service_name = self.sanitize_filename(dataset['name'])
@@ -235,71 +496,112 @@ class DynamicDataUpdater:
         logger.info(f"\n[{dataset.get('update_frequency', 'unknown')}] {service_name}")
         logger.info(f"  {description}")
         
-        # Bepaal output bestand
-        layer_info = self.make_request(f"{self.base_url}{service_path}")
-        if not layer_info or 'layers' not in layer_info:
-            logger.error(f"  Kon layer info niet ophalen")
-            return False
-        
-        layer_name = None
-        for layer in layer_info.get('layers', []):
-            if layer['id'] == layer_id:
-                layer_name = layer.get('name', f"Layer_{layer_id}")
-                break
-        
-        if not layer_name:
+        # Layer info: naam, editingInfo en velden in één request
+        layer_info = self.make_request(f"{self.base_url}{service_path}/{layer_id}")
+        if not layer_info or 'error' in layer_info:
             logger.error(f"  Layer {layer_id} niet gevonden")
             return False
         
+        layer_name = layer_info.get('name') or f"Layer_{layer_id}"
         layer_name_safe = self.sanitize_filename(layer_name)
         output_file = self.output_dir / service_name / f"{layer_name_safe}_layer{layer_id}.geojson"
         
-        # Download nieuwe data
-        logger.info(f"  Downloaden...")
-        new_data = self.download_features(service_path, layer_id)
-        
-        if not new_data or not new_data.get('features'):
-            logger.warning(f"  Geen data gevonden")
-            self.stats['datasets_failed'] += 1
-            return False
-        
-        # Check of data is veranderd
-        new_hash = self.get_data_hash(new_data)
-        existing_hash = self.get_existing_hash(output_file)
-        
-        if new_hash == existing_hash and existing_hash is not None:
-            logger.info(f"  ✓ Geen wijzigingen (hash: {new_hash[:8]}...)")
+        # Goedkope wijzigingscheck tegen het manifest: geen download, geen lokaal parsen
+        manifest = load_manifest(output_file)
+        state = self.get_layer_state(service_path, layer_id, layer_info)
+        if self.state_unchanged(state, manifest):
+            logger.info(f"  ✓ Geen wijzigingen volgens server metadata "
+                        f"({state['count']} features, laatste edit {state['last_edit_date'] or state['max_edit_date']})")
             self.stats['datasets_unchanged'] += 1
+            self.stats['downloads_skipped'] += 1
             return False
         
-        # Data is veranderd, sla op
-        logger.info(f"  ⚡ Data bijgewerkt! ({len(new_data['features'])} features)")
-        logger.info(f"  Oude hash: {existing_hash[:8] if existing_hash else 'geen'}...")
-        logger.info(f"  Nieuwe hash: {new_hash[:8]}...")
+        edit_field = self.incremental_field(layer_info)
+        query_format = 'pbf' if USE_PBF and supports_pbf(layer_info) else 'json'
         
-        # Voeg metadata toe
-        geojson = {
-            'type': 'FeatureCollection',
-            'features': new_data['features'],
-            'metadata': {
+        # Incrementeel: alleen features die sinds de vorige sync zijn bewerkt
+        if (self.incremental and state and manifest and manifest.get('sync')
+                and manifest['sync'].get('edit_field') == edit_field):
+            logger.info(f"  Incrementele sync ({edit_field} > laatste sync)...")
+            result = self.sync_incremental(service_path, layer_id, output_file, manifest, state,
+                                           query_format=query_format)
+            if result is not None:
+                now = datetime.now().isoformat()
+                save_manifest(output_file, {
+                    'state': state,
+                    'data_hash': result['data_hash'],
+                    'checked': now,
+                    'sync': {
+                        'edit_field': edit_field,
+                        'last_edit': result['max_edit'],
+                        'last_reconcile': now if result['reconciled'] else manifest['sync'].get('last_reconcile')
+                    }
+                })
+                logger.info(f"  ⚡ {result['changed']} features gewijzigd, {result['deleted']} verwijderd "
+                            f"({result['count']} totaal)")
+                self.write_flatgeobuf(output_file)
+                self.stats['datasets_updated'] += 1
+                self.stats['datasets_incremental'] += 1
+                self.stats['total_features_downloaded'] += result['changed']
+                return True
+        
+        # Download nieuwe data naar een tijdelijk bestand (pas bij commit op zijn plek)
+        logger.info(f"  Downloaden...")
+        with FeatureCollectionWriter(output_file) as writer:
+            summary = self.download_features(service_path, layer_id, writer, edit_field=edit_field,
+                                             query_format=query_format)
+            
+            if summary is None or not writer.count:
+                logger.warning(f"  Geen data gevonden")
+                self.stats['datasets_failed'] += 1
+                return False
+            
+            # Check of data is veranderd. Wijkt de server toestand af van het
+            # manifest, dan is de download per definitie nieuw: niet vergelijken
+            new_hash = summary['data_hash']
+            state_changed = bool(state and manifest and manifest.get('state') is not None
+                                 and state != manifest['state'])
+            if state_changed:
+                existing_hash = manifest.get('data_hash')
+            elif manifest and manifest.get('data_hash'):
+                existing_hash = manifest['data_hash']
+            else:
+                existing_hash = self.get_existing_hash(output_file)
+            
+            if not state_changed and new_hash == existing_hash and existing_hash is not None:
+                logger.info(f"  ✓ Geen wijzigingen (hash: {new_hash[:8]}...)")
+                self.stats['datasets_unchanged'] += 1
+                # Manifest bijwerken zodat de volgende run de download kan overslaan
+                save_manifest(output_file, self.full_manifest(state, existing_hash, edit_field,
+                                                              summary['max_edit']))
+                return False
+            
+            # Data is veranderd, sla op
+            logger.info(f"  ⚡ Data bijgewerkt! ({writer.count} features)")
+            logger.info(f"  Oude hash: {existing_hash[:8] if existing_hash else 'geen'}...")
+            logger.info(f"  Nieuwe hash: {new_hash[:8]}...")
+            
+            # Metadata als trailer achter de features
+            writer.commit({
                 'service': service_path,
                 'layer_id': layer_id,
                 'layer_name': layer_name,
-                'feature_count': len(new_data['features']),
+                'feature_count': writer.count,
                 'update_date': datetime.now().isoformat(),
                 'source': self.base_url,
                 'description': description,
                 'update_frequency': dataset.get('update_frequency', 'unknown'),
-                'data_hash': new_hash
-            }
-        }
+                'data_hash': new_hash,
+                'sync_mode': 'full',
+                'query_format': query_format,
+                **summary['layer_schema']
+            })
         
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(geojson, f, ensure_ascii=False, indent=2)
+        save_manifest(output_file, self.full_manifest(state, new_hash, edit_field, summary['max_edit']))
+        self.write_flatgeobuf(output_file)
         
         self.stats['datasets_updated'] += 1
-        self.stats['total_features_downloaded'] += len(new_data['features'])
+        self.stats['total_features_downloaded'] += writer.count
         
         return True
     
@@ -325,8 +627,6 @@ class DynamicDataUpdater:
             except Exception as e:
                 logger.error(f"Fout bij updaten {dataset['name']}: {e}")
                 self.stats['datasets_failed'] += 1
-            
-            time.sleep(REQUEST_DELAY)
         
         elapsed_time = time.time() - start_time
         
@@ -340,7 +640,9 @@ class DynamicDataUpdater:
         logger.info("=" * 70)
         logger.info(f"Datasets gecontroleerd: {self.stats['datasets_checked']}")
         logger.info(f"Datasets bijgewerkt: {self.stats['datasets_updated']}")
-        logger.info(f"Datasets ongewijzigd: {self.stats['datasets_unchanged']}")
+        logger.info(f"Datasets ongewijzigd: {self.stats['datasets_unchanged']} "
+                    f"({self.stats['downloads_skipped']} zonder download)")
+        logger.info(f"Datasets incrementeel bijgewerkt: {self.stats['datasets_incremental']}")
         logger.info(f"Datasets gefaald: {self.stats['datasets_failed']}")
         logger.info(f"Totaal features gedownload: {self.stats['total_features_downloaded']:,}")
         logger.info(f"Tijd: {elapsed_time:.1f} seconden ({elapsed_time/60:.1f} minuten)")
@@ -350,15 +652,22 @@ def main():
     """Hoofdfunctie"""
     import sys
     
-    # Optionele command line argumenten
+    # Optionele command line argumenten: [filter] [--full] [--flatgeobuf] [--publish]
+    args = [arg for arg in sys.argv[1:] if arg not in ('--full', '--flatgeobuf', '--publish')]
+    incremental = '--full' not in sys.argv
+    flatgeobuf = WRITE_FLATGEOBUF or '--flatgeobuf' in sys.argv
     dataset_filter = None
-    if len(sys.argv) > 1:
-        dataset_filter = sys.argv[1]
+    if args:
+        dataset_filter = args[0]
         logger.info(f"Filter: alleen '{dataset_filter}' updaten")
+    if not incremental:
+        logger.info("Volledige download (incrementele sync uit)")
     
     updater = DynamicDataUpdater(
         base_url=ARCGIS_BASE_URL,
-        output_dir=OUTPUT_DIR
+        output_dir=OUTPUT_DIR,
+        incremental=incremental,
+        flatgeobuf=flatgeobuf
     )
     
     datasets_to_update = DYNAMISCHE_DATASETS
@@ -370,6 +679,10 @@ def main():
     
     try:
         updater.run(datasets_to_update)
+        if '--publish' in sys.argv and updater.stats['datasets_updated']:
+            stats = publish(Path(OUTPUT_DIR), Path(PUBLISH_DIR))
+            logger.info(f"Gepubliceerd naar {PUBLISH_DIR}: {stats['published']} lagen bijgewerkt, "
+                        f"{stats['unchanged']} ongewijzigd")
     except KeyboardInterrupt:
         logger.warning("\n\nUpdate onderbroken door gebruiker")
         updater.print_summary(0)
@@ -0,0 +1,862 @@
+#!/usr/bin/env python3
+"""
+Vector tiles (Mapbox Vector Tile) van de kaartlagen
+===================================================
+
+De kaartviewer laadt nu hele lagen als GeoJSON. Deze module bouwt uit de
+gedownloade lagen onder `rijnland_kaartlagen/` een MVT piramide (standaard
+z8-z16), zodat een kaart alleen de tegels in beeld ophaalt.
+
+Per tegel en zoomniveau:
+- Geometrie wordt naar Web Mercator geprojecteerd (RD New met dezelfde
+  benadering als de kaartviewer), vereenvoudigd met Douglas-Peucker op
+  SIMPLIFY_TOLERANCE tegeleenheden (niet op het hoogste zoomniveau) en
+  geknipt op de tegel plus TILE_BUFFER
+- Ringen kleiner dan MIN_RING_AREA tegeleenheden² vallen weg
+- Onder DETAIL_ZOOM blijven alleen SUMMARY_ATTRIBUTES over; DROPPED_ATTRIBUTES
+  (Shape velden, GlobalID, edit tracking) komen nooit in de tegels
+
+Output is een directory (<z>/<x>/<y>.pbf plus metadata.json in TileJSON stijl)
+of, bij een pad dat op .mbtiles eindigt, één MBTiles bestand (SQLite).
+
+Tegels worden parallel gerenderd (multiprocessing Pool). De build is
+incrementeel: per feature staan een hash en de bbox in een state bestand;
+een volgende run rendert alleen tegels die een gewijzigde, nieuwe of
+verwijderde feature raken (oude en nieuwe bbox) en verwijdert tegels die
+leeg worden. Gewijzigde instellingen geven een volledige rebuild.
+
+Gebruik:
+    python vector_tiles.py rijnland_kaartlagen ../simulatie-peilbeheer/public/tiles
+    python vector_tiles.py rijnland_kaartlagen kaartlagen.mbtiles --workers 8
+    python vector_tiles.py rijnland_kaartlagen tiles --min-zoom 10 --max-zoom 15 --full
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from fnmatch import fnmatchcase
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from download_profiles import is_profile_file
+from geojson_stream import feature_attributes, iter_features, read_member
+from rd_new import GEOGRAPHIC_WKIDS, rd_to_wgs84
+from response_cache import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+MIN_ZOOM = 8
+MAX_ZOOM = 16
+TILE_EXTENT = 4096  # Coördinaten per tegel
+TILE_BUFFER = 64  # Tegeleenheden rond de tegel (voorkomt randen bij lijnen en vlakken)
+SIMPLIFY_TOLERANCE = 1.0  # Douglas-Peucker tolerantie in tegeleenheden
+MIN_RING_AREA = 4.0  # Kleinere ringen (tegeleenheden²) vallen weg
+DETAIL_ZOOM = 14  # Vanaf dit niveau alle attributen
+SUMMARY_ATTRIBUTES = ('OBJECTID', 'CODE', 'NAAM', 'NAME', 'SOORT*', 'TYPE*', '*PEIL*')  # Onder DETAIL_ZOOM
+DROPPED_ATTRIBUTES = ('SHAPE*', 'GLOBALID', 'CREATED_*', 'LAST_EDITED_*')  # Nooit in de tegels
+DEFAULT_SRID = 28992  # RD New, als de laag geen spatial reference heeft
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+STATE_FILE = '.tiles_state.json'
+FORMAT_VERSION = 1  # Ophogen bij wijzigingen in de rendering (forceert een volledige rebuild)
+SIMPLIFY_CACHE_SIZE = 50000  # Vereenvoudigde geometrieën per worker
+
+# MVT GeomType
+POINT, LINESTRING, POLYGON = 1, 2, 3
+
+
+# --- Projectie --------------------------------------------------------------
+
+def lonlat_to_world(lon: float, lat: float) -> Tuple[float, float]:
+    """(lon, lat) naar Web Mercator wereldcoördinaten in [0, 1], y naar beneden"""
+    lat = max(min(lat, 85.0511287798), -85.0511287798)
+    s = math.sin(math.radians(lat))
+    return lon / 360 + 0.5, 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+
+
+def world_to_lonlat(x: float, y: float) -> Tuple[float, float]:
+    return (x - 0.5) * 360, math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+
+def world_projection(srid: int):
+    """Functie (x, y) -> wereldcoördinaten voor een EPSG code"""
+    if srid in GEOGRAPHIC_WKIDS:
+        return lonlat_to_world
+    if srid in (3857, 102100, 102113, 900913):
+        circumference = 2 * math.pi * 6378137.0
+        return lambda x, y: (x / circumference + 0.5, 0.5 - y / circumference)
+    return lambda x, y: lonlat_to_world(*rd_to_wgs84(x, y))
+
+
+def _ring_area(ring) -> float:
+    """Shoelace oppervlakte; positief voor een buitenring volgens MVT (y naar beneden)"""
+    area = 0.0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+# --- Lagen laden ------------------------------------------------------------
+
+def _matches(name: str, patterns: Iterable[str]) -> bool:
+    upper = name.upper()
+    return any(fnmatchcase(upper, pattern) for pattern in patterns)
+
+
+def prune_attributes(attributes: Dict, zoom: int) -> Dict:
+    """Attributen voor een zoomniveau (onder DETAIL_ZOOM alleen SUMMARY_ATTRIBUTES)"""
+    if zoom >= DETAIL_ZOOM:
+        return attributes
+    return {k: v for k, v in attributes.items() if _matches(k, SUMMARY_ATTRIBUTES)}
+
+
+def _project_ring(ring, project) -> List[Tuple[float, float]]:
+    points = [project(vertex[0], vertex[1]) for vertex in ring]
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+
+def geometry_parts(geometry: Optional[Dict], project) -> Optional[Tuple[int, list]]:
+    """
+    Esri JSON of GeoJSON geometrie naar (MVT type, parts in wereldcoördinaten).
+
+    Punten: [(x, y), ...]; lijnen: [[(x, y), ...], ...]; vlakken: [[buitenring, gat, ...], ...]
+    met open ringen, buitenringen met positieve en gaten met negatieve oppervlakte.
+    """
+    if not geometry:
+        return None
+    if 'coordinates' in geometry:
+        kind, coords = geometry.get('type'), geometry.get('coordinates')
+        if not coords:
+            return None
+        if kind == 'Point':
+            return POINT, [project(coords[0], coords[1])]
+        if kind == 'MultiPoint':
+            return POINT, [project(c[0], c[1]) for c in coords]
+        if kind in ('LineString', 'MultiLineString'):
+            paths = [coords] if kind == 'LineString' else coords
+            return LINESTRING, [[project(c[0], c[1]) for c in path] for path in paths]
+        if kind in ('Polygon', 'MultiPolygon'):
+            polygons = [coords] if kind == 'Polygon' else coords
+            result = []
+            for polygon in polygons:
+                rings = [_project_ring(ring, project) for ring in polygon if ring]
+                if rings:
+                    result.append([ring if (_ring_area(ring) >= 0) == (i == 0) else ring[::-1]
+                                   for i, ring in enumerate(rings)])
+            return POLYGON, result
+        return None
+    if 'x' in geometry:
+        if geometry['x'] is None or geometry.get('y') is None:
+            return None
+        return POINT, [project(geometry['x'], geometry['y'])]
+    if 'points' in geometry:
+        return POINT, [project(p[0], p[1]) for p in geometry['points']]
+    if 'paths' in geometry:
+        return LINESTRING, [[project(p[0], p[1]) for p in path] for path in geometry['paths']]
+    if 'rings' in geometry:
+        # Esri buitenringen zijn met de klok mee (y omhoog): positief in wereldcoördinaten
+        polygons = []
+        for ring in geometry['rings']:
+            ring = _project_ring(ring, project)
+            if len(ring) < 3:
+                continue
+            if _ring_area(ring) > 0 or not polygons:
+                polygons.append([ring if _ring_area(ring) > 0 else ring[::-1]])
+            else:
+                polygons[-1].append(ring)
+        return POLYGON, polygons
+    return None
+
+
+def _bbox(kind: int, parts) -> Tuple[float, float, float, float]:
+    if kind == POINT:
+        points = parts
+    elif kind == LINESTRING:
+        points = [p for path in parts for p in path]
+    else:
+        points = [p for polygon in parts for p in polygon[0]]
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def feature_digest(feature: Dict) -> str:
+    """Hash van geometrie en attributen (voor incrementele builds)"""
+    payload = json.dumps([feature.get('geometry'), feature_attributes(feature)], sort_keys=True,
+                         separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def load_layer(path: Path, name: str) -> Dict:
+    """
+    Lees een laagbestand van de downloader.
+
+    Returns:
+        Dict met 'name' en 'features': lijst van (sleutel, type, parts, attributen, bbox, hash)
+    """
+    metadata = read_member(path, 'metadata', {}) or {}
+    reference = metadata.get('spatial_reference') or {}
+    srid = reference.get('latestWkid') or reference.get('wkid')
+    oid_field = metadata.get('object_id_field') or 'OBJECTID'
+
+    features = []
+    seen = set()
+    project = None
+    for index, feature in enumerate(iter_features(path)):
+        geometry = feature.get('geometry')
+        if project is None and geometry:
+            # GeoJSON zonder spatial reference is WGS84 (RFC 7946)
+            project = world_projection(srid or (4326 if 'coordinates' in geometry else DEFAULT_SRID))
+        parts = geometry_parts(geometry, project) if geometry else None
+        if parts is None or not parts[1]:
+            continue
+        attributes = {k: v for k, v in feature_attributes(feature).items()
+                      if v is not None and not _matches(k, DROPPED_ATTRIBUTES)}
+        key = attributes.get(oid_field)
+        if key is None or key in seen:
+            key = f"#{index}"
+        seen.add(key)
+        kind, parts = parts
+        features.append((key, kind, parts, attributes, _bbox(kind, parts), feature_digest(feature)))
+    return {'name': name, 'features': features}
+
+
+def find_layer_files(root: Path) -> List[Path]:
+    """Alle laagbestanden onder root (zonder profielkopieën)"""
+    return sorted(p for p in Path(root).rglob('*.geojson') if not is_profile_file(p))
+
+
+def layer_names(files: List[Path], root: Path) -> List[Tuple[Path, str]]:
+    """MVT laagnaam per bestand: de servicemap, of <map>_layer<id> als de map meer lagen heeft"""
+    per_dir = Counter(p.parent for p in files)
+    result = []
+    for path in files:
+        if path.parent == Path(root):
+            name = path.stem
+        elif per_dir[path.parent] == 1:
+            name = path.parent.name
+        else:
+            match = re.search(r'_layer(\d+)$', path.stem)
+            name = f"{path.parent.name}_layer{match.group(1)}" if match else f"{path.parent.name}_{path.stem}"
+        result.append((path, name))
+    return result
+
+
+# --- Tegels -----------------------------------------------------------------
+
+def tile_range(bbox: Tuple[float, float, float, float], zoom: int) -> Tuple[int, int, int, int]:
+    """Tegels (min_x, min_y, max_x, max_y) die een bbox in wereldcoördinaten raakt, inclusief buffer"""
+    n = 1 << zoom
+    buffer = TILE_BUFFER / TILE_EXTENT
+    return (max(0, math.floor(bbox[0] * n - buffer)), max(0, math.floor(bbox[1] * n - buffer)),
+            min(n - 1, math.floor(bbox[2] * n + buffer)), min(n - 1, math.floor(bbox[3] * n + buffer)))
+
+
+def tiles_for_bbox(bbox, zooms: Iterable[int]) -> Iterator[Tuple[int, int, int]]:
+    for z in zooms:
+        min_x, min_y, max_x, max_y = tile_range(bbox, z)
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                yield z, x, y
+
+
+def tile_index(layers: List[Dict], zooms: Iterable[int]) -> Dict[Tuple[int, int, int], List[Tuple[int, int]]]:
+    """Per tegel de (laag, feature) indices waarvan de bbox de tegel raakt"""
+    zooms = list(zooms)
+    index: Dict[Tuple[int, int, int], List[Tuple[int, int]]] = {}
+    for li, layer in enumerate(layers):
+        for fi, feature in enumerate(layer['features']):
+            for tile in tiles_for_bbox(feature[4], zooms):
+                index.setdefault(tile, []).append((li, fi))
+    return index
+
+
+def simplify(points: List[Tuple[float, float]], tolerance: float) -> List[Tuple[float, float]]:
+    """Douglas-Peucker (iteratief); begin- en eindpunt blijven altijd staan"""
+    if len(points) < 3 or tolerance <= 0:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    tolerance2 = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        dx, dy = points[last][0] - ax, points[last][1] - ay
+        length2 = dx * dx + dy * dy
+        max_distance, index = 0.0, 0
+        for i in range(first + 1, last):
+            px, py = points[i]
+            t = ((px - ax) * dx + (py - ay) * dy) / length2 if length2 else 0.0
+            t = min(1.0, max(0.0, t))
+            distance = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            if distance > max_distance:
+                max_distance, index = distance, i
+        if max_distance > tolerance2:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_parts(kind: int, parts, tolerance: float):
+    """Vereenvoudig alle parts van een feature (tolerantie in wereldcoördinaten)"""
+    if kind == POINT:
+        return parts
+    if kind == LINESTRING:
+        return [simplify(path, tolerance) for path in parts]
+    polygons = []
+    for polygon in parts:
+        rings = [simplify(ring + ring[:1], tolerance)[:-1] for ring in polygon]
+        if len(rings[0]) >= 3:
+            polygons.append([rings[0]] + [ring for ring in rings[1:] if len(ring) >= 3])
+    return polygons
+
+
+def _clip_segment(a, b, lo: float, hi: float):
+    """Liang-Barsky: deel van segment a-b binnen [lo, hi]², of None"""
+    t0, t1 = 0.0, 1.0
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    for p, q in ((-dx, a[0] - lo), (dx, hi - a[0]), (-dy, a[1] - lo), (dy, hi - a[1])):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    start = (a[0] + t0 * dx, a[1] + t0 * dy) if t0 > 0 else a
+    end = (a[0] + t1 * dx, a[1] + t1 * dy) if t1 < 1 else b
+    return start, end
+
+
+def clip_line(path, lo: float, hi: float) -> List[list]:
+    """Knip een lijn op het vierkant [lo, hi]²; levert de stukken binnen het vierkant"""
+    pieces, current = [], []
+    for a, b in zip(path, path[1:]):
+        segment = _clip_segment(a, b, lo, hi)
+        if segment is None:
+            if current:
+                pieces.append(current)
+                current = []
+            continue
+        start, end = segment
+        if current and start is a:
+            current.append(end)
+        else:
+            if current:
+                pieces.append(current)
+            current = [start, end]
+        if end is not b:
+            pieces.append(current)
+            current = []
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def clip_ring(ring, lo: float, hi: float) -> list:
+    """Sutherland-Hodgman: knip een (open) ring op het vierkant [lo, hi]²"""
+    for axis, bound, keep_above in ((0, lo, True), (0, hi, False), (1, lo, True), (1, hi, False)):
+        if not ring:
+            break
+        clipped = []
+        previous = ring[-1]
+        previous_inside = previous[axis] >= bound if keep_above else previous[axis] <= bound
+        for point in ring:
+            inside = point[axis] >= bound if keep_above else point[axis] <= bound
+            if inside != previous_inside:
+                t = (bound - previous[axis]) / (point[axis] - previous[axis])
+                other = 1 - axis
+                crossing = [0.0, 0.0]
+                crossing[axis] = bound
+                crossing[other] = previous[other] + t * (point[other] - previous[other])
+                clipped.append(tuple(crossing))
+            if inside:
+                clipped.append(point)
+            previous, previous_inside = point, inside
+        ring = clipped
+    return ring
+
+
+def _round(points) -> List[Tuple[int, int]]:
+    """Naar gehele tegelcoördinaten, zonder herhaalde punten"""
+    result = []
+    for x, y in points:
+        point = (round(x), round(y))
+        if not result or result[-1] != point:
+            result.append(point)
+    return result
+
+
+def tile_geometry(kind: int, parts, zoom: int, x: int, y: int):
+    """Geometrie van een feature in tegelcoördinaten (geknipt en afgerond), of None als er niets overblijft"""
+    scale = TILE_EXTENT * (1 << zoom)
+    ox, oy = x * TILE_EXTENT, y * TILE_EXTENT
+    lo, hi = -TILE_BUFFER, TILE_EXTENT + TILE_BUFFER
+
+    def transform(points):
+        return [(px * scale - ox, py * scale - oy) for px, py in points]
+
+    def inside(points):
+        return all(lo <= px <= hi and lo <= py <= hi for px, py in points)
+
+    if kind == POINT:
+        points = [p for p in _round(transform(parts)) if lo <= p[0] <= hi and lo <= p[1] <= hi]
+        return points or None
+
+    if kind == LINESTRING:
+        lines = []
+        for path in parts:
+            path = transform(path)
+            for piece in ([path] if inside(path) else clip_line(path, lo, hi)):
+                piece = _round(piece)
+                if len(piece) >= 2:
+                    lines.append(piece)
+        return lines or None
+
+    polygons = []
+    for polygon in parts:
+        rings = []
+        for i, ring in enumerate(polygon):
+            ring = transform(ring)
+            if not inside(ring):
+                ring = clip_ring(ring, lo, hi)
+            ring = _round(ring)
+            if len(ring) > 1 and ring[0] == ring[-1]:
+                ring.pop()
+            area = _ring_area(ring) if len(ring) >= 3 else 0.0
+            if abs(area) < MIN_RING_AREA:
+                if i == 0:
+                    break  # Buitenring te klein: gaten vervallen ook
+                continue
+            # MVT: buitenring positieve, gat negatieve oppervlakte
+            if (area > 0) != (i == 0):
+                ring.reverse()
+            rings.append(ring)
+        if rings:
+            polygons.append(rings)
+    return polygons or None
+
+
+# --- MVT codering -----------------------------------------------------------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _varint_field(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _bytes_field(number: int, data: bytes) -> bytes:
+    return _varint((number << 3) | 2) + _varint(len(data)) + data
+
+
+def _packed_field(number: int, values: List[int]) -> bytes:
+    return _bytes_field(number, b''.join(_varint(v) for v in values))
+
+
+def encode_geometry(kind: int, geometry) -> List[int]:
+    """MVT geometrie commando's (MoveTo, LineTo, ClosePath met zigzag deltas)"""
+    commands = []
+    cursor = [0, 0]
+
+    def vertices(points):
+        for px, py in points:
+            commands.append(_zigzag(px - cursor[0]))
+            commands.append(_zigzag(py - cursor[1]))
+            cursor[0], cursor[1] = px, py
+
+    if kind == POINT:
+        commands.append(1 | (len(geometry) << 3))
+        vertices(geometry)
+    elif kind == LINESTRING:
+        for line in geometry:
+            commands.append(1 | (1 << 3))
+            vertices(line[:1])
+            commands.append(2 | ((len(line) - 1) << 3))
+            vertices(line[1:])
+    else:
+        for polygon in geometry:
+            for ring in polygon:
+                commands.append(1 | (1 << 3))
+                vertices(ring[:1])
+                commands.append(2 | ((len(ring) - 1) << 3))
+                vertices(ring[1:])
+                commands.append(7 | (1 << 3))
+    return commands
+
+
+def _encode_value(value) -> bytes:
+    """MVT Value: string 1, double 3, uint 5, sint 6, bool 7"""
+    if isinstance(value, bool):
+        return _varint_field(7, int(value))
+    if isinstance(value, int) and -(1 << 63) <= value < (1 << 64):
+        return _varint_field(5, value) if value >= 0 else _varint_field(6, _zigzag(value))
+    if isinstance(value, float):
+        return _varint((3 << 3) | 1) + struct.pack('<d', value)
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    return _bytes_field(1, value.encode('utf-8'))
+
+
+class _LayerBuilder:
+    """Verzamelt features van één MVT laag met gedeelde keys en values tabellen"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.keys: Dict[str, int] = {}
+        self.values: Dict[bytes, int] = {}
+        self.features: List[bytes] = []
+
+    def add(self, feature_id, kind: int, geometry, attributes: Dict):
+        tags = []
+        for key, value in attributes.items():
+            tags.append(self.keys.setdefault(key, len(self.keys)))
+            tags.append(self.values.setdefault(_encode_value(value), len(self.values)))
+        body = b''
+        if isinstance(feature_id, int) and not isinstance(feature_id, bool) and feature_id >= 0:
+            body += _varint_field(1, feature_id)
+        if tags:
+            body += _packed_field(2, tags)
+        body += _varint_field(3, kind) + _packed_field(4, encode_geometry(kind, geometry))
+        self.features.append(body)
+
+    def encode(self) -> bytes:
+        out = [_varint_field(15, 2), _bytes_field(1, self.name.encode('utf-8'))]
+        out += [_bytes_field(2, feature) for feature in self.features]
+        out += [_bytes_field(3, key.encode('utf-8')) for key in self.keys]
+        out += [_bytes_field(4, value) for value in self.values]
+        out.append(_varint_field(5, TILE_EXTENT))
+        return b''.join(out)
+
+
+def render_tile(layers: List[Dict], zoom: int, x: int, y: int, refs: List[Tuple[int, int]],
+                tolerance: float = 0.0, cache: Optional[Dict] = None) -> Optional[bytes]:
+    """
+    Render één tegel.
+
+    Args:
+        layers: Geladen lagen (zie load_layer)
+        refs: (laag, feature) indices waarvan de bbox de tegel raakt
+        tolerance: Vereenvoudiging in wereldcoördinaten (0: geen)
+        cache: Optionele cache van vereenvoudigde geometrie per (laag, feature, zoom)
+
+    Returns:
+        MVT bytes, of None als er na knippen en filteren niets overblijft
+    """
+    by_layer: Dict[int, List[int]] = {}
+    for li, fi in refs:
+        by_layer.setdefault(li, []).append(fi)
+    encoded = []
+    for li in sorted(by_layer):
+        builder = _LayerBuilder(layers[li]['name'])
+        for fi in sorted(by_layer[li]):
+            key, kind, parts, attributes, _, _ = layers[li]['features'][fi]
+            if tolerance and kind != POINT:
+                cache_key = (li, fi, zoom)
+                simplified = cache.get(cache_key) if cache is not None else None
+                if simplified is None:
+                    simplified = simplify_parts(kind, parts, tolerance)
+                    if cache is not None:
+                        if len(cache) >= SIMPLIFY_CACHE_SIZE:
+                            cache.clear()
+                        cache[cache_key] = simplified
+                parts = simplified
+            geometry = tile_geometry(kind, parts, zoom, x, y)
+            if geometry:
+                builder.add(key, kind, geometry, prune_attributes(attributes, zoom))
+        if builder.features:
+            encoded.append(_bytes_field(3, builder.encode()))
+    return b''.join(encoded) or None
+
+
+_worker_layers: List[Dict] = []
+_worker_cache: Dict = {}
+
+
+def _init_worker(layers: List[Dict]):
+    global _worker_layers
+    _worker_layers = layers
+    _worker_cache.clear()
+
+
+def _render_task(task) -> Tuple[int, int, int, Optional[bytes]]:
+    zoom, x, y, refs, tolerance = task
+    return zoom, x, y, render_tile(_worker_layers, zoom, x, y, refs, tolerance, _worker_cache)
+
+
+def _render_all(layers: List[Dict], tasks: List[tuple], workers: int) -> Iterator[tuple]:
+    """Render tegels in een process pool (taken op volgorde, zodat een worker buren krijgt)"""
+    if workers > 1 and len(tasks) > 1:
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with Pool(processes=workers, initializer=_init_worker, initargs=(layers,)) as pool:
+            yield from pool.imap_unordered(_render_task, tasks, chunksize=chunksize)
+    else:
+        _init_worker(layers)
+        yield from map(_render_task, tasks)
+
+
+# --- Opslag -----------------------------------------------------------------
+
+class DirectoryTileStore:
+    """Tegels als <root>/<z>/<x>/<y>.pbf plus metadata.json"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.state_path = self.root / STATE_FILE
+
+    def put(self, zoom: int, x: int, y: int, data: bytes):
+        atomic_write_bytes(self.root / str(zoom) / str(x) / f"{y}.pbf", data)
+
+    def delete(self, zoom: int, x: int, y: int):
+        (self.root / str(zoom) / str(x) / f"{y}.pbf").unlink(missing_ok=True)
+
+    def clear(self):
+        if self.root.exists():
+            for path in self.root.iterdir():
+                if path.is_dir() and path.name.isdigit():
+                    shutil.rmtree(path)
+
+    def set_metadata(self, metadata: Dict):
+        metadata = {**metadata, 'tiles': ['{z}/{x}/{y}.pbf']}
+        atomic_write_bytes(self.root / 'metadata.json',
+                           json.dumps(metadata, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class MBTilesStore:
+    """Tegels in één MBTiles bestand (SQLite, TMS rijen, gzip gecomprimeerde tegels)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.state_path = self.path.with_name(f".{self.path.name}.state.json")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT);
+            CREATE UNIQUE INDEX IF NOT EXISTS metadata_name ON metadata (name);
+            CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                                              tile_data BLOB);
+            CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row);
+        """)
+
+    def put(self, zoom: int, x: int, y: int, data: bytes):
+        self.conn.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                          (zoom, x, (1 << zoom) - 1 - y, gzip.compress(data, mtime=0)))
+
+    def delete(self, zoom: int, x: int, y: int):
+        self.conn.execute("DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                          (zoom, x, (1 << zoom) - 1 - y))
+
+    def get(self, zoom: int, x: int, y: int) -> Optional[bytes]:
+        row = self.conn.execute("SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                                "AND tile_row = ?", (zoom, x, (1 << zoom) - 1 - y)).fetchone()
+        return gzip.decompress(row[0]) if row else None
+
+    def clear(self):
+        self.conn.execute("DELETE FROM tiles")
+
+    def set_metadata(self, metadata: Dict):
+        rows = {
+            'name': metadata['name'],
+            'format': 'pbf',
+            'minzoom': str(metadata['minzoom']),
+            'maxzoom': str(metadata['maxzoom']),
+            'bounds': ','.join(f"{v:.6f}" for v in metadata['bounds']),
+            'center': ','.join(f"{v:.6f}" for v in metadata['center']),
+            'json': json.dumps({'vector_layers': metadata['vector_layers']}, ensure_ascii=False),
+        }
+        self.conn.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)", rows.items())
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def open_store(output: Path):
+    """MBTiles bij een .mbtiles pad, anders een directory"""
+    output = Path(output)
+    return MBTilesStore(output) if output.suffix == '.mbtiles' else DirectoryTileStore(output)
+
+
+# --- Build ------------------------------------------------------------------
+
+def _settings_hash(min_zoom: int, max_zoom: int) -> str:
+    settings = [FORMAT_VERSION, min_zoom, max_zoom, TILE_EXTENT, TILE_BUFFER, SIMPLIFY_TOLERANCE, MIN_RING_AREA,
+                DETAIL_ZOOM, SUMMARY_ATTRIBUTES, DROPPED_ATTRIBUTES]
+    return hashlib.blake2b(json.dumps(settings).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _tilejson(layers: List[Dict], min_zoom: int, max_zoom: int) -> Dict:
+    boxes = [f[4] for layer in layers for f in layer['features']]
+    west, north = world_to_lonlat(min(b[0] for b in boxes), min(b[1] for b in boxes))
+    east, south = world_to_lonlat(max(b[2] for b in boxes), max(b[3] for b in boxes))
+    vector_layers = []
+    for layer in layers:
+        fields = {}
+        for feature in layer['features']:
+            for key, value in feature[3].items():
+                fields.setdefault(key, 'Boolean' if isinstance(value, bool) else
+                                  'Number' if isinstance(value, (int, float)) else 'String')
+        vector_layers.append({'id': layer['name'], 'fields': fields, 'minzoom': min_zoom, 'maxzoom': max_zoom})
+    return {
+        'name': 'rijnland_kaartlagen',
+        'format': 'pbf',
+        'minzoom': min_zoom,
+        'maxzoom': max_zoom,
+        'bounds': [west, south, east, north],
+        'center': [(west + east) / 2, (south + north) / 2, min_zoom],
+        'vector_layers': vector_layers,
+        'generated': datetime.now().isoformat()
+    }
+
+
+def _dirty_tiles(old_layers: Dict, new_layers: Dict, zooms: List[int]) -> Tuple[Set, int]:
+    """Tegels geraakt door gewijzigde, nieuwe of verwijderde features (oude en nieuwe bbox)"""
+    dirty = set()
+    changed = 0
+    for name in old_layers.keys() | new_layers.keys():
+        old_features, new_features = old_layers.get(name, {}), new_layers.get(name, {})
+        for key in old_features.keys() | new_features.keys():
+            before, after = old_features.get(key), new_features.get(key)
+            if before == after:
+                continue
+            changed += 1
+            for entry in (before, after):
+                if entry:
+                    dirty.update(tiles_for_bbox(entry[1:], zooms))
+    return dirty, changed
+
+
+def build_tiles(source_dir: Path, output: Path, min_zoom: int = MIN_ZOOM, max_zoom: int = MAX_ZOOM,
+                workers: int = WORKERS, full: bool = False) -> Dict:
+    """
+    Bouw of werk de tegelpiramide bij.
+
+    Args:
+        source_dir: Directory met de laagbestanden (rijnland_kaartlagen)
+        output: Doel directory, of een .mbtiles bestand
+        min_zoom, max_zoom: Zoomniveaus
+        workers: Aantal processen (1: in dit proces)
+        full: Alles opnieuw renderen, ook als er een state bestand is
+
+    Returns:
+        Statistieken: layers, features, changed_features, tiles_written, tiles_deleted, seconds
+    """
+    start = time.time()
+    source_dir = Path(source_dir)
+    zooms = list(range(min_zoom, max_zoom + 1))
+    layers = [load_layer(path, name) for path, name in layer_names(find_layer_files(source_dir), source_dir)]
+    layers = [layer for layer in layers if layer['features']]
+    settings = _settings_hash(min_zoom, max_zoom)
+    state = {
+        'settings': settings,
+        'layers': {layer['name']: {str(f[0]): [f[5], *f[4]] for f in layer['features']}
+                   for layer in layers}
+    }
+
+    store = open_store(output)
+    previous = None
+    if not full and store.state_path.exists():
+        try:
+            previous = json.loads(store.state_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"State bestand onleesbaar, volledige rebuild: {e}")
+    index = tile_index(layers, zooms)
+
+    if previous and previous.get('settings') == settings:
+        dirty, changed = _dirty_tiles(previous.get('layers', {}), state['layers'], zooms)
+    else:
+        # Volledige rebuild: eerst de state weg, zodat een onderbroken rebuild niet als incrementeel geldt
+        store.state_path.unlink(missing_ok=True)
+        store.clear()
+        dirty, changed = set(index), sum(len(layer['features']) for layer in layers)
+
+    tasks = [(z, x, y, index[(z, x, y)], SIMPLIFY_TOLERANCE / (TILE_EXTENT << z) if z < max_zoom else 0.0)
+             for z, x, y in sorted(dirty) if (z, x, y) in index]
+    written = deleted = 0
+    try:
+        for z, x, y, data in _render_all(layers, tasks, workers):
+            if data:
+                store.put(z, x, y, data)
+                written += 1
+            else:
+                store.delete(z, x, y)
+                deleted += 1
+        for tile in dirty:
+            if tile not in index:
+                store.delete(*tile)
+                deleted += 1
+        if layers:
+            store.set_metadata(_tilejson(layers, min_zoom, max_zoom))
+    finally:
+        store.close()
+    atomic_write_bytes(store.state_path, json.dumps(state, separators=(',', ':')).encode('utf-8'))
+
+    return {
+        'layers': len(layers),
+        'features': sum(len(layer['features']) for layer in layers),
+        'changed_features': changed,
+        'tiles_written': written,
+        'tiles_deleted': deleted,
+        'seconds': time.time() - start
+    }
+
+
+def main():
+    """CLI voor het bouwen van de tegelpiramide"""
+    parser = argparse.ArgumentParser(description='Bouw Mapbox Vector Tiles van de kaartlagen')
+    parser.add_argument('source', help='Directory met de laagbestanden (bijv. rijnland_kaartlagen)')
+    parser.add_argument('output', help='Doel directory, of een .mbtiles bestand')
+    parser.add_argument('--min-zoom', type=int, default=MIN_ZOOM, help=f'Laagste zoomniveau (default: {MIN_ZOOM})')
+    parser.add_argument('--max-zoom', type=int, default=MAX_ZOOM, help=f'Hoogste zoomniveau (default: {MAX_ZOOM})')
+    parser.add_argument('--workers', type=int, default=WORKERS, help=f'Aantal processen (default: {WORKERS})')
+    parser.add_argument('--full', action='store_true', help='Alle tegels opnieuw renderen')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    stats = build_tiles(Path(args.source), Path(args.output), args.min_zoom, args.max_zoom,
+                        args.workers, args.full)
+    print(f"{stats['layers']} lagen, {stats['features']:,} features ({stats['changed_features']:,} gewijzigd): "
+          f"{stats['tiles_written']:,} tegels geschreven, {stats['tiles_deleted']:,} verwijderd "
+          f"in {stats['seconds']:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
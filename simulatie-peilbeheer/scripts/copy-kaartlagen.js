@@ -32,8 +32,8 @@ function copyDirectory(src, dest) {
 
     if (entry.isDirectory()) {
       copyDirectory(srcPath, destPath);
-    } else if (entry.isFile() && entry.name.endsWith('.geojson')) {
-      // Alleen GeoJSON bestanden kopiëren
+    } else if (entry.isFile() && (entry.name.endsWith('.geojson') || entry.name.endsWith('.fgb'))) {
+      // Alleen GeoJSON en FlatGeobuf bestanden kopiëren (.fgb: bbox reads met HTTP range requests)
       fs.copyFileSync(srcPath, destPath);
       console.log(`✓ Kopieerd: ${entry.name}`);
     }
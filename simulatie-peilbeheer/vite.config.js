@@ -1,7 +1,7 @@
 import { defineConfig } from 'vite'
 import vue from '@vitejs/plugin-vue'
 import tailwindcss from '@tailwindcss/vite'
-import { readFileSync, existsSync, readdirSync, writeFileSync, statSync } from 'fs'
+import { readFileSync, existsSync, readdirSync, writeFileSync, statSync, mkdirSync } from 'fs'
 import { resolve } from 'path'
 
 // https://vite.dev/config/
@@ -38,133 +38,43 @@ export default defineConfig({
     {
       name: 'hydronet-api-proxy',
       configureServer(server) {
+        // Laatste punten per gemaal: de Python fetcher schrijft na elke append
+        // peilbesluiten/realtime_gemaal_data/segments/_latest/<code>.json
+        // ({ station, updated, last_ts, window_ms, points: [[timestamp_ms, value], ...] })
+        const latestDir = resolve(__dirname, '..', 'peilbesluiten', 'realtime_gemaal_data', 'segments', '_latest')
+        const readLatest = (code) => {
+          const filePath = resolve(latestDir, `${code}.json`)
+          if (!existsSync(filePath)) return null
+          return JSON.parse(readFileSync(filePath, 'utf-8'))
+        }
+
         // Endpoint om lijst van gemalen met data op te halen (alleen opgeslagen data - geen API checks bij opstart)
         server.middlewares.use('/api/gemalen-met-data', async (req, res, next) => {
           try {
-            const realtimeDataDir = resolve(__dirname, '..', 'peilbesluiten', 'realtime_gemaal_data')
-            let files = []
-            try {
-              if (existsSync(realtimeDataDir)) {
-                files = readdirSync(realtimeDataDir)
-              }
-            } catch (e) {
-              console.warn(`[Proxy] Kon directory niet lezen: ${e.message}`)
-            }
-            
-            // Extraheer unieke gemaal codes - alle gemalen met opgeslagen data worden gemarkeerd
-            // (De filtering op laatste 3 uur gebeurt alleen bij het tonen van de grafiek)
-            const gemalenSet = new Set()
-            
-            // Groepeer bestanden per gemaal code
-            const gemaalFilesMap = new Map()
-            files.forEach(file => {
-              const match = file.match(/^gemaal_([^_]+)_/)
-              if (match) {
-                const code = match[1]
-                if (!gemaalFilesMap.has(code)) {
-                  gemaalFilesMap.set(code, [])
-                }
-                gemaalFilesMap.get(code).push(file)
-              }
-            })
-            
-            // Check voor elk gemaal of er data beschikbaar is (ongeacht hoe oud)
-            for (const [code, fileList] of gemaalFilesMap.entries()) {
-              // Sorteer op datum (nieuwste eerst)
-              fileList.sort().reverse()
-              const latestFile = fileList[0]
-              const filePath = resolve(realtimeDataDir, latestFile)
-              
-              try {
-                const fileContent = readFileSync(filePath, 'utf-8')
-                const savedData = JSON.parse(fileContent)
-                
-                // Als er data is (ongeacht hoe oud), markeer het gemaal als "met data"
-                if (savedData.data && savedData.data.series && savedData.data.series.length > 0) {
-                  const series = savedData.data.series[0]
-                  if (series.data && series.data.length > 0) {
-                    // Heeft data beschikbaar - markeer als groen
-                    gemalenSet.add(code)
-                  }
-                }
-              } catch (e) {
-                // Skip dit bestand als het niet gelezen kan worden
-                console.warn(`[Proxy] Kon bestand niet lezen: ${latestFile}`)
-              }
-            }
-            
-            // GEEN API check bij opstart - alleen opgeslagen data gebruiken voor groene markering
-            // API checks gebeuren alleen wanneer gebruiker op een gemaal klikt
-            
-            const result = {
-              gemalen: Array.from(gemalenSet),
-              totaal: gemalenSet.size,
-              opgeslagen: gemalenSet.size
-            }
-            
-            res.setHeader('Content-Type', 'application/json')
-            res.setHeader('Access-Control-Allow-Origin', '*')
-            res.end(JSON.stringify(result))
-          } catch (error) {
-            console.error('[Proxy] Fout bij ophalen gemalen lijst:', error)
-            res.statusCode = 500
-            res.setHeader('Content-Type', 'application/json')
-            res.end(JSON.stringify({ error: error.message || 'Onbekende fout' }))
-          }
-        })
-        
-        // Endpoint om lijst van gemalen met data op te halen (alleen opgeslagen data - geen API checks bij opstart)
-        server.middlewares.use('/api/gemalen-met-data', async (req, res, next) => {
-          try {
-            const realtimeDataDir = resolve(__dirname, '..', 'peilbesluiten', 'realtime_gemaal_data')
             let files = []
             try {
-              if (existsSync(realtimeDataDir)) {
-                files = readdirSync(realtimeDataDir)
+              if (existsSync(latestDir)) {
+                files = readdirSync(latestDir).filter(f => f.endsWith('.json'))
               }
             } catch (e) {
               console.warn(`[Proxy] Kon directory niet lezen: ${e.message}`)
             }
             
-            // Extraheer unieke gemaal codes - alle gemalen met opgeslagen data worden gemarkeerd
+            // Alle gemalen met opgeslagen punten worden gemarkeerd, ongeacht hoe oud
             // (De filtering op laatste 3 uur gebeurt alleen bij het tonen van de grafiek)
+            // Extra series van een gemaal (<code>__series1.json) tellen niet mee
             const gemalenSet = new Set()
-            
-            // Groepeer bestanden per gemaal code
-            const gemaalFilesMap = new Map()
-            files.forEach(file => {
-              const match = file.match(/^gemaal_([^_]+)_/)
-              if (match) {
-                const code = match[1]
-                if (!gemaalFilesMap.has(code)) {
-                  gemaalFilesMap.set(code, [])
-                }
-                gemaalFilesMap.get(code).push(file)
-              }
-            })
-            
-            // Check voor elk gemaal of er data beschikbaar is (ongeacht hoe oud)
-            for (const [code, fileList] of gemaalFilesMap.entries()) {
-              // Sorteer op datum (nieuwste eerst)
-              fileList.sort().reverse()
-              const latestFile = fileList[0]
-              const filePath = resolve(realtimeDataDir, latestFile)
-              
+            for (const file of files) {
+              const code = file.slice(0, -'.json'.length)
+              if (code.includes('__')) continue
               try {
-                const fileContent = readFileSync(filePath, 'utf-8')
-                const savedData = JSON.parse(fileContent)
-                
-                // Als er data is (ongeacht hoe oud), markeer het gemaal als "met data"
-                if (savedData.data && savedData.data.series && savedData.data.series.length > 0) {
-                  const series = savedData.data.series[0]
-                  if (series.data && series.data.length > 0) {
-                    // Heeft data beschikbaar - markeer als groen
-                    gemalenSet.add(code)
-                  }
+                const snapshot = readLatest(code)
+                if (snapshot && snapshot.points && snapshot.points.length > 0) {
+                  gemalenSet.add(code)
                 }
               } catch (e) {
                 // Skip dit bestand als het niet gelezen kan worden
-                console.warn(`[Proxy] Kon bestand niet lezen: ${latestFile}`)
+                console.warn(`[Proxy] Kon bestand niet lezen: ${file}`)
               }
             }
             
@@ -201,86 +111,42 @@ export default defineConfig({
           }
 
           try {
-            // Stap 1: Probeer eerst lokale opgeslagen data te vinden
-            const realtimeDataDir = resolve(__dirname, '..', 'peilbesluiten', 'realtime_gemaal_data')
-            let files = []
+            // Stap 1: Probeer eerst de laatste punten uit de segment store
             try {
-              if (existsSync(realtimeDataDir)) {
-                files = readdirSync(realtimeDataDir)
-              }
-            } catch (e) {
-              console.warn(`[Proxy] Kon directory niet lezen: ${e.message}`)
-            }
-            
-            // Zoek het meest recente bestand voor dit gemaal
-            const gemaalFiles = files.filter(f => f.startsWith(`gemaal_${gemaalCode}_`) && f.endsWith('.json'))
-            
-            let useLocalData = false
-            let localDataAge = Infinity
-            
-            if (gemaalFiles.length > 0) {
-              // Sorteer op datum (nieuwste eerst)
-              gemaalFiles.sort().reverse()
-              const latestFile = gemaalFiles[0]
-              const filePath = resolve(realtimeDataDir, latestFile)
-              
-              try {
-                const fileStats = statSync(filePath)
-                const fileContent = readFileSync(filePath, 'utf-8')
-                const savedData = JSON.parse(fileContent)
-                
+              const snapshot = readLatest(gemaalCode)
+              if (snapshot) {
                 const now = Date.now()
-                localDataAge = now - fileStats.mtimeMs
-                const thirtyMinutesAgo = now - (30 * 60 * 1000)
+                const localDataAge = now - statSync(resolve(latestDir, `${gemaalCode}.json`)).mtimeMs
+                const threeHoursAgo = now - (3 * 60 * 60 * 1000)
                 
                 // Gebruik lokale data alleen als deze nieuwer is dan 30 minuten
-                if (localDataAge <= 30 * 60 * 1000 && savedData.data && savedData.data.series && savedData.data.series.length > 0) {
-                  const threeHoursAgo = now - (3 * 60 * 60 * 1000)
-                  
-                  const result = {
-                    gemaalCode,
-                    series: savedData.data.series.map(s => ({
-                      name: s.name || 'Debiet',
-                      data: s.data
-                        .map(point => {
-                          // Converteer timestamp naar Date object
-                          const timestamp = point.timestamp_ms || new Date(point.timestamp).getTime()
-                          return {
-                            timestamp: new Date(timestamp),
-                            timestampMs: timestamp,
-                            value: point.value || 0
-                          }
-                        })
-                        .filter(point => {
-                          // Filter alleen laatste 3 uur
-                          return point.timestampMs >= threeHoursAgo && point.timestampMs <= now
-                        })
-                        .sort((a, b) => a.timestampMs - b.timestampMs) // Sorteer op tijd
+                if (localDataAge <= 30 * 60 * 1000) {
+                  const data = snapshot.points
+                    .filter(([timestampMs]) => timestampMs >= threeHoursAgo && timestampMs <= now)
+                    .map(([timestampMs, value]) => ({
+                      timestamp: new Date(timestampMs),
+                      timestampMs,
+                      value: value || 0
                     }))
-                  }
                   
                   // Alleen terugsturen als er data is van laatste 3 uur
-                  if (result.series[0].data.length > 0) {
+                  if (data.length > 0) {
                     console.log(`[Proxy] Gebruik lokale data voor gemaal ${gemaalCode} (${Math.round(localDataAge / 60000)} minuten oud)`)
                     res.setHeader('Content-Type', 'application/json')
                     res.setHeader('Access-Control-Allow-Origin', '*')
-                    res.end(JSON.stringify(result))
+                    res.end(JSON.stringify({ gemaalCode, series: [{ name: 'Debiet', data }] }))
                     return
                   }
-                }
-                
-                // Lokale data is ouder dan 30 minuten of heeft geen data van laatste 3 uur
-                if (localDataAge > 30 * 60 * 1000) {
-                  console.log(`[Proxy] Lokale data voor ${gemaalCode} is ${Math.round(localDataAge / 60000)} minuten oud - haal nieuwe data op via API`)
-                } else {
                   console.log(`[Proxy] Lokale data voor ${gemaalCode} heeft geen data van laatste 3 uur - haal nieuwe data op via API`)
+                } else {
+                  console.log(`[Proxy] Lokale data voor ${gemaalCode} is ${Math.round(localDataAge / 60000)} minuten oud - haal nieuwe data op via API`)
                 }
-              } catch (fileError) {
-                console.warn(`[Proxy] Fout bij lezen lokale data: ${fileError.message}`)
-                // Vervolg naar API fallback
+              } else {
+                console.log(`[Proxy] Geen lokale data gevonden voor gemaal ${gemaalCode} - haal op via API`)
               }
-            } else {
-              console.log(`[Proxy] Geen lokale data gevonden voor gemaal ${gemaalCode} - haal op via API`)
+            } catch (fileError) {
+              console.warn(`[Proxy] Fout bij lezen lokale data: ${fileError.message}`)
+              // Vervolg naar API fallback
             }
             
             // Stap 2: Haal data op via API (als lokale data niet beschikbaar is of ouder dan 30 minuten)
@@ -331,51 +197,24 @@ export default defineConfig({
               return
             }
 
-            // Sla nieuwe data op voor volgende keer
+            // Bewaar de punten als _latest snapshot voor volgende keer (zelfde formaat als de segment store).
+            // Dit is alleen een cache voor de frontend: de historie in de segment store wordt niet
+            // aangevuld, en de eerstvolgende append van de Python fetcher overschrijft dit bestand.
             try {
-              const parsedData = {
-                feature_identifier: gemaalCode,
-                timestamp: new Date().toISOString(),
-                time_range: {
-                  min: config.xAxis?.[0]?.min,
-                  max: config.xAxis?.[0]?.max
-                },
-                yAxis: (config.yAxis || []).map(y => ({
-                  title: y.title?.text || '',
-                  min: y.min,
-                  max: y.max,
-                  id: y.id || ''
-                })),
-                series: series.map(s => ({
-                  name: s.name || 'Debiet',
-                  type: s.type || 'line',
-                  color: s.color || '',
-                  data: (s.data || []).map(point => {
-                    const timestamp_ms = point.x || 0
-                    const value = point.y || 0
-                    const timestamp_dt = new Date(timestamp_ms)
-                    return {
-                      timestamp: timestamp_dt.toISOString(),
-                      timestamp_ms: timestamp_ms,
-                      value: value,
-                      status: value > 0.001 ? 'aan' : 'uit'
-                    }
-                  })
-                }))
+              const points = (series[0].data || [])
+                .map(point => [point.x || 0, point.y || 0])
+                .sort((a, b) => a[0] - b[0])
+              const lastTs = points.length > 0 ? points[points.length - 1][0] : null
+              const windowMs = 3 * 60 * 60 * 1000
+              const snapshot = {
+                station: gemaalCode,
+                updated: new Date().toISOString(),
+                last_ts: lastTs,
+                window_ms: windowMs,
+                points: points.filter(([timestampMs]) => lastTs !== null && timestampMs >= lastTs - windowMs)
               }
-              
-              const timestamp = new Date()
-              const filename = `gemaal_${gemaalCode}_${timestamp.toISOString().replace(/[:.]/g, '-').slice(0, 19).replace('T', '_')}.json`
-              const filePath = resolve(realtimeDataDir, filename)
-              
-              const saveData = {
-                timestamp: timestamp.toISOString(),
-                feature_identifier: gemaalCode,
-                chart_id: HYDRONET_CHART_ID,
-                data: parsedData
-              }
-              
-              writeFileSync(filePath, JSON.stringify(saveData, null, 2), 'utf-8')
+              mkdirSync(latestDir, { recursive: true })
+              writeFileSync(resolve(latestDir, `${gemaalCode}.json`), JSON.stringify(snapshot), 'utf-8')
               console.log(`[Proxy] ✓ Nieuwe data opgeslagen voor gemaal ${gemaalCode}`)
             } catch (saveError) {
               console.warn(`[Proxy] Kon data niet opslaan: ${saveError.message}`)